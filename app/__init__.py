@@ -134,6 +134,11 @@ def create_app(
     # Use the same redis instance as tus but use database "1"
     redis_uri = app.config['REDIS_CONNECTION_STRING']
     app.celery = Celery('houston', broker=redis_uri, backend=redis_uri)
+    git_store_queue = app.config.get('GIT_STORE_CELERY_QUEUE')
+    if git_store_queue:
+        app.celery.conf.task_routes = {
+            'app.extensions.git_store.tasks.*': {'queue': git_store_queue},
+        }
     app.url_map.strict_slashes = False
     # celery.conf.update(app.config)
 
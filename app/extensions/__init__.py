@@ -38,6 +38,15 @@ db = SQLAlchemy()
 
 cache = Cache()
 
+# Cache types shared by every worker, see is_cache_shared()
+SHARED_CACHE_TYPES = (
+    'RedisCache',
+    'RedisSentinelCache',
+    'RedisClusterCache',
+    'MemcachedCache',
+    'SASLMemcachedCache',
+)
+
 executor = Executor()
 
 from sqlalchemy_utils import force_auto_coercion  # NOQA
@@ -437,17 +446,14 @@ class HoustonModel(TimestampViewed, ElasticsearchModel):
     def query_search(cls, search=None, args=None):
         from sqlalchemy import and_, or_
 
+        from .query_search import parse_search_terms
+
         if args is not None:
             search = args.get('search', None)
 
-        if search is not None and len(search) == 0:
-            search = None
-
-        if search is not None:
-            search = search.strip().replace(',', ' ').split(' ')
-            search = [term.strip() for term in search]
-            search = [term for term in search if len(term) > 0]
+        search = parse_search_terms(search)
 
+        if len(search) > 0:
             or_terms = []
             for term in search:
                 or_term = or_(*cls.query_search_term_hook(term))
@@ -460,10 +466,9 @@ class HoustonModel(TimestampViewed, ElasticsearchModel):
 
     @classmethod
     def query_search_term_hook(cls, term):
-        from sqlalchemy import String
-        from sqlalchemy_utils.functions import cast_if
+        from .query_search import search_term_clauses
 
-        return (cast_if(cls.guid, String).contains(term),)
+        return search_term_clauses(term, guid_columns=(cls.guid,))
 
     @classmethod
     def get_multiple(cls, guids):
@@ -764,6 +769,12 @@ class ExportMixin(object):
             self.export_custom_fields(data)
         return data
 
+    def get_export_related(self):
+        """
+        Other exportable objects that are exported alongside this one
+        """
+        return []
+
 
 ##########################################################################################
 
@@ -814,6 +825,17 @@ def parallel(
     return results
 
 
+def is_cache_shared():
+    """
+    Whether the configured cache is shared by every worker.  Values that are
+    invalidated when the data changes are only cached in a shared cache, a
+    worker could otherwise keep using a value another worker invalidated.
+    """
+    from flask import current_app
+
+    return current_app.config.get('CACHE_TYPE') in SHARED_CACHE_TYPES
+
+
 ##########################################################################################
 
 
@@ -108,6 +108,12 @@ class Namespace(BaseNamespace):
 
         Also, any custom Parameters can be used, but it needs to have ``limit`` and ``offset``
         fields.
+
+        Listings backed by a database query additionally support keyset
+        pagination with ``after=<sort key>,<guid>`` (the cursor for the next
+        page is returned in the ``X-Next-After`` header) and a ``count`` mode
+        that selects how ``X-Total-Count`` is computed; the kind of count
+        that was used is returned in the ``X-Total-Count-Type`` header.
         """
         if not parameters:
             # Use default parameters if None specified
@@ -127,15 +133,21 @@ class Namespace(BaseNamespace):
             def wrapper(self_, parameters_args, *args, **kwargs):
                 from app.extensions.elasticsearch import ELASTICSEARCH_SORTING_PREFIX
 
+                from . import pagination
+
                 offset = parameters_args['offset']
                 limit = parameters_args['limit']
                 sort = parameters_args['sort']
                 reverse = parameters_args['reverse']
                 reverse_after = parameters_args.pop('reverse_after', False)
+                after = parameters_args.pop('after', None)
+                count_mode = parameters_args.pop('count', pagination.COUNT_EXACT)
 
                 query = func(self_, parameters_args, *args, **kwargs)
 
                 exportable_count = -1
+                total_count_type = pagination.COUNT_EXACT
+                next_after = None
                 if not isinstance(query, flask_sqlalchemy.BaseQuery):
                     if query is None or len(query) == 0:
                         total_count, response = 0, []
@@ -151,8 +163,10 @@ class Namespace(BaseNamespace):
                             'This may happen when @api.paginate is above @api.response'
                         )
                 else:
-                    total_count = query.count()
                     cls = query.column_descriptions[0].get('entity')
+                    total_count, total_count_type = pagination.get_total_count(
+                        query, cls, count_mode
+                    )
 
                     prmiary_columns = list(cls.__table__.primary_key.columns)
                     if len(prmiary_columns) == 1:
@@ -161,7 +175,7 @@ class Namespace(BaseNamespace):
                         log.warning(
                             'Multiple columns specified as the primary key, defaulting to GUID'
                         )
-                        default_column = cls.guid
+                        default_column = cls.__table__.c.guid
 
                     if sort.startswith(ELASTICSEARCH_SORTING_PREFIX):
                         log.error(
@@ -217,6 +231,30 @@ class Namespace(BaseNamespace):
                     if outerjoin_cls is not None:
                         query = query.outerjoin(outerjoin_cls)
 
+                    keyset = after is not None and len(after) > 0
+                    if keyset:
+                        if outerjoin_cls is not None or sort_column.nullable:
+                            http_exceptions.abort(
+                                code=HTTPStatus.BAD_REQUEST,
+                                message='The sort field %r cannot be used with "after", use a non-nullable column of the listed object'
+                                % (sort,),
+                            )
+                        if not pagination.column_is_indexed(sort_column):
+                            log.warning(
+                                'Keyset pagination on unindexed column %r of %r'
+                                % (sort_column.name, cls.__name__)
+                            )
+                        try:
+                            query = pagination.apply_cursor(
+                                query, sort_column, default_column, after, reverse
+                            )
+                        except ValueError as exception:
+                            http_exceptions.abort(
+                                code=HTTPStatus.BAD_REQUEST, message=str(exception)
+                            )
+                        # The cursor replaces the offset
+                        offset = 0
+
                     query = (
                         query.order_by(sort_func_1(), sort_func_2())
                         .offset(offset)
@@ -236,13 +274,30 @@ class Namespace(BaseNamespace):
 
                     response = query
 
+                    if (
+                        outerjoin_cls is None
+                        and not sort_column.nullable
+                        and len(query.column_descriptions) == 1
+                    ):
+                        response = query.all()
+                        if len(response) == limit:
+                            last = response[0] if reverse_after else response[-1]
+                            next_after = pagination.encode_cursor(
+                                last, sort_column, default_column
+                            )
+
+                headers = {
+                    'X-Total-Count': total_count,
+                    'X-Total-Count-Type': total_count_type,
+                    'X-Exportable-Count': exportable_count,
+                }
+                if next_after is not None:
+                    headers['X-Next-After'] = next_after
+
                 return (
                     response,
                     HTTPStatus.OK,
-                    {
-                        'X-Total-Count': total_count,
-                        'X-Exportable-Count': exportable_count,
-                    },
+                    headers,
                 )
 
             return self.parameters(parameters, locations)(wrapper)
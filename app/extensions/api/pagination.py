@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+Pagination helpers
+------------------
+
+Helpers used by ``Namespace.paginate()`` for keyset (cursor) pagination and
+for computing the ``X-Total-Count`` header without always running an exact
+``COUNT(*)`` over the whole listing.
+"""
+import datetime
+import hashlib
+import logging
+import uuid
+
+import sqlalchemy
+from sqlalchemy.inspection import inspect
+
+log = logging.getLogger(__name__)
+
+COUNT_EXACT = 'exact'
+COUNT_ESTIMATED = 'estimated'
+COUNT_CACHED = 'cached'
+COUNT_NONE = 'none'
+
+COUNT_MODES = (COUNT_EXACT, COUNT_ESTIMATED, COUNT_CACHED, COUNT_NONE)
+
+CURSOR_SEPARATOR = ','
+
+COUNT_CACHE_KEY_PREFIX = 'pagination-count'
+COUNT_CACHE_DEFAULT_TIMEOUT = 60
+
+
+def column_is_indexed(column):
+    """
+    Return True if the column can be used as a leading keyset sort column
+    without a sequential scan (primary key or has its own index).
+    """
+    if column.primary_key or column.index or column.unique:
+        return True
+    for index in column.table.indexes:
+        index_columns = list(index.columns)
+        if len(index_columns) > 0 and index_columns[0] is column:
+            return True
+    return False
+
+
+def _parse_cursor_value(column, value):
+    from app.extensions import GUID
+
+    if isinstance(column.type, GUID):
+        return uuid.UUID(value)
+
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        python_type = None
+
+    if python_type is None or python_type is str:
+        return value
+    if python_type is datetime.datetime:
+        return datetime.datetime.fromisoformat(value)
+    if python_type is datetime.date:
+        return datetime.date.fromisoformat(value)
+    if python_type is bool:
+        return value.lower() in ('1', 'true', 'yes')
+    return python_type(value)
+
+
+def decode_cursor(cursor, sort_column, default_column):
+    """
+    Decode an ``after`` cursor into ``(sort_value, guid_value)``.
+
+    The cursor is formatted as ``<sort key>,<guid>``.  When the listing is
+    sorted by its primary key only the GUID is required.
+
+    Raises:
+        ValueError: the cursor cannot be parsed for the sort column
+    """
+    cursor = cursor.strip()
+    if CURSOR_SEPARATOR in cursor:
+        sort_value, guid_value = cursor.rsplit(CURSOR_SEPARATOR, 1)
+    else:
+        sort_value, guid_value = None, cursor
+
+    if sort_value is None:
+        if sort_column is not default_column:
+            raise ValueError(
+                'The "after" cursor must be formatted as "<sort key>,<guid>"'
+            )
+        sort_value = guid_value
+
+    try:
+        return (
+            _parse_cursor_value(sort_column, sort_value),
+            _parse_cursor_value(default_column, guid_value.strip()),
+        )
+    except (TypeError, ValueError) as exception:
+        raise ValueError('Invalid "after" cursor %r: %s' % (cursor, exception))
+
+
+def encode_cursor(obj, sort_column, default_column):
+    """
+    Build the ``after`` cursor that continues a listing after ``obj``.
+    """
+    mapper = inspect(obj.__class__)
+
+    def _value(column):
+        prop = mapper.get_property_by_column(column)
+        value = getattr(obj, prop.key)
+        if isinstance(value, (datetime.datetime, datetime.date)):
+            return value.isoformat()
+        return str(value)
+
+    if sort_column is default_column:
+        return _value(default_column)
+    return CURSOR_SEPARATOR.join((_value(sort_column), _value(default_column)))
+
+
+def apply_cursor(query, sort_column, default_column, cursor, reverse=False):
+    """
+    Restrict ``query`` to the rows strictly after ``cursor`` in the
+    ``(sort_column, default_column)`` ordering.
+    """
+    sort_value, guid_value = decode_cursor(cursor, sort_column, default_column)
+
+    if sort_column is default_column:
+        clause = default_column < guid_value if reverse else default_column > guid_value
+    else:
+        keys = sqlalchemy.tuple_(sort_column, default_column)
+        values = sqlalchemy.tuple_(
+            sqlalchemy.literal(sort_value, type_=sort_column.type),
+            sqlalchemy.literal(guid_value, type_=default_column.type),
+        )
+        clause = keys < values if reverse else keys > values
+
+    return query.filter(clause)
+
+
+def _count_cache_key(query):
+    statement = query.statement
+    compiled = statement.compile()
+    params = sorted((key, repr(value)) for key, value in compiled.params.items())
+    digest = hashlib.sha256(
+        ('%s|%r' % (compiled, params)).encode('utf-8')
+    ).hexdigest()
+    return '{}:{}'.format(COUNT_CACHE_KEY_PREFIX, digest)
+
+
+def _cached_count(query):
+    from flask import current_app
+
+    from app.extensions import cache
+
+    key = _count_cache_key(query)
+    total_count = cache.get(key)
+    if total_count is None:
+        total_count = query.count()
+        timeout = current_app.config.get(
+            'PAGINATION_COUNT_CACHE_TIMEOUT', COUNT_CACHE_DEFAULT_TIMEOUT
+        )
+        cache.set(key, total_count, timeout=timeout)
+    return total_count
+
+
+def _estimated_count(query, cls):
+    """
+    Return the planner's row estimate for an unfiltered listing from
+    ``pg_class.reltuples``, or None if an estimate is not available.
+    """
+    from app.extensions import db
+
+    if query.whereclause is not None:
+        return None
+
+    if db.engine.dialect.name != 'postgresql':
+        return None
+
+    result = db.session.execute(
+        sqlalchemy.text(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table_name)'
+        ),
+        {'table_name': cls.__table__.name},
+    ).scalar()
+
+    # reltuples is -1 (or 0) until the table has been vacuumed or analyzed
+    if result is None or result <= 0:
+        return None
+    return int(result)
+
+
+def get_total_count(query, cls, mode=COUNT_EXACT):
+    """
+    Compute the total number of rows of a listing query.
+
+    Returns:
+        tuple(int, str) - the count and the kind of count that was used,
+        one of ``exact``, ``estimated``, ``cached`` or ``none``.  An
+        estimated count falls back to a cached count for filtered queries,
+        or when the table has not been analyzed yet.
+    """
+    if mode == COUNT_NONE:
+        return -1, COUNT_NONE
+
+    if mode == COUNT_ESTIMATED:
+        total_count = _estimated_count(query, cls)
+        if total_count is not None:
+            return total_count, COUNT_ESTIMATED
+        mode = COUNT_CACHED
+
+    if mode == COUNT_CACHED:
+        return _cached_count(query), COUNT_CACHED
+
+    return query.count(), COUNT_EXACT
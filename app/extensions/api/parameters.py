@@ -9,6 +9,8 @@ from marshmallow import validate
 
 from flask_restx_patched import Parameters
 
+from .pagination import COUNT_EXACT, COUNT_MODES
+
 
 def _get_is_static_role_property(role_name, static_role):
     """
@@ -70,6 +72,18 @@ class PaginationParameters(Parameters):
         description='the field to reverse the sorted results (after paging has been performed)',
         missing=False,
     )
+    after = base_fields.String(
+        description=(
+            'keyset pagination cursor formatted as "<sort key>,<guid>" (use the '
+            'X-Next-After header of the previous page), replaces offset when given'
+        ),
+        required=False,
+    )
+    count = base_fields.String(
+        description='the kind of X-Total-Count to compute: exact, estimated, cached or none',
+        missing=COUNT_EXACT,
+        validate=validate.OneOf(COUNT_MODES),
+    )
 
 
 class PaginationParametersLatestFirst(PaginationParameters):
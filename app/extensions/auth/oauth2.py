@@ -48,6 +48,34 @@ class OAuth2RequestValidator(provider.OAuth2RequestValidator):
             tokensetter=self._tokensetter,
         )
 
+    def validate_bearer_token(self, token, scopes, request):
+        """
+        Validate an access token as ``provider.OAuth2RequestValidator`` does,
+        with ``OAuth2Token.find_cached``.  The token getter is used as is to
+        revoke and refresh tokens, which need the token itself.
+        """
+        tok = self._token_class.find_cached(access_token=token)
+        if not tok:
+            request.error_message = 'Bearer token not found.'
+            return False
+
+        if tok.expires is not None and datetime.datetime.utcnow() > tok.expires:
+            request.error_message = 'Bearer token is expired.'
+            return False
+
+        if scopes and not set(tok.scopes) & set(scopes):
+            request.error_message = 'Bearer token scope not valid.'
+            return False
+
+        request.access_token = tok
+        request.user = tok.user
+        request.scopes = scopes
+
+        # Cached tokens do not load their client, see CachedOAuth2Token
+        if hasattr(tok, 'client'):
+            request.client = tok.client
+        return True
+
     def _usergetter(self, email, password, client, request):
         # pylint: disable=method-hidden,unused-argument
         # Avoid circular dependencies
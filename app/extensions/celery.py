@@ -42,16 +42,34 @@ if is_extension_enabled('sage'):
 if is_extension_enabled('prometheus'):
     import app.extensions.prometheus.tasks  # noqa
 
+if is_extension_enabled('export'):
+    import app.extensions.export.tasks  # noqa
+
 # Register Module-level tasks
 
 if is_module_enabled('asset_groups'):
     import app.modules.asset_groups.tasks  # noqa
 
+if is_module_enabled('assets'):
+    import app.modules.assets.tasks  # noqa
+
+if is_module_enabled('auth'):
+    import app.modules.auth.tasks  # noqa
+
+if is_module_enabled('emails'):
+    import app.modules.emails.tasks  # noqa
+
 if is_module_enabled('individuals'):
     import app.modules.individuals.tasks  # noqa
 
+if is_module_enabled('integrity'):
+    import app.modules.integrity.tasks  # noqa
+
 if is_module_enabled('missions'):
     import app.modules.missions.tasks  # noqa
 
 if is_module_enabled('sightings'):
     import app.modules.sightings.tasks  # noqa
+
+if is_module_enabled('social_groups'):
+    import app.modules.social_groups.tasks  # noqa
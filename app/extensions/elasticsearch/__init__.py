@@ -1989,6 +1989,29 @@ def es_elasticsearch(
         return results
 
 
+class TimedTransport(elasticsearch.Transport):
+    """
+    Transport that records the duration of every Elasticsearch request in
+    Prometheus, labelled by API (``_search``, ``_bulk``, ``_doc``, ...)
+    rather than by URL so index names and document ids are not labels.
+    """
+
+    @staticmethod
+    def operation(url):
+        for part in url.split('?', 1)[0].split('/'):
+            if part.startswith('_'):
+                return part
+        return 'index'
+
+    def perform_request(self, method, url, *args, **kwargs):
+        from app.extensions import prometheus
+
+        with prometheus.outbound_timer(
+            'elasticsearch', method, TimedTransport.operation(url)
+        ):
+            return super().perform_request(method, url, *args, **kwargs)
+
+
 def init_app(app, **kwargs):
     # pylint: disable=unused-argument
     """
@@ -1999,6 +2022,7 @@ def init_app(app, **kwargs):
     app.elasticsearch = elasticsearch.Elasticsearch(
         hosts=app.config['ELASTICSEARCH_HOSTS'],
         http_auth=app.config['ELASTICSEARCH_HTTP_AUTH'],
+        transport_class=TimedTransport,
     )
     app.es = app.elasticsearch
 
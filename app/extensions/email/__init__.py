@@ -1,8 +1,10 @@
 # -*- coding: utf-8 -*-
 # pylint: disable=no-self-use
+import collections
 import datetime
 import logging
 import re
+import threading
 from io import StringIO
 
 import cssutils
@@ -14,7 +16,7 @@ from premailer import Premailer
 
 import app.version
 from app.utils import to_ascii
-from flask_restx_patched import is_extension_enabled
+from flask_restx_patched import is_extension_enabled, is_module_enabled
 
 if not is_extension_enabled('mail'):
     raise RuntimeError('Email is not enabled')
@@ -23,6 +25,21 @@ if not is_extension_enabled('mail'):
 NEWLINE_TEMP_CODE = '_^_NEWLINE_CHARACTER_^_'
 WEBFONTS_PLACEHOLDER_CODE = '_^_WEBFONTS_PLACEHOLDER_^_'
 
+# The variables passed to Email.template() are rendered as these placeholders
+# when the premailer-inlined HTML is cached, and substituted for each message.
+# A URL scheme is used so premailer leaves them alone when it makes links
+# absolute, and the trailing slash keeps 1 from matching the start of 10.
+TEMPLATE_VARIABLE_PLACEHOLDER = 'houston-var://{}/'
+
+# Characters that need an attribute value to be quoted, htmlmin removes
+# the quotes around the placeholders
+UNQUOTED_ATTRIBUTE_UNSAFE = re.compile(r'[\s"\'=<>`]')
+
+# Inlined and minified HTML by (templates, variables, site settings)
+HTML_TEMPLATE_CACHE = collections.OrderedDict()
+HTML_TEMPLATE_CACHE_LOCK = threading.Lock()
+HTML_TEMPLATE_CACHE_DEFAULT_MAXSIZE = 1024
+
 
 cssutils_log = StringIO()
 cssutils_handler = logging.StreamHandler(cssutils_log)
@@ -104,6 +121,48 @@ def _format_datetime(dt, verbose=False):
     return dt.strftime(time_fmtstr).replace('{S}', str(dt.day) + _suffix(dt.day))
 
 
+def _html_template_cache_get(key):
+    with HTML_TEMPLATE_CACHE_LOCK:
+        html = HTML_TEMPLATE_CACHE.get(key)
+        if html is not None:
+            HTML_TEMPLATE_CACHE.move_to_end(key)
+        return html
+
+
+def _html_template_cache_set(key, html):
+    maxsize = current_app.config.get(
+        'PREMAILER_CACHE_MAXSIZE', HTML_TEMPLATE_CACHE_DEFAULT_MAXSIZE
+    )
+    with HTML_TEMPLATE_CACHE_LOCK:
+        HTML_TEMPLATE_CACHE[key] = html
+        HTML_TEMPLATE_CACHE.move_to_end(key)
+        while len(HTML_TEMPLATE_CACHE) > maxsize:
+            HTML_TEMPLATE_CACHE.popitem(last=False)
+
+
+def _fill_placeholders(html, placeholders, values):
+    """
+    Substitute the template variable placeholders in ``html`` with their
+    values for this message.
+    """
+    if not placeholders:
+        return html
+
+    lookup = {token: str(values.get(key)) for key, token in placeholders.items()}
+    pattern = re.compile(
+        '(=?)({})'.format('|'.join(re.escape(token) for token in lookup))
+    )
+
+    def _replace(match):
+        value = lookup[match.group(2)]
+        # An unquoted attribute value, e.g. href=houston-var://0/
+        if match.group(1) and (value == '' or UNQUOTED_ATTRIBUTE_UNSAFE.search(value)):
+            value = '"{}"'.format(value.replace('"', '&quot;'))
+        return match.group(1) + value
+
+    return pattern.sub(_replace, html)
+
+
 class Email(Message):
     def __init__(self, **kwargs):
         import uuid
@@ -142,6 +201,9 @@ class Email(Message):
             'facebook_url': SiteSetting.get_value('site.links.facebookLink'),
             'adoption_button_text': SiteSetting.get_value('email_adoption_button_text'),
         }
+        # Everything rendered into the cached HTML, except the transaction
+        self._site_kwarg_keys = set(self.template_kwargs.keys()) - {'transaction_id'}
+        self._message_kwarg_keys = {'transaction_id'}
         self.status = None
         self.mail = mail
 
@@ -175,6 +237,9 @@ class Email(Message):
 
         self.template_name = template
         self.template_kwargs.update(kwargs)
+        self._message_kwarg_keys |= {
+            key for key in kwargs if key not in self._site_kwarg_keys
+        }
         self._template_found = False
         self._render_subject()
         self._render_html()
@@ -209,10 +274,12 @@ class Email(Message):
         return temps
 
     # this tries to find the best-fitting template
-    def _try_templates(self, flavor, template_name=None):
+    def _try_templates(self, flavor, template_name=None, template_kwargs=None):
+        if template_kwargs is None:
+            template_kwargs = self.template_kwargs
         for temp in self._templates_to_try(flavor, template_name=template_name):
             try:
-                rt = render_template(temp, **self.template_kwargs)
+                rt = render_template(temp, **template_kwargs)
                 log.debug(f'Template flavor={flavor} matched {temp}')
                 self._template_found = True
                 return rt
@@ -239,19 +306,56 @@ class Email(Message):
             return
         self.body = self._try_templates('txt')
 
+    def _html_cache_key(self, placeholders):
+        site_kwargs = sorted(
+            (key, repr(value))
+            for key, value in self.template_kwargs.items()
+            if key not in placeholders
+        )
+        return (
+            tuple(self._templates_to_try('html')),
+            tuple(sorted(placeholders)),
+            tuple(site_kwargs),
+        )
+
     def _render_html(self):
+        """
+        Render the HTML body.  Running Premailer and htmlmin is slow, so the
+        result is cached per template, language and site settings with the
+        variables passed to template() as placeholders, and only those
+        variables are filled in for each message.  Templates may therefore
+        only print these variables, not branch on them.
+        """
         if self.html:
             return
 
-        # Render raw HTML template with Jinja2
-        self.raw_html = self._try_templates('html')
+        placeholders = {
+            key: TEMPLATE_VARIABLE_PLACEHOLDER.format(index)
+            for index, key in enumerate(sorted(self._message_kwarg_keys))
+        }
+        cache_key = self._html_cache_key(placeholders)
+        html = _html_template_cache_get(cache_key)
+        if html is not None:
+            self._template_found = True
+        else:
+            template_kwargs = dict(self.template_kwargs)
+            template_kwargs.update(placeholders)
+
+            # Render raw HTML template with Jinja2
+            raw_html = self._try_templates('html', template_kwargs=template_kwargs)
+            html = self._transform_html(raw_html)
+            if raw_html is not None:
+                _html_template_cache_set(cache_key, html)
 
+        self.html = _fill_placeholders(html, placeholders, self.template_kwargs)
+
+    def _transform_html(self, raw_html):
         # Run Premailer
         attempt = 0
         while attempt <= 3:
             attempt += 1
             try:
-                transformed_html = pmail.transform(self.raw_html)
+                transformed_html = pmail.transform(raw_html)
                 break
             except (cssutils.prodparser.Missing):
                 pass
@@ -281,7 +385,7 @@ class Email(Message):
             '</head>', '{}</head>'.format(WEBFONTS_PLACEHOLDER_CODE)
         )
         final_html = minified_html.replace(WEBFONTS_PLACEHOLDER_CODE, webfonts_html)
-        self.html = final_html
+        return final_html
 
     def attach(self, filepath, atatchment_name, attachment_type='image/png'):
         with current_app.open_resource(filepath) as asset:
@@ -316,6 +420,45 @@ class Email(Message):
                 addresses.append(recipient)
         return addresses, users
 
+    def queue(self, foreground=None):
+        """
+        Store the email in the outbox to be delivered by the background
+        sender, rather than waiting on the SMTP server now.  Emails with
+        attachments are not stored and are sent straight away.
+        """
+        if not is_module_enabled('emails') or self.attachments:
+            return self.send_message()
+
+        from app.modules.emails.models import OutgoingEmail, OutgoingEmailStatus
+
+        if not self.body and not self.html:
+            raise ValueError(
+                f'No txt/html body content; not queueing email ({self.subject}, {self.recipients})'
+            )
+        if not self.recipients:
+            raise ValueError(f'No recipients; not queueing email ({self.subject})')
+
+        outgoing = OutgoingEmail.create_from_message(self)
+        log.debug(
+            f'Queued email from {self.sender} to {self.recipients}: {self.subject} [{self._transaction_id}]'
+        )
+
+        if foreground is None:
+            foreground = current_app.testing
+
+        if not foreground:
+            return {
+                'status': 'queued',
+                'success': True,
+            }
+
+        OutgoingEmail.deliver_pending(guids=[outgoing.guid])
+        self.status = outgoing.status.value
+        return {
+            'status': self.status,
+            'success': outgoing.status == OutgoingEmailStatus.sent,
+        }
+
     def send_message(self, *args, **kwargs):
         if _validate_settings():
             if not self.body and not self.html:
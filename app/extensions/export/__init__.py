@@ -5,6 +5,7 @@ Export extension
 
 """
 
+from app.extensions.api import api_v1
 from flask_restx_patched import is_extension_enabled
 
 if not is_extension_enabled('export'):
@@ -23,3 +24,8 @@ def init_app(app, **kwargs):
     # issue #932 removes export permission entirely
     # api_v1.add_oauth_scope('export:read', 'Provide access to Export API')
     # api_v1.add_oauth_scope('export:write', 'Provide write access to Export API')
+
+    # Touch underlying modules
+    from . import models, resources  # NOQA
+
+    api_v1.add_namespace(resources.api)
@@ -4,17 +4,31 @@ Export models
 --------------------------------------
 """
 
+import datetime
 import logging
+import os
+import time
+import uuid
 
+from flask import current_app
 from flask_login import current_user
 
 import app.extensions.logging as AuditLog  # NOQA
+from app.extensions import HoustonModel, db
 from app.modules.site_settings.models import SiteSetting
 
-# from app.extensions import HoustonModel, db
-
 log = logging.getLogger(__name__)  # pylint: disable=invalid-name
 
+# Maximum number of search results exported by one request or job
+EXPORT_MAX_ROWS = 15000
+
+# Number of objects loaded from the database at a time by an export job
+EXPORT_CHUNK_SIZE = 500
+
+# Export files, and the export jobs that wrote them, are deleted after this
+# many days, see ExportJob.cleanup()
+EXPORT_RETENTION_DAYS = 7
+
 
 class ExportException(Exception):
     def __init__(self, *args, **kwargs):
@@ -25,13 +39,22 @@ class ExportException(Exception):
 class Export:
     """
     Export class
+
+    The workbook is created in write-only mode, so rows are streamed to disk
+    as they are added and only the column schema of each sheet is kept in
+    memory.  The columns of a sheet are taken from the first object of that
+    class that is added.
     """
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, user=None, *args, **kwargs):
         from openpyxl import Workbook
         from openpyxl.packaging.custom import StringProperty
 
-        self.workbook = Workbook()
+        if user is None and current_user and not current_user.is_anonymous:
+            user = current_user
+        self.user = user
+
+        self.workbook = Workbook(write_only=True)
         self.workbook.custom_doc_props.append(
             StringProperty(
                 name='Codex', value=SiteSetting.get_value('site.name', default='Unknown')
@@ -41,8 +64,8 @@ class Export:
             StringProperty(name='Codex GUID', value=SiteSetting.get_system_guid())
         )
         uname = (
-            f'{str(current_user.guid)} {current_user.full_name}'
-            if current_user
+            f'{str(self.user.guid)} {self.user.full_name}'
+            if self.user
             else 'Unknown User'
         )
         self.workbook.custom_doc_props.append(
@@ -50,8 +73,7 @@ class Export:
         )
         self.sheets = {}
         self.columns = {}
-        # self.active_class = None
-        # self.columns = None
+        self.row_count = 0
         self.filename = self._generate_filename()
 
     # class of obj determines which sheet it gets added to
@@ -61,29 +83,29 @@ class Export:
         if not obj or not issubclass(obj.__class__, ExportMixin):
             raise ValueError(f'{obj} is not an ExportMixin')
 
+        # export_data can be expensive, so compute it exactly once per object
+        exd = obj.export_data
+
         cls = obj.__class__
         if cls not in self.sheets:
             title = f'{obj.__class__.__name__} Results'
-            if not len(self.sheets):
-                self.sheets[cls] = self.workbook.active
-                self.sheets[cls].title = title
-            else:
-                self.sheets[cls] = self.workbook.create_sheet(title)
-            cols = Export._get_columns(obj)
+            self.sheets[cls] = self.workbook.create_sheet(title)
+            cols = Export._get_columns(exd)
             self.columns[cls] = cols
             # for now we set first row to be headers by default
             self.sheets[cls].append(cols)
-        self.sheets[cls].append(self.row(obj))
+        self.sheets[cls].append(self.row(obj, exd))
+        self.row_count += 1
 
     @classmethod
-    def _get_columns(cls, obj):
-        exd = obj.export_data
+    def _get_columns(cls, exd):
         cols = list(exd.keys())
         cols.sort()
         return cols
 
-    def row(self, obj):
-        exd = obj.export_data
+    def row(self, obj, exd=None):
+        if exd is None:
+            exd = obj.export_data
         row = []
         for col in self.columns[obj.__class__]:
             row.append(exd.get(col))
@@ -103,15 +125,252 @@ class Export:
 
     @property
     def filepath(self):
-        import os
-
-        udir = str(current_user.guid) if current_user else 'unknown_user'
-        target_dir = os.path.join('/tmp', 'export', udir)
+        udir = str(self.user.guid) if self.user else 'unknown_user'
+        target_dir = os.path.join(current_app.config['EXPORT_DATABASE_PATH'], udir)
         if not os.path.exists(target_dir):
             os.makedirs(target_dir)
         return os.path.join(target_dir, self.filename)
 
     def save(self):
+        if not self.sheets:
+            # a write-only workbook cannot be saved without any sheets
+            self.workbook.create_sheet('Results')
         log.info(f'{self} saving to {self.filepath}')
         self.workbook.save(self.filepath)
         return self.filename
+
+
+class ExportJob(db.Model, HoustonModel):
+    """
+    A background export of the results of an Elasticsearch query.
+
+    The spreadsheet is written by the ``run_export_job`` Celery task, which
+    reports its progress in ``progress`` and stores the file under
+    ``EXPORT_DATABASE_PATH`` for download once it has completed.
+    """
+
+    EXPORTABLE_CLASSES = ('Encounter', 'Individual', 'Sighting')
+
+    guid = db.Column(
+        db.GUID, default=uuid.uuid4, primary_key=True
+    )  # pylint: disable=invalid-name
+
+    owner_guid = db.Column(
+        db.GUID, db.ForeignKey('user.guid'), index=True, nullable=False
+    )
+    owner = db.relationship('User', foreign_keys=[owner_guid])
+
+    # Name of the exported class, one of EXPORTABLE_CLASSES
+    export_class = db.Column(db.String(length=64), nullable=False)
+    search = db.Column(db.JSON, nullable=True)
+
+    filename = db.Column(db.String(), nullable=True)
+    row_count = db.Column(db.Integer, default=0, nullable=False)
+
+    progress_guid = db.Column(
+        db.GUID, db.ForeignKey('progress.guid'), index=True, nullable=True
+    )
+    progress = db.relationship('Progress', foreign_keys=[progress_guid])
+
+    def __repr__(self):
+        return (
+            '<{class_name}('
+            'guid={self.guid}, '
+            'export_class={self.export_class}, '
+            'row_count={self.row_count}'
+            ')>'.format(class_name=self.__class__.__name__, self=self)
+        )
+
+    def user_is_owner(self, user):
+        return user is not None and user == self.owner
+
+    @classmethod
+    def get_retention(cls):
+        return datetime.timedelta(
+            days=current_app.config.get('EXPORT_RETENTION_DAYS', EXPORT_RETENTION_DAYS)
+        )
+
+    @property
+    def expires(self):
+        if self.created is None:
+            return None
+        return self.created + self.get_retention()
+
+    @classmethod
+    def cleanup(cls):
+        """
+        Delete the jobs created over EXPORT_RETENTION_DAYS ago with their
+        files, then any other export file as old, such as the files written
+        by the synchronous exports.  Returns the number of jobs and files
+        deleted.
+        """
+        retention = cls.get_retention()
+        cutoff = datetime.datetime.utcnow() - retention
+
+        jobs = cls.query.filter(cls.created < cutoff).all()
+        for job in jobs:
+            job.delete()
+
+        files = 0
+        cutoff_mtime = time.time() - retention.total_seconds()
+        export_path = current_app.config['EXPORT_DATABASE_PATH']
+        if os.path.isdir(export_path):
+            for user_dir in os.scandir(export_path):
+                if not user_dir.is_dir():
+                    continue
+                for entry in os.scandir(user_dir.path):
+                    if entry.is_file() and entry.stat().st_mtime < cutoff_mtime:
+                        os.remove(entry.path)
+                        files += 1
+
+        log.info(f'Cleaning exports, deleted {len(jobs)} jobs and {files} files')
+        return {'export_job': len(jobs), 'export_file': files}
+
+    def delete(self):
+        filepath = self.filepath
+        if filepath is not None and os.path.exists(filepath):
+            os.remove(filepath)
+        progress = self.progress
+        with db.session.begin(subtransactions=True):
+            db.session.delete(self)
+            if progress is not None:
+                db.session.delete(progress)
+
+    @classmethod
+    def get_class(cls, export_class):
+        if export_class == 'Encounter':
+            from app.modules.encounters.models import Encounter
+
+            return Encounter
+        if export_class == 'Individual':
+            from app.modules.individuals.models import Individual
+
+            return Individual
+        if export_class == 'Sighting':
+            from app.modules.sightings.models import Sighting
+
+            return Sighting
+        raise ValueError(
+            f'Unable to export {export_class}, options are {", ".join(cls.EXPORTABLE_CLASSES)}'
+        )
+
+    @classmethod
+    def create(cls, export_class, search, owner):
+        from app.modules.progress.models import Progress
+
+        # Validate the class name before creating anything
+        cls.get_class(export_class)
+
+        progress = Progress(description=f'Export of {export_class} search results')
+        with db.session.begin(subtransactions=True):
+            db.session.add(progress)
+            job = cls(
+                owner_guid=owner.guid,
+                export_class=export_class,
+                search=search,
+                progress_guid=progress.guid,
+            )
+            db.session.add(job)
+        return job
+
+    def start(self, foreground=None):
+        from .tasks import run_export_job
+
+        if foreground is None:
+            foreground = current_app.testing
+
+        if foreground:
+            self.run()
+            return
+
+        promise = run_export_job.delay(str(self.guid))
+        with db.session.begin(subtransactions=True):
+            self.progress.celery_guid = uuid.UUID(promise.id)
+            db.session.merge(self.progress)
+
+    @property
+    def filepath(self):
+        if self.filename is None:
+            return None
+        return os.path.join(
+            current_app.config['EXPORT_DATABASE_PATH'], str(self.owner_guid), self.filename
+        )
+
+    @property
+    def is_downloadable(self):
+        return (
+            self.progress is not None
+            and self.progress.complete
+            and self.filepath is not None
+            and os.path.exists(self.filepath)
+        )
+
+    def run(self, chunk_size=EXPORT_CHUNK_SIZE):
+        """
+        Write the spreadsheet for this job.  The search is resolved to GUIDs
+        once, then objects are loaded ``chunk_size`` at a time and released
+        from the session after their rows have been written.
+        """
+        progress = self.progress
+        try:
+            self._run(progress, chunk_size)
+        except Exception as ex:
+            log.exception(f'{self} failed')
+            if progress is not None:
+                progress.fail(str(ex))
+            raise
+
+    def _run(self, progress, chunk_size):
+        cls = self.get_class(self.export_class)
+        owner = self.owner
+
+        # Rows are written in the order of the search results
+        guids = cls.elasticsearch(self.search or {}, load=False, limit=EXPORT_MAX_ROWS)
+
+        export = Export(user=owner)
+        # jobs may finish within the same minute, so make the name unique
+        export.filename = '{}-{}.xls'.format(
+            os.path.splitext(export.filename)[0], str(self.guid)[:8]
+        )
+        added = set()
+        total = len(guids)
+        for start in range(0, total, chunk_size):
+            chunk = guids[start : start + chunk_size]
+            objs = {obj.guid: obj for obj in cls.query.filter(cls.guid.in_(chunk))}
+            loaded = []
+            for guid in chunk:
+                obj = objs.get(guid)
+                if obj is None:
+                    # Deleted since it was indexed
+                    continue
+                loaded.append(obj)
+                if not obj.user_has_export_permission(owner):
+                    continue
+                export.add(obj)
+                for related in obj.get_export_related():
+                    if related is None or related.guid in added:
+                        continue
+                    if not related.user_has_export_permission(owner):
+                        continue
+                    added.add(related.guid)
+                    loaded.append(related)
+                    export.add(related)
+
+            # Keep the session bounded to one chunk of objects
+            for obj in loaded:
+                if obj in db.session:
+                    db.session.expunge(obj)
+
+            if progress is not None:
+                # 100% is reserved for when the file has been saved
+                progress.set(min(99, 100.0 * (start + len(chunk)) / total))
+
+        export.save()
+
+        with db.session.begin(subtransactions=True):
+            self.filename = export.filename
+            self.row_count = export.row_count
+            db.session.merge(self)
+
+        if progress is not None:
+            progress.set(100)
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+"""
+Input arguments (Parameters) for Export resources RESTful API
+-------------------------------------------------------------
+"""
+
+from flask_marshmallow import base_fields
+from marshmallow import validate
+
+from flask_restx_patched import Parameters
+
+from .models import ExportJob
+
+
+class CreateExportJobParameters(Parameters):
+    export_class = base_fields.String(
+        description='the class of the search results to export',
+        required=True,
+        validate=validate.OneOf(ExportJob.EXPORTABLE_CLASSES),
+    )
+    search = base_fields.Dict(
+        description='the Elasticsearch query selecting the objects to export',
+        missing=dict,
+    )
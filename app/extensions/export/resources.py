@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=bad-continuation
+"""
+RESTful API Export resources
+----------------------------
+"""
+
+import logging
+from http import HTTPStatus
+
+from flask import send_file
+from flask_login import current_user
+
+from app.extensions import db
+from app.extensions.api import Namespace, abort
+from app.modules.users import permissions
+from app.modules.users.permissions.rules import ModuleActionRule
+from app.modules.users.permissions.types import AccessOperation
+from flask_restx_patched import Resource
+
+from . import parameters, schemas
+from .models import ExportJob
+
+log = logging.getLogger(__name__)  # pylint: disable=invalid-name
+api = Namespace('export', description='Export')  # pylint: disable=invalid-name
+
+
+@api.route('/jobs')
+@api.login_required(oauth_scopes=[])
+class ExportJobs(Resource):
+    """
+    Background spreadsheet exports of search results.
+    """
+
+    @api.parameters(parameters.CreateExportJobParameters())
+    @api.response(schemas.BaseExportJobSchema())
+    @api.response(code=HTTPStatus.FORBIDDEN)
+    def post(self, args):
+        """
+        Start a background export of the results of an Elasticsearch query.
+        """
+        cls = ExportJob.get_class(args['export_class'])
+        if not ModuleActionRule(module=cls, action=AccessOperation.READ).check():
+            abort(HTTPStatus.FORBIDDEN, f'Not permitted to export {cls.__name__}')
+
+        context = api.commit_or_abort(
+            db.session, default_error_message='Failed to create a new ExportJob'
+        )
+        with context:
+            export_job = ExportJob.create(
+                args['export_class'], args.get('search'), current_user
+            )
+        export_job.start()
+        return export_job
+
+
+@api.route('/jobs/<uuid:export_job_guid>')
+@api.login_required(oauth_scopes=[])
+@api.response(
+    code=HTTPStatus.NOT_FOUND,
+    description='ExportJob not found.',
+)
+@api.resolve_object_by_model(ExportJob, 'export_job')
+class ExportJobByID(Resource):
+    @api.permission_required(
+        permissions.ObjectAccessPermission,
+        kwargs_on_request=lambda kwargs: {
+            'obj': kwargs['export_job'],
+            'action': AccessOperation.READ,
+        },
+    )
+    @api.response(schemas.BaseExportJobSchema())
+    def get(self, export_job):
+        """
+        Get ExportJob details and progress by ID.
+        """
+        return export_job
+
+
+@api.route('/jobs/<uuid:export_job_guid>/download')
+@api.login_required(oauth_scopes=[])
+@api.response(
+    code=HTTPStatus.NOT_FOUND,
+    description='ExportJob not found.',
+)
+@api.resolve_object_by_model(ExportJob, 'export_job')
+class ExportJobDownload(Resource):
+    @api.permission_required(
+        permissions.ObjectAccessPermission,
+        kwargs_on_request=lambda kwargs: {
+            'obj': kwargs['export_job'],
+            'action': AccessOperation.READ,
+        },
+    )
+    @api.response(code=HTTPStatus.CONFLICT)
+    def get(self, export_job):
+        """
+        Download the spreadsheet of a completed ExportJob.
+        """
+        if not export_job.is_downloadable:
+            abort(HTTPStatus.CONFLICT, 'Export has not completed')
+        return send_file(
+            export_job.filepath,
+            mimetype='application/vnd.ms-excel',
+            as_attachment=True,
+            attachment_filename=export_job.filename,
+        )
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""
+Serialization schemas for Export resources RESTful API
+------------------------------------------------------
+"""
+
+from flask_marshmallow import base_fields
+
+from app.modules.progress.schemas import BaseProgressSchema
+from flask_restx_patched import ModelSchema
+
+from .models import ExportJob
+
+
+class BaseExportJobSchema(ModelSchema):
+    """
+    Base ExportJob schema exposes only the most general fields.
+    """
+
+    progress = base_fields.Nested(BaseProgressSchema)
+    downloadable = base_fields.Boolean(attribute='is_downloadable')
+    expires = base_fields.DateTime()
+
+    class Meta:
+        # pylint: disable=missing-docstring
+        model = ExportJob
+        fields = (
+            ExportJob.guid.key,
+            ExportJob.owner_guid.key,
+            ExportJob.export_class.key,
+            ExportJob.filename.key,
+            ExportJob.row_count.key,
+            ExportJob.created.key,
+            ExportJob.updated.key,
+            'progress',
+            'downloadable',
+            'expires',
+        )
+        dump_only = fields
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+import logging
+
+from app.extensions.celery import celery
+
+EXPORT_CLEANUP_FREQUENCY = 60 * 60
+
+
+log = logging.getLogger(__name__)
+
+
+@celery.on_after_configure.connect
+def export_setup_periodic_tasks(sender, **kwargs):
+    if EXPORT_CLEANUP_FREQUENCY is not None:
+        sender.add_periodic_task(
+            EXPORT_CLEANUP_FREQUENCY,
+            export_cleanup.s(),
+            name='Clean-up Expired Export Files and Jobs',
+        )
+
+
+@celery.task
+def run_export_job(export_job_guid):
+    from .models import ExportJob
+
+    export_job = ExportJob.query.get(export_job_guid)
+    if export_job is None:
+        log.warning(f'ExportJob {export_job_guid} no longer exists, skipping')
+        return
+
+    export_job.run()
+
+
+@celery.task
+def export_cleanup():
+    from .models import ExportJob
+
+    return ExportJob.cleanup()
@@ -4,6 +4,7 @@
 Local Git Store
 
 """
+import datetime
 import enum
 import json
 import keyword
@@ -15,6 +16,7 @@ import uuid
 
 import git
 import requests.exceptions
+import sqlalchemy as sa
 import tqdm
 import utool as ut
 from flask import current_app, render_template, request, session  # NOQA
@@ -33,6 +35,9 @@ KEYWORD_SET = set(keyword.kwlist)
 
 log = logging.getLogger(__name__)
 
+# Number of Assets looked up and written per transaction by update_asset_symlinks()
+ASSET_BULK_CHUNK_SIZE = 500
+
 
 def compute_xxhash64_digest_filepath(filepath):
     try:
@@ -42,8 +47,11 @@ def compute_xxhash64_digest_filepath(filepath):
 
         assert os.path.exists(filepath)
 
+        hasher = xxhash.xxh64()
         with open(filepath, 'rb') as file_:
-            digest = xxhash.xxh64_hexdigest(file_.read())
+            for block in iter(lambda: file_.read(1024 * 1024), b''):
+                hasher.update(block)
+        digest = hasher.hexdigest()
     except Exception:  # pragma: no cover
         digest = None
     return digest
@@ -174,6 +182,20 @@ class GitStore(db.Model, HoustonModel):
         foreign_keys='GitStore.progress_identification_guid',
     )
 
+    # Push state, see request_push() and push_pending()
+    push_requested = db.Column(db.DateTime, index=True, nullable=True)
+    push_attempts = db.Column(db.Integer, default=0, nullable=False)
+    push_retry_after = db.Column(db.DateTime, nullable=True)
+    push_error = db.Column(db.String, nullable=True)
+    pushed = db.Column(db.DateTime, nullable=True)
+
+    # Stores pushed by one run of the push_pending_git_stores task
+    PUSH_BATCH_SIZE = 20
+    PUSH_RETRY_DELAY = datetime.timedelta(minutes=1)
+    PUSH_MAX_RETRY_DELAY = datetime.timedelta(hours=6)
+    # How long a store claimed for a push is left to that worker
+    PUSH_LEASE = datetime.timedelta(minutes=30)
+
     __mapper_args__ = {
         'confirm_deleted_rows': False,
         'polymorphic_identity': 'gitstore',
@@ -211,7 +233,122 @@ class GitStore(db.Model, HoustonModel):
         return DetailedGitStoreSchema
 
     def git_push_delay(self):
-        raise NotImplementedError()
+        from app.extensions.git_store.tasks import git_push
+
+        if current_app.testing:
+            git_push.delay(str(self.guid))
+        else:
+            self.request_push()
+
+    def request_push(self):
+        """
+        Record that this store has commits to push.  Requests made before the
+        push_pending_git_stores task gets to the store are pushed together.
+        """
+        with db.session.begin(subtransactions=True):
+            GitStore.query.filter(GitStore.guid == self.guid).update(
+                {GitStore.push_requested: datetime.datetime.utcnow()},
+                synchronize_session=False,
+            )
+
+    def git_push(self):
+        from app.extensions.git_store.tasks import ensure_remote
+
+        repo = self.get_repository()
+
+        exists = repo and 'origin' in repo.remotes
+        if not exists:
+            exists = ensure_remote(str(self.guid))
+            repo = self.get_repository()
+
+        if exists and repo and len(repo.remotes) > 0:
+            log.debug('Pushing to authorized URL')
+            repo.git.push('--set-upstream', repo.remotes.origin, repo.head.ref)
+            log.debug(f'...pushed to {repo.head.ref}')
+        return bool(exists)
+
+    @classmethod
+    def push_pending(cls, limit=PUSH_BATCH_SIZE):
+        """
+        Push up to ``limit`` stores with requested pushes, oldest request first.
+
+        Stores are claimed for PUSH_LEASE with SKIP LOCKED, so no lock is held
+        while pushing and concurrent request_push() calls are never blocked.
+        A failed push is retried with exponential backoff.  Returns the number
+        of stores pushed.
+        """
+        now = datetime.datetime.utcnow()
+        with db.session.begin(subtransactions=True):
+            pending = (
+                db.session.query(GitStore.guid, GitStore.push_requested)
+                .filter(
+                    GitStore.push_requested.isnot(None),
+                    sa.or_(
+                        GitStore.push_retry_after.is_(None),
+                        GitStore.push_retry_after <= now,
+                    ),
+                )
+                .order_by(GitStore.push_requested)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            if len(pending) == 0:
+                return 0
+            guids = [guid for guid, _ in pending]
+            GitStore.query.filter(GitStore.guid.in_(guids)).update(
+                {GitStore.push_retry_after: now + cls.PUSH_LEASE},
+                synchronize_session=False,
+            )
+
+        pushed = 0
+        for guid, push_requested in pending:
+            git_store = GitStore.query.get(guid)
+            if git_store is None:
+                continue
+            try:
+                if not git_store.git_push():
+                    raise ValueError('Remote repository is not available')
+            except Exception as ex:
+                log.warning(f'Push of {git_store} failed: {ex}')
+                git_store._push_failed(ex)
+            else:
+                git_store._pushed(push_requested)
+                pushed += 1
+        return pushed
+
+    def _pushed(self, push_requested):
+        now = datetime.datetime.utcnow()
+        with db.session.begin(subtransactions=True):
+            values = {
+                GitStore.pushed: now,
+                GitStore.push_attempts: 0,
+                GitStore.push_retry_after: None,
+                GitStore.push_error: None,
+            }
+            GitStore.query.filter(GitStore.guid == self.guid).update(
+                values, synchronize_session=False
+            )
+            # A push requested while this one ran stays pending
+            GitStore.query.filter(
+                GitStore.guid == self.guid,
+                GitStore.push_requested == push_requested,
+            ).update({GitStore.push_requested: None}, synchronize_session=False)
+
+    def _push_failed(self, error):
+        attempts = (self.push_attempts or 0) + 1
+        delay = min(
+            self.PUSH_RETRY_DELAY * (2 ** (attempts - 1)), self.PUSH_MAX_RETRY_DELAY
+        )
+        with db.session.begin(subtransactions=True):
+            GitStore.query.filter(GitStore.guid == self.guid).update(
+                {
+                    GitStore.push_attempts: attempts,
+                    GitStore.push_retry_after: datetime.datetime.utcnow() + delay,
+                    GitStore.push_error: str(error),
+                },
+                synchronize_session=False,
+            )
 
     def delete_remote_delay(self):
         raise NotImplementedError()
@@ -396,11 +533,14 @@ class GitStore(db.Model, HoustonModel):
             self.progress_preparation.set(1)
 
         # Step 2
-        #   Description: Unpack zip files and archives submitted to the repo, currently not implemented
-        #   Delay: no-op, << 1.0 seconds
+        #   Description: Unpack zip and tar files submitted to the repo
+        #   Delay: proportional to the size of the archives, unbounded seconds
         #   Percentage: 0% (1% -> 1%)
-        if realize:
-            self.realize_local_store()
+        #   Archives are only extracted when the assets are updated, as the
+        #   file data computed while extracting is consumed by Step 3
+        realized_files = {}
+        if realize and update:
+            realized_files = self.realize_local_store()
 
         if self.progress_preparation and update:
             self.progress_preparation.set(1)
@@ -410,7 +550,9 @@ class GitStore(db.Model, HoustonModel):
         #   Delay: the majority of the processing, unbounded seconds
         #   Percentage: 89% (1% -> 90%)
         if update:
-            self.update_asset_symlinks(input_filenames=input_filenames, **kwargs)
+            self.update_asset_symlinks(
+                input_filenames=input_filenames, realized_files=realized_files, **kwargs
+            )
 
         if self.progress_preparation and update:
             self.progress_preparation.set(90)
@@ -422,11 +564,12 @@ class GitStore(db.Model, HoustonModel):
         if commit in [True] or (
             commit not in [False] and current_app.config['UPLOADS_GIT_COMMIT']
         ):
-            # repo.index.add('.gitignore')
-            repo.index.add('_uploads/')
-            repo.index.add('_assets/')
-            repo.index.add('_metadata/')
-            repo.index.add('metadata.json')
+            # Stage with git itself, which uses its stat cache to only hash the
+            # paths that changed since the last commit, rather than re-adding
+            # every file under these folders
+            repo.git.add(
+                '--all', '--', '_uploads/', '_assets/', '_metadata/', 'metadata.json'
+            )
 
             new_commit = repo.index.commit(message)
 
@@ -841,8 +984,14 @@ class GitStore(db.Model, HoustonModel):
             # completion here)
             self.git_push_delay()
 
+            # Assets extracted from an archive are named after the archive
+            archive_prefixes = tuple(
+                f'{filename}/' for filename in original_filenames if filename
+            )
             for asset in self.assets:
-                if asset.path in paths_added:
+                if asset.path in paths_added or asset.path.startswith(
+                    archive_prefixes
+                ):
                     assets_added.append(asset)
 
         if purge_dir:
@@ -853,29 +1002,94 @@ class GitStore(db.Model, HoustonModel):
 
     def realize_local_store(self):
         """
-        Unpack any archives and resolve any symlinks
-
-        Must check for security vulnerabilities around decompression bombs and
-        recursive links
+        Unpack any zip or tar archives uploaded into _uploads/
+
+        The members of an archive are extracted next to it, into a directory
+        named after the archive, which is then deleted.  Members that are not
+        whitelisted MIME types, links, and paths leaving the directory are
+        skipped, and the number and total size of the extracted files are
+        bounded to guard against decompression bombs.
+
+        Returns:
+            dict - the file data (path, MIME type, size and xxHash64) computed
+            during extraction for each extracted filepath, for
+            update_asset_symlinks()
         """
-        ARCHIVE_MIME_TYPE_WHITELIST = [  # NOQA
-            'application/gzip',
-            'application/vnd.rar',
-            'application/x-7z-compressed',
-            'application/x-bzip',
-            'application/x-bzip2',
-            'application/x-tar',
-            'application/zip',
-        ]
-        pass
+        import magic
+
+        from .archives import ARCHIVE_MIME_TYPES, ArchiveExtractor
+
+        local_store_path = self.get_absolute_path()
+        local_name_path = os.path.join(local_store_path, '_uploads')
+        local_metadata_path = os.path.join(local_store_path, '_metadata')
+
+        realized_files = {}
+        if not os.path.isdir(local_name_path):
+            return realized_files
+
+        for name in sorted(os.listdir(local_name_path)):
+            archive_path = os.path.join(local_name_path, name)
+            if name.startswith('.') or os.path.islink(archive_path):
+                continue
+            if not os.path.isfile(archive_path):
+                continue
+            archive_type = ARCHIVE_MIME_TYPES.get(
+                magic.from_file(archive_path, mime=True)
+            )
+            if archive_type is None:
+                continue
+
+            # Extracted files are named after the archive's uploaded filename
+            archive_filename = name
+            metadata_filepath = os.path.join(
+                local_metadata_path, '{}.metadata.json'.format(name)
+            )
+            if os.path.exists(metadata_filepath):
+                with open(metadata_filepath, 'r') as metadata_file:
+                    archive_filename = json.load(metadata_file).get('filename', name)
+
+            target_path = os.path.join(local_name_path, '{}.contents'.format(name))
+            extractor = ArchiveExtractor(
+                target_path,
+                self.mime_type_whitelist,
+                max_files=current_app.config.get('UPLOADS_ARCHIVE_MAX_FILES', 100000),
+                max_size=current_app.config.get('UPLOADS_ARCHIVE_MAX_SIZE', 64 * 1024**3),
+            )
+            log.info(f'Extracting {archive_filename!r} into {target_path!r}')
+            try:
+                files = extractor.extract(archive_path, archive_type)
+            except Exception as ex:
+                shutil.rmtree(target_path, ignore_errors=True)
+                raise HoustonException(
+                    log,
+                    f'Unable to extract archive {archive_filename}: {ex}',
+                    obj=self,
+                )
+
+            if extractor.skipped:
+                log.info(
+                    f'Skipped {len(extractor.skipped)} files in {archive_filename!r}'
+                )
+            for filepath, file_data in files.items():
+                file_data['path'] = '{}/{}'.format(archive_filename, file_data['path'])
+                realized_files[os.path.normpath(filepath)] = file_data
+
+            # The archive is replaced by its contents
+            os.remove(archive_path)
+
+        return realized_files
 
     def update_asset_symlinks(
-        self, existing_filepath_guid_mapping={}, input_filenames=[]
+        self, existing_filepath_guid_mapping={}, input_filenames=[], realized_files=None
     ):
         """
         Traverse the files in the _raw/ folder and add/update symlinks
         for any relevant files we identify
 
+        Files extracted by realize_local_store() are given in realized_files
+        with their MIME type and hash already computed, so they are not read
+        again.
+
         This function represents Step 3 in self.git_commit().
         The progress domain for this function is Percentage: 89% (1% -> 90%)
 
@@ -885,6 +1099,8 @@ class GitStore(db.Model, HoustonModel):
             http://www.iana.org/assignments/media-types/media-types.xhtml
         """
         assets = []
+        if realized_files is None:
+            realized_files = {}
 
         try:
             assert self.exists
@@ -948,6 +1164,15 @@ class GitStore(db.Model, HoustonModel):
                             # Skip any symbolic links (sanity check)
                             skipped.append((filepath, extension))
                             continue
+
+                        realized_data = realized_files.get(filepath)
+                        if realized_data is not None:
+                            file_data = dict(realized_data)
+                            file_data['filepath'] = filepath
+                            file_data['git_store_guid'] = self.guid
+                            files.append(file_data)
+                            continue
+
                         mime_type = magic.from_file(filepath, mime=True)
                         if mime_type not in self.mime_type_whitelist:
                             # Skip any unsupported MIME types
@@ -998,12 +1223,25 @@ class GitStore(db.Model, HoustonModel):
             #   Percentage: 9% (10% -> 19%)
             assert self.exists
 
-            # Compute the xxHash64 for all found files
-            filepath_list = [file_data_['filepath'] for file_data_ in files]
+            # Compute the xxHash64 for all found files, extracted files were
+            # hashed while they were written
+            filepath_list = [
+                file_data_['filepath']
+                for file_data_ in files
+                if 'filesystem_xxhash64' not in file_data_
+            ]
             arguments_list = list(zip(filepath_list))
-            filesystem_xxhash64_list = parallel(
-                compute_xxhash64_digest_filepath, arguments_list
+            computed_xxhash64 = dict(
+                zip(
+                    filepath_list,
+                    parallel(compute_xxhash64_digest_filepath, arguments_list),
+                )
             )
+            filesystem_xxhash64_list = [
+                file_data_.get('filesystem_xxhash64')
+                or computed_xxhash64[file_data_['filepath']]
+                for file_data_ in files
+            ]
             filesystem_guid_list = list(
                 map(ut.hashable_to_uuid, filesystem_xxhash64_list)
             )
@@ -1065,51 +1303,72 @@ class GitStore(db.Model, HoustonModel):
                 file_data.pop('filepath', None) for file_data in files
             ]
             zipped = list(zip(files, local_asset_filepath_list))
-            for index, zip_data in enumerate(zipped):
-                assert self.exists
 
-                file_data, local_asset_filepath = zip_data
+            # Update record if Asset exists
+            search_keys = [
+                'filesystem_guid',
+                'semantic_guid',
+                'git_store_guid',
+            ]
 
-                semantic_guid = file_data.get('semantic_guid', None)
-                asset = Asset.query.filter(Asset.semantic_guid == semantic_guid).first()
-                if asset is None:
+            # Assets are looked up and written a chunk at a time, rather than
+            # with a query and a transaction for every file
+            chunk_size = ASSET_BULK_CHUNK_SIZE
+            for chunk_start in range(0, len(zipped), chunk_size):
+                assert self.exists
 
-                    # Check if we can recycle existing GUID from symlink
-                    recycle_guid = existing_filepath_guid_mapping.get(
-                        local_asset_filepath, None
-                    )
-                    if recycle_guid is not None:
-                        file_data['guid'] = recycle_guid
-
-                    # Create record if asset is new
-                    with db.session.begin(subtransactions=True):
-                        asset = Asset(**file_data)
-                        db.session.add(asset)
-                else:
-                    log.info(
-                        'Found asset {!r} for semantic_guid = {!r}'.format(
-                            asset, semantic_guid
-                        )
+                chunk = zipped[chunk_start : chunk_start + chunk_size]
+                semantic_guids = {
+                    file_data.get('semantic_guid') for file_data, _ in chunk
+                }
+                existing_assets = {
+                    asset.semantic_guid: asset
+                    for asset in Asset.query.filter(
+                        Asset.semantic_guid.in_(list(semantic_guids))
                     )
+                }
+                existing_assets.update(
+                    {
+                        asset.semantic_guid: asset
+                        for asset in assets
+                        if asset.semantic_guid in semantic_guids
+                    }
+                )
 
-                    # Update record if Asset exists
-                    search_keys = [
-                        'filesystem_guid',
-                        'semantic_guid',
-                        'git_store_guid',
-                    ]
-
-                    with db.session.begin(subtransactions=True):
-                        for key in file_data:
-                            if key in search_keys:
-                                continue
-                            value = file_data[key]
-                            setattr(asset, key, value)
-                        db.session.merge(asset)
-                assets.append(asset)
+                with db.session.begin(subtransactions=True):
+                    for file_data, local_asset_filepath in chunk:
+                        semantic_guid = file_data.get('semantic_guid', None)
+                        asset = existing_assets.get(semantic_guid)
+                        if asset is None:
+
+                            # Check if we can recycle existing GUID from symlink
+                            recycle_guid = existing_filepath_guid_mapping.get(
+                                local_asset_filepath, None
+                            )
+                            if recycle_guid is not None:
+                                file_data['guid'] = recycle_guid
+
+                            # Create record if asset is new
+                            asset = Asset(**file_data)
+                            db.session.add(asset)
+                            existing_assets[semantic_guid] = asset
+                        else:
+                            log.info(
+                                'Found asset {!r} for semantic_guid = {!r}'.format(
+                                    asset, semantic_guid
+                                )
+                            )
+
+                            for key in file_data:
+                                if key in search_keys:
+                                    continue
+                                value = file_data[key]
+                                setattr(asset, key, value)
+                            db.session.merge(asset)
+                        assets.append(asset)
 
                 if self.progress_preparation:
-                    numerator = index
+                    numerator = chunk_start + len(chunk)
                     denominator = len(zipped)
                     percentage = numerator / denominator
                     offset = 20.0
@@ -1255,6 +1514,16 @@ class GitStore(db.Model, HoustonModel):
                 return asset
         return None
 
+    def get_archive_asset_paths(self, filename):
+        """
+        Return the sorted paths of the assets extracted from the uploaded
+        archive named filename, or an empty list if it was not an archive
+        """
+        prefix = f'{filename}/'
+        return sorted(
+            asset.path for asset in self.assets if asset.path.startswith(prefix)
+        )
+
     # stub of DEX-220 ... to be continued
     def justify_existence(self):
         if self.assets:  # we have assets, so we live on
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Git Store archive extraction
+----------------------------
+
+Zip and tar (optionally gzip, bzip2 or xz compressed) uploads are unpacked
+into the store by ``GitStore.realize_local_store``.  Members are streamed
+to disk in fixed-size blocks, and each member is hashed and its MIME type
+sniffed while it is written, so ``update_asset_symlinks`` does not have to
+read the extracted files again.
+"""
+import logging
+import os
+import posixpath
+import stat
+import tarfile
+import zipfile
+
+log = logging.getLogger(__name__)
+
+ARCHIVE_MIME_TYPES = {
+    'application/gzip': 'tar',
+    'application/x-gzip': 'tar',
+    'application/x-bzip2': 'tar',
+    'application/x-xz': 'tar',
+    'application/x-tar': 'tar',
+    'application/zip': 'zip',
+}
+
+# Read and write size of archive members
+ARCHIVE_BUFFER_SIZE = 1024 * 1024
+
+# Number of bytes of a member given to libmagic to sniff its MIME type
+ARCHIVE_MAGIC_BUFFER_SIZE = 8192
+
+
+class ArchiveException(Exception):
+    pass
+
+
+def safe_member_path(name):
+    """
+    Return the normalized relative path of an archive member, or None if it
+    would be written outside of the extraction directory, is hidden, or is
+    macOS resource fork metadata.
+    """
+    name = name.replace('\\', '/')
+    if name.startswith('/'):
+        return None
+    path = posixpath.normpath(name)
+    parts = path.split('/')
+    if path in ('', '.') or '..' in parts:
+        return None
+    if parts[0] == '__MACOSX' or any(part.startswith('.') for part in parts):
+        return None
+    return path
+
+
+class ArchiveExtractor(object):
+    """
+    Extract the whitelisted members of an archive into ``target_path``.
+
+    ``max_files`` and ``max_size`` bound the number of members and the total
+    number of bytes written, guarding against decompression bombs.  Sizes
+    are counted as the data is written, not taken from the archive headers.
+    """
+
+    def __init__(self, target_path, mime_type_whitelist, max_files, max_size):
+        self.target_path = target_path
+        self.mime_type_whitelist = mime_type_whitelist
+        self.max_files = max_files
+        self.max_size = max_size
+        self.total_size = 0
+        self.files = {}
+        self.skipped = []
+
+    def extract(self, archive_path, archive_type):
+        os.makedirs(self.target_path, exist_ok=True)
+        if archive_type == 'zip':
+            self._extract_zip(archive_path)
+        else:
+            self._extract_tar(archive_path)
+        return self.files
+
+    def _extract_zip(self, archive_path):
+        with zipfile.ZipFile(archive_path) as archive:
+            for info in archive.infolist():
+                mode = info.external_attr >> 16
+                if info.is_dir() or stat.S_ISLNK(mode):
+                    continue
+                path = safe_member_path(info.filename)
+                if path is None:
+                    self.skipped.append(info.filename)
+                    continue
+                with archive.open(info) as member:
+                    self._write_member(path, member)
+
+    def _extract_tar(self, archive_path):
+        # Stream mode reads the archive front to back without seeking
+        with tarfile.open(archive_path, mode='r|*') as archive:
+            for info in archive:
+                if not info.isreg():
+                    # Links, devices and directories are never extracted
+                    continue
+                path = safe_member_path(info.name)
+                if path is None:
+                    self.skipped.append(info.name)
+                    continue
+                member = archive.extractfile(info)
+                self._write_member(path, member)
+
+    def _write_member(self, path, member):
+        import magic
+        import xxhash
+
+        if len(self.files) >= self.max_files:
+            raise ArchiveException(f'Archive has more than {self.max_files} files')
+
+        head = member.read(ARCHIVE_MAGIC_BUFFER_SIZE)
+        mime_type = magic.from_buffer(head, mime=True)
+        if mime_type not in self.mime_type_whitelist:
+            self.skipped.append(path)
+            return
+
+        filepath = os.path.join(self.target_path, *path.split('/'))
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        if os.path.lexists(filepath):
+            # A member listed twice in the archive
+            self.skipped.append(path)
+            return
+
+        digest = xxhash.xxh64()
+        size_bytes = 0
+        with open(filepath, 'xb') as file_:
+            data = head
+            while data:
+                size_bytes += len(data)
+                self.total_size += len(data)
+                if self.total_size > self.max_size:
+                    raise ArchiveException(
+                        f'Archive expands to more than {self.max_size} bytes'
+                    )
+                digest.update(data)
+                file_.write(data)
+                data = member.read(ARCHIVE_BUFFER_SIZE)
+
+        self.files[filepath] = {
+            'path': path,
+            'mime_type': mime_type,
+            'magic_signature': magic.from_buffer(head),
+            'size_bytes': size_bytes,
+            'filesystem_xxhash64': digest.hexdigest(),
+        }
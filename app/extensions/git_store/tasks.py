@@ -9,9 +9,22 @@ from flask import current_app
 from app.extensions.celery import celery
 from app.extensions.gitlab import GitlabInitializationError
 
+GIT_STORE_PUSH_FREQUENCY = 30
+
+
 log = logging.getLogger(__name__)
 
 
+@celery.on_after_configure.connect
+def git_store_setup_periodic_tasks(sender, **kwargs):
+    if GIT_STORE_PUSH_FREQUENCY is not None:
+        sender.add_periodic_task(
+            GIT_STORE_PUSH_FREQUENCY,
+            push_pending_git_stores.s(),
+            name='Push pending Git Stores',
+        )
+
+
 @celery.task(
     autoretry_for=(GitlabInitializationError, requests.exceptions.RequestException),
     default_retry_delay=600,
@@ -100,18 +113,18 @@ def git_push(git_store_guid, ignore_error=True):
         return  # git store doesn't exist in the database
 
     try:
-        repo = git_store.get_repository()
-
-        exists = repo and 'origin' in repo.remotes
-        if not exists:
-            exists = ensure_remote(git_store_guid)
-
-        if exists:
-            log.debug('Pushing to authorized URL')
-            if len(repo.remotes) > 0:
-                repo.git.push('--set-upstream', repo.remotes.origin, repo.head.ref)
-                log.debug(f'...pushed to {repo.head.ref}')
+        git_store.git_push()
     except GitlabInitializationError:
         log.warning('GitLab Initialization Error in tasks.git_push()')
         if not ignore_error:
             raise
+
+
+@celery.task
+def push_pending_git_stores():
+    from app.extensions.git_store import GitStore
+
+    pushed = GitStore.push_pending()
+    if pushed:
+        log.info(f'Pushed {pushed} Git Stores')
+    return pushed
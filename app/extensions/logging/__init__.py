@@ -76,6 +76,11 @@ class Logging(object):
             msg += f" in {kwargs['duration']} seconds"
             log_kwargs.pop('duration')
 
+        # Only used by AuditLog.create, not by the logger
+        log_kwargs = {
+            key: value for key, value in log_kwargs.items() if key != 'synchronous'
+        }
+
         if logger:
             logger.log(cls.AUDIT, msg, *args, **log_kwargs)
         else:
@@ -165,6 +170,8 @@ class Logging(object):
 
     @classmethod
     def delete_object(cls, logger, obj, msg='', *args, **kwargs):
+        # Deletes are written with the transaction that performs them
+        kwargs.setdefault('synchronous', True)
         cls.audit_log_object(logger, obj, msg, cls.AuditType.Delete, *args, **kwargs)
 
     @classmethod
@@ -3,14 +3,17 @@
 Logging adapter
 ---------------
 """
+import contextlib
 import datetime
+import json
 import logging
 import os
+import threading
+import time
 
-from flask import current_app, url_for
+from flask import current_app, g, has_request_context, url_for
 from oauthlib.oauth2 import BackendApplicationClient
-from prometheus_client import Counter, Gauge, Info
-from prometheus_client.metrics import MetricWrapperBase
+from prometheus_client import Counter, Gauge, Histogram, Info
 from requests_oauthlib import OAuth2Session
 
 from app.extensions.api import api_v1
@@ -24,6 +27,35 @@ os.environ['OAUTHLIB_INSECURE_TRANSPORT'] = '1'
 
 REGISTERED_MODELS = {}
 REGISTERED_TAXONOMIES = {}
+SQLALCHEMY_TIMING_ATTACHED = False
+
+# Celery stats are collected with a broadcast that waits for every worker to
+# reply, so they are sampled by a background thread and the last snapshot is
+# used when the gauges are updated.  Processes without a sampler thread, such
+# as the Celery worker running the prometheus_update task, take one sample
+# in update() when their snapshot is missing or stale.
+CELERY_SAMPLE_INTERVAL = 60
+CELERY_INSPECT_TIMEOUT = 5.0
+CELERY_STATS_SNAPSHOT = {
+    'stats': None,
+    'timestamp': None,
+}
+CELERY_SAMPLER_THREAD = None
+
+# Endpoint label used for requests that did not match any URL rule (404s),
+# so that unknown paths cannot create new time series
+UNMATCHED_ENDPOINT = '<unmatched>'
+
+SQL_QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+RESPONSE_SIZE_BUCKETS = (
+    100,
+    1000,
+    10000,
+    100000,
+    1000000,
+    10000000,
+    100000000,
+)
 
 
 info = Info(
@@ -54,6 +86,23 @@ logins = Gauge(
     ['days'],
 )
 
+auth_expired = Gauge(
+    'auth_expired',
+    'Number of expired rows by auth table',
+    ['table'],
+)
+
+auth_cleanup_deleted = Gauge(
+    'auth_cleanup_deleted',
+    'Number of expired rows deleted by the last clean-up by auth table',
+    ['table'],
+)
+
+audit_logs_lost = Counter(
+    'audit_logs_lost',
+    'Number of buffered audit log records that could not be written since start',
+)
+
 requests = Counter(
     'requests',
     'Number of total requests by endpoint since start',
@@ -72,6 +121,44 @@ tasks_ = Gauge(
     ['function'],
 )
 
+request_duration = Histogram(
+    'request_duration_seconds',
+    'Request duration by endpoint',
+    ['method', 'endpoint'],
+)
+
+requests_in_flight = Gauge(
+    'requests_in_flight',
+    'Number of requests currently being handled by endpoint',
+    ['method', 'endpoint'],
+)
+
+response_size = Histogram(
+    'response_size_bytes',
+    'Response body size by endpoint',
+    ['method', 'endpoint'],
+    buckets=RESPONSE_SIZE_BUCKETS,
+)
+
+request_sql_queries = Histogram(
+    'request_sql_queries',
+    'Number of SQL queries executed per request by endpoint',
+    ['method', 'endpoint'],
+    buckets=SQL_QUERY_COUNT_BUCKETS,
+)
+
+request_sql_duration = Histogram(
+    'request_sql_duration_seconds',
+    'Total time spent in SQL queries per request by endpoint',
+    ['method', 'endpoint'],
+)
+
+outbound_duration = Histogram(
+    'outbound_request_duration_seconds',
+    'Duration of requests to external services (Sage, EDM, Elasticsearch) by operation',
+    ['service', 'method', 'operation'],
+)
+
 
 def register_prometheus_model(cls):
     global REGISTERED_MODELS
@@ -96,8 +183,12 @@ def _init_logins(*args, **kwargs):
     _update_logins(*args, **kwargs)
 
 
-def _init_celery(*args, **kwargs):
-    _update_celery(*args, **kwargs)
+def _init_auth(*args, **kwargs):
+    _update_auth(*args, **kwargs)
+
+
+def _init_celery(app, *args, **kwargs):
+    _start_celery_sampler(app)
 
 
 def _update_info(*args, **kwargs):
@@ -112,10 +203,46 @@ def _update_info(*args, **kwargs):
     info.info(info_dict)
 
 
+def _model_table_estimates(classes):
+    """
+    Return ``{table name: row estimate}`` from ``pg_class.reltuples`` for the
+    tables of ``classes`` in a single query.  Tables that have not been
+    analyzed yet are left out.
+    """
+    import sqlalchemy
+
+    from app.extensions import db
+
+    if db.engine.dialect.name != 'postgresql':
+        return {}
+
+    table_names = sorted({cls.__table__.name for cls in classes})
+    if len(table_names) == 0:
+        return {}
+
+    params = {f'table_{index}': name for index, name in enumerate(table_names)}
+    regclasses = ', '.join(f'to_regclass(:{key})' for key in params)
+    result = db.session.execute(
+        sqlalchemy.text(
+            f'SELECT relname, reltuples::bigint FROM pg_class WHERE oid IN ({regclasses})'
+        ),
+        params,
+    )
+
+    # reltuples is -1 (or 0) until the table has been vacuumed or analyzed
+    return {name: int(value) for name, value in result if value > 0}
+
+
 def _update_models(*args, **kwargs):
+    # Between updates the gauges are maintained incrementally by the
+    # insert / delete listeners, see _attach_sqlalchemy_listeners()
+    estimates = _model_table_estimates(REGISTERED_MODELS)
     for cls in REGISTERED_MODELS:
         cls_str = '{}.{}'.format(cls.__module__, cls.__name__)
-        value = cls.query.count()
+        value = estimates.get(cls.__table__.name)
+        if value is None:
+            # Tables without statistics yet are small, so counting is cheap
+            value = cls.query.count()
         models.labels(cls=cls_str).set(value)
 
 
@@ -155,42 +282,112 @@ def _update_taxonomies_fast(*args, **kwargs):
 
 
 def _update_logins(*args, **kwargs):
+    from sqlalchemy import case, func
+
+    from app.extensions import db
     from app.modules.auth.models import OAuth2Token
 
-    tokens = OAuth2Token.query.all()
-    users = {}
-    for token in tokens:
-        user_guid = token.user.guid
-        created = token.created
-        if user_guid is None:
-            continue
-        if user_guid not in users:
-            users[user_guid] = created
-        elif users[user_guid] < created:
-            users[user_guid] = created
+    # Number of users who last logged in within 30, 90 days etc, computed
+    # from each user's latest token in a single aggregate query
+    all_days = [1, 7, 30, 90, 180, 365]
+
+    latest = (
+        db.session.query(
+            OAuth2Token.user_guid.label('user_guid'),
+            func.max(OAuth2Token.created).label('created'),
+        )
+        .group_by(OAuth2Token.user_guid)
+        .subquery()
+    )
 
-    # Number of users who last logged in within 30, 90 days etc
     now = datetime.datetime.utcnow()
-    for days in [1, 7, 30, 90, 180, 365, None]:
-        if days is None:
-            value = len(users)
-        else:
-            limit = now - datetime.timedelta(days=days)
+    columns = [func.count(latest.c.user_guid)]
+    for days in all_days:
+        limit = now - datetime.timedelta(days=days)
+        columns.append(func.sum(case([(latest.c.created > limit, 1)], else_=0)))
 
-            value = 0
-            for user, timestamp in users.items():
-                if timestamp > limit:
-                    value += 1
+    row = db.session.query(*columns).one()
+    total, counts = row[0], row[1:]
 
-        logins.labels(days=days).set(value)
+    for days, value in zip(all_days, counts):
+        logins.labels(days=days).set(value or 0)
+    logins.labels(days=None).set(total or 0)
 
 
-def _update_celery(*args, **kwargs):
+def _update_auth(*args, **kwargs):
+    import pytz
+
+    from app.extensions import db
+    from app.modules.auth.models import Code, OAuth2Token
+
+    # Served by the expires indexes
+    now = datetime.datetime.now(tz=pytz.utc)
+    auth_expired.labels(table='code').set(
+        db.session.query(Code.guid)
+        .filter(Code.expires < now, Code.response.is_(None))
+        .count()
+    )
+    auth_expired.labels(table='oauth2_token').set(
+        db.session.query(OAuth2Token.guid).filter(OAuth2Token.expires < now).count()
+    )
+
+
+def _sample_celery(*args, **kwargs):
     from flask import current_app
 
-    inspect = current_app.celery.control.inspect()
+    inspect = current_app.celery.control.inspect(timeout=CELERY_INSPECT_TIMEOUT)
     stats = inspect.stats()
 
+    CELERY_STATS_SNAPSHOT['stats'] = stats
+    CELERY_STATS_SNAPSHOT['timestamp'] = datetime.datetime.utcnow()
+
+
+def _celery_sampler(app, interval):
+    while True:
+        try:
+            with app.app_context():
+                _sample_celery()
+                _update_celery()
+        except Exception:
+            log.exception('Prometheus Celery sampling failed')
+        time.sleep(interval)
+
+
+def _start_celery_sampler(app, interval=CELERY_SAMPLE_INTERVAL):
+    global CELERY_SAMPLER_THREAD
+
+    # Only start one sampler per process
+    if CELERY_SAMPLER_THREAD is not None and CELERY_SAMPLER_THREAD.is_alive():
+        return
+
+    CELERY_SAMPLER_THREAD = threading.Thread(
+        target=_celery_sampler,
+        args=(app, interval),
+        name='prometheus-celery-sampler',
+        daemon=True,
+    )
+    CELERY_SAMPLER_THREAD.start()
+
+
+def _celery_snapshot_is_stale():
+    timestamp = CELERY_STATS_SNAPSHOT['timestamp']
+    if timestamp is None:
+        return True
+    age = datetime.datetime.utcnow() - timestamp
+    return age > datetime.timedelta(seconds=2 * CELERY_SAMPLE_INTERVAL)
+
+
+def _update_celery(*args, **kwargs):
+    # Serve the last snapshot taken by the sampler.  Without a running
+    # sampler, take one sample bounded by CELERY_INSPECT_TIMEOUT instead
+    if _celery_snapshot_is_stale():
+        try:
+            _sample_celery()
+        except Exception:
+            log.warning('Prometheus Celery sampling failed', exc_info=True)
+
+    stats = CELERY_STATS_SNAPSHOT['stats']
+
     if stats is not None:
         functions = {
             None: 0,
@@ -207,28 +404,121 @@ def _update_celery(*args, **kwargs):
             tasks_.labels(function=function).set(value)
 
 
+@contextlib.contextmanager
+def outbound_timer(service, method, operation):
+    """
+    Time a request to an external service, for example::
+
+        with prometheus.outbound_timer('sage', 'get', 'engine.result'):
+            ...
+
+    ``operation`` must come from a fixed set of names (an endpoint tag, not a
+    URL) to keep the number of time series bounded.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        try:
+            outbound_duration.labels(
+                service=service, method=method.lower(), operation=operation
+            ).observe(time.perf_counter() - start)
+        except Exception:  # pragma: no cover
+            log.warning(f'Prometheus outbound timing failed for {service} {operation}')
+
+
+def _endpoint_label():
+    """
+    Label requests with the URL rule they matched (e.g.
+    ``/api/v1/assets/<uuid:asset_guid>``) rather than the raw path
+    """
+    from flask import request
+
+    if request.url_rule is None:
+        return UNMATCHED_ENDPOINT
+    return request.url_rule.rule
+
+
 def _attach_flask_callbacks(app):
     @app.before_request
     def before_request_callback():
         from flask import request
 
         method = request.method
-        endpoint = request.path
+        endpoint = _endpoint_label()
+
+        g.prometheus_request = {
+            'method': method,
+            'endpoint': endpoint,
+            'start': time.perf_counter(),
+            'sql_queries': 0,
+            'sql_duration': 0.0,
+        }
 
         requests.labels(method=method, endpoint=endpoint).inc()
+        requests_in_flight.labels(method=method, endpoint=endpoint).inc()
 
     @app.after_request
     def after_request_callback(response):
         from flask import request
 
         method = request.method
-        endpoint = request.path
+        endpoint = _endpoint_label()
         code = response.status_code
 
         responses.labels(method=method, endpoint=endpoint, code=code).inc()
 
+        # Streamed responses (e.g. file downloads) do not have a known length
+        if not response.is_streamed:
+            length = response.calculate_content_length()
+            if length is not None:
+                response_size.labels(method=method, endpoint=endpoint).observe(length)
+
         return response
 
+    @app.teardown_request
+    def teardown_request_callback(exception=None):
+        # Runs for every request that reached before_request, including
+        # requests that raised, so the in-flight gauge is always decremented
+        data = g.pop('prometheus_request', None)
+        if data is None:
+            return
+
+        labels = {'method': data['method'], 'endpoint': data['endpoint']}
+        requests_in_flight.labels(**labels).dec()
+        request_duration.labels(**labels).observe(time.perf_counter() - data['start'])
+        request_sql_queries.labels(**labels).observe(data['sql_queries'])
+        request_sql_duration.labels(**labels).observe(data['sql_duration'])
+
+
+def _attach_sqlalchemy_timing(app):
+    from sqlalchemy.engine import Engine
+    from sqlalchemy.event import listen
+
+    global SQLALCHEMY_TIMING_ATTACHED
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('prometheus_query_start', []).append(time.perf_counter())
+
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('prometheus_query_start')
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+
+        if not has_request_context():
+            return
+        data = g.get('prometheus_request')
+        if data is not None:
+            data['sql_queries'] += 1
+            data['sql_duration'] += elapsed
+
+    # Only register these hooks once, they apply to every engine
+    if not SQLALCHEMY_TIMING_ATTACHED:
+        listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        SQLALCHEMY_TIMING_ATTACHED = True
+
 
 def _attach_sqlalchemy_listeners(app):
     from sqlalchemy.event import listen
@@ -266,14 +556,16 @@ def _attach_sqlalchemy_listeners(app):
 def init(app, *args, **kwargs):
     _attach_flask_callbacks(app)
     _attach_sqlalchemy_listeners(app)
+    _attach_sqlalchemy_timing(app)
 
     _init_info(*args, **kwargs)
 
     _init_models(*args, **kwargs)
     _init_taxonomies(*args, **kwargs)
     _init_logins(*args, **kwargs)
+    _init_auth(*args, **kwargs)
 
-    _init_celery(*args, **kwargs)
+    _init_celery(app, *args, **kwargs)
 
 
 def update(*args, **kwargs):
@@ -284,12 +576,15 @@ def update(*args, **kwargs):
     _update_models(*args, **kwargs)
     _update_taxonomies_fast(*args, **kwargs)
     _update_logins(*args, **kwargs)
+    _update_auth(*args, **kwargs)
 
     _update_celery(*args, **kwargs)
 
+    # Only gauges and info can be set by the update endpoint, per-request
+    # histograms and counters are only meaningful in the process serving them
     samples = []
     for key, value in current_module.__dict__.items():
-        if isinstance(value, MetricWrapperBase):
+        if isinstance(value, (Gauge, Info)):
             metrics = value.collect()
             for metric in metrics:
                 for sample in metric.samples:
@@ -303,6 +598,31 @@ def update_logins(*args, **kwargs):
     _update_logins(*args, **kwargs)
 
 
+def update_auth_cleanup(deleted):
+    # ``deleted`` is the number of rows deleted by table
+    for table, value in deleted.items():
+        auth_cleanup_deleted.labels(table=table).set(value)
+    _update_auth()
+
+    # The clean-up runs in a Celery worker, so the gauges are sent to the
+    # process serving the metrics, as the prometheus_update task does
+    samples = [
+        sample
+        for gauge in (auth_cleanup_deleted, auth_expired)
+        for metric in gauge.collect()
+        for sample in metric.samples
+    ]
+    try:
+        send_update(json.dumps(samples))
+    except Exception:
+        log.warning('Prometheus auth clean-up update failed', exc_info=True)
+
+
+def update_audit_logs_lost(lost):
+    # ``lost`` is the number of audit log records the writer failed to write
+    audit_logs_lost.inc(lost)
+
+
 def init_app(app, **kwargs):
     # pylint: disable=unused-argument
     """
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Database-side text search helpers used by ``query_search``
+-----------------------------------------------------------
+
+The clauses built here are shaped so that PostgreSQL can use the trigram
+(``pg_trgm``) GIN indexes created in migration ``1f6b2d8e4c3a``:
+
+* a term that is a complete GUID is matched with equality against GUID
+  columns, using their primary key or b-tree index
+* a term that cannot appear in the text form of a GUID (anything other
+  than hex digits and dashes) skips the GUID columns entirely
+* any other term is matched with ``LIKE '%term%'`` against
+  ``CAST(column AS TEXT)``, which is the expression the trigram
+  indexes are built on
+"""
+import logging
+import re
+import uuid
+
+import sqlalchemy
+
+log = logging.getLogger(__name__)
+
+GUID_FRAGMENT_REGEX = re.compile(r'^[0-9a-fA-F-]+$')
+
+
+def parse_search_terms(search):
+    """
+    Split a search string on whitespace and commas, dropping empty terms.
+    """
+    if search is None:
+        return []
+    terms = search.strip().replace(',', ' ').split(' ')
+    terms = [term.strip() for term in terms]
+    return [term for term in terms if len(term) > 0]
+
+
+def guid_term_clauses(column, term):
+    """
+    Return the clauses matching ``term`` against a GUID column.
+    """
+    if not GUID_FRAGMENT_REGEX.match(term):
+        return ()
+
+    try:
+        value = uuid.UUID(term)
+    except ValueError:
+        value = None
+
+    if value is not None:
+        return (column == value,)
+
+    return (sqlalchemy.cast(column, sqlalchemy.Text).contains(term.lower()),)
+
+
+def text_term_clauses(column, term):
+    """
+    Return the clauses matching ``term`` against a text column.
+    """
+    return (column.contains(term),)
+
+
+def search_term_clauses(term, guid_columns=(), text_columns=()):
+    """
+    Build the tuple of alternative clauses for one search term, as expected
+    from ``HoustonModel.query_search_term_hook``, for example::
+
+        search_term_clauses(
+            term,
+            guid_columns=(cls.guid, cls.owner_guid),
+            text_columns=(cls.title,),
+        )
+    """
+    clauses = []
+    for column in guid_columns:
+        clauses += guid_term_clauses(column, term)
+    for column in text_columns:
+        clauses += text_term_clauses(column, term)
+
+    if len(clauses) == 0:
+        # Nothing can match this term, e.g. a word searched only against GUIDs
+        clauses.append(sqlalchemy.false())
+
+    return tuple(clauses)
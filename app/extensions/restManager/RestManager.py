@@ -8,6 +8,7 @@ system using REST API
 import json
 import keyword
 import logging
+import threading
 import uuid
 from collections import namedtuple
 
@@ -86,6 +87,9 @@ class RestManager(RestManagerUserMixin):
     def __init__(self, pre_initialize=False, *args, **kwargs):
         super(RestManager, self).__init__(*args, **kwargs)
         self.initialized = False
+        # Sessions are shared by threads, initialization and re-authentication
+        # replace them so they are serialized
+        self._lock = threading.RLock()
 
         # Must be overwritten by the derived class
         assert self.NAME is not None
@@ -188,38 +192,45 @@ class RestManager(RestManagerUserMixin):
         Ensures that a session always exists, uses the presence of the auth credentials in the
         environment to determine if a login is required.
         """
-        if target not in self.sessions:
-            log.debug(f'Creating anonymous session for {target}')
-            self.sessions[target] = requests.Session()
-
-        if target in self.auths:
-            auth = self.auths[target]
-
-            email = auth.get('username', auth.get('email', None))
-            password = auth.get('password', auth.get('pass', None))
-
-            message = f'{self.NAME} Authentication for {target} unspecified (email)'
-            assert email is not None, message
-            message = f'{self.NAME} Authentication for {target} unspecified (password)'
-            assert password is not None, message
-
-            response = self._request(
-                'get',
-                'session.login',
-                email,
-                password,
-                target=target,
-                ensure_initialized=False,
-                reauthenticated=reauthenticating,
-            )
-            assert (
-                not isinstance(response, requests.models.Response) or response.ok
-            ), f'{self.NAME} Authentication for {target} returned non-OK code: {response.status_code}'
+        with self._lock:
+            if target not in self.sessions:
+                log.debug(f'Creating anonymous session for {target}')
+                self.sessions[target] = requests.Session()
+
+            if target in self.auths:
+                auth = self.auths[target]
+
+                email = auth.get('username', auth.get('email', None))
+                password = auth.get('password', auth.get('pass', None))
 
-        log.debug(f'Created authenticated session for {self.NAME} target {target}')
+                message = f'{self.NAME} Authentication for {target} unspecified (email)'
+                assert email is not None, message
+                message = f'{self.NAME} Authentication for {target} unspecified (password)'
+                assert password is not None, message
+
+                response = self._request(
+                    'get',
+                    'session.login',
+                    email,
+                    password,
+                    target=target,
+                    ensure_initialized=False,
+                    reauthenticated=reauthenticating,
+                )
+                assert (
+                    not isinstance(response, requests.models.Response) or response.ok
+                ), f'{self.NAME} Authentication for {target} returned non-OK code: {response.status_code}'
+
+            log.debug(f'Created authenticated session for {self.NAME} target {target}')
 
     def _ensure_initialized(self):
-        if not self.initialized:
+        if self.initialized:
+            return
+
+        with self._lock:
+            if self.initialized:
+                return
+
             from app.extensions.elapsed_time import ElapsedTime
 
             timer = ElapsedTime()
@@ -254,6 +265,8 @@ class RestManager(RestManagerUserMixin):
         verbose=False,
         reauthenticated=False,
     ):
+        from app.extensions import prometheus
+
         if ensure_initialized:
             self._ensure_initialized()
 
@@ -280,15 +293,19 @@ class RestManager(RestManagerUserMixin):
             # log.debug(f'Sending {method} request to {self.NAME}: {endpoint_encoded}'
             #          f'Contents {passthrough_kwargs}')
 
+        # The session is not closed, it is shared with other requests and
+        # threads, and its connections are kept alive between requests
         session_ = target_session or self.sessions[target]
 
-        with session_:
-            if _pre_request_func is not None:
-                session_ = _pre_request_func(session_)
+        if _pre_request_func is not None:
+            session_ = _pre_request_func(session_)
 
-            request_func = getattr(session_, method, None)
-            assert request_func is not None
+        request_func = getattr(session_, method, None)
+        assert request_func is not None
 
+        # Label by endpoint tag, not URL, to bound the metric's cardinality
+        operation = tag if tag is not None else 'passthrough'
+        with prometheus.outbound_timer(self.NAME.lower(), method, operation):
             response = request_func(endpoint_encoded, **passthrough_kwargs)
 
         if response.ok:
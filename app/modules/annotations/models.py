@@ -113,31 +113,45 @@ class Annotation(db.Model, HoustonModel, SageModel):
         super().__init__(*args, **kwargs)
 
     @classmethod
-    def run_integrity(cls):
-        from app.modules.asset_groups.models import AssetGroup
+    def run_integrity(cls, since=None):
+        """
+        Check annotations, or only those updated since ``since``.
+        """
+        from app.modules.asset_groups.models import (
+            AssetGroup,
+            AssetGroupSighting,
+            AssetGroupSightingStage,
+        )
+        from app.modules.assets.models import Asset
 
         result = {'no_content_guid': [], 'no_encounter': []}
 
-        # Annots must always have a content guid
-        no_contents = Annotation.query.filter(Annotation.content_guid.is_(None)).all()
-        if no_contents:
-            result['no_content_guid'] = [annot.guid for annot in no_contents]
+        query = db.session.query(Annotation.guid)
+        if since is not None:
+            query = query.filter(Annotation.updated >= since)
 
-        no_encounters = []
-        if is_module_enabled('encounters'):
-            no_encounters = Annotation.query.filter(
-                Annotation.encounter_guid.is_(None)
-            ).all()
+        # Annots must always have a content guid
+        result['no_content_guid'] = [
+            guid for (guid,) in query.filter(Annotation.content_guid.is_(None))
+        ]
 
         # just because an annot has no encounters does not immediately make this an integrity check failure
         # Annots in Assets in Asset groups that are not fully processed may validly not have an encounter
-        for annot in no_encounters:
-            assert annot.asset.git_store
+        if is_module_enabled('encounters'):
+            unprocessed = (
+                db.session.query(AssetGroupSighting.guid)
+                .filter(AssetGroupSighting.asset_group_guid == AssetGroup.guid)
+                .filter(AssetGroupSighting.stage != AssetGroupSightingStage.processed)
+                .exists()
+            )
             # Integrity only currently implemented on codex, not MWS
-            assert isinstance(annot.asset.git_store, AssetGroup)
-
-            if annot.asset.git_store.is_processed():
-                result['no_encounter'].append(annot.guid)
+            no_encounters = (
+                query.join(Asset, Annotation.asset_guid == Asset.guid)
+                .join(AssetGroup, Asset.git_store_guid == AssetGroup.guid)
+                .filter(Annotation.encounter_guid.is_(None))
+                .filter(~unprocessed)
+            )
+            result['no_encounter'] = [guid for (guid,) in no_encounters]
 
         return result
 
@@ -394,8 +408,9 @@ class Annotation(db.Model, HoustonModel, SageModel):
         return sighting
 
     def get_asset_src(self):
+        # Asset.src looks up the version of the derived file, read it once
         assset_src = None
-        if self.asset and self.asset.src:
+        if self.asset:
             assset_src = self.asset.src
         return assset_src
 
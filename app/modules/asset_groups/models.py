@@ -10,6 +10,7 @@ import logging
 import uuid
 from http import HTTPStatus
 
+import sqlalchemy as sa
 from flask import current_app, url_for
 from flask_login import current_user  # NOQA
 
@@ -22,6 +23,7 @@ from app.modules.assets.models import Asset
 from app.modules.encounters.models import Encounter
 from app.modules.individuals.models import Individual
 from app.modules.names.models import DEFAULT_NAME_CONTEXT
+from app.modules.progress.pipeline import PipelineStatusMixin
 from app.modules.sightings.models import Sighting, SightingStage
 from app.modules.users.models import User
 from app.utils import HoustonException
@@ -43,12 +45,21 @@ class AssetGroupSightingStage(str, enum.Enum):
 
 
 # AssetGroup can have many sightings, so needs a table
-class AssetGroupSighting(db.Model, HoustonModel):
+class AssetGroupSighting(db.Model, HoustonModel, PipelineStatusMixin):
 
     __mapper_args__ = {
         'confirm_deleted_rows': False,
     }
 
+    PIPELINE_STATUS_ATTRIBUTES = (
+        'stage',
+        'config',
+        'detection_start',
+        'curation_start',
+        'progress_detection_guid',
+        'progress_identification_guid',
+    )
+
     guid = db.Column(db.GUID, default=uuid.uuid4, primary_key=True)
     stage = db.Column(
         db.Enum(AssetGroupSightingStage),
@@ -162,6 +173,9 @@ class AssetGroupSighting(db.Model, HoustonModel):
         if self.stage != AssetGroupSightingStage.preparation:
             return
 
+        # The assets extracted from any archives exist now
+        self.expand_archive_references()
+
         # Allow sightings to have no Assets, they go straight to curation
         if (
             'assetReferences' not in self.sighting_config
@@ -373,6 +387,32 @@ class AssetGroupSighting(db.Model, HoustonModel):
         )
         return sighting
 
+    def expand_archive_references(self):
+        """
+        Replace any assetReferences to an uploaded archive with the paths of
+        the assets extracted from it, so the references resolve to assets
+        """
+        if not self.sighting_config:
+            return
+        references = self.sighting_config.get('assetReferences') or []
+        asset_paths = {asset.path for asset in self.asset_group.assets}
+        expanded = []
+        for reference in references:
+            if reference in asset_paths:
+                expanded.append(reference)
+                continue
+            expanded.extend(
+                self.asset_group.get_archive_asset_paths(reference) or [reference]
+            )
+        if expanded == references:
+            return
+
+        with db.session.begin(subtransactions=True):
+            self.sighting_config['assetReferences'] = expanded
+            # sighting_config is actually an alias, need to rewrite the top level DB item
+            self.config = self.config
+            db.session.merge(self)
+
     def has_filename(self, filename):
         if not self.sighting_config:
             return False
@@ -545,8 +585,54 @@ class AssetGroupSighting(db.Model, HoustonModel):
             jobs.extend(asset_group_sighting.get_jobs_debug(verbose))
         return jobs
 
-    def get_pipeline_status(self):
-        db.session.refresh(self)
+    def get_pipeline_progress(self, stage):
+        if stage == 'preparation':
+            return self.progress_preparation
+        elif stage == 'detection':
+            return self.progress_detection
+        elif stage == 'identification':
+            return self.progress_identification
+        return None
+
+    @classmethod
+    def pipeline_status_stale_criteria(cls, changes):
+        criteria = []
+        if changes.get('Progress'):
+            progress_guids = changes['Progress']
+            criteria += [
+                cls.progress_detection_guid.in_(progress_guids),
+                cls.progress_identification_guid.in_(progress_guids),
+                cls.asset_group_guid.in_(
+                    sa.select([GitStore.guid]).where(
+                        GitStore.progress_preparation_guid.in_(progress_guids)
+                    )
+                ),
+            ]
+        if changes.get('AssetGroupSighting'):
+            criteria.append(cls.guid.in_(changes['AssetGroupSighting']))
+        if changes.get('AssetGroup'):
+            criteria.append(cls.asset_group_guid.in_(changes['AssetGroup']))
+        if changes.get('Asset'):
+            # the annotations of an asset changed
+            criteria.append(
+                cls.asset_group_guid.in_(
+                    sa.select([Asset.git_store_guid]).where(
+                        Asset.guid.in_(changes['Asset'])
+                    )
+                )
+            )
+        if changes.get('Sighting'):
+            # curation is complete once the sighting is created
+            criteria.append(
+                cls.guid.in_(
+                    sa.select([Sighting.asset_group_sighting_guid]).where(
+                        Sighting.guid.in_(changes['Sighting'])
+                    )
+                )
+            )
+        return sa.or_(*criteria) if criteria else None
+
+    def compute_pipeline_status(self):
         status = {
             'preparation': self._get_pipeline_status_preparation(),
             'detection': self._get_pipeline_status_detection(),
@@ -1494,6 +1580,9 @@ class AssetGroup(GitStore):
     AssetGroup database model.
     """
 
+    # Changes to these make the pipeline status of the asset group sightings stale
+    PIPELINE_STATUS_ATTRIBUTES = ('progress_preparation_guid',)
+
     GIT_STORE_NAME = 'asset_groups'
 
     GIT_STORE_DATABASE_PATH_CONFIG_NAME = 'ASSET_GROUP_DATABASE_PATH'
@@ -1512,7 +1601,11 @@ class AssetGroup(GitStore):
     }
 
     @classmethod
-    def run_integrity(cls):
+    def run_integrity(cls, since=None):
+        """
+        Check asset groups and their sightings, or only the asset group
+        sightings updated and the assets in groups updated since ``since``.
+        """
         result = {
             'assets_without_annots': [],
             'failed_sightings': [],
@@ -1523,60 +1616,72 @@ class AssetGroup(GitStore):
         }
 
         # Processed groups should have no assets without annots
-        under_processed_groups = (
-            db.session.query(AssetGroup)
-            .join(AssetGroupSighting)
-            .join(Asset)
+        processed = (
+            db.session.query(AssetGroupSighting.guid)
+            .filter(AssetGroupSighting.asset_group_guid == AssetGroup.guid)
             .filter(AssetGroupSighting.stage == AssetGroupSightingStage.processed)
+            .exists()
+        )
+        hanging_assets = (
+            db.session.query(AssetGroup.guid, Asset.guid)
+            .join(Asset, Asset.git_store_guid == AssetGroup.guid)
+            .filter(processed)
             .filter(~Asset.annotations.any())
-        ).all()
-
-        if under_processed_groups:
-            for group in under_processed_groups:
-                hanging_assets = [
-                    asset.guid for asset in group.assets if len(asset.annotations) == 0
-                ]
-                result['assets_without_annots'].append(
-                    {
-                        'group_guid': group.guid,
-                        'asset_guids': hanging_assets,
-                    }
-                )
+        )
+        if since is not None:
+            hanging_assets = hanging_assets.filter(
+                sa.or_(AssetGroup.updated >= since, Asset.updated >= since)
+            )
+        hanging_assets = hanging_assets.order_by(AssetGroup.guid, Asset.guid)
+
+        groups = {}
+        for group_guid, asset_guid in hanging_assets:
+            if group_guid not in groups:
+                groups[group_guid] = {
+                    'group_guid': group_guid,
+                    'asset_guids': [],
+                }
+                result['assets_without_annots'].append(groups[group_guid])
+            groups[group_guid]['asset_guids'].append(asset_guid)
+
+        query = db.session.query(AssetGroupSighting.guid)
+        if since is not None:
+            query = query.filter(AssetGroupSighting.updated >= since)
+
         result['failed_sightings'] = [
-            sight.guid
-            for sight in (
-                db.session.query(AssetGroupSighting).filter(
-                    AssetGroupSighting.stage == AssetGroupSightingStage.failed
-                )
-            ).all()
+            guid
+            for (guid,) in query.filter(
+                AssetGroupSighting.stage == AssetGroupSightingStage.failed
+            )
         ]
 
         result['unknown_stage_sightings'] = [
-            sight.guid
-            for sight in (
-                db.session.query(AssetGroupSighting).filter(
-                    AssetGroupSighting.stage == AssetGroupSightingStage.unknown
-                )
-            ).all()
+            guid
+            for (guid,) in query.filter(
+                AssetGroupSighting.stage == AssetGroupSightingStage.unknown
+            )
         ]
 
         result['preparation_stage_sightings'] = [
-            sight.guid
-            for sight in (
-                db.session.query(AssetGroupSighting).filter(
-                    AssetGroupSighting.stage == AssetGroupSightingStage.preparation
-                )
-            ).all()
+            guid
+            for (guid,) in query.filter(
+                AssetGroupSighting.stage == AssetGroupSightingStage.preparation
+            )
         ]
 
         # Having detecting sightings is perfectly valid but there may be reasons why they're
         # stuck in detecting. Only look at ones that are at least an hour old to avoid false positives
         an_hour_ago = datetime.datetime.utcnow() - datetime.timedelta(hours=1)
         detecting_sightings = (
-            db.session.query(AssetGroupSighting)
-            .filter(AssetGroupSighting.stage == AssetGroupSightingStage.detection)
+            AssetGroupSighting.query.filter(
+                AssetGroupSighting.stage == AssetGroupSightingStage.detection
+            )
             .filter(AssetGroupSighting.created < an_hour_ago)
-        ).all()
+        )
+        if since is not None:
+            detecting_sightings = detecting_sightings.filter(
+                AssetGroupSighting.updated >= since
+            )
 
         # look for some possible reasons we're stuck in detection
         for sighting in detecting_sightings:
@@ -1683,11 +1788,6 @@ class AssetGroup(GitStore):
 
         ensure_remote.delay(str(asset_group.guid))
 
-    def git_push_delay(self):
-        from app.extensions.git_store.tasks import git_push
-
-        git_push.delay(str(self.guid))
-
     def delete_remote_delay(self):
         from app.extensions.git_store.tasks import delete_remote
 
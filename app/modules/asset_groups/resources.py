@@ -11,7 +11,7 @@ import uuid
 from http import HTTPStatus
 
 import werkzeug
-from flask import request
+from flask import make_response, request
 from flask_login import current_user
 
 import app.extensions.logging as AuditLog
@@ -801,6 +801,38 @@ class AssetGroupSightingAsSightingEncounterByID(Resource):
         return returned_json
 
 
+@api.route('/sighting/<uuid:asset_group_sighting_guid>/pipeline_status')
+@api.login_required(oauth_scopes=['asset_group_sightings:read'])
+@api.response(
+    code=HTTPStatus.NOT_FOUND,
+    description='Asset_group_sighting not found.',
+)
+@api.resolve_object_by_model(AssetGroupSighting, 'asset_group_sighting')
+class AssetGroupSightingPipelineStatus(Resource):
+    """
+    The pipeline status of the Asset Group Sighting, for polling
+    """
+
+    @api.permission_required(
+        permissions.ObjectAccessPermission,
+        kwargs_on_request=lambda kwargs: {
+            'obj': kwargs['asset_group_sighting'],
+            'action': AccessOperation.READ,
+        },
+    )
+    def get(self, asset_group_sighting):
+        """
+        Get the pipeline status of an Asset_group_sighting.
+
+        Pass the ``version`` of the last status read to get a 304 response
+        if it has not changed since.
+        """
+        version = request.args.get('version', type=int)
+        if not asset_group_sighting.pipeline_status_changed(version):
+            return make_response('', HTTPStatus.NOT_MODIFIED)
+        return asset_group_sighting.get_pipeline_status()
+
+
 @api.route('/sighting/<uuid:asset_group_sighting_guid>/commit')
 @api.login_required(oauth_scopes=['asset_group_sightings:write'])
 @api.response(
@@ -28,3 +28,9 @@ def init_app(app, **kwargs):
     # Register Models to use with Elasticsearch
     register_elasticsearch_model(models.Asset)
     register_prometheus_model(models.Asset)
+
+    @app.teardown_request
+    def forget_asset_src_versions(exception=None):
+        from flask import g
+
+        g.pop(models.ASSET_SRC_VERSIONS_G_KEY, None)
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+Assets file delivery
+--------------------
+
+Asset files are sent in one of the ``ASSET_DELIVERY_MODES``:
+
+* ``send_file`` (the default) streams the bytes through the WSGI worker in
+  ``ASSET_STREAM_BUFFER_SIZE`` blocks, honouring ``Range`` requests
+* ``x-accel-redirect`` authorizes the request in Houston and hands the
+  transfer to nginx through an ``internal`` location that maps
+  ``ASSET_ACCEL_REDIRECT_PREFIX`` onto ``PROJECT_DATABASE_PATH``, e.g.::
+
+      location /_protected_data/ {
+          internal;
+          alias /data/var/;
+          etag off;
+      }
+
+* ``x-sendfile`` does the same with an absolute path for Apache/lighttpd
+
+The web server answers ``Range`` requests itself in the last two modes.
+"""
+
+import logging
+import os
+import uuid
+from http import HTTPStatus
+from urllib.parse import quote
+
+import werkzeug
+from flask import current_app, request
+
+log = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+ASSET_DELIVERY_MODES = ('send_file', 'x-accel-redirect', 'x-sendfile')
+
+# More ranges than this in one request are answered with the whole file
+ASSET_MAX_RANGES = 16
+
+
+def file_version(filepath, *parts):
+    """
+    Return a version token for a file, which changes whenever the file is
+    rewritten (e.g. a rotated image or regenerated derivative).
+    """
+    stat = os.stat(filepath)
+    return '-'.join(
+        [str(part) for part in parts] + [f'{stat.st_mtime_ns:x}', f'{stat.st_size:x}']
+    )
+
+
+def _accel_redirect_uri(filepath):
+    root = os.path.realpath(current_app.config['PROJECT_DATABASE_PATH'])
+    relpath = os.path.relpath(filepath, root)
+    if relpath.startswith(os.pardir):
+        return None
+    prefix = current_app.config.get('ASSET_ACCEL_REDIRECT_PREFIX', '/_protected_data/')
+    return prefix.rstrip('/') + '/' + quote(relpath)
+
+
+def _set_cache_headers(response, version):
+    response.set_etag(version)
+    response.headers.pop('Expires', None)
+    # The same URL is served a new file when an asset is rotated, so only a
+    # request pinned to the current version may be cached without revalidation
+    if request.args.get('v') == version:
+        max_age = current_app.config.get('ASSET_CACHE_MAX_AGE', 365 * 24 * 60 * 60)
+        response.headers['Cache-Control'] = f'private, max-age={max_age}, immutable'
+    else:
+        response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def parse_byte_ranges(size, version):
+    """
+    Return the requested byte ranges of a file of ``size`` bytes as a list of
+    ``(start, stop)`` pairs (``stop`` exclusive), ``None`` if the whole file
+    should be sent, or an empty list if no range can be satisfied.
+    """
+    byte_range = request.range
+    if byte_range is None or byte_range.units != 'bytes':
+        return None
+
+    if_range = request.if_range
+    if if_range.etag is not None and if_range.etag != version:
+        return None
+    if if_range.date is not None:
+        # Dates are too coarse to identify a version, only the ETag is used
+        return None
+
+    if len(byte_range.ranges) > ASSET_MAX_RANGES:
+        return None
+
+    ranges = []
+    for start, stop in byte_range.ranges:
+        if start < 0:
+            # Suffix range, the last -start bytes
+            start = max(size + start, 0)
+            stop = size
+        else:
+            stop = size if stop is None else min(stop, size)
+        if start >= size or start >= stop:
+            continue
+        ranges.append((start, stop))
+    return ranges
+
+
+def _read_file(filepath, ranges, buffer_size, parts=None):
+    """
+    Yield the bytes of ``ranges`` of a file, reading at most ``buffer_size``
+    bytes at a time.  ``parts`` are the multipart headers written before
+    each range, followed by the closing boundary.
+    """
+    with open(filepath, 'rb') as fp:
+        for index, (start, stop) in enumerate(ranges):
+            if parts is not None:
+                yield parts[index]
+            fp.seek(start)
+            remaining = stop - start
+            while remaining > 0:
+                data = fp.read(min(buffer_size, remaining))
+                if not data:
+                    return
+                remaining -= len(data)
+                yield data
+        if parts is not None:
+            yield parts[-1]
+
+
+def stream_file(filepath, mimetype, version):
+    """
+    Stream a file, or the ``Range`` of it that was requested, as a
+    ``200 OK``, ``206 Partial Content`` (``multipart/byteranges`` for more
+    than one range) or ``416 Range Not Satisfiable`` response.
+    """
+    size = os.path.getsize(filepath)
+    buffer_size = current_app.config.get('ASSET_STREAM_BUFFER_SIZE', 64 * 1024)
+    ranges = parse_byte_ranges(size, version)
+
+    if ranges is not None and len(ranges) == 0:
+        response = current_app.response_class(
+            status=HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE
+        )
+        response.headers['Content-Range'] = f'bytes */{size}'
+        response.headers['Accept-Ranges'] = 'bytes'
+        return response
+
+    parts = None
+    if ranges is None:
+        ranges = [(0, size)]
+        status = HTTPStatus.OK
+        content_length = size
+    elif len(ranges) == 1:
+        status = HTTPStatus.PARTIAL_CONTENT
+        start, stop = ranges[0]
+        content_length = stop - start
+    else:
+        status = HTTPStatus.PARTIAL_CONTENT
+        boundary = uuid.uuid4().hex
+        parts = [
+            (
+                f'\r\n--{boundary}\r\n'
+                f'Content-Type: {mimetype}\r\n'
+                f'Content-Range: bytes {start}-{stop - 1}/{size}\r\n\r\n'
+            ).encode('ascii')
+            for start, stop in ranges
+        ]
+        parts.append(f'\r\n--{boundary}--\r\n'.encode('ascii'))
+        content_length = sum(len(part) for part in parts) + sum(
+            stop - start for start, stop in ranges
+        )
+        mimetype = f'multipart/byteranges; boundary={boundary}'
+
+    response = current_app.response_class(
+        _read_file(filepath, ranges, buffer_size, parts),
+        status=status,
+        mimetype=mimetype,
+        direct_passthrough=True,
+    )
+    response.headers['Content-Length'] = str(content_length)
+    response.headers['Accept-Ranges'] = 'bytes'
+    if status == HTTPStatus.PARTIAL_CONTENT and parts is None:
+        response.headers['Content-Range'] = f'bytes {start}-{stop - 1}/{size}'
+    return response
+
+
+def send_asset_file(filepath, mimetype, *version_parts):
+    """
+    Send an asset file with its ``Content-Type``, ``ETag`` and cache headers,
+    using the configured ``ASSET_DELIVERY_MODE``.
+
+    Requests with a matching ``If-None-Match`` get a ``304 Not Modified``
+    without the file being opened.
+    """
+    filepath = os.path.realpath(filepath)
+    if not os.path.isfile(filepath):
+        raise werkzeug.exceptions.NotFound()
+
+    version = file_version(filepath, *version_parts)
+
+    if request.if_none_match.contains(version):
+        response = current_app.response_class(status=HTTPStatus.NOT_MODIFIED)
+        return _set_cache_headers(response, version)
+
+    mode = current_app.config.get('ASSET_DELIVERY_MODE') or 'send_file'
+    response = None
+    if mode == 'x-accel-redirect':
+        uri = _accel_redirect_uri(filepath)
+        if uri is None:
+            log.warning(f'{filepath} is outside of PROJECT_DATABASE_PATH, sending it')
+        else:
+            response = current_app.response_class(mimetype=mimetype)
+            response.headers['X-Accel-Redirect'] = uri
+    elif mode == 'x-sendfile':
+        response = current_app.response_class(mimetype=mimetype)
+        response.headers['X-Sendfile'] = filepath
+    elif mode != 'send_file':
+        log.warning(
+            f'Unknown ASSET_DELIVERY_MODE {mode!r}, options are {ASSET_DELIVERY_MODES}'
+        )
+
+    if response is None:
+        response = stream_file(filepath, mimetype, version)
+    return _set_cache_headers(response, version)
@@ -3,24 +3,30 @@
 Assets database models
 --------------------
 """
+import datetime
 import logging
 import os
 import pathlib
+import subprocess
 import uuid
 from functools import total_ordering
 
-from flask import current_app, url_for
+from flask import current_app, g, has_request_context, url_for
 from flask_login import current_user
 from PIL import Image
 
 import app.extensions.logging as AuditLog
-from app.extensions import HoustonModel, SageModel, db
+from app.extensions import HoustonModel, SageModel, Timestamp, db
 from app.modules import is_module_enabled, module_required
 from app.modules.users.models import User
 from app.utils import HoustonException
 
 log = logging.getLogger(__name__)  # pylint: disable=invalid-name
 
+# Versions of the derived files looked up while serving a request, keyed by
+# asset guid and format, so serializing an asset stats its derived file once
+ASSET_SRC_VERSIONS_G_KEY = 'asset_src_versions'
+
 
 class AssetTags(db.Model, HoustonModel):
     asset_guid = db.Column(db.GUID, db.ForeignKey('asset.guid'), primary_key=True)
@@ -113,8 +119,22 @@ class Asset(db.Model, HoustonModel, SageModel):
         )
 
     @classmethod
-    def run_integrity(cls):
-        from app.modules.asset_groups.models import AssetGroup
+    def run_integrity(cls, since=None):
+        """
+        Check assets, or only those that have been updated or had an
+        annotation updated since ``since``.
+        """
+        import sqlalchemy as sa
+        from sqlalchemy.orm import aliased
+
+        from app.modules.annotations.models import Annotation
+        from app.modules.asset_groups.models import (
+            AssetGroupSighting,
+            AssetGroupSightingStage,
+        )
+        from app.modules.encounters.models import Encounter
+
+        from .reconcile import find_missing_asset_files
 
         result = {
             'no_content_guid': [],
@@ -123,58 +143,74 @@ class Asset(db.Model, HoustonModel, SageModel):
             'file_not_on_disk': [],
         }
 
+        def _changed(query, column):
+            if since is None:
+                return query
+            # Aliased so the subqueries are not correlated with the outer query
+            asset_alias = aliased(Asset)
+            annotation_alias = aliased(Annotation)
+            changed_assets = db.session.query(asset_alias.guid).filter(
+                asset_alias.updated >= since
+            )
+            changed_annotations = db.session.query(annotation_alias.asset_guid).filter(
+                annotation_alias.updated >= since
+            )
+            return query.filter(
+                sa.or_(column.in_(changed_assets), column.in_(changed_annotations))
+            )
+
+        def _group_in_stage(*stages):
+            # Asset groups are the only git stores with asset group sightings
+            return (
+                db.session.query(AssetGroupSighting.guid)
+                .filter(AssetGroupSighting.asset_group_guid == Asset.git_store_guid)
+                .filter(*stages)
+                .exists()
+            )
+
+        query = _changed(db.session.query(Asset.guid), Asset.guid)
+
         # Assets must have a content guid unless they are in an AGS that is still detecting
-        no_contents = Asset.query.filter(Asset.content_guid.is_(None)).all()
-        for asset in no_contents:
-            if isinstance(asset.git_store, AssetGroup):
-                if not asset.is_detection():
-                    result['no_content_guid'].append(asset.guid)
-            else:
-                result['no_content_guid'].append(asset.guid)
-
-        # This will be glacial as all assets should have annots right?
-        # but if there's a query foo that can give this, it's a mystery.
-        # First filter should be assets with multi annots that have an encounter
-        has_annots = Asset.query.filter(Asset.annotations.any()).all()
-        for asset in has_annots:
-            if len(asset.annotations) > 1:
-                sighting = None
-                for annot in asset.annotations:
-                    annot_sighting = annot.get_sighting()
-                    if not annot_sighting:
-                        continue
-
-                    if sighting:
-                        if sighting != annot_sighting:
-                            result['multiple_sightings'].append(asset.guid)
-                            break
-                    else:
-                        sighting = annot_sighting
-
-        # This shoudl leave us with assets that are definitely a problem and some that might be OK if they are in
-        # an Asset group that has not been fully processed. Need to manually go though them to check.
-        assets_without_sighting = [
-            asset
-            for asset in (
-                db.session.query(Asset).filter(~Asset.asset_sightings.any()).all()
+        no_contents = query.filter(Asset.content_guid.is_(None)).filter(
+            ~_group_in_stage(
+                AssetGroupSighting.stage == AssetGroupSightingStage.detection
             )
+        )
+        result['no_content_guid'] = [guid for (guid,) in no_contents]
+
+        # Assets whose annotations have encounters in more than one sighting
+        multiple_sightings = (
+            db.session.query(Annotation.asset_guid)
+            .join(Encounter, Annotation.encounter_guid == Encounter.guid)
+            .filter(Encounter.sighting_guid.isnot(None))
+            .group_by(Annotation.asset_guid)
+            .having(sa.func.count(sa.distinct(Encounter.sighting_guid)) > 1)
+        )
+        multiple_sightings = _changed(multiple_sightings, Annotation.asset_guid)
+        result['multiple_sightings'] = [guid for (guid,) in multiple_sightings]
+
+        # Assets without a sighting are definitely a problem unless they are in an
+        # asset group that has not been fully processed, those need to be checked
+        # against the asset group sightings one by one
+        without_sighting = query.filter(~Asset.asset_sightings.any())
+        unprocessed = _group_in_stage(
+            AssetGroupSighting.stage != AssetGroupSightingStage.processed
+        )
+        result['no_sightings'] = [
+            guid for (guid,) in without_sighting.filter(~unprocessed)
         ]
-        for asset in assets_without_sighting:
-            if isinstance(asset.git_store, AssetGroup):
-                if asset.git_store.is_processed():
-                    # if group is processed, then this was left hanging, definitely a problem
-                    result['no_sightings'].append(asset.guid)
-                elif not asset.git_store.get_asset_group_sightings_for_asset(asset):
-                    # asset has no ags, That's a problem
-                    result['no_sightings'].append(asset.guid)
-            else:
-                # Not an asset group, definitely a problem
+        pending_guids = [guid for (guid,) in without_sighting.filter(unprocessed)]
+        for asset in Asset.query.filter(Asset.guid.in_(pending_guids)):
+            if not asset.git_store.get_asset_group_sightings_for_asset(asset):
+                # asset has no ags, That's a problem
                 result['no_sightings'].append(asset.guid)
 
-        all_assets = Asset.query.all()
-        for asset in all_assets:
-            if not asset.file_exists_on_disk():
-                result['file_not_on_disk'].append(asset.guid)
+        # List the asset directory of each git store instead of resolving the
+        # symlink of every asset
+        asset_guids = None
+        if since is not None:
+            asset_guids = _changed(db.session.query(Asset.guid), Asset.guid)
+        result['file_not_on_disk'] = find_missing_asset_files(asset_guids)
 
         return result
 
@@ -266,10 +302,46 @@ class Asset(db.Model, HoustonModel, SageModel):
                 db.session.delete(ref)
                 break
 
+    def get_src_version(self, format='master'):
+        """
+        The version of a derived file, as sent in its ETag, or None if it has
+        not been made yet.  Memoized for the request.
+        """
+        from .delivery import file_version
+
+        versions = {}
+        if has_request_context():
+            versions = g.setdefault(ASSET_SRC_VERSIONS_G_KEY, {})
+        key = (self.guid, format)
+        if key not in versions:
+            try:
+                versions[key] = file_version(
+                    self.get_derived_path(format), self.guid, format
+                )
+            except OSError:
+                versions[key] = None
+        return versions[key]
+
+    def forget_src_versions(self):
+        # The derived files of this asset were written or deleted
+        if has_request_context():
+            versions = g.get(ASSET_SRC_VERSIONS_G_KEY) or {}
+            for key in [key for key in versions if key[0] == self.guid]:
+                del versions[key]
+
     @property
     def src(self):
+        # Pinned to the current version (see delivery._set_cache_headers) so
+        # browsers can cache the file until the asset is rotated
+        kwargs = {}
+        version = self.get_src_version()
+        if version is not None:
+            kwargs['v'] = version
         return url_for(
-            'api.assets_asset_src_u_by_id_2', asset_guid=str(self.guid), _external=False
+            'api.assets_asset_src_u_by_id_2',
+            asset_guid=str(self.guid),
+            _external=False,
+            **kwargs,
         )
 
     @property
@@ -377,15 +449,19 @@ class Asset(db.Model, HoustonModel, SageModel):
     def filename(self):
         return self.get_original_filename()
 
-    @property
-    def extension(self):
+    @classmethod
+    def get_extension(cls, mime_type):
         asset_mime_type_whitelist = current_app.config.get(
             'ASSET_MIME_TYPE_WHITELIST_EXTENSION', []
         )
-        if self.mime_type not in asset_mime_type_whitelist:
+        if mime_type not in asset_mime_type_whitelist:
             return 'unknown'
         else:
-            return asset_mime_type_whitelist[self.mime_type]
+            return asset_mime_type_whitelist[mime_type]
+
+    @property
+    def extension(self):
+        return self.get_extension(self.mime_type)
 
     def get_original_filename(self):
         return pathlib.Path(self.path).name
@@ -537,6 +613,7 @@ class Asset(db.Model, HoustonModel, SageModel):
             if format == 'abox':
                 source_image = self.draw_annotations(source_image)
             source_image.save(target_path)
+        self.forget_src_versions()
 
         return target_path
 
@@ -600,6 +677,8 @@ class Asset(db.Model, HoustonModel, SageModel):
         # Delete derived images (generated next time they're fetched)
         for format in self.FORMATS:
             self.get_derived_path(format).unlink(missing_ok=True)
+        self.get_derived_path('poster').unlink(missing_ok=True)
+        self.forget_src_versions()
 
     def original_changed(self, image_object):
         # Creates a copy of the original image
@@ -625,6 +704,47 @@ class Asset(db.Model, HoustonModel, SageModel):
         self.annotations = []
         self.git_store.asset_updated(self)
 
+    def get_or_make_poster_path(self):
+        """
+        Extract a poster frame of a video asset to derive the image formats
+        from.  ffmpeg seeks to the frame through the container index, so only
+        a small part of the (possibly very large) video is read.
+        """
+        source_path = self.get_symlink()
+        target_path = self.get_derived_path('poster')
+        target_path.parent.mkdir(parents=True, exist_ok=True)
+        if target_path.exists():
+            return target_path
+
+        offset = current_app.config.get('ASSET_VIDEO_POSTER_OFFSET', 1)
+        # Videos shorter than the offset get their first frame
+        for seek in sorted({offset, 0}, reverse=True):
+            command = [
+                current_app.config.get('FFMPEG_PATH', 'ffmpeg'),
+                '-nostdin',
+                '-loglevel',
+                'error',
+                '-ss',
+                str(seek),
+                '-i',
+                str(source_path.resolve()),
+                '-frames:v',
+                '1',
+                '-y',
+                str(target_path),
+            ]
+            try:
+                subprocess.run(command, check=True, capture_output=True, timeout=120)
+            except (OSError, subprocess.SubprocessError) as ex:
+                log.warning(f'Unable to extract a poster frame from {self}: {ex}')
+                continue
+            if target_path.exists() and target_path.stat().st_size > 0:
+                return target_path
+
+        raise HoustonException(
+            log, f'Unable to extract a poster frame from video Asset {self.guid}', obj=self
+        )
+
     # note: Image seems to *strip exif* sufficiently here (tested with gps, comments, etc) so this may be enough!
     # also note: this fails horribly in terms of exif orientation.  wom-womp
     def get_or_make_master_format_path(self):
@@ -639,6 +759,8 @@ class Asset(db.Model, HoustonModel, SageModel):
         target_path.parent.mkdir(parents=True, exist_ok=True)
         if target_path.exists():
             return target_path
+        if self.is_mime_type_major('video'):
+            source_path = self.get_or_make_poster_path()
         log.info(
             'make_master_format() creating master format as {!r}'.format(target_path)
         )
@@ -646,6 +768,7 @@ class Asset(db.Model, HoustonModel, SageModel):
             source_image.thumbnail(self.FORMATS['master'])
             rgb = source_image.convert('RGB')
             rgb.save(target_path)
+        self.forget_src_versions()
         return target_path
 
     def delete_relationships(self, delete_unreferenced_tags=True):
@@ -696,3 +819,235 @@ class Asset(db.Model, HoustonModel, SageModel):
 
     def get_owner(self):
         return self.git_store.owner
+
+
+class AssetReconciliation(db.Model, Timestamp):
+    """
+    A run of the asset file reconciliation, see app/modules/assets/reconcile.py.
+
+    The git stores are checked in guid order.  After each chunk of git
+    stores the missing and orphaned files are added as findings, together
+    with ``cursor``, the guid of the last git store checked, so an
+    interrupted run resumes where it stopped.
+
+    A run is claimed by one worker at a time for RUN_LEASE, which is renewed
+    after every chunk.  Only the last KEEP_COMPLETED_RUNS completed runs are
+    kept.
+    """
+
+    RUN_LEASE = datetime.timedelta(hours=1)
+    KEEP_COMPLETED_RUNS = 7
+
+    guid = db.Column(
+        db.GUID, default=uuid.uuid4, primary_key=True
+    )  # pylint: disable=invalid-name
+
+    # Last git store checked, None if none were checked yet
+    cursor = db.Column(db.GUID, nullable=True)
+    num_git_stores = db.Column(db.Integer, default=0, nullable=False)
+    num_missing = db.Column(db.Integer, default=0, nullable=False)
+    num_orphaned = db.Column(db.Integer, default=0, nullable=False)
+
+    completed = db.Column(db.DateTime, index=True, nullable=True)
+    # Until when the worker running it holds the run
+    lease_expires = db.Column(db.DateTime, nullable=True)
+
+    progress_guid = db.Column(
+        db.GUID, db.ForeignKey('progress.guid'), index=True, nullable=True
+    )
+    progress = db.relationship('Progress', foreign_keys=[progress_guid])
+
+    def __repr__(self):
+        return (
+            '<{class_name}('
+            'guid={self.guid}, '
+            'cursor={self.cursor}, '
+            'completed={self.completed}'
+            ')>'.format(class_name=self.__class__.__name__, self=self)
+        )
+
+    @classmethod
+    def get_last_run(cls):
+        return (
+            cls.query.filter(cls.completed.isnot(None))
+            .order_by(cls.created.desc())
+            .first()
+        )
+
+    @classmethod
+    def get_or_create(cls):
+        """
+        Claim the run that was interrupted, or a new run.  Returns None if
+        another worker holds the incomplete run.
+        """
+        import sqlalchemy as sa
+
+        from app.modules.progress.models import Progress
+
+        now = datetime.datetime.utcnow()
+        with db.session.begin(subtransactions=True):
+            # Claims are serialized, so two workers never create or resume a
+            # run at the same time
+            db.session.execute(
+                sa.select(
+                    [sa.func.pg_advisory_xact_lock(sa.func.hashtext(cls.__tablename__))]
+                )
+            )
+            reconciliation = (
+                cls.query.filter(cls.completed.is_(None))
+                .order_by(cls.created.desc())
+                .populate_existing()
+                .first()
+            )
+            if reconciliation is not None and (
+                reconciliation.lease_expires is not None
+                and reconciliation.lease_expires > now
+            ):
+                log.info(f'{reconciliation} is already running')
+                return None
+            if reconciliation is None:
+                reconciliation = cls(num_git_stores=0, num_missing=0, num_orphaned=0)
+                db.session.add(reconciliation)
+            reconciliation.lease_expires = now + cls.RUN_LEASE
+            if reconciliation.progress is None or not reconciliation.progress.active:
+                progress = Progress(description='Asset file reconciliation')
+                db.session.add(progress)
+                reconciliation.progress = progress
+        return reconciliation
+
+    @classmethod
+    def prune(cls, keep=None):
+        """
+        Delete the completed runs older than the last ``keep``, the database
+        deletes their findings with them.  Returns the number of runs deleted.
+        """
+        if keep is None:
+            keep = cls.KEEP_COMPLETED_RUNS
+
+        kept = (
+            db.session.query(cls.guid)
+            .filter(cls.completed.isnot(None))
+            .order_by(cls.completed.desc())
+            .limit(keep)
+        )
+        with db.session.begin(subtransactions=True):
+            return cls.query.filter(
+                cls.completed.isnot(None), ~cls.guid.in_(kept)
+            ).delete(synchronize_session=False)
+
+    def get_missing(self):
+        """
+        The guids of the assets without a file
+        """
+        query = db.session.query(AssetReconciliationFinding.asset_guid).filter(
+            AssetReconciliationFinding.run_guid == self.guid,
+            AssetReconciliationFinding.asset_guid.isnot(None),
+        )
+        return [asset_guid for (asset_guid,) in query]
+
+    def get_orphaned(self):
+        """
+        The files of git stores that do not belong to an asset
+        """
+        query = db.session.query(AssetReconciliationFinding.path).filter(
+            AssetReconciliationFinding.run_guid == self.guid,
+            AssetReconciliationFinding.path.isnot(None),
+        )
+        return sorted(path for (path,) in query)
+
+    def run(self, chunk_size=None):
+        from app.extensions.git_store import GitStore
+
+        from .reconcile import ASSET_RECONCILE_STORE_CHUNK_SIZE, iter_reconciled_chunks
+
+        if chunk_size is None:
+            chunk_size = ASSET_RECONCILE_STORE_CHUNK_SIZE
+
+        total = GitStore.query.count()
+        try:
+            chunks = iter_reconciled_chunks(after=self.cursor, chunk_size=chunk_size)
+            for cursor, num_git_stores, missing, orphaned in chunks:
+                findings = [{'asset_guid': guid} for guid in missing]
+                findings += [{'path': path} for path in orphaned]
+                with db.session.begin(subtransactions=True):
+                    if findings:
+                        AssetReconciliationFinding.insert(self.guid, findings)
+                    self.lease_expires = datetime.datetime.utcnow() + self.RUN_LEASE
+                    self.cursor = cursor
+                    self.num_git_stores += num_git_stores
+                    self.num_missing += len(missing)
+                    self.num_orphaned += len(orphaned)
+                if missing or orphaned:
+                    log.warning(
+                        f'{self} found {len(missing)} missing and '
+                        f'{len(orphaned)} orphaned files'
+                    )
+                if self.progress is not None and total:
+                    self.progress.set(100 * self.num_git_stores / total)
+        except Exception as ex:
+            log.exception(f'{self} failed')
+            if self.progress is not None:
+                self.progress.fail(str(ex))
+            # Release the run so the next worker resumes it straight away
+            with db.session.begin(subtransactions=True):
+                self.lease_expires = None
+            raise
+
+        with db.session.begin(subtransactions=True):
+            self.completed = datetime.datetime.utcnow()
+            self.lease_expires = None
+        if self.progress is not None:
+            self.progress.set(100)
+
+        self.prune()
+        return self
+
+
+class AssetReconciliationFinding(db.Model):
+    """
+    A missing or orphaned file found by an asset file reconciliation
+    """
+
+    guid = db.Column(
+        db.GUID, default=uuid.uuid4, primary_key=True
+    )  # pylint: disable=invalid-name
+
+    # The reconciliation run that found it
+    run_guid = db.Column(
+        db.GUID,
+        db.ForeignKey('asset_reconciliation.guid', ondelete='CASCADE'),
+        index=True,
+        nullable=False,
+    )
+
+    # Asset without a file
+    asset_guid = db.Column(db.GUID, nullable=True)
+    # File of a git store that does not belong to an asset, relative to the
+    # git store database
+    path = db.Column(db.String, nullable=True)
+
+    def __repr__(self):
+        return (
+            '<{class_name}('
+            'guid={self.guid}, '
+            'asset_guid={self.asset_guid}, '
+            'path={self.path}'
+            ')>'.format(class_name=self.__class__.__name__, self=self)
+        )
+
+    @classmethod
+    def insert(cls, run_guid, findings):
+        """
+        Add the findings (dicts with an ``asset_guid`` or a ``path``) of a
+        reconciliation with one multi-row INSERT
+        """
+        values = [
+            {
+                'guid': uuid.uuid4(),
+                'run_guid': run_guid,
+                'asset_guid': finding.get('asset_guid'),
+                'path': finding.get('path'),
+            }
+            for finding in findings
+        ]
+        db.session.execute(cls.__table__.insert().values(values))
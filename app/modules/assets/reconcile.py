@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Asset file reconciliation
+-------------------------
+
+Every asset is a symlink named ``<asset guid>.<extension>`` in the ``_assets``
+directory of its git store.  Instead of resolving the symlink of each asset,
+the expected file names are fetched a page of git stores at a time, in git
+store guid order, and the ``_assets`` directories of a chunk of git stores are listed with
+``os.scandir`` in parallel, one store per worker.
+
+Assets without a file are reported as missing, files that do not belong to
+any asset of the store are reported as orphaned.
+"""
+import itertools
+import logging
+import os
+
+from flask import current_app
+
+from app.extensions import db, parallel
+
+log = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+# Number of git stores listed in parallel before the results are recorded
+ASSET_RECONCILE_STORE_CHUNK_SIZE = 100
+
+
+def get_git_store_path(git_store_guid, git_store_type):
+    """
+    The absolute path of a git store, without loading it, see
+    ``GitStore.get_absolute_path()``
+    """
+    from app.extensions.git_store import GitStore
+
+    mapper = GitStore.__mapper__.polymorphic_map.get(git_store_type)
+    cls = mapper.class_ if mapper is not None else GitStore
+    database_path = current_app.config.get(cls.GIT_STORE_DATABASE_PATH_CONFIG_NAME)
+    return os.path.join(database_path, str(git_store_guid))
+
+
+def iter_expected_asset_files(
+    after=None, asset_guids=None, page_size=ASSET_RECONCILE_STORE_CHUNK_SIZE
+):
+    """
+    Yield ``(git store guid, git store path, expected)`` for each git store in
+    guid order, ``expected`` maps the file names in ``_assets`` to asset guids.
+
+    Git stores after the ``after`` guid are listed.  If ``asset_guids`` (a
+    query of asset guids) is given only the git stores of those assets are
+    listed, and only those assets are expected.
+
+    The git stores are fetched ``page_size`` at a time with keyset pagination
+    on their guid, then the assets of each page with one query, so no cursor
+    or transaction is held open while the stores are listed.
+    """
+    from app.extensions.git_store import GitStore
+
+    from .models import Asset
+
+    while True:
+        stores_query = db.session.query(GitStore.guid, GitStore.git_store_type)
+        if asset_guids is not None:
+            stores_query = stores_query.filter(
+                GitStore.guid.in_(
+                    db.session.query(Asset.git_store_guid).filter(
+                        Asset.guid.in_(asset_guids)
+                    )
+                )
+            )
+        if after is not None:
+            stores_query = stores_query.filter(GitStore.guid > after)
+        stores = stores_query.order_by(GitStore.guid).limit(page_size).all()
+        if not stores:
+            return
+
+        # Git stores without assets can still have orphaned files
+        expected = {git_store_guid: {} for git_store_guid, _ in stores}
+        assets_query = db.session.query(
+            Asset.git_store_guid, Asset.guid, Asset.mime_type
+        ).filter(Asset.git_store_guid.in_(list(expected)))
+        if asset_guids is not None:
+            assets_query = assets_query.filter(Asset.guid.in_(asset_guids))
+        for git_store_guid, asset_guid, mime_type in assets_query:
+            extension = Asset.get_extension(mime_type)
+            expected[git_store_guid][f'{asset_guid}.{extension}'] = asset_guid
+
+        for git_store_guid, git_store_type in stores:
+            git_store_path = get_git_store_path(git_store_guid, git_store_type)
+            yield git_store_guid, git_store_path, expected[git_store_guid]
+
+        if len(stores) < page_size:
+            return
+        after = stores[-1][0]
+
+
+def scan_git_store_assets(git_store_path, expected):
+    """
+    List the ``_assets`` directory of a git store.  Returns the guids of the
+    expected assets that have no file and the names of the files that are
+    not expected.
+    """
+    present = set()
+    orphaned = []
+    try:
+        with os.scandir(os.path.join(git_store_path, '_assets')) as entries:
+            for entry in entries:
+                if entry.name in expected:
+                    # Follows the symlink, a broken symlink is a missing file
+                    if entry.is_file():
+                        present.add(entry.name)
+                elif not entry.name.startswith('.'):
+                    orphaned.append(entry.name)
+    except FileNotFoundError:
+        pass
+
+    missing = [guid for name, guid in expected.items() if name not in present]
+    return missing, sorted(orphaned)
+
+
+def iter_reconciled_chunks(
+    after=None,
+    asset_guids=None,
+    chunk_size=ASSET_RECONCILE_STORE_CHUNK_SIZE,
+):
+    """
+    Yield ``(last git store guid, number of git stores, missing, orphaned)``
+    for each chunk of git stores, see ``iter_expected_asset_files()``.
+    Orphaned files are reported as paths relative to the git store database.
+    """
+    workers = current_app.config.get('EXECUTOR_MAX_WORKERS')
+    stores = iter_expected_asset_files(
+        after=after, asset_guids=asset_guids, page_size=chunk_size
+    )
+    while True:
+        chunk = list(itertools.islice(stores, chunk_size))
+        if not chunk:
+            break
+
+        results = parallel(
+            scan_git_store_assets,
+            [(git_store_path, expected) for _, git_store_path, expected in chunk],
+            workers=workers,
+            desc='Reconcile asset files',
+        )
+
+        missing, orphaned = [], []
+        for (git_store_guid, _, _), (store_missing, store_orphaned) in zip(
+            chunk, results
+        ):
+            missing += store_missing
+            orphaned += [f'{git_store_guid}/_assets/{name}' for name in store_orphaned]
+
+        yield chunk[-1][0], len(chunk), missing, orphaned
+
+
+def find_missing_asset_files(
+    asset_guids=None, chunk_size=ASSET_RECONCILE_STORE_CHUNK_SIZE
+):
+    """
+    The guids of the assets (all, or the ``asset_guids`` query) without a file
+    """
+    missing = []
+    for _, _, chunk_missing, _ in iter_reconciled_chunks(
+        asset_guids=asset_guids, chunk_size=chunk_size
+    ):
+        missing += chunk_missing
+    return missing
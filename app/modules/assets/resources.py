@@ -9,7 +9,7 @@ import logging
 from http import HTTPStatus
 
 import werkzeug
-from flask import request, send_file
+from flask import request
 
 from app.extensions import db
 from app.extensions.api import Namespace
@@ -18,6 +18,7 @@ from app.modules.users.permissions.types import AccessOperation
 from flask_restx_patched import Resource
 
 from . import parameters, schemas
+from .delivery import send_asset_file
 from .models import Asset
 
 log = logging.getLogger(__name__)  # pylint: disable=invalid-name
@@ -177,7 +178,9 @@ class AssetSrcUByID(Resource):
         except Exception:
             logging.exception('Got exception from get_or_make_format_path()')
             raise werkzeug.exceptions.NotImplemented
-        return send_file(asset_format_path, asset.DERIVED_MIME_TYPE)
+        return send_asset_file(
+            asset_format_path, asset.DERIVED_MIME_TYPE, asset.guid, format
+        )
 
 
 @api.route('/src_raw/<uuid:asset_guid>', doc=False)
@@ -196,7 +199,7 @@ class AssetSrcRawByID(Resource):
         },
     )
     def get(self, asset):
-        return send_file(asset.get_symlink())
+        return send_asset_file(asset.get_symlink(), asset.mime_type, asset.guid, 'raw')
 
 
 @api.route('/jobs/<uuid:asset_guid>')
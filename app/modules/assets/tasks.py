@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+import logging
+
+from app.extensions.celery import celery
+
+ASSET_RECONCILE_FREQUENCY = 60 * 60 * 24
+
+
+log = logging.getLogger(__name__)
+
+
+@celery.on_after_configure.connect
+def assets_setup_periodic_tasks(sender, **kwargs):
+    if ASSET_RECONCILE_FREQUENCY is not None:
+        sender.add_periodic_task(
+            ASSET_RECONCILE_FREQUENCY,
+            reconcile_asset_files.s(),
+            name='Reconcile Asset Files',
+        )
+
+
+@celery.task
+def reconcile_asset_files():
+    from .models import AssetReconciliation
+
+    # Resumes the previous run if it was interrupted
+    reconciliation = AssetReconciliation.get_or_create()
+    if reconciliation is None:
+        log.info('Asset file reconciliation is already running')
+        return None
+    reconciliation.run()
+    return {
+        'missing': reconciliation.num_missing,
+        'orphaned': reconciliation.num_orphaned,
+    }
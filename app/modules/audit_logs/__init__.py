@@ -21,8 +21,11 @@ def init_app(app, **kwargs):
 
     # Touch underlying modules
     from . import models, resources  # NOQA
+    from .writer import audit_log_writer
 
     api_v1.add_namespace(resources.api)
 
+    audit_log_writer.init_app(app)
+
     # Register Models to use with Elasticsearch
     register_elasticsearch_model(models.AuditLog)
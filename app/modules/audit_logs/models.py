@@ -4,15 +4,21 @@ Audit Logs database models
 --------------------
 """
 
+import datetime
 import logging
 import uuid
 
+import sqlalchemy as sa
 from flask_login import current_user  # NOQA
 
 from app.extensions import HoustonModel, db
 
 log = logging.getLogger(__name__)  # pylint: disable=invalid-name
 
+# Buffered audit log records of the current session transaction, handed to the
+# audit log writer on commit
+AUDIT_LOG_RECORDS_SESSION_KEY = 'audit_log_records'
+
 
 class AuditLog(db.Model, HoustonModel):
     """
@@ -48,16 +54,12 @@ class AuditLog(db.Model, HoustonModel):
 
     @classmethod
     def query_search_term_hook(cls, term):
-        from sqlalchemy import String
-        from sqlalchemy_utils.functions import cast_if
+        from app.extensions.query_search import search_term_clauses
 
-        return (
-            cast_if(cls.guid, String).contains(term),
-            cls.module_name.contains(term),
-            cast_if(cls.item_guid, String).contains(term),
-            cls.user_email.contains(term),
-            cls.message.contains(term),
-            cls.audit_type.contains(term),
+        return search_term_clauses(
+            term,
+            guid_columns=(cls.guid, cls.item_guid),
+            text_columns=(cls.module_name, cls.user_email, cls.message, cls.audit_type),
         )
 
     @classmethod
@@ -68,8 +70,26 @@ class AuditLog(db.Model, HoustonModel):
 
     @classmethod
     def create(
-        cls, msg, audit_type, module_name=None, item_guid=None, user=None, *args, **kwargs
+        cls,
+        msg,
+        audit_type,
+        module_name=None,
+        item_guid=None,
+        user=None,
+        *args,
+        synchronous=False,
+        **kwargs,
     ):
+        """
+        Record an audit log entry.
+
+        Entries are buffered and written in batches by the audit log writer
+        once the current transaction commits, and discarded if it is rolled
+        back.  If ``synchronous`` is set (security and delete entries) or
+        buffering is disabled, the entry is added to the current session.
+        """
+        from .writer import audit_log_writer
+
         user_email = 'anonymous user'
         if user and not user.is_anonymous:
             user_email = user.email
@@ -92,21 +112,52 @@ class AuditLog(db.Model, HoustonModel):
         if module_name or item_guid:
             # Must set both of them or neither
             assert item_guid and module_name
-            log_entry = AuditLog(
-                module_name=module_name,
-                item_guid=item_guid,
-                user_email=user_email,
-                message=msg,
-                audit_type=audit_type,
-                duration=duration,
-            )
-        else:
-            log_entry = AuditLog(
-                user_email=user_email,
-                message=msg,
-                audit_type=audit_type,
-                duration=duration,
-            )
+
+        if not synchronous and audit_log_writer.enabled:
+            now = datetime.datetime.utcnow()
+            record = {
+                'guid': uuid.uuid4(),
+                'module_name': module_name,
+                'item_guid': item_guid,
+                'user_email': user_email,
+                'message': msg,
+                'audit_type': audit_type,
+                'duration': duration,
+                'created': now,
+                'updated': now,
+                'indexed': now,
+                'viewed': now,
+            }
+            session = db.session()
+            if session.transaction is not None:
+                # Only written if the transaction commits
+                session.info.setdefault(AUDIT_LOG_RECORDS_SESSION_KEY, []).append(record)
+                return
+            if audit_log_writer.enqueue(record):
+                return
+
+        log_entry = AuditLog(
+            module_name=module_name,
+            item_guid=item_guid,
+            user_email=user_email,
+            message=msg,
+            audit_type=audit_type,
+            duration=duration,
+        )
 
         with db.session.begin(subtransactions=True):
             db.session.add(log_entry)
+
+
+@sa.event.listens_for(sa.orm.Session, 'after_commit')
+def audit_log_session_after_commit(session):
+    records = session.info.pop(AUDIT_LOG_RECORDS_SESSION_KEY, None)
+    if records:
+        from .writer import audit_log_writer
+
+        audit_log_writer.enqueue_all(records)
+
+
+@sa.event.listens_for(sa.orm.Session, 'after_rollback')
+def audit_log_session_after_rollback(session):
+    session.info.pop(AUDIT_LOG_RECORDS_SESSION_KEY, None)
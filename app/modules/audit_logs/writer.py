@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+Audit Logs buffered writer
+--------------------------
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+
+log = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+
+class AuditLogWriter(object):
+    """
+    Buffers audit log records in memory and writes them to the database with
+    multi-row INSERTs from a background thread, so a request that audits many
+    objects does not pay for one INSERT per object.
+
+    The buffer holds at most ``AUDIT_LOG_BUFFER_SIZE`` records.  When it is
+    full, or buffering is disabled (a size of 0), ``enqueue()`` returns False
+    and the caller writes the record synchronously instead of dropping it.
+
+    ``AuditLog.create()`` only hands records to the writer once the session
+    commits, records of a rolled back request are discarded.  They are written
+    outside of the request transaction and picked up by the periodic
+    Elasticsearch indexing rather than indexed on commit.  Records that cannot
+    be written are logged and counted in ``lost``.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.max_size = 0
+        self.batch_size = 500
+        self.flush_interval = 1.0
+        self.buffer = None
+        self.lost = 0
+        self._pid = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.max_size = app.config.get('AUDIT_LOG_BUFFER_SIZE', 0)
+        self.batch_size = app.config.get('AUDIT_LOG_FLUSH_BATCH_SIZE', 500)
+        self.flush_interval = app.config.get('AUDIT_LOG_FLUSH_INTERVAL', 1.0)
+        if self.enabled:
+            atexit.register(self.flush)
+
+    @property
+    def enabled(self):
+        return self.app is not None and self.max_size > 0
+
+    def _ensure_started(self):
+        pid = os.getpid()
+        if self._pid == pid and self._thread is not None and self._thread.is_alive():
+            return
+
+        with self._lock:
+            if self._pid != pid:
+                # A forked worker process gets its own buffer and thread
+                self.buffer = queue.Queue(maxsize=self.max_size)
+                self._pid = pid
+                self._thread = None
+
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name='audit-log-writer',
+                    daemon=True,
+                )
+                self._thread.start()
+
+    def enqueue(self, record):
+        """
+        Buffer a record (a dict of AuditLog column values).
+
+        Returns:
+            bool - False if the record was not buffered and must be written
+            by the caller
+        """
+        if not self.enabled:
+            return False
+
+        self._ensure_started()
+        try:
+            self.buffer.put_nowait(record)
+        except queue.Full:
+            log.warning('Audit log buffer is full, writing record synchronously')
+            return False
+
+        if self.buffer.qsize() >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def _drain(self):
+        records = []
+        while len(records) < self.batch_size:
+            try:
+                records.append(self.buffer.get_nowait())
+            except queue.Empty:
+                break
+        return records
+
+    def enqueue_all(self, records):
+        """
+        Buffer records, the ones that do not fit are written straight away
+        """
+        unbuffered = [record for record in records if not self.enqueue(record)]
+        if unbuffered:
+            self._write(unbuffered)
+
+    def _insert(self, values):
+        from app.extensions import db
+
+        from .models import AuditLog
+
+        with db.engine.begin() as connection:
+            connection.execute(AuditLog.__table__.insert().values(values))
+
+    def _write(self, records):
+        """
+        Write records with one multi-row INSERT.  If that fails the records
+        are written one at a time, so one bad record does not lose the whole
+        batch.  Returns the number of records that could not be written.
+        """
+        from app.extensions import prometheus
+
+        with self.app.app_context():
+            try:
+                self._insert(records)
+                return 0
+            except Exception:
+                log.exception(
+                    f'Failed to write {len(records)} audit log records, '
+                    'writing them one at a time'
+                )
+
+            lost = 0
+            for record in records:
+                try:
+                    self._insert(record)
+                except Exception:
+                    log.exception(
+                        f"Lost audit log record {record['guid']}: {record['message']}"
+                    )
+                    lost += 1
+
+            if lost:
+                self.lost += lost
+                prometheus.update_audit_logs_lost(lost)
+        return lost
+
+    def flush(self):
+        """
+        Write every buffered record, returns the number of records written.
+        """
+        if self.buffer is None or self._pid != os.getpid():
+            return 0
+
+        total = 0
+        while True:
+            records = self._drain()
+            if len(records) == 0:
+                return total
+            self._write(records)
+            total += len(records)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:  # pragma: no cover
+                log.exception('Audit log writer flush failed')
+
+
+audit_log_writer = AuditLogWriter()
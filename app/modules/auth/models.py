@@ -11,16 +11,19 @@ More details are available here:
 """
 import datetime
 import enum
+import hashlib
 import logging
 import random
+import time
 import uuid
 
 import pytz
+import sqlalchemy as sa
 from flask import current_app
 from sqlalchemy import or_
 from sqlalchemy_utils.types import ScalarListType
 
-from app.extensions import HoustonModel, Timestamp, db
+from app.extensions import HoustonModel, Timestamp, cache, db, is_cache_shared
 from app.extensions.auth import security
 from app.modules.users.models import User
 
@@ -62,6 +65,54 @@ CODE_SETTINGS = {
     CodeTypes.onetime: {'ttl': None, 'len': 8},  # None will default to 10 minutes
 }
 
+# Access tokens are cached under the hash of the token, see OAuth2Token.find_cached
+OAUTH2_TOKEN_CACHE_KEY = 'oauth2-token-{}'
+# Time the tokens of a user were revoked, tokens cached before it are not used
+OAUTH2_USER_REVOKED_CACHE_KEY = 'oauth2-user-revoked-{}'
+OAUTH2_TOKEN_CACHE_TIMEOUT = 30
+# Cache keys and users to invalidate once the session commits
+OAUTH2_TOKEN_INVALIDATIONS_SESSION_KEY = 'oauth2_token_invalidations'
+
+# Rows deleted per transaction by the periodic clean-up of codes and tokens
+AUTH_CLEANUP_BATCH_SIZE = 1000
+# Expired tokens are kept this long so their refresh tokens can still be used
+OAUTH2_TOKEN_RETENTION_DAYS = 30
+
+
+def delete_in_batches(cls, criterion, batch_size=AUTH_CLEANUP_BATCH_SIZE):
+    """
+    Delete the rows of ``cls`` matching ``criterion``, ``batch_size`` rows per
+    transaction so the clean-up never holds locks on a large part of the
+    table.  Returns the number of rows deleted.
+    """
+    table = cls.__table__
+    total = 0
+    while True:
+        guids = [
+            guid
+            for (guid,) in db.session.execute(
+                sa.select([table.c.guid]).where(criterion).limit(batch_size)
+            )
+        ]
+        if not guids:
+            break
+        with db.session.begin(subtransactions=True):
+            # Repeat the criterion, rows may have changed since they were selected
+            result = db.session.execute(
+                table.delete().where(sa.and_(table.c.guid.in_(guids), criterion))
+            )
+        total += result.rowcount
+
+        # Deleted objects loaded in the session must not be returned by get()
+        deleted = set(guids)
+        for obj in list(db.session.identity_map.values()):
+            if isinstance(obj, cls) and obj.guid in deleted:
+                db.session.expunge(obj)
+
+        if len(guids) < batch_size:
+            break
+    return total
+
 
 class OAuth2Client(db.Model, Timestamp):
     """
@@ -213,7 +264,7 @@ class OAuth2Token(db.Model, Timestamp):
         unique=True,
         nullable=True,
     )
-    expires = db.Column(db.DateTime, nullable=False)
+    expires = db.Column(db.DateTime, index=True, nullable=False)
     scopes = db.Column(ScalarListType(separator=' '), nullable=False)
 
     @property
@@ -232,6 +283,94 @@ class OAuth2Token(db.Model, Timestamp):
 
         return response
 
+    @classmethod
+    def get_cache_key(cls, access_token):
+        # The key does not reveal the token to anything that can list the cache
+        digest = hashlib.sha256(access_token.encode('utf-8')).hexdigest()
+        return OAUTH2_TOKEN_CACHE_KEY.format(digest)
+
+    @classmethod
+    def get_cache_timeout(cls):
+        # Tokens are only cached in a cache shared by every worker, a revoked
+        # token could otherwise still be used in the workers that did not
+        # revoke it
+        if not is_cache_shared():
+            return 0
+        return current_app.config.get(
+            'OAUTH2_TOKEN_CACHE_TIMEOUT', OAUTH2_TOKEN_CACHE_TIMEOUT
+        )
+
+    @classmethod
+    def find_cached(cls, access_token=None, refresh_token=None):
+        """
+        Find a token to authenticate a request with.  Access tokens are
+        cached for a few seconds so authenticating a request normally skips
+        the token query, deleting or updating a token and revoking the tokens
+        of a user invalidate the cache once committed.
+        """
+        timeout = cls.get_cache_timeout()
+        if not access_token or refresh_token or not timeout:
+            return cls.find(access_token=access_token, refresh_token=refresh_token)
+
+        key = cls.get_cache_key(access_token)
+        data = cache.get(key)
+        if data is not None:
+            revoked = cache.get(OAUTH2_USER_REVOKED_CACHE_KEY.format(data['user_guid']))
+            if revoked is None or revoked < data['cached']:
+                return CachedOAuth2Token(
+                    data['guid'], data['user_guid'], data['scopes'], data['expires']
+                )
+            cache.delete(key)
+
+        # Taken before the query, so a revocation committed while the token is
+        # loaded still applies to it
+        now = time.time()
+        token = cls.find(access_token=access_token)
+        if token is not None:
+            data = {
+                'guid': token.guid,
+                'user_guid': token.user_guid,
+                'scopes': list(token.scopes),
+                'expires': token.expires,
+                'cached': now,
+            }
+            cache.set(key, data, timeout=timeout)
+        return token
+
+    @classmethod
+    def cleanup(cls, batch_size=AUTH_CLEANUP_BATCH_SIZE):
+        """
+        Delete tokens that expired over OAUTH2_TOKEN_RETENTION_DAYS ago.  The
+        latest token of each user is kept, as the login metrics are built
+        from it.
+        """
+        now = datetime.datetime.now(tz=pytz.utc)
+        cutoff = now - datetime.timedelta(days=OAUTH2_TOKEN_RETENTION_DAYS)
+        newer = sa.orm.aliased(cls)
+        criterion = sa.and_(
+            cls.expires < cutoff,
+            sa.exists().where(
+                sa.and_(newer.user_guid == cls.user_guid, newer.created > cls.created)
+            ),
+        )
+        deleted = delete_in_batches(cls, criterion, batch_size=batch_size)
+        log.info('Cleaning OAuth2 tokens, deleted %d' % (deleted,))
+        return deleted
+
+    @classmethod
+    def revoke_cached_user_tokens(cls, user_guid):
+        """
+        Stop using the cached tokens of a user, on lockout or password change
+        """
+        timeout = cls.get_cache_timeout()
+        if timeout:
+            # Outlives every token cached before now
+            cache.set(
+                OAUTH2_USER_REVOKED_CACHE_KEY.format(user_guid),
+                time.time(),
+                timeout=timeout,
+            )
+
     def delete(self):
         with db.session.begin():
             db.session.delete(self)
@@ -243,6 +382,40 @@ class OAuth2Token(db.Model, Timestamp):
         return expired
 
 
+class CachedOAuth2Token(object):
+    """
+    The parts of an OAuth2Token needed to authenticate a request, returned by
+    ``OAuth2Token.find_cached`` without querying the oauth2_token table.
+
+    The client is deliberately not exposed, so validating a bearer token does
+    not load it, the resources do not use the client of the request.
+    """
+
+    def __init__(self, guid, user_guid, scopes, expires):
+        self.guid = guid
+        self.user_guid = user_guid
+        self.scopes = scopes
+        self.expires = expires
+
+    def __repr__(self):
+        return (
+            '<{class_name}('
+            'guid={self.guid}, '
+            'user_guid={self.user_guid}'
+            ')>'.format(class_name=self.__class__.__name__, self=self)
+        )
+
+    @property
+    def user(self):
+        return User.query.get(self.user_guid)
+
+    @property
+    def is_expired(self):
+        now_utc = datetime.datetime.now(tz=pytz.utc)
+        expired = now_utc > self.expires.replace(tzinfo=pytz.utc)
+        return expired
+
+
 class Code(db.Model, HoustonModel):
     """
     OAuth2 Access Tokens storage model.
@@ -262,7 +435,7 @@ class Code(db.Model, HoustonModel):
     accept_code = db.Column(db.String(length=64), index=True, unique=True, nullable=False)
     reject_code = db.Column(db.String(length=64), index=True, unique=True, nullable=False)
 
-    expires = db.Column(db.DateTime, nullable=False)
+    expires = db.Column(db.DateTime, index=True, nullable=False)
     response = db.Column(db.DateTime, nullable=True)
 
     decision = db.Column(db.Enum(CodeDecisions), nullable=True)
@@ -431,15 +604,13 @@ class Code(db.Model, HoustonModel):
         return matched_codes
 
     @classmethod
-    def cleanup(cls):
-        codes = cls.query.all()
-        old_codes = [code for code in codes if code.is_expired and not code.is_resolved]
-        log.warning('Cleaning codes, deleting %d' % (len(old_codes),))
-        with db.session.begin():
-            for old_code in old_codes:
-                db.session.delete(old_code)
-
-        return None
+    def cleanup(cls, batch_size=AUTH_CLEANUP_BATCH_SIZE):
+        # Expired codes that were never resolved
+        now = datetime.datetime.now(tz=pytz.utc)
+        criterion = sa.and_(cls.expires < now, cls.response.is_(None))
+        deleted = delete_in_batches(cls, criterion, batch_size=batch_size)
+        log.warning('Cleaning codes, deleted %d' % (deleted,))
+        return deleted
 
     @classmethod
     def received(cls, code_str):
@@ -498,3 +669,64 @@ class Code(db.Model, HoustonModel):
     def delete(self):
         with db.session.begin():
             db.session.delete(self)
+
+
+def _invalidate_after_commit(target, cache_keys=(), user_guids=()):
+    session = sa.orm.object_session(target)
+    if session is None:
+        return
+    invalidations = session.info.setdefault(
+        OAUTH2_TOKEN_INVALIDATIONS_SESSION_KEY, {'cache_keys': set(), 'user_guids': set()}
+    )
+    invalidations['cache_keys'].update(cache_keys)
+    invalidations['user_guids'].update(user_guids)
+
+
+@sa.event.listens_for(OAuth2Token, 'after_update')
+@sa.event.listens_for(OAuth2Token, 'after_delete')
+def oauth2_token_changed(mapper, connection, target):
+    # Revoked and logged out tokens
+    access_tokens = {target.access_token}
+    history = sa.inspect(target).attrs.access_token.history
+    access_tokens.update(history.deleted or ())
+    _invalidate_after_commit(
+        target,
+        cache_keys=[
+            OAuth2Token.get_cache_key(access_token)
+            for access_token in access_tokens
+            if access_token
+        ],
+    )
+
+
+@sa.event.listens_for(User, 'after_update')
+def oauth2_user_changed(mapper, connection, target):
+    # Lockout, deactivation and password changes
+    state = sa.inspect(target)
+    if (
+        state.attrs.password.history.has_changes()
+        or state.attrs.static_roles.history.has_changes()
+    ):
+        _invalidate_after_commit(target, user_guids=[target.guid])
+
+
+@sa.event.listens_for(User, 'after_delete')
+def oauth2_user_deleted(mapper, connection, target):
+    # The tokens of the user are deleted by the database
+    _invalidate_after_commit(target, user_guids=[target.guid])
+
+
+@sa.event.listens_for(sa.orm.Session, 'after_commit')
+def oauth2_session_after_commit(session):
+    # Until the change is committed other requests still see the old token
+    invalidations = session.info.pop(OAUTH2_TOKEN_INVALIDATIONS_SESSION_KEY, None)
+    if invalidations:
+        for key in invalidations['cache_keys']:
+            cache.delete(key)
+        for user_guid in invalidations['user_guids']:
+            OAuth2Token.revoke_cached_user_tokens(user_guid)
+
+
+@sa.event.listens_for(sa.orm.Session, 'after_rollback')
+def oauth2_session_after_rollback(session):
+    session.info.pop(OAUTH2_TOKEN_INVALIDATIONS_SESSION_KEY, None)
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+import logging
+
+from app.extensions.celery import celery
+
+AUTH_CLEANUP_FREQUENCY = 60 * 60
+
+
+log = logging.getLogger(__name__)
+
+
+@celery.on_after_configure.connect
+def auth_setup_periodic_tasks(sender, **kwargs):
+    if AUTH_CLEANUP_FREQUENCY is not None:
+        sender.add_periodic_task(
+            AUTH_CLEANUP_FREQUENCY,
+            auth_cleanup.s(),
+            name='Clean-up Expired Codes and OAuth2 Tokens',
+        )
+
+
+@celery.task
+def auth_cleanup():
+    from app.extensions import prometheus
+
+    from .models import Code, OAuth2Token
+
+    deleted = {
+        'code': Code.cleanup(),
+        'oauth2_token': OAuth2Token.cleanup(),
+    }
+    prometheus.update_auth_cleanup(deleted)
+    return deleted
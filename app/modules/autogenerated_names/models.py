@@ -4,11 +4,14 @@ Autogeneratednames database models
 --------------------
 """
 
+import datetime
 import enum
 import logging
 import uuid
 
-from app.extensions import HoustonModel, db
+import sqlalchemy as sa
+
+from app.extensions import HoustonModel, cache, db, is_cache_shared
 from app.utils import HoustonException
 
 log = logging.getLogger(__name__)  # pylint: disable=invalid-name
@@ -17,6 +20,16 @@ AUTOGEN_NAME_PREFIX_MIN_LENGTH = 3
 AUTOGEN_NAME_PREFIX_MAX_LENGTH = 5
 AUTOGEN_NAME_CONTEXT_PREFIX = 'autogen-'
 
+# Number of individuals named by each statement of populate_all_individuals()
+AUTOGEN_NAME_POPULATE_BATCH_SIZE = 1000
+
+# Prefix, type and reference of every AutogeneratedName, so that resolving a
+# name does not query them.  Cleared once a change to one is committed.
+AUTOGEN_NAMES_CACHE_KEY = 'autogenerated-names'
+AUTOGEN_NAMES_CACHE_TIMEOUT = 60 * 5
+# Set in the session info when the cached definitions need to be cleared
+AUTOGEN_NAMES_CHANGED_SESSION_KEY = 'autogenerated_names_changed'
+
 
 class AutogeneratedNameType(str, enum.Enum):
     auto_species = 'auto_species'
@@ -81,23 +94,164 @@ class AutogeneratedName(db.Model, HoustonModel):
         else:
             raise ValueError(f'unsupported reference type {self.type}')
 
-    def get_next(self):
+    @classmethod
+    def format_value(cls, value):
+        return str(value).zfill(3)
+
+    def reserve_values(self, count=1):
+        """
+        Reserve ``count`` consecutive values and return the first one.  The
+        counter is incremented by a single UPDATE ... RETURNING, so concurrent
+        reservations never hand out the same value.
+        """
+        table = self.__table__
+        update = (
+            table.update()
+            .where(table.c.guid == self.guid)
+            .values(next_value=table.c.next_value + count)
+        )
         with db.session.begin(subtransactions=True):
-            # keep read/modify/write all within the single db.session to make it atomic WRT the DB
-            next_val = str(self.next_value).zfill(3)
-            self.next_value += 1
-            db.session.merge(self)
-        return str(next_val)
+            if db.session.get_bind().dialect.implicit_returning:
+                next_value = db.session.execute(
+                    update.returning(table.c.next_value)
+                ).scalar()
+            else:
+                db.session.execute(update)
+                next_value = db.session.execute(
+                    sa.select([table.c.next_value]).where(table.c.guid == self.guid)
+                ).scalar()
+        if next_value is None:
+            raise ValueError(f'{self} has no next_value')
+        sa.orm.attributes.set_committed_value(self, 'next_value', next_value)
+        return next_value - count
+
+    def get_next(self):
+        return self.format_value(self.reserve_values(1))
 
     # use on newly-created or newly-enabled agn
-    def populate_all_individuals(self, user):
+    def populate_all_individuals(self, user, batch_size=AUTOGEN_NAME_POPULATE_BATCH_SIZE):
+        """
+        Give a name from this AutogeneratedName to every individual of its
+        taxonomy that has none.  Each batch of individuals reserves its range
+        of values and inserts its names with one statement.  Returns the
+        number of individuals named.
+        """
         from app.modules.individuals.models import Individual
+        from app.modules.names.models import Name
 
-        indivs = Individual.query.all()
-        for indiv in indivs:
-            if not indiv.has_name_context(self.context):
-                log.debug(f'populating {self} on {indiv} with user {user}')
-                indiv.update_autogen_name(user, self)
+        if not self.enabled:
+            return 0
+        if self.type != AutogeneratedNameType.auto_species.value:
+            # future development
+            log.warning(f'skipping unsupported AutogeneratedName type={self.type}')
+            return 0
+
+        creator_guid = user.guid if hasattr(user, 'guid') else user
+        context = self.context
+        # species names from other taxonomies are not valid on these individuals
+        other_contexts = [
+            f'{AUTOGEN_NAME_CONTEXT_PREFIX}{row.guid}'
+            for row in db.session.query(AutogeneratedName.guid).filter(
+                AutogeneratedName.type == AutogeneratedNameType.auto_species,
+                AutogeneratedName.guid != self.guid,
+            )
+        ]
+        named = sa.exists().where(
+            sa.and_(Name.individual_guid == Individual.guid, Name.context == context)
+        )
+        unnamed = (
+            db.session.query(Individual.guid)
+            .filter(Individual.taxonomy_guid == self.reference_guid)
+            .filter(~named)
+            .order_by(Individual.created, Individual.guid)
+            .limit(batch_size)
+        )
+
+        total = 0
+        while True:
+            individual_guids = [row.guid for row in unnamed]
+            if not individual_guids:
+                break
+            with db.session.begin(subtransactions=True):
+                if other_contexts:
+                    stale_names = Name.query.filter(
+                        Name.individual_guid.in_(individual_guids),
+                        Name.context.in_(other_contexts),
+                    )
+                    for name in stale_names:
+                        log.debug(f'removing {name} due to {self}')
+                        name.delete()
+
+                start = self.reserve_values(len(individual_guids))
+                now = datetime.datetime.utcnow()
+                db.session.execute(
+                    Name.__table__.insert(),
+                    [
+                        {
+                            'guid': uuid.uuid4(),
+                            'created': now,
+                            'updated': now,
+                            'indexed': now,
+                            'viewed': now,
+                            'value': self.format_value(start + offset),
+                            'context': context,
+                            'individual_guid': individual_guid,
+                            'creator_guid': creator_guid,
+                        }
+                        for offset, individual_guid in enumerate(individual_guids)
+                    ],
+                )
+                # the individuals are reindexed by the next Elasticsearch refresh
+                db.session.execute(
+                    Individual.__table__.update()
+                    .where(Individual.guid.in_(individual_guids))
+                    .values(updated=now)
+                )
+            for individual_guid in individual_guids:
+                key = sa.orm.util.identity_key(Individual, individual_guid)
+                individual = db.session.identity_map.get(key)
+                if individual is not None:
+                    db.session.expire(individual, ['names', 'updated'])
+            total += len(individual_guids)
+            log.debug(f'populated {self} on {len(individual_guids)} individuals')
+
+        if total:
+            import app.extensions.logging as AuditLog  # NOQA
+
+            AuditLog.audit_log_object(
+                log, self, f'populated names on {total} individuals by {user}'
+            )
+        return total
+
+    @classmethod
+    def get_definitions(cls):
+        """
+        The prefix, type, reference and state of every AutogeneratedName,
+        keyed by guid string
+        """
+        # Only cached when every worker shares the cache and its invalidation
+        shared = is_cache_shared()
+        definitions = cache.get(AUTOGEN_NAMES_CACHE_KEY) if shared else None
+        if definitions is None:
+            rows = db.session.query(
+                cls.guid, cls.prefix, cls.type, cls.reference_guid, cls.enabled
+            )
+            definitions = {
+                str(row.guid): {
+                    'prefix': row.prefix,
+                    'type': row.type,
+                    'reference_guid': row.reference_guid,
+                    'enabled': row.enabled,
+                }
+                for row in rows
+            }
+            if shared:
+                cache.set(
+                    AUTOGEN_NAMES_CACHE_KEY,
+                    definitions,
+                    timeout=AUTOGEN_NAMES_CACHE_TIMEOUT,
+                )
+        return definitions
 
     # takes a Name and returns human-facing value
     @classmethod
@@ -105,11 +259,15 @@ class AutogeneratedName(db.Model, HoustonModel):
         agn_guid = name.autogenerated_guid
         if not agn_guid:
             return name.value  # lets be kind
-        agn = AutogeneratedName.query.get(agn_guid)
-        if not agn:
+        definition = cls.get_definitions().get(str(agn_guid))
+        if definition is None and is_cache_shared():
+            # may have been created by another process since it was cached
+            cache.delete(AUTOGEN_NAMES_CACHE_KEY)
+            definition = cls.get_definitions().get(str(agn_guid))
+        if not definition:
             log.warning(f'no matching AutogeneratedName for {name}')
             return None
-        return f'{agn.prefix}-{name.value}'
+        return f"{definition['prefix']}-{name.value}"
 
     # skip_taxonomy_check is specifically for site.species setting which needs to also set this (but taxonomies wont exist yet)
     @classmethod
@@ -344,3 +502,30 @@ class AutogeneratedName(db.Model, HoustonModel):
                     log.info(f'{name} for {agn} exceeds type count on {indiv}')
                     continue
         return bad
+
+
+@sa.event.listens_for(AutogeneratedName, 'after_insert')
+@sa.event.listens_for(AutogeneratedName, 'after_update')
+@sa.event.listens_for(AutogeneratedName, 'after_delete')
+def autogenerated_name_changed(mapper, connection, target):
+    session = sa.orm.object_session(target)
+    if session is None:
+        cache.delete(AUTOGEN_NAMES_CACHE_KEY)
+    else:
+        # Cleared once committed, so a concurrent read can not cache the
+        # definitions from before the change again
+        session.info[AUTOGEN_NAMES_CHANGED_SESSION_KEY] = True
+
+
+@sa.event.listens_for(sa.orm.Session, 'after_commit')
+def autogenerated_names_session_after_commit(session):
+    if session.info.pop(AUTOGEN_NAMES_CHANGED_SESSION_KEY, False):
+        try:
+            cache.delete(AUTOGEN_NAMES_CACHE_KEY)
+        except Exception:  # pragma: no cover
+            log.exception('Failed to clear the cached autogenerated names')
+
+
+@sa.event.listens_for(sa.orm.Session, 'after_rollback')
+def autogenerated_names_session_after_rollback(session):
+    session.info.pop(AUTOGEN_NAMES_CHANGED_SESSION_KEY, None)
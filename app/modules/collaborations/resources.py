@@ -231,7 +231,9 @@ class CollaborationByID(Resource):
             except HoustonException as ex:
                 abort(ex.status_code, ex.message)
 
-        AuditLog.patch_object(log, collaboration, args, duration=timer.elapsed())
+        AuditLog.patch_object(
+            log, collaboration, args, duration=timer.elapsed(), synchronous=True
+        )
         return collaboration
 
     @api.permission_required(
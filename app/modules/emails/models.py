@@ -3,6 +3,7 @@ import datetime
 import enum
 import logging
 import pprint
+import smtplib
 import uuid
 
 from flask import current_app, request
@@ -43,6 +44,167 @@ class EmailRecord(db.Model, HoustonModel):
         return BaseEmailRecordSchema
 
 
+class OutgoingEmailStatus(str, enum.Enum):
+    pending = 'pending'
+    sent = 'sent'
+    failed = 'failed'
+
+
+class OutgoingEmail(db.Model, HoustonModel):
+    """
+    A rendered email waiting in the outbox.
+
+    Emails queued with ``Email.queue()`` are stored here and delivered in
+    batches by the ``send_outgoing_emails`` Celery task, so a request does not
+    wait on the SMTP server.  A failed delivery is retried with exponential
+    backoff until ``MAX_ATTEMPTS`` is reached.
+    """
+
+    MAX_ATTEMPTS = 5
+    RETRY_DELAY = datetime.timedelta(minutes=1)
+    BATCH_SIZE = 100
+
+    guid = db.Column(
+        db.GUID, default=uuid.uuid4, primary_key=True
+    )  # pylint: disable=invalid-name
+
+    sender = db.Column(db.String, nullable=True)
+    recipients = db.Column(db.JSON, nullable=False)
+    subject = db.Column(db.String, nullable=True)
+    body = db.Column(db.String, nullable=True)
+    html = db.Column(db.String, nullable=True)
+    extra_headers = db.Column(db.JSON, nullable=True)
+    email_type = db.Column(db.Enum(EmailTypes), nullable=True)
+
+    status = db.Column(
+        db.Enum(OutgoingEmailStatus),
+        default=OutgoingEmailStatus.pending,
+        index=True,
+        nullable=False,
+    )
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    next_attempt = db.Column(
+        db.DateTime, default=datetime.datetime.utcnow, index=True, nullable=False
+    )
+    last_error = db.Column(db.String, nullable=True)
+
+    def __repr__(self):
+        return (
+            '<{class_name}('
+            'guid={self.guid}, '
+            'status={self.status}, '
+            'attempts={self.attempts}'
+            ')>'.format(class_name=self.__class__.__name__, self=self)
+        )
+
+    @classmethod
+    def create_from_message(cls, message):
+        outgoing = cls(
+            sender=message.sender,
+            recipients=list(message.recipients),
+            subject=message.subject,
+            body=message.body,
+            html=message.html,
+            extra_headers=message.extra_headers,
+            email_type=getattr(message, 'email_type', None),
+        )
+        with db.session.begin(subtransactions=True):
+            db.session.add(outgoing)
+        return outgoing
+
+    def to_message(self):
+        from flask_mail import Message
+
+        return Message(
+            subject=self.subject,
+            recipients=self.recipients,
+            body=self.body,
+            html=self.html,
+            sender=self.sender,
+            extra_headers=self.extra_headers,
+        )
+
+    def _sent(self):
+        self.status = OutgoingEmailStatus.sent
+        self.attempts += 1
+        self.last_error = None
+        if self.email_type is not None:
+            for recipient in self.recipients:
+                db.session.add(
+                    EmailRecord(recipient=recipient, email_type=self.email_type)
+                )
+
+    def _failed(self, error, now, count_attempt=True):
+        if count_attempt:
+            self.attempts += 1
+        self.last_error = str(error)
+        if self.attempts >= self.MAX_ATTEMPTS:
+            self.status = OutgoingEmailStatus.failed
+            log.error(f'Giving up on {self}: {error}')
+        else:
+            self.next_attempt = now + self.RETRY_DELAY * 2 ** max(self.attempts - 1, 0)
+            log.warning(f'Failed to deliver {self}, will retry: {error}')
+
+    @classmethod
+    def deliver_pending(cls, limit=BATCH_SIZE, guids=None):
+        """
+        Deliver up to ``limit`` due emails over a single SMTP connection.
+
+        Rows are locked with ``SKIP LOCKED`` so several workers can empty the
+        outbox at the same time.  Returns the number of emails sent.
+        """
+        from app.extensions.email import _validate_settings, mail
+
+        now = datetime.datetime.utcnow()
+        sent = 0
+        with db.session.begin(subtransactions=True):
+            query = cls.query.filter(
+                cls.status == OutgoingEmailStatus.pending,
+                cls.next_attempt <= now,
+            )
+            if guids is not None:
+                query = query.filter(cls.guid.in_(guids))
+            outgoing_emails = (
+                query.order_by(cls.next_attempt)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            if len(outgoing_emails) == 0:
+                return 0
+
+            if not _validate_settings():
+                for outgoing in outgoing_emails:
+                    outgoing._failed('Codex email not properly configured', now)
+                return 0
+
+            # this initializes based on new MAIL_ values from _validate_settings
+            mail.init_app(current_app)
+
+            remaining = list(outgoing_emails)
+            try:
+                with mail.connect() as connection:
+                    while remaining:
+                        outgoing = remaining[0]
+                        try:
+                            connection.send(outgoing.to_message())
+                        except smtplib.SMTPServerDisconnected:
+                            raise
+                        except Exception as ex:
+                            outgoing._failed(ex, now)
+                        else:
+                            outgoing._sent()
+                            sent += 1
+                        remaining.pop(0)
+            except Exception as ex:
+                # The connection could not be opened or was dropped, try the
+                # rest of the batch again later
+                for index, outgoing in enumerate(remaining):
+                    outgoing._failed(ex, now, count_attempt=index == 0)
+
+        return sent
+
+
 class RecordedEmail(Email):
     def __init__(self, *args, **kwargs):
         self.email_type = None
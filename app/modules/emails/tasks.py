@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+import logging
+
+from app.extensions.celery import celery
+
+OUTGOING_EMAIL_FREQUENCY = 10
+
+
+log = logging.getLogger(__name__)
+
+
+@celery.on_after_configure.connect
+def emails_setup_periodic_tasks(sender, **kwargs):
+    if OUTGOING_EMAIL_FREQUENCY is not None:
+        sender.add_periodic_task(
+            OUTGOING_EMAIL_FREQUENCY,
+            send_outgoing_emails.s(),
+            name='Send Outgoing Emails',
+        )
+
+
+@celery.task
+def send_outgoing_emails():
+    from app.modules.emails.models import OutgoingEmail
+
+    total = 0
+    while True:
+        sent = OutgoingEmail.deliver_pending()
+        total += sent
+        if sent < OutgoingEmail.BATCH_SIZE:
+            break
+    if total:
+        log.info(f'Sent {total} outgoing emails')
+    return total
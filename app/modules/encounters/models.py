@@ -121,6 +121,9 @@ class Encounter(db.Model, HoustonModel, CustomFieldMixin, ExportMixin):
         data['taxonomy'] = tx.scientificName if tx else None
         return data
 
+    def get_export_related(self):
+        return [self.sighting, self.individual]
+
     @classmethod
     def get_elasticsearch_schema(cls):
         from app.modules.encounters.schemas import ElasticsearchEncounterSchema
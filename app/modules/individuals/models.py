@@ -5,9 +5,11 @@ Individuals database models
 """
 
 import datetime
+import itertools
 import logging
 import uuid
 
+import sqlalchemy as sa
 from flask import current_app, url_for
 
 import app.extensions.logging as AuditLog
@@ -17,6 +19,20 @@ from app.utils import HoustonException
 
 log = logging.getLogger(__name__)  # pylint: disable=invalid-name
 
+# Individual summary columns maintained by Individual.refresh_summaries()
+INDIVIDUAL_SUMMARY_ATTRIBUTES = (
+    'last_seen',
+    'last_seen_specificity',
+    'last_seen_time_guid',
+    'last_seen_time',
+    'encounter_count',
+    'sighting_count',
+    'annotation_count',
+    'resolved_featured_asset_guid',
+)
+
+INDIVIDUAL_SUMMARY_CHUNK_SIZE = 1000
+
 
 class IndividualMergeRequestVote(db.Model):
     """
@@ -105,6 +121,145 @@ class IndividualMergeRequestVote(db.Model):
                 db.session.merge(notification)
 
 
+class IndividualMergeRequestStakeholder(db.Model):
+    request_guid = db.Column(
+        db.GUID, db.ForeignKey('individual_merge_request.guid'), primary_key=True
+    )
+    user_guid = db.Column(
+        db.GUID, db.ForeignKey('user.guid'), index=True, primary_key=True
+    )
+    user = db.relationship('User', foreign_keys=[user_guid])
+
+
+class IndividualMergeRequest(db.Model, HoustonModel):
+    """
+    A pending or finished merge request.
+
+    The guid is also the id of the ``execute_merge_request`` Celery task that
+    runs the merge at the deadline, so requests can be listed and looked up
+    without asking the workers what they have scheduled.
+    """
+
+    TASK_NAME = 'app.modules.individuals.tasks.execute_merge_request'
+
+    STATES = ('pending', 'completed', 'blocked', 'cancelled', 'failed', 'expired')
+
+    guid = db.Column(
+        db.GUID, default=uuid.uuid4, primary_key=True
+    )  # pylint: disable=invalid-name
+
+    requester_guid = db.Column(
+        db.GUID, db.ForeignKey('user.guid'), index=True, nullable=True
+    )
+    requester = db.relationship('User', foreign_keys=[requester_guid])
+
+    # Individuals are deleted by the merge, so these are not foreign keys
+    target_individual_guid = db.Column(db.GUID, index=True, nullable=False)
+    from_individual_guids = db.Column(db.JSON, nullable=False)
+    parameters = db.Column(db.JSON, nullable=True)
+
+    deadline = db.Column(db.DateTime, index=True, nullable=False)
+    state = db.Column(db.String(length=16), index=True, default='pending', nullable=False)
+
+    stakeholders = db.relationship(
+        'IndividualMergeRequestStakeholder',
+        cascade='delete, delete-orphan',
+    )
+
+    def __repr__(self):
+        return (
+            '<{class_name}('
+            'guid={self.guid}, '
+            'target={self.target_individual_guid}, '
+            'state={self.state}, '
+            'deadline={self.deadline}'
+            ')>'.format(class_name=self.__class__.__name__, self=self)
+        )
+
+    @classmethod
+    def get_pending(cls, request_id):
+        try:
+            request_guid = uuid.UUID(str(request_id))
+        except ValueError:
+            return None
+        return cls.query.filter_by(guid=request_guid, state='pending').first()
+
+    @classmethod
+    def get_pending_for_user(cls, user):
+        return (
+            cls.query.join(IndividualMergeRequestStakeholder)
+            .filter(IndividualMergeRequestStakeholder.user_guid == user.guid)
+            .filter(cls.state == 'pending')
+            .order_by(cls.deadline)
+            .all()
+        )
+
+    def get_stakeholder_guids(self):
+        return [stakeholder.user_guid for stakeholder in self.stakeholders]
+
+    def get_task_args(self):
+        return [
+            str(self.target_individual_guid),
+            list(self.from_individual_guids),
+            self.parameters or {},
+        ]
+
+    def get_task_data(self):
+        """
+        The request in the shape of a scheduled task as reported by
+        ``celery inspect``, which is what the API has always returned
+        """
+        eta = self.deadline.replace(tzinfo=datetime.timezone.utc)
+        return {
+            'eta': eta.isoformat(),
+            'request': {
+                'id': str(self.guid),
+                'name': self.TASK_NAME,
+                'type': self.TASK_NAME,
+                'args': self.get_task_args(),
+                'kwargs': {},
+            },
+        }
+
+    def delete(self):
+        with db.session.begin(subtransactions=True):
+            db.session.delete(self)
+
+    def set_state(self, state):
+        assert state in self.STATES
+        with db.session.begin(subtransactions=True):
+            self.state = state
+            db.session.merge(self)
+
+    @classmethod
+    def reconcile(cls, grace=datetime.timedelta(hours=1)):
+        """
+        Mark pending requests whose task is no longer known to Celery, long
+        after their deadline, as expired (e.g. the broker lost the task).
+        Returns the number of requests that were expired.
+        """
+        from app.utils import get_celery_data
+
+        overdue = cls.query.filter(
+            cls.state == 'pending',
+            cls.deadline < datetime.datetime.utcnow() - grace,
+        ).all()
+        expired = 0
+        for merge_request in overdue:
+            try:
+                async_res, data = get_celery_data(str(merge_request.guid))
+            except NotImplementedError:
+                log.warning('Unable to reconcile merge requests, no celery workers')
+                break
+            if data and 'revoked' in data:
+                merge_request.set_state('cancelled')
+            elif not async_res:
+                log.warning(f'{merge_request} has no celery task, expiring it')
+                merge_request.set_state('expired')
+                expired += 1
+        return expired
+
+
 class Individual(db.Model, HoustonModel, CustomFieldMixin, ExportMixin):
     """
     Individuals database model.
@@ -120,6 +275,21 @@ class Individual(db.Model, HoustonModel, CustomFieldMixin, ExportMixin):
         'Encounter', back_populates='individual', order_by='Encounter.guid'
     )
 
+    # Summary of the encounters, kept up to date when encounters or annotations are
+    # attached, detached or re-timed.  None until the individual is summarized
+    last_seen = db.Column(db.DateTime, index=True, default=None, nullable=True)
+    last_seen_specificity = db.Column(db.String(length=16), default=None, nullable=True)
+    last_seen_time_guid = db.Column(db.GUID, default=None, nullable=True)
+    last_seen_time = db.relationship(
+        'ComplexDateTime',
+        primaryjoin='foreign(Individual.last_seen_time_guid) == ComplexDateTime.guid',
+        viewonly=True,
+    )
+    encounter_count = db.Column(db.Integer, default=None, nullable=True)
+    sighting_count = db.Column(db.Integer, default=None, nullable=True)
+    annotation_count = db.Column(db.Integer, default=None, nullable=True)
+    resolved_featured_asset_guid = db.Column(db.GUID, default=None, nullable=True)
+
     names = db.relationship('Name', back_populates='individual', order_by='Name.created')
 
     comments = db.Column(db.String(), nullable=True)
@@ -229,13 +399,20 @@ class Individual(db.Model, HoustonModel, CustomFieldMixin, ExportMixin):
         )
 
     @classmethod
-    def run_integrity(cls):
+    def run_integrity(cls, since=None):
+        """
+        Check individuals, or only those updated since ``since``.
+        """
         result = {'no_encounters': []}
 
+        query = db.session.query(Individual.guid)
+        if since is not None:
+            query = query.filter(Individual.updated >= since)
+
         # Individuals without encounters are an error that should never really happen
-        no_encounters = Individual.query.filter(~Individual.encounters.any()).all()
-        if no_encounters:
-            result['no_encounters'] = [ind.guid for ind in no_encounters]
+        result['no_encounters'] = [
+            guid for (guid,) in query.filter(~Individual.encounters.any())
+        ]
 
         return result
 
@@ -361,7 +538,12 @@ class Individual(db.Model, HoustonModel, CustomFieldMixin, ExportMixin):
     def get_encounter_guids(self):
         return [encounter.guid for encounter in self.encounters]
 
+    def is_summarized(self):
+        return self.encounter_count is not None
+
     def num_encounters(self):
+        if self.is_summarized():
+            return self.encounter_count
         return len(self.encounters)
 
     def add_encounters(self, encounters):
@@ -420,6 +602,8 @@ class Individual(db.Model, HoustonModel, CustomFieldMixin, ExportMixin):
         return mrs.get_location_id_value() if mrs else None
 
     def get_number_sightings(self):
+        if self.is_summarized():
+            return self.sighting_count
         return len(self.get_sightings())
 
     def get_owners(self):
@@ -548,6 +732,8 @@ class Individual(db.Model, HoustonModel, CustomFieldMixin, ExportMixin):
         self.add_name(agn.context, new_name, user)
 
     def get_featured_asset_guid(self):
+        if self.is_summarized():
+            return self.resolved_featured_asset_guid
         rt_val = None
         if self.featured_asset_guid is not None:
             if self._ensure_asset_individual_association(self.featured_asset_guid):
@@ -563,6 +749,8 @@ class Individual(db.Model, HoustonModel, CustomFieldMixin, ExportMixin):
         return rt_val
 
     def get_last_seen_time(self):
+        if self.is_summarized():
+            return self.last_seen_time
         last_enc = None
         for enc in self.encounters:
             if last_enc:
@@ -583,10 +771,17 @@ class Individual(db.Model, HoustonModel, CustomFieldMixin, ExportMixin):
         return lstime.isoformat_in_timezone() if lstime else None
 
     def get_last_seen_time_specificity(self):
+        if self.is_summarized():
+            from app.modules.complex_date_time.models import Specificities
+
+            specificity = self.last_seen_specificity
+            return Specificities(specificity) if specificity else None
         lstime = self.get_last_seen_time()
         return lstime.specificity if lstime else None
 
     def has_annotations(self):
+        if self.is_summarized():
+            return self.annotation_count > 0
         for enc in self.encounters:
             if enc.annotations and len(enc.annotations) > 0:
                 return True
@@ -676,6 +871,7 @@ class Individual(db.Model, HoustonModel, CustomFieldMixin, ExportMixin):
     def set_featured_asset_guid(self, asset_guid):
         if self._ensure_asset_individual_association(asset_guid):
             self.featured_asset_guid = asset_guid
+            self.resolved_featured_asset_guid = asset_guid
             return True
         else:
             return False
@@ -692,6 +888,116 @@ class Individual(db.Model, HoustonModel, CustomFieldMixin, ExportMixin):
                     rt_val = True
         return rt_val
 
+    @classmethod
+    def get_summary_update(cls, criterion):
+        """
+        An UPDATE statement recomputing the summary columns of the individuals
+        selected by ``criterion`` from their encounters and annotations
+        """
+        from app.modules.annotations.models import Annotation
+        from app.modules.complex_date_time.models import ComplexDateTime
+        from app.modules.encounters.models import Encounter
+        from app.modules.sightings.models import Sighting
+
+        individual = cls.__table__
+        encounter = Encounter.__table__
+        annotation = Annotation.__table__
+        sighting = Sighting.__table__
+        cdt = ComplexDateTime.__table__
+
+        owned = encounter.c.individual_guid == individual.c.guid
+
+        # encounters fall back to the time of their sighting
+        encounter_times = encounter.outerjoin(
+            sighting, encounter.c.sighting_guid == sighting.c.guid
+        ).join(
+            cdt,
+            cdt.c.guid == sa.func.coalesce(encounter.c.time_guid, sighting.c.time_guid),
+        )
+
+        def last_seen(column):
+            return (
+                sa.select([column])
+                .select_from(encounter_times)
+                .where(owned)
+                .order_by(cdt.c.datetime.desc(), cdt.c.guid)
+                .limit(1)
+                .as_scalar()
+            )
+
+        encounter_annotations = annotation.join(
+            encounter, annotation.c.encounter_guid == encounter.c.guid
+        )
+        default_featured_asset_guid = (
+            sa.select([annotation.c.asset_guid])
+            .select_from(encounter_annotations)
+            .where(owned)
+            .order_by(encounter.c.guid, annotation.c.guid)
+            .limit(1)
+            .as_scalar()
+        )
+        featured_asset_is_associated = sa.exists(
+            sa.select([annotation.c.guid])
+            .select_from(encounter_annotations)
+            .where(
+                sa.and_(
+                    owned, annotation.c.asset_guid == individual.c.featured_asset_guid
+                )
+            )
+        )
+
+        def count(column, from_obj):
+            return sa.select([column]).select_from(from_obj).where(owned).as_scalar()
+
+        return (
+            individual.update()
+            .where(criterion)
+            .values(
+                last_seen=last_seen(cdt.c.datetime),
+                last_seen_specificity=last_seen(sa.cast(cdt.c.specificity, sa.String)),
+                last_seen_time_guid=last_seen(cdt.c.guid),
+                encounter_count=count(sa.func.count(encounter.c.guid), encounter),
+                sighting_count=count(
+                    sa.func.count(sa.distinct(encounter.c.sighting_guid)), encounter
+                ),
+                annotation_count=count(
+                    sa.func.count(annotation.c.guid), encounter_annotations
+                ),
+                resolved_featured_asset_guid=sa.case(
+                    [
+                        (
+                            individual.c.featured_asset_guid.is_(None),
+                            default_featured_asset_guid,
+                        ),
+                        (featured_asset_is_associated, individual.c.featured_asset_guid),
+                    ],
+                    else_=sa.null(),
+                ),
+                # the encounters are part of the indexed individual
+                updated=datetime.datetime.utcnow(),
+            )
+        )
+
+    @classmethod
+    def refresh_summaries(cls, guids=None, chunk_size=INDIVIDUAL_SUMMARY_CHUNK_SIZE):
+        """
+        Recompute the summary columns of the given individuals, or of all of
+        them.  Returns the number of individuals summarized.
+        """
+        if guids is None:
+            guids = [row.guid for row in db.session.query(cls.guid)]
+        guids = list(guids)
+
+        for index in range(0, len(guids), chunk_size):
+            chunk = guids[index : index + chunk_size]
+            with db.session.begin(subtransactions=True):
+                db.session.execute(cls.get_summary_update(cls.guid.in_(chunk)))
+            _expire_individual_summaries(db.session, chunk)
+        return len(guids)
+
+    def refresh_summary(self):
+        self.refresh_summaries([self.guid])
+
     # note: since encounters are only re-assigned, no cascade problems happen around merging
     def merge_from(self, *source_individuals, parameters=None):
         if (
@@ -733,31 +1039,25 @@ class Individual(db.Model, HoustonModel, CustomFieldMixin, ExportMixin):
         Taxonomy(self.taxonomy_guid)  # will raise ValueError if bad
         rtn['targetTaxonomyGuid'] = self.taxonomy_guid
 
-        # notably, self.taxonomy_guid has already been set (as merge_names() uses it)
-        self.merge_names(
-            source_individuals,
-            parameters
-            and parameters.get('override')
-            and parameters['override'].get('name_context'),
-        )
-        # now we steal their encounters and delete them
-        # NOTE:  technically we could iterate over the enc ids in merged.merged_id array, but we run (tiny) risk of this individual
-        #   getting assigned to additional encounters in the interim, so instead we just steal all the encounters directly
-        for indiv in source_individuals:
-            rtn['merged'][
-                str(indiv.guid)
-            ] = []  # list of encounters that were moved from this source_indiv
-            for enc in indiv.encounters:
-                AuditLog.audit_log_object(
-                    log, indiv, f'merge assigning our {enc} to {self}'
-                )
-                AuditLog.audit_log_object(
-                    log, self, f'assigned {enc} from merged {indiv}'
-                )
-                enc.individual_guid = self.guid
-                rtn['merged'][str(indiv.guid)].append(str(enc.guid))
-            self._consolidate_social_groups(indiv)
-            indiv.delete()
+        # the whole merge is one transaction, so the affected objects are
+        #   reindexed in a single bulk operation when it ends
+        with db.session.begin(subtransactions=True):
+            # overrides must reach the db, as merge_names() refreshes self
+            db.session.flush()
+            # notably, self.taxonomy_guid has already been set (as merge_names() uses it)
+            self.merge_names(
+                source_individuals,
+                parameters
+                and parameters.get('override')
+                and parameters['override'].get('name_context'),
+            )
+            # now we steal their encounters and delete them
+            # NOTE:  technically we could iterate over the enc ids in merged.merged_id array, but we run (tiny) risk of this individual
+            #   getting assigned to additional encounters in the interim, so instead we just steal all the encounters directly
+            rtn['merged'] = self._merge_encounters(source_individuals)
+            for indiv in source_individuals:
+                self._consolidate_social_groups(indiv)
+                indiv.delete()
         AuditLog.audit_log_object(
             log,
             self,
@@ -765,6 +1065,69 @@ class Individual(db.Model, HoustonModel, CustomFieldMixin, ExportMixin):
         )
         return rtn
 
+    def _merge_encounters(self, source_individuals):
+        """
+        Reassign all encounters of ``source_individuals`` to self with a single
+        UPDATE, and queue the affected encounters, sightings and annotations
+        to be reindexed.  Returns the moved encounter guids of each source.
+        """
+        from app.modules.annotations.models import Annotation
+        from app.modules.encounters.models import Encounter
+        from app.modules.sightings.models import Sighting
+
+        source_guids = [indiv.guid for indiv in source_individuals]
+        merged = {str(guid): [] for guid in source_guids}
+        moved = (
+            db.session.query(Encounter.guid, Encounter.individual_guid)
+            .filter(Encounter.individual_guid.in_(source_guids))
+            .order_by(Encounter.guid)
+            .all()
+        )
+        for encounter_guid, individual_guid in moved:
+            merged[str(individual_guid)].append(str(encounter_guid))
+        for indiv in source_individuals:
+            num_encounters = len(merged[str(indiv.guid)])
+            AuditLog.audit_log_object(
+                log, indiv, f'merge assigning our {num_encounters} encounters to {self}'
+            )
+            AuditLog.audit_log_object(
+                log, self, f'assigned {num_encounters} encounters from merged {indiv}'
+            )
+
+        encounter_guids = [encounter_guid for encounter_guid, _ in moved]
+        now = datetime.datetime.utcnow()
+        with db.session.begin(subtransactions=True):
+            Encounter.query.filter(Encounter.guid.in_(encounter_guids)).update(
+                {Encounter.individual_guid: self.guid, Encounter.updated: now},
+                synchronize_session=False,
+            )
+        Individual.refresh_summaries([self.guid])
+
+        # the loaded encounter collections and parents no longer match the db; the
+        #   sources must be expired before being deleted, or deleting them would
+        #   detach the encounters they held
+        for indiv in (self,) + tuple(source_individuals):
+            db.session.expire(indiv, ['encounters'])
+        for encounter_guid in encounter_guids:
+            key = sa.orm.util.identity_key(Encounter, encounter_guid)
+            encounter = db.session.identity_map.get(key)
+            if encounter is not None:
+                db.session.expire(encounter, ['individual', 'individual_guid', 'updated'])
+
+        if encounter_guids:
+            encounters = Encounter.query.filter(Encounter.guid.in_(encounter_guids))
+            sighting_guids = sa.select([Encounter.sighting_guid]).where(
+                Encounter.guid.in_(encounter_guids)
+            )
+            sightings = Sighting.query.filter(Sighting.guid.in_(sighting_guids))
+            annotations = Annotation.query.filter(
+                Annotation.encounter_guid.in_(encounter_guids)
+            )
+            for obj in itertools.chain(encounters, sightings, annotations):
+                obj.index()
+        self.index()
+        return merged
+
     # mimics individual.merge_from(), but does not immediately executes; rather waits for approval
     #   and initiates a request including time-out etc
     # - really likely only useful via api endpoint (based on permissions); not direct call
@@ -788,12 +1151,7 @@ class Individual(db.Model, HoustonModel, CustomFieldMixin, ExportMixin):
         stakeholders = cls.get_merge_request_stakeholders(individuals)
 
         # Build up dict of which individuals each user is a stakeholder for
-        owner_individuals = {}
-        for indiv in individuals:
-            for enc in indiv.encounters:
-                if enc.owner not in owner_individuals:
-                    owner_individuals[enc.owner] = []
-                owner_individuals[enc.owner].append(indiv)
+        owner_individuals = cls.get_owner_individuals(individuals)
         log.debug(
             f'merge_notify() type={notif_type} created owners structure {owner_individuals}'
         )
@@ -809,7 +1167,7 @@ class Individual(db.Model, HoustonModel, CustomFieldMixin, ExportMixin):
             Individual._merge_notify_user(
                 current_user,
                 stakeholder,
-                owner_individuals[stakeholder],
+                owner_individuals[stakeholder.guid],
                 individuals,
                 request_data,
                 notif_type,
@@ -833,13 +1191,16 @@ class Individual(db.Model, HoustonModel, CustomFieldMixin, ExportMixin):
         AuditLog.audit_log_object(log, user, log_msg)
 
     @classmethod
-    def merge_request_cancel_task(cls, req_id):
-        current_app.celery.control.revoke(req_id)
-        Individual.merge_request_cleanup(req_id)
+    def merge_request_cancel_task(cls, req_id, state='cancelled'):
+        current_app.celery.control.revoke(str(req_id))
+        Individual.merge_request_cleanup(req_id, state)
 
     # scrubs notifications etc, once a merge has completed
     @classmethod
-    def merge_request_cleanup(cls, req_id):
+    def merge_request_cleanup(cls, req_id, state='completed'):
+        merge_request = IndividualMergeRequest.get_pending(req_id)
+        if merge_request:
+            merge_request.set_state(state)
         IndividualMergeRequestVote.resolve_sent_notifications(req_id)
         log.debug(
             f'[{req_id}] merge_request_cleanup (notifications, etc) not yet fully implemented'
@@ -855,12 +1216,20 @@ class Individual(db.Model, HoustonModel, CustomFieldMixin, ExportMixin):
         log.info(
             f'{log_id} initiated for Individual {target_individual_guid} (from {from_individual_ids}; {parameters})'
         )
+        merge_request = IndividualMergeRequest.query.get(cel_task.request.id)
+        if merge_request and merge_request.state != 'pending':
+            # Blocked or decided by a vote, and the revoke did not reach the worker
+            log.info(f'{log_id} skipped, merge request is {merge_request.state}')
+            return
+
         all_individuals = Individual.validate_merge_request(
             target_individual_guid, from_individual_ids, parameters
         )
         if not all_individuals:
             msg = f'{log_id} failed validation'
             AuditLog.houston_fault(log, msg)
+            if merge_request:
+                merge_request.set_state('failed')
             return
 
         # validate_merge_request should check hashes etc and means we are good to merge
@@ -872,9 +1241,13 @@ class Individual(db.Model, HoustonModel, CustomFieldMixin, ExportMixin):
         if not isinstance(res, dict):
             msg = f'{log_id} (via celery task) merge_from failed: {res}'
             AuditLog.houston_fault(log, msg)
+            if merge_request:
+                merge_request.set_state('failed')
             return
 
         log.info(f'{log_id} merge completed, results={res}')
+        if merge_request:
+            merge_request.set_state('completed')
 
         # notify users that merge has happened
         #   NOTE request_data here may need some altering depending on what final templates look like
@@ -1095,6 +1468,8 @@ class Individual(db.Model, HoustonModel, CustomFieldMixin, ExportMixin):
     # does the actual work of setting up celery task to execute this merge
     # NOTE: this does not do any notification of users; see merge_request_from()
     def _merge_request_init(self, individuals, parameters=None):
+        from flask_login import current_user
+
         from app.modules.individuals.tasks import execute_merge_request
         from app.modules.site_settings.models import Taxonomy
 
@@ -1132,7 +1507,33 @@ class Individual(db.Model, HoustonModel, CustomFieldMixin, ExportMixin):
         stakeholders = Individual.get_merge_request_stakeholders([self] + individuals)
         parameters['stakeholder_guids'] = [str(u.guid) for u in stakeholders]
         args = (str(self.guid), individual_guids, parameters)
-        async_res = execute_merge_request.apply_async(args, eta=deadline)
+
+        requester = (
+            current_user if current_user and not current_user.is_anonymous else None
+        )
+        merge_request = IndividualMergeRequest(
+            requester_guid=requester.guid if requester else None,
+            target_individual_guid=self.guid,
+            from_individual_guids=individual_guids,
+            parameters=parameters,
+            deadline=deadline,
+        )
+        for user in stakeholders:
+            merge_request.stakeholders.append(
+                IndividualMergeRequestStakeholder(user_guid=user.guid)
+            )
+        with db.session.begin(subtransactions=True):
+            db.session.add(merge_request)
+
+        try:
+            # The request guid is the task id, so both can be looked up by one id
+            async_res = execute_merge_request.apply_async(
+                args, eta=deadline, task_id=str(merge_request.guid)
+            )
+        except Exception:
+            with db.session.begin(subtransactions=True):
+                db.session.delete(merge_request)
+            raise
         AuditLog.audit_log_object(
             log,
             self,
@@ -1147,35 +1548,47 @@ class Individual(db.Model, HoustonModel, CustomFieldMixin, ExportMixin):
 
     @classmethod
     def get_merge_request_data(cls, task_id):
-        from app.utils import get_celery_data
-
-        async_res, data = get_celery_data(task_id)
-        if data and 'revoked' in data:
-            log.info(f'get_merge_request_data(): id={task_id} has been revoked')
-            return None
-        if not async_res or not data:
-            log.debug(f'get_merge_request_data(): id={task_id} unknown')
-            return None
-        if (
-            'request' not in data
-            or data['request'].get('name')
-            != 'app.modules.individuals.tasks.execute_merge_request'
-        ):
-            log.warning(
-                f'get_merge_request_data(): id={task_id} invalid name/data: {data}'
-            )
+        merge_request = IndividualMergeRequest.get_pending(task_id)
+        if not merge_request:
+            log.debug(f'get_merge_request_data(): id={task_id} unknown or not pending')
             return None
-        return data
+        return merge_request.get_task_data()
 
     @classmethod
     def get_merge_request_stakeholders(cls, individuals):
-        users = set()
+        from app.modules.encounters.models import Encounter
+        from app.modules.users.models import User
+
+        individual_guids = [indiv.guid for indiv in individuals]
+        internal = User.static_roles.op('&')(User.StaticRoles.INTERNAL.mask)
+        query = (
+            User.query.join(Encounter, Encounter.owner_guid == User.guid)
+            .filter(Encounter.individual_guid.in_(individual_guids))
+            .filter(internal == 0)
+            .distinct()
+        )
+        return set(query)
+
+    @classmethod
+    def get_owner_individuals(cls, individuals):
+        """
+        Map the guids of the owners of encounters of ``individuals`` to the
+        individuals they own encounters of, in the order given
+        """
+        from app.modules.encounters.models import Encounter
+
+        by_guid = {indiv.guid: indiv for indiv in individuals}
+        pairs = set(
+            db.session.query(Encounter.owner_guid, Encounter.individual_guid).filter(
+                Encounter.individual_guid.in_(list(by_guid))
+            )
+        )
+        owner_individuals = {}
         for indiv in individuals:
-            for enc in indiv.encounters:
-                enc_owner = enc.get_owner()
-                if enc_owner and not enc_owner.is_internal:
-                    users.add(enc_owner)
-        return users
+            for owner_guid, individual_guid in pairs:
+                if individual_guid == indiv.guid:
+                    owner_individuals.setdefault(owner_guid, []).append(indiv)
+        return owner_individuals
 
     # likely will evolve to include other reasons to not be allowed to merge (changes since request etc)
     @classmethod
@@ -1223,32 +1636,15 @@ class Individual(db.Model, HoustonModel, CustomFieldMixin, ExportMixin):
 
     @classmethod
     def get_active_merge_requests(cls, user=None):
-        from app.utils import get_celery_tasks_scheduled
-
-        try:
-            reqs = get_celery_tasks_scheduled(
-                'app.modules.individuals.tasks.execute_merge_request'
+        if user:
+            merge_requests = IndividualMergeRequest.get_pending_for_user(user)
+        else:
+            merge_requests = (
+                IndividualMergeRequest.query.filter_by(state='pending')
+                .order_by(IndividualMergeRequest.deadline)
+                .all()
             )
-        except NotImplementedError:
-            AuditLog.backend_fault(log, 'celery failure')
-            return []
-
-        if not user:
-            return reqs
-        user_reqs = []
-        for req in reqs:
-            if (  # warning, extreme nested json parsing!
-                'request' in req
-                and 'args' in req['request']
-                and isinstance(req['request']['args'], list)
-                and len(req['request']['args']) > 2
-                and isinstance(req['request']['args'][2], dict)
-                and 'stakeholder_guids' in req['request']['args'][2]
-                and isinstance(req['request']['args'][2]['stakeholder_guids'], list)
-                and str(user.guid) in req['request']['args'][2]['stakeholder_guids']
-            ):
-                user_reqs.append(req)
-        return user_reqs
+        return [merge_request.get_task_data() for merge_request in merge_requests]
 
     @classmethod
     def merge_request_hash(cls, individuals):
@@ -1257,25 +1653,37 @@ class Individual(db.Model, HoustonModel, CustomFieldMixin, ExportMixin):
         return hash(tuple(parts))
 
     @classmethod
-    def find_merge_conflicts(self, individuals):
+    def find_merge_conflicts(cls, individuals):
         if len(individuals) < 2:
             raise ValueError('not enough individuals')
-        values = {'sex': set(), 'taxonomy_guid': set()}
-        name_contexts = {}
-        for individual in individuals:
-            for name in individual.names:
-                name_contexts[name.context] = name_contexts.get(name.context, 0) + 1
-            values['sex'].add(individual.get_sex())
-            values['taxonomy_guid'].add(individual.get_taxonomy_guid())
-        conflicts = {'name_contexts': []}
-        for key in values.keys():
-            if len(values[key]) > 1:
-                conflicts[key] = True
-        for context in name_contexts.keys():
-            if name_contexts[context] > 1:
-                conflicts['name_contexts'].append(context)
-        if not conflicts['name_contexts']:
-            del conflicts['name_contexts']  # eject if empty
+        individual_guids = [individual.guid for individual in individuals]
+
+        def count_values(column):
+            # None counts as a value, as it does in a set
+            is_null = sa.case([(column.is_(None), 1)], else_=0)
+            return sa.func.count(sa.distinct(column)) + sa.func.max(is_null)
+
+        sex_count, taxonomy_count = (
+            db.session.query(count_values(cls.sex), count_values(cls.taxonomy_guid))
+            .filter(cls.guid.in_(individual_guids))
+            .one()
+        )
+
+        conflicts = {}
+        if sex_count > 1:
+            conflicts['sex'] = True
+        if taxonomy_count > 1:
+            conflicts['taxonomy_guid'] = True
+        name_contexts = [
+            row.context
+            for row in db.session.query(Name.context)
+            .filter(Name.individual_guid.in_(individual_guids))
+            .group_by(Name.context)
+            .having(sa.func.count(Name.guid) > 1)
+            .order_by(sa.func.min(Name.created))
+        ]
+        if name_contexts:
+            conflicts['name_contexts'] = name_contexts
         return conflicts
 
     def delete(self):
@@ -1342,3 +1750,111 @@ class Individual(db.Model, HoustonModel, CustomFieldMixin, ExportMixin):
                 }
             )
         return rels
+
+
+# Attributes whose changes make the summary of the related individuals stale
+INDIVIDUAL_SUMMARY_DEPENDENCIES = {
+    'Individual': ('featured_asset_guid',),
+    'Encounter': ('individual_guid', 'sighting_guid', 'time_guid'),
+    'Annotation': ('encounter_guid', 'asset_guid'),
+    'Sighting': ('time_guid',),
+    'ComplexDateTime': ('datetime', 'specificity'),
+}
+
+
+def _history_values(obj, attribute):
+    history = sa.inspect(obj).attrs[attribute].history
+    return {value for value in history.sum() if value is not None}
+
+
+def _individual_summary_changes(session):
+    changes = {}
+    for obj in itertools.chain(session.new, session.dirty, session.deleted):
+        class_name = obj.__class__.__name__
+        attributes = INDIVIDUAL_SUMMARY_DEPENDENCIES.get(class_name)
+        if not attributes:
+            continue
+        if obj in session.dirty:
+            state = sa.inspect(obj)
+            if not any(state.attrs[attr].history.has_changes() for attr in attributes):
+                continue
+        # the previous individual or encounter is affected by a move too, and the
+        # values are read from the history as deleted rows are already gone
+        if class_name in ('Individual', 'Sighting', 'ComplexDateTime'):
+            changes.setdefault(class_name, set()).add(obj.guid)
+        elif class_name == 'Encounter':
+            changes.setdefault('Encounter', set()).add(obj.guid)
+            changes.setdefault('Individual', set()).update(
+                _history_values(obj, 'individual_guid')
+            )
+        elif class_name == 'Annotation':
+            changes.setdefault('Encounter', set()).update(
+                _history_values(obj, 'encounter_guid')
+            )
+    return changes
+
+
+def _individual_summary_criterion(changes):
+    from app.modules.encounters.models import Encounter
+    from app.modules.sightings.models import Sighting
+
+    criteria = []
+    individual_guids = changes.get('Individual')
+    if individual_guids:
+        criteria.append(Individual.guid.in_(individual_guids))
+
+    encounter_criteria = []
+    if changes.get('Encounter'):
+        encounter_criteria.append(Encounter.guid.in_(changes['Encounter']))
+    sighting_guids = changes.get('Sighting')
+    if sighting_guids:
+        encounter_criteria.append(Encounter.sighting_guid.in_(sighting_guids))
+    cdt_guids = changes.get('ComplexDateTime')
+    if cdt_guids:
+        encounter_criteria.append(Encounter.time_guid.in_(cdt_guids))
+        encounter_criteria.append(
+            Encounter.sighting_guid.in_(
+                sa.select([Sighting.guid]).where(Sighting.time_guid.in_(cdt_guids))
+            )
+        )
+        criteria.append(Individual.last_seen_time_guid.in_(cdt_guids))
+    if encounter_criteria:
+        criteria.append(
+            Individual.guid.in_(
+                sa.select([Encounter.individual_guid]).where(sa.or_(*encounter_criteria))
+            )
+        )
+    return sa.or_(*criteria) if criteria else None
+
+
+def _expire_individual_summaries(session, guids):
+    for guid in guids:
+        key = sa.orm.util.identity_key(Individual, guid)
+        individual = session.identity_map.get(key)
+        if individual is not None:
+            session.expire(individual, INDIVIDUAL_SUMMARY_ATTRIBUTES)
+
+
+@sa.event.listens_for(sa.orm.Session, 'after_flush')
+def individual_summary_after_flush(session, flush_context):
+    changes = _individual_summary_changes(session)
+    if not changes:
+        return
+    criterion = _individual_summary_criterion(changes)
+    if criterion is None:
+        return
+
+    individual_guids = [
+        row.guid for row in session.execute(sa.select([Individual.guid]).where(criterion))
+    ]
+    if not individual_guids:
+        return
+    session.execute(Individual.get_summary_update(Individual.guid.in_(individual_guids)))
+    session.info.setdefault('individual_summary_guids', set()).update(individual_guids)
+
+
+@sa.event.listens_for(sa.orm.Session, 'after_flush_postexec')
+def individual_summary_after_flush_postexec(session, flush_context):
+    guids = session.info.pop('individual_summary_guids', None)
+    if guids:
+        _expire_individual_summaries(session, guids)
@@ -711,7 +711,7 @@ class IndividualMergeRequestByTaskId(Resource):
                 all_individuals[0],
                 f'BLOCK vote for merge_request id={task_id} (celery task revoked)',
             )
-            Individual.merge_request_cancel_task(task_id)
+            Individual.merge_request_cancel_task(task_id, 'blocked')
             request_data = {
                 'id': task_id,
                 'from_individual_ids': task_data['request']['args'][1],
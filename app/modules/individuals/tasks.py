@@ -3,9 +3,22 @@ import logging
 
 from app.extensions.celery import celery
 
+MERGE_REQUEST_RECONCILE_FREQUENCY = 60 * 60
+
+
 log = logging.getLogger(__name__)
 
 
+@celery.on_after_configure.connect
+def individuals_setup_periodic_tasks(sender, **kwargs):
+    if MERGE_REQUEST_RECONCILE_FREQUENCY is not None:
+        sender.add_periodic_task(
+            MERGE_REQUEST_RECONCILE_FREQUENCY,
+            reconcile_merge_requests.s(),
+            name='Reconcile Individual Merge Requests',
+        )
+
+
 @celery.task(
     bind=True,
     # autoretry_for=(requests.exceptions.RequestException,),
@@ -18,3 +31,13 @@ def execute_merge_request(self, target_individual_guid, from_individual_ids, par
     Individual.merge_request_celery_task(
         self, target_individual_guid, from_individual_ids, parameters
     )
+
+
+@celery.task
+def reconcile_merge_requests():
+    from .models import IndividualMergeRequest
+
+    expired = IndividualMergeRequest.reconcile()
+    if expired:
+        log.info(f'Expired {expired} Individual Merge Requests')
+    return expired
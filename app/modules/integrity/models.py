@@ -4,16 +4,30 @@ Integrity database models
 --------------------
 """
 
+import logging
 import uuid
 
+import sqlalchemy as sa
+from flask import current_app
+
 from app.extensions import HoustonModel, db
 
+log = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
 
 class Integrity(db.Model, HoustonModel):
     """
     Integrity database model.
+
+    The checks of each model are run by a separate ``run_integrity_check``
+    Celery task, which stores its part of ``result`` and completes its step
+    of ``progress``.  An incremental run only checks the rows changed since
+    the previous run started, see ``since``.
     """
 
+    # Name in the result of each model that is checked
+    CHECKS = ('asset_groups', 'sightings', 'individuals', 'annotations', 'assets')
+
     guid = db.Column(
         db.GUID, default=uuid.uuid4, primary_key=True
     )  # pylint: disable=invalid-name
@@ -21,6 +35,14 @@ class Integrity(db.Model, HoustonModel):
     # result data. Indexed on top level entity
     result = db.Column(db.JSON, nullable=True)
 
+    # Only rows changed since this time are checked, None to check everything
+    since = db.Column(db.DateTime, nullable=True)
+
+    progress_guid = db.Column(
+        db.GUID, db.ForeignKey('progress.guid'), index=True, nullable=True
+    )
+    progress = db.relationship('Progress', foreign_keys=[progress_guid])
+
     def __repr__(self):
         return (
             '<{class_name}('
@@ -28,25 +50,126 @@ class Integrity(db.Model, HoustonModel):
             ')>'.format(class_name=self.__class__.__name__, self=self)
         )
 
-    def __init__(self):
-        # Creating an Integrity entry runs the full integrity checks and generates and stores the result
-        # for later analysis
-        from app.modules.annotations.models import Annotation
-        from app.modules.asset_groups.models import AssetGroup
-        from app.modules.assets.models import Asset
-        from app.modules.individuals.models import Individual
-        from app.modules.sightings.models import Sighting
-
-        self.result = {
-            'asset_groups': AssetGroup.run_integrity(),
-            'sightings': Sighting.run_integrity(),
-            'individuals': Individual.run_integrity(),
-            'annotations': Annotation.run_integrity(),
-            'assets': Asset.run_integrity(),
-        }
-
     @classmethod
     def get_elasticsearch_schema(cls):
         from app.modules.integrity.schemas import BaseIntegritySchema
 
         return BaseIntegritySchema
+
+    @classmethod
+    def get_check_class(cls, check):
+        if check == 'asset_groups':
+            from app.modules.asset_groups.models import AssetGroup
+
+            return AssetGroup
+        if check == 'sightings':
+            from app.modules.sightings.models import Sighting
+
+            return Sighting
+        if check == 'individuals':
+            from app.modules.individuals.models import Individual
+
+            return Individual
+        if check == 'annotations':
+            from app.modules.annotations.models import Annotation
+
+            return Annotation
+        if check == 'assets':
+            from app.modules.assets.models import Asset
+
+            return Asset
+        raise ValueError(f'Unknown integrity check {check}')
+
+    @classmethod
+    def get_last_run(cls):
+        """
+        The most recent run that completed, runs from before checks were run
+        in the background have no progress and always completed.
+        """
+        from app.modules.progress.models import Progress, ProgressStatus
+
+        return (
+            cls.query.outerjoin(Progress, cls.progress_guid == Progress.guid)
+            .filter(
+                sa.or_(
+                    cls.progress_guid.is_(None),
+                    Progress.status == ProgressStatus.completed,
+                )
+            )
+            .order_by(cls.created.desc())
+            .first()
+        )
+
+    @classmethod
+    def create(cls, incremental=False):
+        from app.modules.progress.models import Progress
+
+        since = None
+        if incremental:
+            last_run = cls.get_last_run()
+            if last_run is not None:
+                since = last_run.created
+
+        progress = Progress(description='Integrity checks')
+        with db.session.begin(subtransactions=True):
+            db.session.add(progress)
+            integrity = cls(since=since, result={}, progress_guid=progress.guid)
+            db.session.add(integrity)
+        return integrity
+
+    def start(self, foreground=None):
+        """
+        Run every check, in parallel Celery tasks unless ``foreground``
+        """
+        from app.modules.progress.models import Progress
+
+        from .tasks import run_integrity_check
+
+        if foreground is None:
+            foreground = current_app.testing
+
+        steps = {}
+        with db.session.begin(subtransactions=True):
+            for check in self.CHECKS:
+                steps[check] = Progress(
+                    description=f'Integrity check of {check}',
+                    parent_guid=self.progress_guid,
+                )
+                db.session.add(steps[check])
+
+        for check in self.CHECKS:
+            if foreground:
+                self.run_check(check, steps[check])
+                continue
+
+            promise = run_integrity_check.delay(
+                str(self.guid), check, str(steps[check].guid)
+            )
+            with db.session.begin(subtransactions=True):
+                steps[check].celery_guid = uuid.UUID(promise.id)
+                db.session.merge(steps[check])
+
+    def run_check(self, check, progress=None):
+        cls = self.get_check_class(check)
+        try:
+            check_result = cls.run_integrity(since=self.since)
+        except Exception as ex:
+            log.exception(f'{self} {check} check failed')
+            if progress is not None:
+                progress.fail(str(ex))
+            raise
+
+        # The checks run in parallel, lock the row to add to the result
+        with db.session.begin(subtransactions=True):
+            integrity = (
+                Integrity.query.filter(Integrity.guid == self.guid)
+                .with_for_update()
+                .populate_existing()
+                .one()
+            )
+            result = dict(integrity.result or {})
+            result[check] = check_result
+            integrity.result = result
+
+        if progress is not None:
+            progress.set(100)
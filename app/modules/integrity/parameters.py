@@ -4,11 +4,13 @@ Input arguments (Parameters) for Integrity resources RESTful API
 -----------------------------------------------------------
 """
 
-from flask_restx_patched import Parameters
+from flask_marshmallow import base_fields
 
-from . import schemas
+from flask_restx_patched import Parameters
 
 
-class CreateIntegrityParameters(Parameters, schemas.BaseIntegritySchema):
-    class Meta(schemas.BaseIntegritySchema.Meta):
-        pass
+class CreateIntegrityParameters(Parameters):
+    incremental = base_fields.Boolean(
+        description='only check what changed since the last completed run',
+        missing=False,
+    )
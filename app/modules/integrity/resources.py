@@ -60,14 +60,18 @@ class IntegrityChecks(Resource):
     @api.response(code=HTTPStatus.CONFLICT)
     def post(self, args):
         """
-        Create a new instance of Integrity.
+        Start a new run of the Integrity checks.
+
+        The checks run in the background, the result is filled in as they
+        complete.  An incremental run only checks what changed since the last
+        completed run.
         """
         context = api.commit_or_abort(
             db.session, default_error_message='Failed to create a new Integrity'
         )
         with context:
-            integrity = Integrity(**args)
-            db.session.add(integrity)
+            integrity = Integrity.create(**args)
+        integrity.start()
         return integrity
 
 
@@ -21,6 +21,8 @@ class BaseIntegritySchema(ModelSchema):
             Integrity.guid.key,
             Integrity.created.key,
             Integrity.result.key,
+            Integrity.since.key,
+            Integrity.progress_guid.key,
             'elasticsearchable',
             Integrity.indexed.key,
         )
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+import logging
+
+from app.extensions.celery import celery
+
+log = logging.getLogger(__name__)
+
+
+@celery.task
+def run_integrity_check(integrity_guid, check, progress_guid=None):
+    from app.modules.progress.models import Progress
+
+    from .models import Integrity
+
+    integrity = Integrity.query.get(integrity_guid)
+    if integrity is None:
+        log.warning(f'Integrity {integrity_guid} no longer exists, skipping')
+        return
+
+    progress = Progress.query.get(progress_guid) if progress_guid else None
+    integrity.run_check(check, progress)
@@ -8,6 +8,7 @@ import enum
 import logging
 import uuid
 
+import sqlalchemy as sa
 import tqdm
 from flask import current_app
 
@@ -16,6 +17,9 @@ from app.extensions.git_store import GitStore
 
 log = logging.getLogger(__name__)  # pylint: disable=invalid-name
 
+# Number of MissionTask asset rows inserted or deleted per statement
+MISSION_TASK_ASSET_CHUNK_SIZE = 5000
+
 
 class MissionUserAssignment(db.Model, HoustonModel):
     mission_guid = db.Column(db.GUID, db.ForeignKey('mission.guid'), primary_key=True)
@@ -90,13 +94,12 @@ class Mission(db.Model, HoustonModel, Timestamp):
 
     @classmethod
     def query_search_term_hook(cls, term):
-        from sqlalchemy import String
-        from sqlalchemy_utils.functions import cast_if
+        from app.extensions.query_search import search_term_clauses
 
-        return (
-            cast_if(cls.guid, String).contains(term),
-            cls.title.contains(term),
-            cast_if(cls.owner_guid, String).contains(term),
+        return search_term_clauses(
+            term,
+            guid_columns=(cls.guid, cls.owner_guid),
+            text_columns=(cls.title,),
         )
 
     @property
@@ -107,19 +110,37 @@ class Mission(db.Model, HoustonModel, Timestamp):
     def assets(self):
         return self.get_assets()
 
-    def asset_search(self, search, total=True, **pagination_kwargs):
+    def get_collection_guids_query(self):
+        return db.session.query(MissionCollection.guid).filter(
+            MissionCollection.mission_guid == self.guid
+        )
+
+    def get_asset_guids_query(self):
         from app.modules.assets.models import Asset
 
-        # Get all mission's GUIDs
-        mission_guids = self.get_assets(load=False)
+        return db.session.query(Asset.guid).filter(
+            Asset.git_store_guid.in_(self.get_collection_guids_query().subquery())
+        )
+
+    def asset_search(self, search, total=True, load=True, **pagination_kwargs):
+        from app.modules.assets.models import Asset
+
+        collection_guids = [str(guid) for (guid,) in self.get_collection_guids_query()]
+        if len(collection_guids) == 0:
+            return (0, []) if total else []
+
+        # Restrict the search to the mission's collections within Elasticsearch,
+        # instead of filtering the hits against every asset GUID of the mission
+        mission_search = {
+            'bool': {
+                'filter': [{'terms': {'git_store.guid': collection_guids}}],
+            },
+        }
+        if search:
+            mission_search['bool']['must'] = search
 
-        # Get Elasticsearch GUIDs
         response = Asset.elasticsearch(
-            search,
-            load=False,
-            total=total,
-            filter_guids=mission_guids,
-            **pagination_kwargs
+            mission_search, load=False, total=total, **pagination_kwargs
         )
 
         if total:
@@ -128,12 +149,16 @@ class Mission(db.Model, HoustonModel, Timestamp):
         else:
             num_total, search_guids = None, response
 
-        # Load assets from DB
-        assets = []
-        for guid in search_guids:
-            asset = Asset.query.get(guid)
-            if asset is not None:
-                assets.append(asset)
+        # Check the hits against the database and load them with one query
+        query = Asset.query.filter(
+            Asset.guid.in_(search_guids),
+            Asset.git_store_guid.in_(self.get_collection_guids_query().subquery()),
+        )
+        if load:
+            found = {asset.guid: asset for asset in query}
+        else:
+            found = {guid: guid for (guid,) in query.with_entities(Asset.guid)}
+        assets = [found[guid] for guid in search_guids if guid in found]
 
         if num_total is None:
             return assets
@@ -142,10 +167,7 @@ class Mission(db.Model, HoustonModel, Timestamp):
 
     @property
     def asset_count(self):
-        count = 0
-        for collection in self.collections:
-            count += collection.asset_count
-        return count
+        return self.get_asset_guids_query().order_by(None).count()
 
     def get_options(self):
         return self.options.get('model_options', [])
@@ -179,10 +201,13 @@ class Mission(db.Model, HoustonModel, Timestamp):
                 break
 
     def get_assets(self, load=True):
-        assets = []
-        for collection in self.collections:
-            assets += collection.get_assets(load=load)
-        return assets
+        from app.modules.assets.models import Asset
+
+        if load:
+            return Asset.query.filter(
+                Asset.guid.in_(self.get_asset_guids_query().subquery())
+            ).all()
+        return [guid for (guid,) in self.get_asset_guids_query()]
 
     def get_jobs_json(self):
         job_data = []
@@ -306,7 +331,13 @@ class MissionCollection(GitStore):
 
     @property
     def asset_count(self):
-        return len(self.get_assets(load=False))
+        from app.modules.assets.models import Asset
+
+        return (
+            db.session.query(sa.func.count(Asset.guid))
+            .filter(Asset.git_store_guid == self.guid)
+            .scalar()
+        )
 
     def post_preparation_hook(self):
         pass
@@ -327,14 +358,12 @@ class MissionCollection(GitStore):
 
     @classmethod
     def query_search_term_hook(cls, term):
-        from sqlalchemy import String
-        from sqlalchemy_utils.functions import cast_if
+        from app.extensions.query_search import search_term_clauses
 
-        return (
-            cast_if(cls.guid, String).contains(term),
-            cls.description.contains(term),
-            cast_if(cls.owner_guid, String).contains(term),
-            cast_if(cls.mission_guid, String).contains(term),
+        return search_term_clauses(
+            term,
+            guid_columns=(cls.guid, cls.owner_guid, cls.mission_guid),
+            text_columns=(cls.description,),
         )
 
     @classmethod
@@ -343,11 +372,6 @@ class MissionCollection(GitStore):
 
         ensure_remote.delay(str(mission_collection.guid))
 
-    def git_push_delay(self):
-        from app.extensions.git_store.tasks import git_push
-
-        git_push.delay(str(self.guid))
-
     def delete_remote_delay(self):
         from app.extensions.git_store.tasks import delete_remote
 
@@ -493,14 +517,12 @@ class MissionTask(db.Model, HoustonModel, Timestamp):
 
     @classmethod
     def query_search_term_hook(cls, term):
-        from sqlalchemy import String
-        from sqlalchemy_utils.functions import cast_if
+        from app.extensions.query_search import search_term_clauses
 
-        return (
-            cast_if(cls.guid, String).contains(term),
-            cls.title.contains(term),
-            cast_if(cls.owner_guid, String).contains(term),
-            cast_if(cls.mission_guid, String).contains(term),
+        return search_term_clauses(
+            term,
+            guid_columns=(cls.guid, cls.owner_guid, cls.mission_guid),
+            text_columns=(cls.title,),
         )
 
     @property
@@ -517,11 +539,58 @@ class MissionTask(db.Model, HoustonModel, Timestamp):
 
     @property
     def asset_count(self):
-        return len(self.asset_participations)
+        return (
+            db.session.query(sa.func.count(MissionTaskAssetParticipation.asset_guid))
+            .filter(MissionTaskAssetParticipation.mission_task_guid == self.guid)
+            .scalar()
+        )
 
     @property
     def annotation_count(self):
-        return len(self.annotation_participations)
+        return (
+            db.session.query(
+                sa.func.count(MissionTaskAnnotationParticipation.annotation_guid)
+            )
+            .filter(MissionTaskAnnotationParticipation.mission_task_guid == self.guid)
+            .scalar()
+        )
+
+    @classmethod
+    def get_new_title(cls, mission, globally_unique=False, candidates=10):
+        """
+        Pick a random, unused title with an adjective noun structure (see
+        https://github.com/imsky/wordlists), checking the candidates with a
+        single query instead of loading the existing tasks.
+        """
+        import randomname
+
+        while True:
+            titles = set()
+            while len(titles) < candidates:
+                title = randomname.get_name(
+                    adj=(
+                        'character',
+                        'colors',
+                        'emotions',
+                        'shape',
+                    ),
+                    noun=(
+                        'apex_predators',
+                        'birds',
+                        'cats',
+                        'dogs',
+                        'fish',
+                    ),
+                    sep=' ',
+                ).title()
+                titles.add('New Task: {}'.format(title))
+
+            query = db.session.query(cls.title).filter(cls.title.in_(titles))
+            if not globally_unique:
+                query = query.filter(cls.mission_guid == mission.guid)
+            titles -= {title for (title,) in query}
+            if titles:
+                return sorted(titles)[0]
 
     @db.validates('title')
     def validate_title(self, key, title):  # pylint: disable=unused-argument,no-self-use
@@ -563,6 +632,50 @@ class MissionTask(db.Model, HoustonModel, Timestamp):
     def get_assets(self):
         return [participation.asset for participation in self.asset_participations]
 
+    def get_asset_guids(self):
+        return [
+            guid
+            for (guid,) in db.session.query(
+                MissionTaskAssetParticipation.asset_guid
+            ).filter(MissionTaskAssetParticipation.mission_task_guid == self.guid)
+        ]
+
+    def add_asset_guids_in_context(self, asset_guids):
+        """
+        Insert the participation rows of many assets at once, the task must
+        have been flushed already.
+        """
+        table = MissionTaskAssetParticipation.__table__
+        asset_guids = list(asset_guids)
+        now = datetime.datetime.utcnow()
+        for start in range(0, len(asset_guids), MISSION_TASK_ASSET_CHUNK_SIZE):
+            chunk = asset_guids[start : start + MISSION_TASK_ASSET_CHUNK_SIZE]
+            db.session.execute(
+                table.insert(),
+                [
+                    {
+                        'mission_task_guid': self.guid,
+                        'asset_guid': asset_guid,
+                        'created': now,
+                        'updated': now,
+                        'indexed': now,
+                        'viewed': now,
+                    }
+                    for asset_guid in chunk
+                ],
+            )
+        db.session.expire(self, ['asset_participations'])
+
+    def remove_asset_guids_in_context(self, asset_guids):
+        asset_guids = list(asset_guids)
+        for start in range(0, len(asset_guids), MISSION_TASK_ASSET_CHUNK_SIZE):
+            chunk = asset_guids[start : start + MISSION_TASK_ASSET_CHUNK_SIZE]
+            MissionTaskAssetParticipation.query.filter(
+                MissionTaskAssetParticipation.mission_task_guid == self.guid,
+                MissionTaskAssetParticipation.asset_guid.in_(chunk),
+            ).delete(synchronize_session=False)
+        db.session.expire(self, ['asset_participations'])
+
     def add_asset(self, asset):
         with db.session.begin(subtransactions=True):
             self.add_asset_in_context(asset)
@@ -5,6 +5,7 @@ Input arguments (Parameters) for Missions resources RESTful API
 """
 
 import logging
+import uuid
 
 from flask_login import current_user  # NOQA
 from flask_marshmallow import base_fields
@@ -198,8 +199,17 @@ class CreateMissionTaskParameters(SetOperationsJSONParameters):
 
     @classmethod
     def resolve(cls, field, value, obj):
+        """
+        Resolve an operation to the set of Asset GUIDs it selects, using one
+        query per operation rather than loading the Assets.
+        """
+        from app.extensions import db
         from app.modules.assets.models import Asset
-        from app.modules.missions.models import MissionCollection, MissionTask
+        from app.modules.missions.models import (
+            MissionCollection,
+            MissionTask,
+            MissionTaskAssetParticipation,
+        )
 
         def _check(condition):
             if not condition:
@@ -208,59 +218,85 @@ class CreateMissionTaskParameters(SetOperationsJSONParameters):
                     % (field, value)
                 )
 
-        if field == 'search':
-            return obj.asset_search(value, total=False, limit=None)
-        elif field == 'collections':
-            assets = []
-
+        def _guids():
             _check(isinstance(value, list))
+            guids = set()
             for guid in value:
                 _check(isinstance(guid, str))
-                mission_collection = MissionCollection.query.get(guid)
-                if mission_collection is not None:
-                    if mission_collection.mission == obj:
-                        assets += mission_collection.assets
-                    else:
-                        raise ValidationError(
-                            'Failed to update set. Mission Collection %r is not part of Mission %r'
-                            % (mission_collection.guid, obj.guid)
-                        )
-
-            return assets
+                try:
+                    guids.add(uuid.UUID(guid))
+                except ValueError:
+                    _check(False)
+            return guids
+
+        if field == 'search':
+            return set(obj.asset_search(value, total=False, load=False, limit=None))
+        elif field == 'collections':
+            guids = _guids()
+            if len(guids) == 0:
+                return set()
+
+            found = db.session.query(
+                MissionCollection.guid, MissionCollection.mission_guid
+            ).filter(MissionCollection.guid.in_(guids))
+            collection_guids = set()
+            for collection_guid, mission_guid in found:
+                if mission_guid != obj.guid:
+                    raise ValidationError(
+                        'Failed to update set. Mission Collection %r is not part of Mission %r'
+                        % (collection_guid, obj.guid)
+                    )
+                collection_guids.add(collection_guid)
+
+            if len(collection_guids) == 0:
+                return set()
+            query = db.session.query(Asset.guid).filter(
+                Asset.git_store_guid.in_(collection_guids)
+            )
+            return {asset_guid for (asset_guid,) in query}
         elif field == 'tasks':
-            assets = []
+            guids = _guids()
+            if len(guids) == 0:
+                return set()
 
-            _check(isinstance(value, list))
-            for guid in value:
-                _check(isinstance(guid, str))
-                mission_task = MissionTask.query.get(guid)
-                if mission_task is not None:
-                    if mission_task.mission == obj:
-                        assets += mission_task.assets
-                    else:
-                        raise ValidationError(
-                            'Failed to update set. Mission Task %r is not part of Mission %r'
-                            % (mission_task.guid, obj.guid)
-                        )
-
-            return assets
+            found = db.session.query(MissionTask.guid, MissionTask.mission_guid).filter(
+                MissionTask.guid.in_(guids)
+            )
+            task_guids = set()
+            for task_guid, mission_guid in found:
+                if mission_guid != obj.guid:
+                    raise ValidationError(
+                        'Failed to update set. Mission Task %r is not part of Mission %r'
+                        % (task_guid, obj.guid)
+                    )
+                task_guids.add(task_guid)
+
+            if len(task_guids) == 0:
+                return set()
+            query = db.session.query(MissionTaskAssetParticipation.asset_guid).filter(
+                MissionTaskAssetParticipation.mission_task_guid.in_(task_guids)
+            )
+            return {asset_guid for (asset_guid,) in query}
         elif field == 'assets':
-            assets = []
-
-            _check(isinstance(value, list))
-            for guid in value:
-                _check(isinstance(guid, str))
-                asset = Asset.query.get(guid)
-                if asset is not None:
-                    if asset.git_store.mission == obj:
-                        assets.append(asset)
-                    else:
-                        raise ValidationError(
-                            'Failed to update set. Asset %r is not part of any Mission Collection for Mission %r'
-                            % (asset.guid, obj.guid)
-                        )
-
-            return assets
+            guids = _guids()
+            if len(guids) == 0:
+                return set()
+
+            query = (
+                db.session.query(Asset.guid, MissionCollection.mission_guid)
+                .outerjoin(MissionCollection, MissionCollection.guid == Asset.git_store_guid)
+                .filter(Asset.guid.in_(guids))
+            )
+            asset_guids = set()
+            for asset_guid, mission_guid in query:
+                if mission_guid != obj.guid:
+                    raise ValidationError(
+                        'Failed to update set. Asset %r is not part of any Mission Collection for Mission %r'
+                        % (asset_guid, obj.guid)
+                    )
+                asset_guids.add(asset_guid)
+
+            return asset_guids
 
         return None
 
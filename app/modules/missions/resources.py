@@ -9,8 +9,6 @@ import logging
 import uuid
 from http import HTTPStatus
 
-import randomname
-import tqdm
 import werkzeug
 from flask import request
 from flask_login import current_user  # NOQA
@@ -367,14 +365,12 @@ class MissionTasksForMission(Resource):
         """
         Create a new instance of Mission.
         """
-        from app.modules.assets.models import Asset
-
         try:
             (
-                asset_set,
+                asset_guid_set,
                 identity_dict,
             ) = parameters.CreateMissionTaskParameters.perform_set_operations(
-                args, obj=mission, obj_cls=Asset
+                args, obj=mission, obj_cls=uuid.UUID
             )
         except ValidationError as exception:
             abort(409, message=str(exception))
@@ -383,33 +379,9 @@ class MissionTasksForMission(Resource):
             db.session, default_error_message='Failed to create a new MissionTask'
         )
 
-        # Pick a random title with an adjective nown structure (see here: https://github.com/imsky/wordlists)
-        if USE_GLOBALLY_UNIQUE_MISSION_TASK_NAMES:
-            current_tasks = MissionTask.query.all()
-        else:
-            current_tasks = mission.tasks
-        titles = [task.title for task in current_tasks]
-        title = None
-        while title in titles + [None]:
-            title = randomname.get_name(
-                adj=(
-                    'character',
-                    'colors',
-                    'emotions',
-                    'shape',
-                ),
-                noun=(
-                    'apex_predators',
-                    'birds',
-                    'cats',
-                    'dogs',
-                    'fish',
-                ),
-                sep=' ',
-            ).title()
-            title = 'New Task: {}'.format(title)
-        assert title is not None
-        assert title not in titles
+        title = MissionTask.get_new_title(
+            mission, globally_unique=USE_GLOBALLY_UNIQUE_MISSION_TASK_NAMES
+        )
 
         args = {}
         args['title'] = title
@@ -420,8 +392,8 @@ class MissionTasksForMission(Resource):
         with context:
             db.session.add(mission_task)
             mission_task.add_user_in_context(current_user)
-            for asset in tqdm.tqdm(asset_set, desc='Adding Assets to MissionTask'):
-                mission_task.add_asset_in_context(asset)
+            db.session.flush()
+            mission_task.add_asset_guids_in_context(asset_guid_set)
 
         db.session.refresh(mission_task)
 
@@ -735,15 +707,16 @@ class MissionTaskByID(Resource):
         """
         Create a new instance of Mission.
         """
-        from app.modules.assets.models import Asset
-
-        starting_set = set(mission_task.assets)
+        starting_set = set(mission_task.get_asset_guids())
         try:
             (
-                asset_set,
+                asset_guid_set,
                 identity_dict,
             ) = parameters.CreateMissionTaskParameters.perform_set_operations(
-                args, obj=mission_task.mission, obj_cls=Asset, starting_set=starting_set
+                args,
+                obj=mission_task.mission,
+                obj_cls=uuid.UUID,
+                starting_set=starting_set,
             )
         except ValidationError as exception:
             abort(409, message=str(exception))
@@ -753,13 +726,8 @@ class MissionTaskByID(Resource):
         )
 
         with context:
-            add_set = asset_set - starting_set
-            for asset in add_set:
-                mission_task.add_asset_in_context(asset)
-
-            remove_set = starting_set - asset_set
-            for asset in remove_set:
-                mission_task.remove_asset_in_context(asset)
+            mission_task.add_asset_guids_in_context(asset_guid_set - starting_set)
+            mission_task.remove_asset_guids_in_context(starting_set - asset_guid_set)
 
             db.session.merge(mission_task)
 
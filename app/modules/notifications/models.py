@@ -4,18 +4,31 @@ Notifications database models
 --------------------
 """
 
+import copy
 import datetime
 import enum
 import logging
 import uuid
 
+import sqlalchemy as sa
 from flask_login import current_user
 
-from app.extensions import HoustonModel, db
+from app.extensions import HoustonModel, cache, db, is_cache_shared
 from app.utils import HoustonException
 
 log = logging.getLogger(__name__)  # pylint: disable=invalid-name
 
+# Per user unread counts by message type, deleted once a change to the
+# user's notifications is committed and counted again on the next read.  The
+# timeout bounds any drift from bulk updates that bypass the ORM events.
+UNREAD_COUNTS_CACHE_KEY = 'notification-unread-counts:{}'
+UNREAD_COUNTS_CACHE_TIMEOUT = 60 * 5
+# Cache keys to delete once the session commits
+NOTIFICATION_CACHE_INVALIDATIONS_SESSION_KEY = 'notification_cache_invalidations'
+
+SYSTEM_PREFERENCES_CACHE_KEY = 'system-notification-preferences'
+SYSTEM_PREFERENCES_CACHE_TIMEOUT = 60 * 5
+
 
 class NotificationType(str, enum.Enum):
     raw = 'raw'  # Dummy value used as a default
@@ -598,9 +611,8 @@ class Notification(db.Model, HoustonModel):
 
     message_type = db.Column(db.String, default=NotificationType.raw, nullable=False)
     message_values = db.Column(db.JSON, nullable=True)
-    recipient_guid = db.Column(
-        db.GUID, db.ForeignKey('user.guid'), index=True, nullable=True
-    )
+    # Indexed by the composite inbox index below
+    recipient_guid = db.Column(db.GUID, db.ForeignKey('user.guid'), nullable=True)
     recipient = db.relationship('User', back_populates='notifications')
     sender_guid = db.Column(db.GUID, nullable=True)
 
@@ -608,6 +620,16 @@ class Notification(db.Model, HoustonModel):
         db.DateTime, index=True, default=datetime.datetime.utcnow, nullable=False
     )
 
+    __table_args__ = (
+        # Serves the unread-first inbox ordering and the unread counts
+        db.Index(
+            'ix_notification_recipient_guid_is_read_created',
+            recipient_guid,
+            is_read,
+            created.desc(),
+        ),
+    )
+
     @classmethod
     def get_elasticsearch_schema(cls):
         from app.modules.notifications.schemas import BaseNotificationSchema
@@ -625,39 +647,98 @@ class Notification(db.Model, HoustonModel):
         )
 
     @classmethod
-    def _apply_notification_preferences(cls, user, all_notifications):
-        from app.modules.notifications.models import NotificationChannel
-
+    def _rest_message_types(cls, user):
+        # Message types the user receives on the REST API
         preferences = user.get_notification_preferences()
-        returned_notifications = [
-            notif
-            for notif in all_notifications
-            if preferences[notif.message_type][NotificationChannel.rest]
-        ]
+        return sorted(
+            {
+                getattr(message_type, 'value', message_type)
+                for message_type, channels in preferences.items()
+                if channels.get(NotificationChannel.rest, False)
+            }
+        )
+
+    @classmethod
+    def inbox_query(cls, user, unread_only=False):
+        """
+        Query of the user's notifications after preferences are applied,
+        unread first and then newest first.
+        """
+        query = cls.query.filter(
+            cls.recipient_guid == user.guid,
+            cls.message_type.in_(cls._rest_message_types(user)),
+        )
+        if unread_only:
+            query = query.filter(cls.is_read.is_(False))
+        return query.order_by(cls.is_read, cls.created.desc())
 
-        return returned_notifications
+    @classmethod
+    def get_notifications_for_user(cls, user, offset=0, limit=None, unread_only=False):
+        query = cls.inbox_query(user, unread_only=unread_only)
+        if offset:
+            query = query.offset(offset)
+        if limit is not None:
+            query = query.limit(limit)
+        notifications = query.all()
+        cls.load_sender_names(notifications)
+        return notifications
 
     @classmethod
-    def get_notifications_for_user(cls, user):
-        from sqlalchemy import desc
-
-        return cls._apply_notification_preferences(
-            user,
-            Notification.query.filter_by(recipient_guid=user.guid)
-            .order_by(desc(Notification.created))
-            .all(),
+    def get_unread_notifications_for_user(cls, user, offset=0, limit=None):
+        return cls.get_notifications_for_user(
+            user, offset=offset, limit=limit, unread_only=True
         )
 
     @classmethod
-    def get_unread_notifications_for_user(cls, user):
-        from sqlalchemy import desc
-
-        return cls._apply_notification_preferences(
-            user,
-            Notification.query.filter_by(recipient_guid=user.guid)
-            .filter_by(is_read=False)
-            .order_by(desc(Notification.created))
-            .all(),
+    def load_sender_names(cls, notifications):
+        """
+        Look up the sender names of ``notifications`` with one query, rather
+        than one query per notification when they are serialized.
+        """
+        from app.modules.users.models import User
+
+        sender_guids = {
+            notification.sender_guid
+            for notification in notifications
+            if notification.sender_guid is not None
+        }
+        names = {}
+        if sender_guids:
+            names = dict(
+                db.session.query(User.guid, User.full_name)
+                .filter(User.guid.in_(sender_guids))
+                .all()
+            )
+        for notification in notifications:
+            notification._sender_name = names.get(notification.sender_guid) or 'N/A'
+
+    @classmethod
+    def _unread_counts(cls, user_guid):
+        # Only cached when every worker shares the cache and its invalidation
+        shared = is_cache_shared()
+        key = UNREAD_COUNTS_CACHE_KEY.format(user_guid)
+        counts = cache.get(key) if shared else None
+        if counts is None:
+            rows = (
+                db.session.query(cls.message_type, sa.func.count(cls.guid))
+                .filter(cls.recipient_guid == user_guid, cls.is_read.is_(False))
+                .group_by(cls.message_type)
+                .all()
+            )
+            counts = {
+                getattr(message_type, 'value', message_type): count
+                for message_type, count in rows
+            }
+            if shared:
+                cache.set(key, counts, timeout=UNREAD_COUNTS_CACHE_TIMEOUT)
+        return counts
+
+    @classmethod
+    def get_unread_count_for_user(cls, user):
+        counts = cls._unread_counts(user.guid)
+        return sum(
+            counts.get(message_type, 0)
+            for message_type in cls._rest_message_types(user)
         )
 
     @property
@@ -674,6 +755,11 @@ class Notification(db.Model, HoustonModel):
     def get_sender_name(self):
         from app.modules.users.models import User
 
+        # Set in bulk by load_sender_names()
+        sender_name = getattr(self, '_sender_name', None)
+        if sender_name is not None:
+            return sender_name
+
         if self.sender_guid is not None:
             user = User.query.get(self.sender_guid)
             if user:
@@ -732,7 +818,7 @@ class Notification(db.Model, HoustonModel):
             email.template(
                 f"notifications/{config['email_template_name']}", **email_message_values
             )
-            email.send_message()
+            email.queue()
             self._channels_sent[NotificationChannel.email.value] = email
 
     @classmethod
@@ -783,6 +869,59 @@ class Notification(db.Model, HoustonModel):
             db.session.merge(notification)
 
 
+def _invalidate_after_commit(target, cache_key):
+    session = sa.orm.object_session(target)
+    if session is None:
+        cache.delete(cache_key)
+        return
+    session.info.setdefault(NOTIFICATION_CACHE_INVALIDATIONS_SESSION_KEY, set()).add(
+        cache_key
+    )
+
+
+def _invalidate_unread_counts(notification):
+    if notification.recipient_guid is not None:
+        _invalidate_after_commit(
+            notification, UNREAD_COUNTS_CACHE_KEY.format(notification.recipient_guid)
+        )
+
+
+@sa.event.listens_for(Notification, 'after_insert')
+def notification_after_insert(mapper, connection, target):
+    if not target.is_read:
+        _invalidate_unread_counts(target)
+
+
+@sa.event.listens_for(Notification, 'after_update')
+def notification_after_update(mapper, connection, target):
+    history = sa.inspect(target).attrs.is_read.history
+    if history.has_changes():
+        _invalidate_unread_counts(target)
+
+
+@sa.event.listens_for(Notification, 'after_delete')
+def notification_after_delete(mapper, connection, target):
+    if not target.is_read:
+        _invalidate_unread_counts(target)
+
+
+@sa.event.listens_for(sa.orm.Session, 'after_commit')
+def notification_session_after_commit(session):
+    # Deleted rather than updated in place, so a concurrent read can not
+    # write back a count computed before the commit
+    cache_keys = session.info.pop(NOTIFICATION_CACHE_INVALIDATIONS_SESSION_KEY, None)
+    if cache_keys:
+        try:
+            cache.delete_many(*cache_keys)
+        except Exception:  # pragma: no cover
+            log.exception('Failed to invalidate the cached notification data')
+
+
+@sa.event.listens_for(sa.orm.Session, 'after_rollback')
+def notification_session_after_rollback(session):
+    session.info.pop(NOTIFICATION_CACHE_INVALIDATIONS_SESSION_KEY, None)
+
+
 class NotificationPreferences(HoustonModel):
     """
     Notification Preferences database model.
@@ -847,6 +986,32 @@ class SystemNotificationPreferences(db.Model, NotificationPreferences):
                     db.session.merge(system_prefs)
         return system_prefs
 
+    @classmethod
+    def get_preferences(cls):
+        """
+        Return a copy of the system preferences, cached so that sending a
+        notification does not query them every time.
+        """
+        if not is_cache_shared():
+            return copy.deepcopy(cls.get().preferences)
+
+        preferences = cache.get(SYSTEM_PREFERENCES_CACHE_KEY)
+        if preferences is None:
+            preferences = cls.get().preferences
+            cache.set(
+                SYSTEM_PREFERENCES_CACHE_KEY,
+                preferences,
+                timeout=SYSTEM_PREFERENCES_CACHE_TIMEOUT,
+            )
+        return copy.deepcopy(preferences)
+
+
+@sa.event.listens_for(SystemNotificationPreferences, 'after_insert')
+@sa.event.listens_for(SystemNotificationPreferences, 'after_update')
+@sa.event.listens_for(SystemNotificationPreferences, 'after_delete')
+def system_notification_preferences_changed(mapper, connection, target):
+    _invalidate_after_commit(target, SYSTEM_PREFERENCES_CACHE_KEY)
+
 
 class UserNotificationPreferences(db.Model, NotificationPreferences):
     """
@@ -871,7 +1036,7 @@ class UserNotificationPreferences(db.Model, NotificationPreferences):
 
     @classmethod
     def get_user_preferences(cls, user):
-        prefs = SystemNotificationPreferences.get().preferences
+        prefs = SystemNotificationPreferences.get_preferences()
         if user.notification_preferences:
             user_prefs = user.notification_preferences[0].preferences
             if user_prefs is not None:
@@ -51,16 +51,13 @@ class MyNotifications(Resource):
         """
         List of Notifications for the user after preferences applied.
 
-        Returns a list of Notification starting from ``offset`` limited by ``limit``
+        Unread notifications are listed first, then newest first.  Returns a
+        list of Notification starting from ``offset`` limited by ``limit``
         parameter.
         """
-
-        returned_notifications = Notification.get_notifications_for_user(current_user)
-
-        # Manually apply offset and limit after the unique list is created
-        offset = args['offset']
-        limit = args['limit']
-        return returned_notifications[offset : offset + limit]
+        return Notification.get_notifications_for_user(
+            current_user, offset=args['offset'], limit=args['limit']
+        )
 
     # No reason we should allow the frontend to create an arbitrary notification and many security
     # reasons that we should not. Code retained in case this decision is reversed.
@@ -144,13 +141,30 @@ class MyUnreadNotifications(Resource):
         Returns a list of Notification starting from ``offset`` limited by ``limit``
         parameter.
         """
-        unread_notifications = Notification.get_unread_notifications_for_user(
-            current_user
+        return Notification.get_unread_notifications_for_user(
+            current_user, offset=args['offset'], limit=args['limit']
         )
-        # Manually apply offset and limit after the list is created
-        offset = args['offset']
-        limit = args['limit']
-        return unread_notifications[offset : offset + limit]
+
+
+@api.route('/unread/count')
+@api.login_required(oauth_scopes=['notifications:read'])
+class MyUnreadNotificationsCount(Resource):
+    """
+    Number of the Users own Unread Notifications.
+    """
+
+    @api.permission_required(
+        permissions.ModuleAccessPermission,
+        kwargs_on_request=lambda kwargs: {
+            'module': Notification,
+            'action': AccessOperation.READ,
+        },
+    )
+    def get(self):
+        """
+        Number of unread Notifications for the user after preferences applied.
+        """
+        return {'unread': Notification.get_unread_count_for_user(current_user)}
 
 
 @api.route('/all_unread')
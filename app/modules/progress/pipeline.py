@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+Pipeline status snapshots
+-------------------------
+
+Asset Group Sightings and Sightings report the status of the preparation,
+detection, curation and identification stages of the pipeline.  Building it
+walks Progress rows, assets and annotations, so it is stored on the object
+in ``pipeline_status`` and ``pipeline_state`` and only rebuilt after it
+has been invalidated.
+
+Whenever a flush changes a Progress or one of the ``PIPELINE_STATUS_ATTRIBUTES``
+of a model, adds or removes a step of a Progress, adds or removes an
+annotation or deletes a sighting, the snapshots that depend on it are cleared
+in the same transaction and their ``pipeline_status_version`` is incremented,
+so callers can cheaply tell whether anything changed since the version they
+last saw.
+"""
+import datetime
+import itertools
+import json
+import logging
+
+import flask.json
+import sqlalchemy as sa
+
+from app.extensions import db
+
+log = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+PIPELINE_STAGES = ('preparation', 'detection', 'curation', 'identification')
+
+# Progress attributes that are reported in a pipeline status
+PROGRESS_STATUS_ATTRIBUTES = ('status', 'percentage', 'message', 'description')
+
+
+class PipelineStatusMixin(object):
+    """
+    Stores the pipeline status built by ``compute_pipeline_status()``.
+
+    Models using this mixin implement ``compute_pipeline_status()``,
+    ``get_pipeline_progress()`` and ``pipeline_status_stale_criteria()``.
+    """
+
+    # Changes to these attributes make the pipeline status of the object stale
+    PIPELINE_STATUS_ATTRIBUTES = ('stage',)
+
+    pipeline_status = db.Column(db.JSON, default=None, nullable=True)
+    pipeline_state = db.Column(db.String(length=32), default=None, nullable=True)
+    pipeline_status_version = db.Column(db.Integer, default=0, nullable=False)
+
+    def compute_pipeline_status(self):
+        raise NotImplementedError()
+
+    def get_pipeline_progress(self, stage):
+        """
+        The Progress of a stage, used to report a live ETA and queue position
+        for stages that are in progress
+        """
+        return None
+
+    @classmethod
+    def pipeline_status_stale_criteria(cls, changes):
+        """
+        Return a SQL criterion selecting the rows made stale by ``changes``, a
+        dict of model class names to the guids of changed objects, or None
+        """
+        raise NotImplementedError()
+
+    @staticmethod
+    def get_pipeline_state_from_status(status):
+        # the furthest stage the pipeline got to that is not complete
+        for stage in PIPELINE_STAGES:
+            stage_status = status[stage]
+            if not (stage_status.get('complete') or stage_status.get('skipped')):
+                return stage
+        return None
+
+    def refresh_pipeline_status(self):
+        """
+        Rebuild and store the pipeline status.  The snapshot is only stored if
+        it was not invalidated while it was being built.
+        """
+        cls = self.__class__
+
+        db.session.refresh(self)
+        version = self.pipeline_status_version or 0
+        status = self.compute_pipeline_status()
+        snapshot = {key: value for key, value in status.items() if key != 'now'}
+        # Round trip through JSON so the snapshot matches what is read back
+        snapshot = json.loads(json.dumps(snapshot, cls=flask.json.JSONEncoder))
+        state = self.get_pipeline_state_from_status(snapshot)
+
+        with db.session.begin(subtransactions=True):
+            stored = (
+                cls.query.filter(
+                    cls.guid == self.guid,
+                    cls.pipeline_status_version == version,
+                ).update(
+                    {
+                        cls.pipeline_status: snapshot,
+                        cls.pipeline_state: state,
+                    },
+                    synchronize_session=False,
+                )
+                > 0
+            )
+        if stored:
+            sa.orm.attributes.set_committed_value(self, 'pipeline_status', snapshot)
+            sa.orm.attributes.set_committed_value(self, 'pipeline_state', state)
+        return snapshot, state
+
+    def get_pipeline_status(self):
+        snapshot = self.pipeline_status
+        if snapshot is None:
+            snapshot, _ = self.refresh_pipeline_status()
+
+        status = dict(snapshot)
+        for stage in PIPELINE_STAGES:
+            stage_status = status.get(stage)
+            if not stage_status or not stage_status.get('inProgress'):
+                continue
+            progress = self.get_pipeline_progress(stage)
+            if progress is not None:
+                stage_status = dict(stage_status)
+                stage_status['eta'] = progress.current_eta
+                stage_status['ahead'] = progress.ahead
+                status[stage] = stage_status
+
+        status['now'] = datetime.datetime.utcnow().isoformat()
+        status['version'] = self.pipeline_status_version
+        return status
+
+    def get_pipeline_state(self):
+        if self.pipeline_status is None:
+            _, state = self.refresh_pipeline_status()
+            return state
+        return self.pipeline_state
+
+    def pipeline_status_changed(self, version):
+        return version is None or version != self.pipeline_status_version
+
+
+def _has_changes(obj, attributes):
+    state = sa.inspect(obj)
+    return any(state.attrs[attribute].history.has_changes() for attribute in attributes)
+
+
+def _loaded_value(obj, attribute):
+    # Deleted rows can't be loaded again, so only read what the session has
+    return sa.inspect(obj).dict.get(attribute)
+
+
+@sa.event.listens_for(sa.orm.Session, 'after_flush')
+def pipeline_status_after_flush(session, flush_context):
+    from app.modules.annotations.models import Annotation
+    from app.modules.progress.models import Progress
+    from app.modules.sightings.models import Sighting
+
+    changes = {}
+
+    def changed(class_name, guid):
+        if guid is not None:
+            changes.setdefault(class_name, set()).add(guid)
+
+    for obj in itertools.chain(session.new, session.deleted):
+        if isinstance(obj, Annotation):
+            # The number of annotations on the asset changed, the snapshots
+            # refer to the assets and not to their annotations
+            changed('Asset', _loaded_value(obj, 'asset_guid'))
+        elif isinstance(obj, Progress):
+            # The steps of the parent changed
+            changed('Progress', _loaded_value(obj, 'parent_guid'))
+        elif isinstance(obj, Sighting) and obj in session.deleted:
+            # The row is gone, so it can't be joined to its asset group sighting
+            changed(
+                'AssetGroupSighting', _loaded_value(obj, 'asset_group_sighting_guid')
+            )
+
+    for obj in itertools.chain(session.new, session.dirty):
+        if isinstance(obj, Progress):
+            attributes = PROGRESS_STATUS_ATTRIBUTES
+        else:
+            attributes = getattr(obj, 'PIPELINE_STATUS_ATTRIBUTES', None)
+            if not attributes:
+                continue
+        if obj in session.new or _has_changes(obj, attributes):
+            changed(obj.__class__.__name__, obj.guid)
+
+    if not changes:
+        return
+
+    for cls in _pipeline_status_models():
+        criteria = cls.pipeline_status_stale_criteria(changes)
+        if criteria is None:
+            continue
+        table = cls.__table__
+        session.execute(
+            table.update()
+            .where(criteria)
+            .values(
+                pipeline_status=sa.null(),
+                pipeline_state=sa.null(),
+                pipeline_status_version=table.c.pipeline_status_version + 1,
+            )
+        )
+
+
+def _pipeline_status_models():
+    models = []
+    pending = list(PipelineStatusMixin.__subclasses__())
+    while pending:
+        cls = pending.pop(0)
+        if hasattr(cls, '__table__'):
+            models.append(cls)
+        pending.extend(cls.__subclasses__())
+    return models
@@ -9,6 +9,7 @@ import logging
 import uuid
 from http import HTTPStatus
 
+import sqlalchemy as sa
 from flask import current_app, url_for
 
 import app.extensions.logging as AuditLog
@@ -16,6 +17,7 @@ from app.extensions import CustomFieldMixin, ExportMixin, HoustonModel, db
 from app.modules.annotations.models import Annotation
 from app.modules.encounters.models import Encounter
 from app.modules.individuals.models import Individual
+from app.modules.progress.pipeline import PipelineStatusMixin
 from app.utils import HoustonException
 
 log = logging.getLogger(__name__)  # pylint: disable=invalid-name
@@ -61,11 +63,19 @@ class SightingMatchState(str, enum.Enum):
     unidentifiable = 'unidentifiable'
 
 
-class Sighting(db.Model, HoustonModel, CustomFieldMixin, ExportMixin):
+class Sighting(
+    db.Model, HoustonModel, CustomFieldMixin, ExportMixin, PipelineStatusMixin
+):
     """
     Sightings database model.
     """
 
+    PIPELINE_STATUS_ATTRIBUTES = (
+        'stage',
+        'asset_group_sighting_guid',
+        'progress_identification_guid',
+    )
+
     guid = db.Column(
         db.GUID, default=uuid.uuid4, primary_key=True
     )  # pylint: disable=invalid-name
@@ -167,6 +177,9 @@ class Sighting(db.Model, HoustonModel, CustomFieldMixin, ExportMixin):
         data['comments'] = self.comments
         return data
 
+    def get_export_related(self):
+        return list(self.get_encounters())
+
     @classmethod
     def get_elasticsearch_schema(cls):
         from app.modules.sightings.schemas import ElasticsearchSightingSchema
@@ -235,38 +248,40 @@ class Sighting(db.Model, HoustonModel, CustomFieldMixin, ExportMixin):
         )
 
     @classmethod
-    def run_integrity(cls):
+    def run_integrity(cls, since=None):
+        """
+        Check sightings, or only those updated since ``since``.
+        """
         result = {
             'no_encounters': [],
             'failed_sightings': [],
             'jobless_identifying_sightings': [],
         }
 
+        query = db.session.query(Sighting.guid)
+        if since is not None:
+            query = query.filter(Sighting.updated >= since)
+
         # Sightings without encounters are an error that should never really happen
         result['no_encounters'] = [
-            sight.guid
-            for sight in Sighting.query.filter(~Sighting.encounters.any()).all()
+            guid for (guid,) in query.filter(~Sighting.encounters.any())
         ]
 
         # As are failed sightings
         result['failed_sightings'] = [
-            sight.guid
-            for sight in (
-                db.session.query(Sighting).filter(Sighting.stage == SightingStage.failed)
-            ).all()
+            guid for (guid,) in query.filter(Sighting.stage == SightingStage.failed)
         ]
 
         # any sighting that has been identifying for over an hour looks suspicious. The only fault we know of at
         # the moment is if there are no jobs,
         an_hour_ago = datetime.datetime.utcnow() - datetime.timedelta(hours=1)
         result['jobless_identifying_sightings'] = [
-            sight.guid
-            for sight in (
-                db.session.query(Sighting)
-                .filter(Sighting.stage == SightingStage.identification)
+            guid
+            for (guid,) in (
+                query.filter(Sighting.stage == SightingStage.identification)
                 .filter(Sighting.created < an_hour_ago)
                 .filter(Sighting.jobs.is_(None))
-            ).all()
+            )
         ]
 
         return result
@@ -646,18 +661,33 @@ class Sighting(db.Model, HoustonModel, CustomFieldMixin, ExportMixin):
     def is_migrated_data(self):
         return self.asset_group_sighting_guid is None
 
-    # returns the furthest pipeline got that is not complete
-    def get_pipeline_state(self):
-        status = self.get_pipeline_status()
-        for st in ['preparation', 'detection', 'curation', 'identification']:
-            if not (
-                status[st].get('complete', False) or status[st].get('skipped', False)
-            ):
-                return st
+    def get_pipeline_progress(self, stage):
+        if stage == 'identification':
+            return self.progress_identification
+        if self.asset_group_sighting:
+            return self.asset_group_sighting.get_pipeline_progress(stage)
         return None
 
-    def get_pipeline_status(self):
-        db.session.refresh(self)
+    @classmethod
+    def pipeline_status_stale_criteria(cls, changes):
+        from app.modules.asset_groups.models import AssetGroupSighting
+
+        criteria = []
+        if changes.get('Progress'):
+            criteria.append(cls.progress_identification_guid.in_(changes['Progress']))
+        if changes.get('Sighting'):
+            criteria.append(cls.guid.in_(changes['Sighting']))
+        # the first three stages are those of the asset group sighting
+        ags_criteria = AssetGroupSighting.pipeline_status_stale_criteria(changes)
+        if ags_criteria is not None:
+            criteria.append(
+                cls.asset_group_sighting_guid.in_(
+                    sa.select([AssetGroupSighting.guid]).where(ags_criteria)
+                )
+            )
+        return sa.or_(*criteria) if criteria else None
+
+    def compute_pipeline_status(self):
         status = {
             'preparation': self._get_pipeline_status_preparation(),
             'detection': self._get_pipeline_status_detection(),
@@ -493,6 +493,38 @@ class SightingIdResult(Resource):
             abort(ex.status_code, ex.message, errorFields=ex.get_val('error', 'Error'))
 
 
+@api.route('/<uuid:sighting_guid>/pipeline_status')
+@api.login_required(oauth_scopes=['sightings:read'])
+@api.response(
+    code=HTTPStatus.NOT_FOUND,
+    description='Sighting not found.',
+)
+@api.resolve_object_by_model(Sighting, 'sighting')
+class SightingPipelineStatus(Resource):
+    """
+    The pipeline status of a Sighting, for polling
+    """
+
+    @api.permission_required(
+        permissions.ObjectAccessPermission,
+        kwargs_on_request=lambda kwargs: {
+            'obj': kwargs['sighting'],
+            'action': AccessOperation.READ,
+        },
+    )
+    def get(self, sighting):
+        """
+        Get the pipeline status of a Sighting.
+
+        Pass the ``version`` of the last status read to get a 304 response
+        if it has not changed since.
+        """
+        version = request.args.get('version', type=int)
+        if not sighting.pipeline_status_changed(version):
+            return make_response('', HTTPStatus.NOT_MODIFIED)
+        return sighting.get_pipeline_status()
+
+
 @api.route('/<uuid:sighting_guid>/annotations/src/<uuid:annotation_guid>')
 @api.login_required(oauth_scopes=['sightings:read'])
 @api.response(
@@ -178,11 +178,11 @@ class SiteSettingModules(object):
             SocialGroup.validate_roles(value)
 
     @classmethod
-    def update_social_group_roles(cls, value=None):
+    def update_social_group_roles(cls, value=None, previous=None):
         if is_module_enabled('social_groups'):
             from app.modules.social_groups.models import SocialGroup
 
-            SocialGroup.site_settings_updated()
+            SocialGroup.site_settings_updated(value, previous)
 
     @classmethod
     def validate_relationship_type_roles(cls, value):
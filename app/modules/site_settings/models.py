@@ -282,6 +282,8 @@ class SiteSetting(db.Model, Timestamp):
             'public': True,
             'validate_function': SiteSettingModules.validate_social_group_roles,
             'update_function': SiteSettingModules.update_social_group_roles,
+            # update_function is also passed the value it replaced
+            'update_with_previous': True,
         },
         'relationship_type_roles': {
             'type': dict,
@@ -568,6 +570,9 @@ class SiteSetting(db.Model, Timestamp):
 
         if key_data.get('read_only', False) and not override_readonly:
             raise ValueError(f'read-only key {key}')
+        previous = None
+        if key_data.get('update_with_previous', False):
+            previous = cls.get_value(key)
         if 'set_function' in key_data:
             key_data['set_function'](key, value)
             setting = cls.query.get(key)
@@ -575,7 +580,10 @@ class SiteSetting(db.Model, Timestamp):
             setting = cls.set_after_validation(key, value)
 
         if 'update_function' in key_data:
-            key_data['update_function'](value)
+            if key_data.get('update_with_previous', False):
+                key_data['update_function'](value, previous)
+            else:
+                key_data['update_function'](value)
 
         return setting
 
@@ -590,11 +598,15 @@ class SiteSetting(db.Model, Timestamp):
 
         setting = cls.query.get(key)
         if setting:
+            previous = setting.get_val()
             with db.session.begin(subtransactions=True):
                 db.session.delete(setting)
 
             if 'update_function' in key_data:
-                key_data['update_function']()
+                if key_data.get('update_with_previous', False):
+                    key_data['update_function'](None, previous)
+                else:
+                    key_data['update_function']()
 
     @classmethod
     def get_value(cls, key, default=None, **kwargs):
@@ -74,7 +74,7 @@ class MainDataBlock(Resource):
             abort(ex.status_code, ex.message)
 
         message = f'Setting block data to {data}'
-        AuditLog.audit_log(log, message, duration=timer.elapsed())
+        AuditLog.audit_log(log, message, duration=timer.elapsed(), synchronous=True)
         return {}
 
     @api.login_required(oauth_scopes=['site-settings:write'])
@@ -104,7 +104,7 @@ class MainDataBlock(Resource):
                 abort(400, f'op {arg["op"]} not supported on {arg["path"]}')
 
         message = f'Patching path: {request_in_}'
-        AuditLog.audit_log(log, message, duration=timer.elapsed())
+        AuditLog.audit_log(log, message, duration=timer.elapsed(), synchronous=True)
         return {}
 
 
@@ -156,7 +156,9 @@ class MainDataByPath(Resource):
                     else:
                         site_setting = SiteSetting.set_key_value(path, data['value'])
                         message = f'Setting path: {path} to {data}'
-                    AuditLog.audit_log(log, message, duration=timer.elapsed())
+                    AuditLog.audit_log(
+                        log, message, duration=timer.elapsed(), synchronous=True
+                    )
                     return site_setting
                 else:
                     SiteSetting.forget_key_value(path)
@@ -177,7 +179,7 @@ class MainDataByPath(Resource):
     @api.login_required(oauth_scopes=['site-settings:write'])
     @api.response(code=HTTPStatus.NO_CONTENT)
     def delete(self, path):
-        AuditLog.audit_log(log, f'Deleting {path}')
+        AuditLog.audit_log(log, f'Deleting {path}', synchronous=True)
         try:
             SiteSetting.forget_key_value(path)
         except HoustonException as ex:
@@ -4,9 +4,13 @@ Social Groups database models
 --------------------
 """
 
+import datetime
 import logging
 import uuid
 
+import sqlalchemy as sa
+from flask import current_app
+
 import app.extensions.logging as AuditLog
 from app.extensions import HoustonModel, db
 from app.utils import HoustonException
@@ -99,47 +103,166 @@ class SocialGroup(db.Model, HoustonModel):
         return role_data[0]
 
     @classmethod
-    def site_settings_updated(cls):
+    def site_settings_updated(cls, roles=None, previous_roles=None, foreground=None):
+        """
+        Revalidate member roles after the social_group_roles setting changed
+        from ``previous_roles`` to ``roles``.  Only roles that were removed,
+        or that can no longer be held by multiple members of a group, need
+        checking, in a Celery task unless ``foreground``.  Returns the
+        Progress of the revalidation, or None if there was nothing to check.
+        """
+        from app.modules.progress.models import Progress
+
+        from .tasks import revalidate_social_group_roles
+
+        roles = {role['guid']: role for role in roles or []}
+        previous_roles = {role['guid']: role for role in previous_roles or []}
+        removed_role_guids = sorted(set(previous_roles) - set(roles))
+        singular_role_guids = sorted(
+            guid
+            for guid, role in roles.items()
+            if not role['multipleInGroup']
+            and previous_roles.get(guid, {}).get('multipleInGroup', True)
+        )
+        if not removed_role_guids and not singular_role_guids:
+            return None
+
+        if foreground is None:
+            foreground = current_app.testing
+
+        progress = Progress(description='Social group role revalidation')
+        with db.session.begin(subtransactions=True):
+            db.session.add(progress)
+
+        if foreground:
+            cls.run_role_revalidation(
+                removed_role_guids, singular_role_guids, progress=progress
+            )
+        else:
+            promise = revalidate_social_group_roles.delay(
+                removed_role_guids, singular_role_guids, str(progress.guid)
+            )
+            with db.session.begin(subtransactions=True):
+                progress.celery_guid = uuid.UUID(promise.id)
+                db.session.merge(progress)
+        return progress
+
+    @classmethod
+    def run_role_revalidation(
+        cls, removed_role_guids, singular_role_guids, progress=None
+    ):
         from app.modules.site_settings.models import SiteSetting
 
-        permitted_role_data = SiteSetting.get_value('social_group_roles')
-        all_groups = SocialGroup.query.all()
-        for group in all_groups:
-            current_roles_singular = {}
-            for member in group.members:
-                if not member.roles:
-                    continue
-                if not permitted_role_data:
-                    member.roles = None
-                    with db.session.begin(subtransactions=True):
-                        db.session.merge(member)
-                    continue
-
-                for role in member.roles:
-                    role_data = cls.get_role_data(role)
-                    if not role_data:
-                        # That role not supported anymore
-                        msg = f"member {member.individual_guid} lost role {role} as it's no longer supported"
-                        AuditLog.audit_log_object(log, group, msg)
-                        member.roles.remove(role)
-
-                        # Ensure it's written to the DB
-                        member.roles = member.roles
-                        with db.session.begin(subtransactions=True):
-                            db.session.merge(member)
-                        continue
-
-                    # if a role is now only singular in the group and we have multiple, all we can do is audit it
-                    if role_data['multipleInGroup']:
-                        if current_roles_singular.get(role):
-                            current_roles_singular[role] = False
-                        else:
-                            current_roles_singular[role] = True
-
-                for role in current_roles_singular:
-                    if not current_roles_singular[role]:
-                        msg = f"WARNING: multiple members with {role}. Can't guess which to remove"
-                        AuditLog.audit_log_object(log, group, msg)
+        try:
+            member_roles = cls.get_members_with_roles(
+                removed_role_guids + singular_role_guids
+            )
+            # Members left without any roles have none if no roles are supported
+            empty_roles = [] if SiteSetting.get_value('social_group_roles') else None
+
+            updates = []
+            messages = {}
+            holders = {}
+            for group_guid, individual_guid, roles in member_roles:
+                lost = [role for role in roles if role in removed_role_guids]
+                if lost:
+                    remaining = [role for role in roles if role not in lost]
+                    updates.append(
+                        {
+                            'b_group_guid': group_guid,
+                            'b_individual_guid': individual_guid,
+                            'b_roles': remaining or empty_roles,
+                        }
+                    )
+                    messages.setdefault(group_guid, []).extend(
+                        f"member {individual_guid} lost role {role} as it's no longer supported"
+                        for role in lost
+                    )
+                for role in roles:
+                    if role in singular_role_guids:
+                        holders.setdefault((group_guid, role), 0)
+                        holders[(group_guid, role)] += 1
+
+            # if a role is now only singular in the group and we have multiple, all we can do is audit it
+            for (group_guid, role), count in holders.items():
+                if count > 1:
+                    messages.setdefault(group_guid, []).append(
+                        f"WARNING: multiple members with {role}. Can't guess which to remove"
+                    )
+
+            changed_group_guids = {update['b_group_guid'] for update in updates}
+            with db.session.begin(subtransactions=True):
+                cls._update_member_roles(updates)
+                if messages:
+                    groups = cls.query.filter(cls.guid.in_(messages.keys())).all()
+                    for group in groups:
+                        msg = '; '.join(messages[group.guid])
+                        AuditLog.audit_log_object(log, group, msg, synchronous=True)
+                        if group.guid in changed_group_guids:
+                            # So the group is reindexed with the new roles
+                            group.updated = datetime.datetime.utcnow()
+        except Exception as ex:
+            log.exception('Social group role revalidation failed')
+            if progress is not None:
+                progress.fail(str(ex))
+            raise
+
+        if progress is not None:
+            progress.set(100)
+        return len(updates)
+
+    @classmethod
+    def get_members_with_roles(cls, role_guids):
+        """
+        The (group_guid, individual_guid, roles) of every member holding one
+        of ``role_guids``, in one query
+        """
+        if not role_guids:
+            return []
+        roles_text = sa.cast(SocialGroupIndividualMembership.roles, sa.Text)
+        rows = (
+            SocialGroupIndividualMembership.query.with_entities(
+                SocialGroupIndividualMembership.group_guid,
+                SocialGroupIndividualMembership.individual_guid,
+                SocialGroupIndividualMembership.roles,
+            )
+            .filter(sa.or_(*[roles_text.contains(guid) for guid in role_guids]))
+            .all()
+        )
+        # The text match is only a prefilter, check the roles themselves
+        return [
+            (group_guid, individual_guid, roles)
+            for group_guid, individual_guid, roles in rows
+            if roles and set(roles) & set(role_guids)
+        ]
+
+    @classmethod
+    def _update_member_roles(cls, updates):
+        if not updates:
+            return
+        membership = SocialGroupIndividualMembership
+        table = membership.__table__
+        db.session.execute(
+            table.update()
+            .where(
+                sa.and_(
+                    table.c.group_guid == sa.bindparam('b_group_guid'),
+                    table.c.individual_guid == sa.bindparam('b_individual_guid'),
+                )
+            )
+            .values(roles=sa.bindparam('b_roles'), updated=datetime.datetime.utcnow()),
+            updates,
+        )
+
+        # Members already loaded in the session must read the new roles
+        updated = {
+            (update['b_group_guid'], update['b_individual_guid']) for update in updates
+        }
+        for obj in list(db.session.identity_map.values()):
+            if isinstance(obj, membership) and (
+                (obj.group_guid, obj.individual_guid) in updated
+            ):
+                db.session.expire(obj, ['roles', 'updated'])
 
     # This is for validating te site settings social group roles format, not the roles of an individual social group
     @classmethod
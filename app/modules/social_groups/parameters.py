@@ -90,5 +90,5 @@ class PatchSocialGroupDetailsParameters(PatchJSONParameters):
             for member in members:
                 ret_val = obj.remove_member(member)
             msg = f'Removing members {members}'
-            AuditLog.audit_log_object(log, obj, msg)
+            AuditLog.audit_log_object(log, obj, msg, synchronous=True)
         return ret_val
@@ -228,7 +228,7 @@ class SocialGroupByID(Resource):
             except HoustonException as ex:
                 abort(ex.status_code, ex.message)
             db.session.merge(social_group)
-        AuditLog.patch_object(log, social_group, args)
+        AuditLog.patch_object(log, social_group, args, synchronous=True)
         return social_group
 
     @api.permission_required(
@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+import logging
+
+from app.extensions.celery import celery
+
+log = logging.getLogger(__name__)
+
+
+@celery.task
+def revalidate_social_group_roles(removed_role_guids, singular_role_guids, progress_guid):
+    from app.modules.progress.models import Progress
+
+    from .models import SocialGroup
+
+    progress = Progress.query.get(progress_guid)
+    SocialGroup.run_role_revalidation(
+        removed_role_guids, singular_role_guids, progress=progress
+    )
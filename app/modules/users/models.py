@@ -7,8 +7,10 @@ import enum
 import logging
 import uuid
 
+import sqlalchemy as sa
 from flask import url_for
 from flask_login import current_user  # NOQA
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy_utils import types as column_types
 
 import app.extensions.logging as AuditLog
@@ -266,24 +268,29 @@ class User(db.Model, HoustonModel):
         return UserListSchema
 
     @classmethod
-    def get_admins(cls):
-        # used for first run admin creation
-        users = cls.query.all()  # NOQA
+    def static_role_criterion(cls, role):
+        # Matches the predicate of the partial role indexes on the user table,
+        # created in migration 6f2a9c4e8b13 and excluded from autogenerate in
+        # migrations/env.py
+        return cls.static_roles.op('&')(role.mask) != 0
 
-        admin_users = []
-        for user in users:
+    @classmethod
+    def _get_admins_query(cls):
+        return cls.query.filter(
+            cls.static_role_criterion(cls.StaticRoles.ADMIN),
             # TODO: Remove the check below at a later point after default admin create is removed
-            if user.email.endswith('@localhost'):
-                continue
-            if user.is_admin:
-                admin_users.append(user)
+            sa.not_(cls.email.endswith('@localhost')),
+        )
 
-        return admin_users
+    @classmethod
+    def get_admins(cls):
+        # used for first run admin creation
+        return cls._get_admins_query().all()
 
     @classmethod
     def admin_user_initialized(cls):
         # used for first run admin creation
-        return len(cls.get_admins()) > 0
+        return db.session.query(cls._get_admins_query().exists()).scalar()
 
     @classmethod
     def ensure_user(
@@ -394,20 +401,21 @@ class User(db.Model, HoustonModel):
 
     @classmethod
     def query_search_term_hook(cls, term):
-        from sqlalchemy import String
-        from sqlalchemy_utils.functions import cast_if
+        from app.extensions.query_search import search_term_clauses
 
-        return (
-            cast_if(cls.guid, String).contains(term),
-            cls.email.contains(term),
-            cls.affiliation.contains(term),
-            cls.forum_id.contains(term),
-            cls.full_name.contains(term),
+        return search_term_clauses(
+            term,
+            guid_columns=(cls.guid,),
+            text_columns=(cls.email, cls.affiliation, cls.forum_id, cls.full_name),
         )
 
     @classmethod
     def find_by_linked_account(cls, account_key, value, id_key='id'):
-        possible = User.query.filter(User.linked_accounts.isnot(None)).all()
+        # JSONB containment is served by the GIN index on linked_accounts
+        linked_accounts = sa.cast(cls.linked_accounts, JSONB)
+        possible = cls.query.filter(
+            linked_accounts.contains({account_key: {id_key: value}})
+        ).all()
         for user in possible:
             if (
                 user.linked_accounts
@@ -799,7 +807,7 @@ class User(db.Model, HoustonModel):
                 fup.delete()
 
     def deactivate(self):
-        AuditLog.audit_log_object(log, self, 'Deactivating')
+        AuditLog.audit_log_object(log, self, 'Deactivating', synchronous=True)
         # Store email hash for potential later restoration
         # But zap all of the personal information
         self.email = self._get_hashed_email(self.email)
@@ -833,11 +841,9 @@ class User(db.Model, HoustonModel):
 
     @classmethod
     def get_deactivated_account(cls, email):
+        # Deactivated accounts keep the hash in the (indexed) email column
         hashed_email = cls._get_hashed_email(email)
-        found_users = [user for user in User.query.all() if user.email == hashed_email]
-        if found_users:
-            return found_users[0]
-        return None
+        return cls.query.filter(cls.email == hashed_email).first()
 
     @classmethod
     def initial_random_password(cls):
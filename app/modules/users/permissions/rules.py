@@ -214,6 +214,7 @@ else:
         ('Annotation', AccessOperation.DELETE): ['user_is_owner'],
         ('Collaboration', AccessOperation.READ): ['user_can_access'],
         ('Collaboration', AccessOperation.WRITE): ['user_can_access'],
+        ('ExportJob', AccessOperation.READ): ['user_is_owner'],
     }
 
 
@@ -216,7 +216,8 @@ class UserByID(Resource):
             parameters.PatchUserDetailsParameters.perform_patch(args, user)
             db.session.merge(user)
         db.session.refresh(user)
-        AuditLog.patch_object(log, user, args, duration=timer.elapsed())
+        # Roles and passwords are patched here, so not buffered
+        AuditLog.patch_object(log, user, args, duration=timer.elapsed(), synchronous=True)
         return user
 
     @api.login_required(oauth_scopes=['users:write'])
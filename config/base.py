@@ -66,6 +66,11 @@ class RedisConfig:
         conn_str = f'{proto}://{password_parts}{host}:{port}/{database}{query_string}'
         return conn_str
 
+    @property
+    def CACHE_REDIS_URL(self):
+        # Used when CACHE_TYPE is RedisCache
+        return self.REDIS_CONNECTION_STRING
+
 
 class BaseConfig(FlaskConfigOverrides, RedisConfig):
     # This class is expected to be initialized to enable the `@property`
@@ -132,9 +137,35 @@ class BaseConfig(FlaskConfigOverrides, RedisConfig):
     UPLOADS_DATABASE_PATH = str(DATA_ROOT / 'uploads')
     UPLOADS_TTL_SECONDS = 24 * 60 * 60  # 24 hours
     UPLOADS_GIT_COMMIT = False
+    # Celery queue for the git store commit and push tasks, so that they can be
+    # given dedicated workers (``celery worker -Q <queue>``), default queue if unset
+    GIT_STORE_CELERY_QUEUE = _getenv('GIT_STORE_CELERY_QUEUE')
+    # bounds on the files extracted from one uploaded zip or tar archive
+    UPLOADS_ARCHIVE_MAX_FILES = 100000
+    UPLOADS_ARCHIVE_MAX_SIZE = 64 * 1024**3
 
     FILEUPLOAD_BASE_PATH = str(DATA_ROOT / 'fileuploads')
 
+    # where background export jobs write their spreadsheets, shared by web and workers
+    EXPORT_DATABASE_PATH = str(DATA_ROOT / 'export')
+    # export files, and the export jobs that wrote them, are deleted after this long
+    EXPORT_RETENTION_DAYS = int(_getenv('EXPORT_RETENTION_DAYS', 7))
+
+    # how asset files are sent: 'send_file' streams them through Houston,
+    # 'x-accel-redirect' (nginx) or 'x-sendfile' hand them to the web server
+    ASSET_DELIVERY_MODE = _getenv('ASSET_DELIVERY_MODE', 'send_file')
+    # nginx internal location aliased to PROJECT_DATABASE_PATH
+    ASSET_ACCEL_REDIRECT_PREFIX = _getenv(
+        'ASSET_ACCEL_REDIRECT_PREFIX', '/_protected_data/'
+    )
+    # lifetime of asset files requested with their current version (?v=<etag>)
+    ASSET_CACHE_MAX_AGE = int(_getenv('ASSET_CACHE_MAX_AGE', 365 * 24 * 60 * 60))
+    # block size used when streaming asset files (and ranges of them) through Houston
+    ASSET_STREAM_BUFFER_SIZE = 64 * 1024
+    # seconds into a video of the frame its image formats are derived from
+    ASSET_VIDEO_POSTER_OFFSET = 1
+    FFMPEG_PATH = _getenv('FFMPEG_PATH', 'ffmpeg')
+
     @property
     def SQLALCHEMY_DATABASE_URI(self):
         try:
@@ -222,6 +253,20 @@ class BaseConfig(FlaskConfigOverrides, RedisConfig):
         _getenv('TUS_MAX_TIME_PER_TRANSACTION', 24 * 60 * 60)
     )
 
+    # Seconds to keep a listing's total count when requested with ``count=cached``
+    PAGINATION_COUNT_CACHE_TIMEOUT = int(_getenv('PAGINATION_COUNT_CACHE_TIMEOUT', 60))
+
+    # Seconds an access token is cached for authenticating requests, 0 disables
+    # the cache.  Revoking a token or locking out its user invalidates it.
+    # Tokens are only cached with a CACHE_TYPE shared by the workers (RedisCache)
+    OAUTH2_TOKEN_CACHE_TIMEOUT = int(_getenv('OAUTH2_TOKEN_CACHE_TIMEOUT', 30))
+
+    # Audit log records buffered in memory and written in batches by a
+    # background thread, 0 writes every record synchronously
+    AUDIT_LOG_BUFFER_SIZE = int(_getenv('AUDIT_LOG_BUFFER_SIZE', 10000))
+    AUDIT_LOG_FLUSH_BATCH_SIZE = int(_getenv('AUDIT_LOG_FLUSH_BATCH_SIZE', 500))
+    AUDIT_LOG_FLUSH_INTERVAL = float(_getenv('AUDIT_LOG_FLUSH_INTERVAL', 1.0))
+
 
 class EmailConfig(object):
     MAIL_SERVER = _getenv('MAIL_SERVER', 'smtp.gmail.com')
@@ -397,7 +442,8 @@ class ElasticsearchConfig:
     )
     ELASTICSEARCH_BLOCKING = bool(_getenv('ELASTICSEARCH_BLOCKING', False, empty_ok=True))
 
-    CACHE_TYPE = 'SimpleCache'
+    # RedisCache shares the cache between workers, see CACHE_REDIS_URL
+    CACHE_TYPE = _getenv('CACHE_TYPE', 'SimpleCache')
     CACHE_DEFAULT_TIMEOUT = 60
 
     EXECUTOR_TYPE = 'thread'
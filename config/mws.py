@@ -103,3 +103,6 @@ class TestingConfig(DevelopmentConfig):
     )
 
     MAIL_SUPPRESS_SEND = True
+
+    # Tests read audit logs straight after the request that wrote them
+    AUDIT_LOG_BUFFER_SIZE = 0
@@ -76,6 +76,20 @@ def run_migrations_online():
                 directives[:] = []
                 logger.info('No changes in schema detected.')
 
+    # the pg_trgm search indexes, and these indexes of expressions and partial
+    # indexes, are created by hand in migrations and are not declared on the
+    # models, so do not let autogenerate drop them
+    manual_indexes = {
+        'ix_user_linked_accounts',
+        'ix_user_static_roles_admin',
+    }
+
+    def include_object(object_, name, type_, reflected, compare_to):
+        if type_ == 'index' and reflected and compare_to is None:
+            name = name or ''
+            return not (name.endswith('_trgm') or name in manual_indexes)
+        return True
+
     engine = engine_from_config(
         config.get_section(config.config_ini_section),
         prefix='sqlalchemy.',
@@ -87,6 +101,7 @@ def run_migrations_online():
         connection=connection,
         target_metadata=target_metadata,
         process_revision_directives=process_revision_directives,
+        include_object=include_object,
         render_as_batch=True,
         **current_app.extensions['migrate'].configure_args,
     )
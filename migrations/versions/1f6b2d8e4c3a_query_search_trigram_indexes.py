@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""query_search trigram indexes
+
+Revision ID: 1f6b2d8e4c3a
+Revises: effd65fb089e
+Create Date: 2024-02-05 10:12:41.502113
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '1f6b2d8e4c3a'
+down_revision = 'effd65fb089e'
+
+
+# Tables listed through ``query_search`` and the columns searched by their
+# ``query_search_term_hook`` (see app/extensions/query_search.py)
+GUID_SEARCH_COLUMNS = {
+    'annotation': ['guid'],
+    'asset': ['guid'],
+    'asset_group': ['guid'],
+    'asset_group_sighting': ['guid'],
+    'audit_log': ['guid', 'item_guid'],
+    'collaboration': ['guid'],
+    'encounter': ['guid'],
+    'individual': ['guid'],
+    'keyword': ['guid'],
+    'mission': ['guid', 'owner_guid'],
+    'mission_collection': ['guid', 'owner_guid', 'mission_guid'],
+    'mission_task': ['guid', 'owner_guid', 'mission_guid'],
+    'notification': ['guid'],
+    'organization': ['guid'],
+    'project': ['guid'],
+    'relationship': ['guid'],
+    'sighting': ['guid'],
+    'social_group': ['guid'],
+    'user': ['guid'],
+}
+
+TEXT_SEARCH_COLUMNS = {
+    'audit_log': ['module_name', 'user_email', 'message', 'audit_type'],
+    'mission': ['title'],
+    'mission_collection': ['description'],
+    'mission_task': ['title'],
+    'user': ['email', 'affiliation', 'forum_id', 'full_name'],
+}
+
+
+def _index_name(table_name, column_name):
+    return 'ix_{}_{}_trgm'.format(table_name, column_name)
+
+
+def _existing_tables():
+    bind = op.get_bind()
+    return set(sa.inspect(bind).get_table_names())
+
+
+def upgrade():
+    """
+    Upgrade Semantic Description:
+        Adds pg_trgm GIN indexes so the LIKE '%term%' filters built by
+        query_search on GUID text and searchable text columns can use an index
+    """
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    tables = _existing_tables()
+    for table_name, column_names in GUID_SEARCH_COLUMNS.items():
+        if table_name not in tables:
+            continue
+        for column_name in column_names:
+            op.execute(
+                'CREATE INDEX IF NOT EXISTS {} ON "{}" USING gin ((CAST({} AS TEXT)) gin_trgm_ops)'.format(
+                    _index_name(table_name, column_name), table_name, column_name
+                )
+            )
+
+    for table_name, column_names in TEXT_SEARCH_COLUMNS.items():
+        if table_name not in tables:
+            continue
+        for column_name in column_names:
+            op.execute(
+                'CREATE INDEX IF NOT EXISTS {} ON "{}" USING gin ({} gin_trgm_ops)'.format(
+                    _index_name(table_name, column_name), table_name, column_name
+                )
+            )
+
+
+def downgrade():
+    """
+    Downgrade Semantic Description:
+        Drops the query_search trigram indexes (the pg_trgm extension is kept)
+    """
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    for search_columns in (GUID_SEARCH_COLUMNS, TEXT_SEARCH_COLUMNS):
+        for table_name, column_names in search_columns.items():
+            for column_name in column_names:
+                op.execute(
+                    'DROP INDEX IF EXISTS {}'.format(
+                        _index_name(table_name, column_name)
+                    )
+                )
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""user lookup indexes
+
+Revision ID: 6f2a9c4e8b13
+Revises: 2d7b9f4c6a18
+Create Date: 2024-03-04 14:27:09.318542
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '6f2a9c4e8b13'
+down_revision = '2d7b9f4c6a18'
+
+
+# Bit of User.StaticRoles.ADMIN in user.static_roles
+ADMIN_ROLE_MASK = 0x04000
+
+
+def upgrade():
+    """
+    Upgrade Semantic Description:
+        Adds a GIN index for the JSONB containment lookup of users by linked
+        account and a partial index of site administrators
+    """
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute(
+        'CREATE INDEX IF NOT EXISTS ix_user_linked_accounts ON "user" '
+        'USING gin ((CAST(linked_accounts AS JSONB)) jsonb_path_ops)'
+    )
+    op.execute(
+        'CREATE INDEX IF NOT EXISTS ix_user_static_roles_admin ON "user" (guid) '
+        'WHERE (static_roles & {}) != 0'.format(ADMIN_ROLE_MASK)
+    )
+
+
+def downgrade():
+    """
+    Downgrade Semantic Description:
+        Drops the linked account and site administrator indexes of users
+    """
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute('DROP INDEX IF EXISTS ix_user_static_roles_admin')
+    op.execute('DROP INDEX IF EXISTS ix_user_linked_accounts')
@@ -16,6 +16,7 @@ from tasks.app import (
     email,
     endpoints,
     fileuploads,
+    individuals,
     initial_development_data,
     job_control,
     run,
@@ -35,6 +36,7 @@ namespace = Collection(
     email,
     endpoints,
     fileuploads,
+    individuals,
     initial_development_data,
     job_control,
     audit_logs,
@@ -24,3 +24,24 @@ def get_stored_filename(context, input_filename):
     from app.utils import get_stored_filename
 
     print(get_stored_filename(input_filename))
+
+
+@app_context_task
+def reconcile_files(context):
+    """
+    Check the asset files of every git store, resuming an interrupted run
+    """
+    from app.modules.assets.models import AssetReconciliation
+
+    reconciliation = AssetReconciliation.get_or_create()
+    if reconciliation is None:
+        print('Asset file reconciliation is already running')
+        return
+    reconciliation.run()
+    print(f'Checked {reconciliation.num_git_stores} git stores')
+    print(f'Missing asset files : {reconciliation.num_missing}')
+    for guid in reconciliation.get_missing():
+        print(f'  {guid}')
+    print(f'Orphaned files      : {reconciliation.num_orphaned}')
+    for path in reconciliation.get_orphaned():
+        print(f'  {path}')
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+"""
+Application Individual management related tasks for Invoke.
+"""
+
+import uuid
+
+from tasks.utils import app_context_task
+
+
+@app_context_task(help={'guid': 'guid of a single individual to summarize'})
+def refresh_summaries(context, guid=None):
+    """
+    Recompute the summary columns (last seen, counts, featured asset) of individuals
+    """
+    from app.modules.individuals.models import Individual
+
+    guids = [uuid.UUID(guid)] if guid else None
+    total = Individual.refresh_summaries(guids)
+    print(f'Summarized {total} individuals')
@@ -2,8 +2,14 @@
 """
 Data transfer from EDM to houston Invoke.
 """
+import concurrent.futures
+import json
 import logging
+import os
+import threading
+import time
 import types
+import uuid
 
 import sqlalchemy
 import tqdm
@@ -16,11 +22,23 @@ from tasks.utils import app_context_task
 
 log = logging.getLogger(__name__)  # pylint: disable=invalid-name
 
+# Number of concurrent requests to EDM
+EDM_TRANSFER_WORKERS = 8
+
+# Number of objects fetched, applied and committed together
+EDM_TRANSFER_CHUNK_SIZE = 200
+
+EDM_TRANSFER_CHECKPOINT_FILENAME = 'edm_transfer_checkpoint.json'
+
 
 # Helper base class for syncing data from EDM
 class EDMDataSync(object):
     @classmethod
-    def edm_sync_all(cls, verbose=True, refresh=False):
+    def get_edm_model(cls):
+        return cls
+
+    @classmethod
+    def edm_sync_all(cls, verbose=True, refresh=False, workers=EDM_TRANSFER_WORKERS):
         edm_items = app.edm.get_list('{}.list'.format(cls.EDM_NAME))
 
         if verbose:
@@ -29,6 +47,15 @@ class EDMDataSync(object):
                 % (len(edm_items), cls.EDM_NAME)
             )
 
+        # Look up the local objects a chunk at a time rather than one by one
+        model = cls.get_edm_model()
+        guids = list(edm_items)
+        existing = {}
+        for start in range(0, len(guids), EDM_TRANSFER_CHUNK_SIZE):
+            chunk = guids[start : start + EDM_TRANSFER_CHUNK_SIZE]
+            for model_obj in model.query.filter(model.guid.in_(chunk)):
+                existing[model_obj.guid] = model_obj
+
         new_items = []
         stale_items = []
         for guid in tqdm.tqdm(edm_items):
@@ -36,9 +63,11 @@ class EDMDataSync(object):
             version = item_version.get('version', None)
             assert version is not None
 
-            model_obj, is_new = cls.ensure_edm_obj(guid)
-            if is_new:
-                new_items.append(model_obj)
+            model_obj = existing.get(guid)
+            if model_obj is None:
+                model_obj, is_new = cls.ensure_edm_obj(guid)
+                if is_new:
+                    new_items.append(model_obj)
 
             if model_obj.version != version or refresh:
                 stale_items.append((model_obj, version))
@@ -49,14 +78,28 @@ class EDMDataSync(object):
 
         updated_items = []
         failed_items = []
-        for model_obj, version in tqdm.tqdm(stale_items):
-            try:
-                model_obj._sync_item(model_obj.guid, version)
-                updated_items.append(model_obj)
-            except sqlalchemy.exc.IntegrityError:
-                log.exception(f'Error updating {cls.EDM_NAME} {model_obj}')
-
-                failed_items.append(model_obj)
+        flask_app = app._get_current_object()
+        # The workers share the EDM sessions, log in before submitting work
+        app.edm._ensure_initialized()
+
+        def _fetch(guid):
+            with flask_app.app_context():
+                return cls._fetch_item(guid)
+
+        # Fetch concurrently, but apply in this thread with its session
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            stale_guids = [model_obj.guid for model_obj, version in stale_items]
+            fetched = executor.map(_fetch, stale_guids)
+            for (model_obj, version), data in tqdm.tqdm(
+                zip(stale_items, fetched), total=len(stale_items)
+            ):
+                try:
+                    model_obj._process_edm_data(data, version)
+                    updated_items.append(model_obj)
+                except sqlalchemy.exc.IntegrityError:
+                    log.exception(f'Error updating {cls.EDM_NAME} {model_obj}')
+
+                    failed_items.append(model_obj)
 
         return edm_items, new_items, updated_items, failed_items
 
@@ -142,15 +185,18 @@ class EDMDataSync(object):
         else:
             log.info('Updating to found version {!r}'.format(found_version))
 
-    def _sync_item(self, guid, version):
-        response = app.edm.get_data_item(guid, '{}.data'.format(self.EDM_NAME))
-        import uuid
+    @classmethod
+    def _fetch_item(cls, guid):
+        response = app.edm.get_data_item(guid, '{}.data'.format(cls.EDM_NAME))
 
         assert response.success
         data = response.result
 
         assert uuid.UUID(data.id) == guid
+        return data
 
+    def _sync_item(self, guid, version):
+        data = self._fetch_item(guid)
         self._process_edm_data(data, version)
 
 
@@ -191,6 +237,12 @@ class UserDataSync(EDMDataSync):
     }
     # fmt: on
 
+    @classmethod
+    def get_edm_model(cls):
+        from app.modules.users.models import User
+
+        return User
+
     @classmethod
     def ensure_edm_obj(cls, guid):
         from app.modules.users.models import User
@@ -308,10 +360,222 @@ class OrganizationEDMSync(EDMDataSync):
         pass
 
 
-def transfer_data_setting():
+class RecordedEDM(object):
+    """
+    Stand-in for ``app.edm`` that answers ``get_dict()`` from a JSON file of
+    recorded responses, ``{"<tag>": {"<guid>": <response>}}``, as written by
+    ``RecordingEDM``.  Used to test and time a transfer without EDM.
+    """
+
+    def __init__(self, filepath):
+        with open(filepath) as recording:
+            self.responses = json.load(recording)
+
+    def _ensure_initialized(self):
+        pass
+
+    def get_dict(self, list_name, guid, target='default'):
+        # Not a dict, so treated like an object missing from EDM
+        return self.responses.get(list_name, {}).get(str(guid))
+
+
+class RecordingEDM(object):
+    """
+    Wraps ``app.edm`` and keeps the ``get_dict()`` responses to be saved for
+    ``RecordedEDM``.
+    """
+
+    def __init__(self, edm):
+        self.edm = edm
+        self.responses = {}
+        self._lock = threading.Lock()
+
+    def _ensure_initialized(self):
+        self.edm._ensure_initialized()
+
+    def get_dict(self, list_name, guid, target='default'):
+        response = self.edm.get_dict(list_name, guid, target=target)
+        if isinstance(response, dict):
+            with self._lock:
+                self.responses.setdefault(list_name, {})[str(guid)] = response
+        return response
+
+    def save(self, filepath):
+        with open(filepath, 'w') as recording:
+            json.dump(self.responses, recording)
+
+
+class EDMTransfer(object):
+    """
+    Copy the EDM data of one section onto the existing houston objects.
+
+    Objects are processed in GUID order, ``chunk_size`` at a time.  The EDM
+    responses for a chunk are fetched by up to ``workers`` threads while the
+    previous chunk is applied and committed in a single transaction.  After
+    each commit the last GUID is saved in the checkpoint file, so a transfer
+    that fails part way resumes after the last committed chunk.  The
+    checkpoint of a section is removed once it has completed.
+
+    With ``dry_run`` the responses are only fetched, to report throughput.
+    """
+
+    def __init__(
+        self,
+        section,
+        model,
+        tag,
+        apply_func,
+        edm=None,
+        workers=EDM_TRANSFER_WORKERS,
+        chunk_size=EDM_TRANSFER_CHUNK_SIZE,
+        checkpoint=None,
+        dry_run=False,
+    ):
+        self.section = section
+        self.model = model
+        self.tag = tag
+        self.apply_func = apply_func
+        self.edm = edm
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.checkpoint = checkpoint
+        self.dry_run = dry_run
+        self.stats = {
+            'fetched': 0,
+            'transferred': 0,
+            'missing': 0,
+            'fetch_seconds': 0.0,
+            'seconds': 0.0,
+        }
+
+    def _load_checkpoint(self):
+        if self.checkpoint is None or not os.path.exists(self.checkpoint):
+            return {}
+        with open(self.checkpoint) as checkpoint:
+            return json.load(checkpoint)
+
+    def _save_checkpoint(self, state):
+        if self.checkpoint is None:
+            return
+        checkpoints = self._load_checkpoint()
+        if state is None:
+            checkpoints.pop(self.section, None)
+        else:
+            checkpoints[self.section] = state
+        # Write and rename, so an interrupted write cannot corrupt the checkpoint
+        temp_filepath = f'{self.checkpoint}.tmp'
+        with open(temp_filepath, 'w') as checkpoint:
+            json.dump(checkpoints, checkpoint)
+        os.replace(temp_filepath, self.checkpoint)
+
+    def reset(self):
+        self._save_checkpoint(None)
+
+    def _fetch(self, flask_app, guid):
+        start = time.perf_counter()
+        with flask_app.app_context():
+            edm = self.edm if self.edm is not None else app.edm
+            response = edm.get_dict(self.tag, guid)
+        return response, time.perf_counter() - start
+
+    def _apply(self, guids, responses):
+        objs = {obj.guid: obj for obj in self.model.query.filter(self.model.guid.in_(guids))}
+        with db.session.begin():
+            for guid, response in zip(guids, responses):
+                if not isinstance(response, dict):
+                    log.warning(
+                        f'{self.section} {guid} missing from EDM: response=({response})'
+                    )
+                    self.stats['missing'] += 1
+                    continue
+                assert response.get('success', False)
+                obj = objs.get(guid)
+                if obj is None:
+                    # deleted since the transfer started
+                    continue
+                self.apply_func(obj, response['result'])
+                self.stats['transferred'] += 1
+
+        # Keep the session bounded to one chunk of objects
+        for obj in objs.values():
+            if obj in db.session:
+                db.session.expunge(obj)
+
+    def run(self):
+        start = time.perf_counter()
+        state = {} if self.dry_run else self._load_checkpoint().get(self.section, {})
+        for key in ('transferred', 'missing'):
+            self.stats[key] = state.get(key, 0)
+
+        query = db.session.query(self.model.guid).order_by(self.model.guid)
+        if state.get('last_guid') is not None:
+            log.info(f'Resuming {self.section} transfer after {state["last_guid"]}')
+            query = query.filter(self.model.guid > uuid.UUID(state['last_guid']))
+        guids = [guid for (guid,) in query]
+        chunks = [
+            guids[index : index + self.chunk_size]
+            for index in range(0, len(guids), self.chunk_size)
+        ]
+
+        print(f'{self.section} edm data transfer started')
+        flask_app = app._get_current_object()
+        # Log in before the workers share the EDM sessions
+        edm = self.edm if self.edm is not None else app.edm
+        edm._ensure_initialized()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as executor:
+
+            def _submit(chunk):
+                return [executor.submit(self._fetch, flask_app, guid) for guid in chunk]
+
+            progress = tqdm.tqdm(total=len(guids))
+            futures = _submit(chunks[0]) if chunks else []
+            for index, chunk in enumerate(chunks):
+                results = [future.result() for future in futures]
+                # Start fetching the next chunk before applying this one
+                if index + 1 < len(chunks):
+                    futures = _submit(chunks[index + 1])
+
+                responses = [response for response, elapsed in results]
+                self.stats['fetched'] += len(responses)
+                self.stats['fetch_seconds'] += sum(elapsed for response, elapsed in results)
+
+                if not self.dry_run:
+                    self._apply(chunk, responses)
+                    state = {
+                        'last_guid': str(chunk[-1]),
+                        'transferred': self.stats['transferred'],
+                        'missing': self.stats['missing'],
+                    }
+                    self._save_checkpoint(state)
+                progress.update(len(chunk))
+            progress.close()
+
+        if not self.dry_run:
+            self._save_checkpoint(None)
+        self.stats['seconds'] = time.perf_counter() - start
+        self.report()
+        return self.stats
+
+    def report(self):
+        fetched = self.stats['fetched']
+        seconds = self.stats['seconds']
+        rate = fetched / seconds if seconds > 0 else 0.0
+        latency = self.stats['fetch_seconds'] / fetched if fetched > 0 else 0.0
+        mode = ' (dry run)' if self.dry_run else ''
+        print(
+            f'{self.section} edm data transfer complete{mode}: '
+            f'fetched {fetched} in {seconds:.1f}s ({rate:.1f}/s, '
+            f'{latency * 1000.0:.0f}ms per request with {self.workers} workers), '
+            f'transferred {self.stats["transferred"]}, missing {self.stats["missing"]}'
+        )
+
+
+def transfer_data_setting(edm=None):
     from app.modules.site_settings.models import Regions, SiteSetting
 
-    response = app.edm.get_dict('configuration.data', '__bundle_setup')
+    if edm is None:
+        edm = app.edm
+    response = edm.get_dict('configuration.data', '__bundle_setup')
     assert isinstance(response, dict)
     assert response.get('success', False)
     edm_conf = response['response']['configuration']
@@ -336,205 +600,241 @@ def transfer_data_setting():
         SiteSetting.set_key_value(new_key, value)
 
 
-def transfer_data_encounter():
+def _apply_encounter_data(reg, enc, edm_data):
     import app.modules.utils as util
-    from app.modules.encounters.models import Encounter
-    from app.modules.site_settings.models import Regions, Taxonomy
+    from app.modules.site_settings.models import Taxonomy
 
-    reg = Regions()
-    encs = Encounter.query.all()
-    print('encounter edm data transfer started')
-    for enc in tqdm.tqdm(encs):
-        response = app.edm.get_dict('encounter.data_complete', enc.guid)
-        if not isinstance(response, dict):
-            log.warning(f'encounter {enc.guid} missing from EDM: response=({response})')
-            continue
-        assert response.get('success', False)
-        edm_data = response['result']
-        dlat = edm_data.get('decimalLatitude')
-        if dlat:
-            dlat = float(dlat)
-            if not util.is_valid_latitude(dlat):
-                raise ValueError(f'invalid decimalLatitude {dlat} on enc {enc.guid}')
-        enc.decimal_latitude = dlat
-        dlon = edm_data.get('decimalLongitude')
-        if dlon:
-            dlon = float(dlon)
-            if not util.is_valid_longitude(dlon):
-                raise ValueError(f'invalid decimalLongitude {dlon} on enc {enc.guid}')
-        enc.decimal_longitude = dlon
-        sex = edm_data.get('sex')
-        if sex and not util.is_valid_sex(sex):
-            raise ValueError(f'invalid sex "{sex}" on enc {enc.guid}')
-        enc.sex = sex
-        enc.verbatim_locality = edm_data.get('verbatimLocality')
-
-        loc = edm_data.get('locationId')
-        if loc:
-            found = reg.transfer_find(loc)
-            if found and found.get('id'):
-                enc.location_guid = found['id']
-            else:  # TODO handle better?
-                raise ValueError(f'unknown locationId "{loc}" on enc {enc.guid}')
+    dlat = edm_data.get('decimalLatitude')
+    if dlat:
+        dlat = float(dlat)
+        if not util.is_valid_latitude(dlat):
+            raise ValueError(f'invalid decimalLatitude {dlat} on enc {enc.guid}')
+    enc.decimal_latitude = dlat
+    dlon = edm_data.get('decimalLongitude')
+    if dlon:
+        dlon = float(dlon)
+        if not util.is_valid_longitude(dlon):
+            raise ValueError(f'invalid decimalLongitude {dlon} on enc {enc.guid}')
+    enc.decimal_longitude = dlon
+    sex = edm_data.get('sex')
+    if sex and not util.is_valid_sex(sex):
+        raise ValueError(f'invalid sex "{sex}" on enc {enc.guid}')
+    enc.sex = sex
+    enc.verbatim_locality = edm_data.get('verbatimLocality')
+
+    loc = edm_data.get('locationId')
+    if loc:
+        found = reg.transfer_find(loc)
+        if found and found.get('id'):
+            enc.location_guid = found['id']
+        else:  # TODO handle better?
+            raise ValueError(f'unknown locationId "{loc}" on enc {enc.guid}')
+
+    tx_id = edm_data.get('taxonomy')
+    if tx_id:
+        Taxonomy(tx_id)  # will raise ValueError if bad id
+        enc.taxonomy_guid = tx_id
+
+    edm_custom_fields = edm_data.get('customFields', {})
+    try:
+        enc.set_custom_field_values(edm_custom_fields)
+    except ValueError as ve:
+        if str(ve).startswith('Value "" is not valid for'):
+            log.info(f'attempting to repair: {edm_custom_fields}')
+            for key in edm_custom_fields:
+                if edm_custom_fields[key] == '':
+                    edm_custom_fields[key] = None
+            log.info(f'repaired candidate: {edm_custom_fields}')
+            enc.set_custom_field_values(edm_custom_fields)
+        else:
+            log.error(f'unrepairable fail on {edm_custom_fields} for {enc}')
+            raise ve
 
-        tx_id = edm_data.get('taxonomy')
-        if tx_id:
-            Taxonomy(tx_id)  # will raise ValueError if bad id
-            enc.taxonomy_guid = tx_id
 
-        edm_custom_fields = edm_data.get('customFields', {})
-        try:
-            enc.set_custom_field_values(edm_custom_fields)
-        except ValueError as ve:
-            if str(ve).startswith('Value "" is not valid for'):
-                log.info(f'attempting to repair: {edm_custom_fields}')
-                for key in edm_custom_fields:
-                    if edm_custom_fields[key] == '':
-                        edm_custom_fields[key] = None
-                log.info(f'repaired candidate: {edm_custom_fields}')
-                enc.set_custom_field_values(edm_custom_fields)
-            else:
-                log.error(f'unrepairable fail on {edm_custom_fields} for {enc}')
-                raise ve
-    db.session.flush()
-    print('encounter edm data transfer complete')
+def transfer_data_encounter(**kwargs):
+    from app.modules.encounters.models import Encounter
+    from app.modules.site_settings.models import Regions
 
+    reg = Regions()
+    return EDMTransfer(
+        'encounter',
+        Encounter,
+        'encounter.data_complete',
+        lambda enc, edm_data: _apply_encounter_data(reg, enc, edm_data),
+        **kwargs,
+    ).run()
 
-def transfer_data_sighting():
+
+def _apply_sighting_data(reg, sighting, edm_data):
     import app.modules.utils as util
-    from app.modules.sightings.models import Sighting
-    from app.modules.site_settings.models import Regions, Taxonomy
+    from app.modules.site_settings.models import Taxonomy
 
-    reg = Regions()
-    sightings = Sighting.query.all()
-    print('sighting edm data transfer started')
-    for sighting in tqdm.tqdm(sightings):
-        response = app.edm.get_dict('sighting.data_complete', sighting.guid)
-        if not isinstance(response, dict):
-            log.warning(
-                f'sighting {sighting.guid} missing from EDM: response=({response})'
+    dlat = edm_data.get('decimalLatitude')
+    if dlat:
+        dlat = float(dlat)
+        if not util.is_valid_latitude(dlat):
+            raise ValueError(
+                f'invalid decimalLatitude {dlat} on sighting {sighting.guid}'
             )
-            continue
-        assert response.get('success', False)
-        edm_data = response['result']
-        dlat = edm_data.get('decimalLatitude')
-        if dlat:
-            dlat = float(dlat)
-            if not util.is_valid_latitude(dlat):
-                raise ValueError(
-                    f'invalid decimalLatitude {dlat} on sighting {sighting.guid}'
-                )
-        sighting.decimal_latitude = dlat
-        dlon = edm_data.get('decimalLongitude')
-        if dlon:
-            dlon = float(dlon)
-            if not util.is_valid_longitude(dlon):
-                raise ValueError(
-                    f'invalid decimalLongitude {dlon} on sighting {sighting.guid}'
-                )
-        sighting.decimal_longitude = dlon
-        sighting.verbatim_locality = edm_data.get('verbatimLocality')
-        sighting.comments = edm_data.get('comments')
+    sighting.decimal_latitude = dlat
+    dlon = edm_data.get('decimalLongitude')
+    if dlon:
+        dlon = float(dlon)
+        if not util.is_valid_longitude(dlon):
+            raise ValueError(
+                f'invalid decimalLongitude {dlon} on sighting {sighting.guid}'
+            )
+    sighting.decimal_longitude = dlon
+    sighting.verbatim_locality = edm_data.get('verbatimLocality')
+    sighting.comments = edm_data.get('comments')
+
+    loc = edm_data.get('locationId')
+    if loc:
+        found = reg.transfer_find(loc)
+        if found and found.get('id'):
+            sighting.location_guid = found['id']
+        else:  # TODO handle better?
+            raise ValueError(f'unknown locationId "{loc}" on sighting {sighting.guid}')
+
+    txs = edm_data.get('taxonomies', [])
+    taxonomies = []
+    for tx_id in txs:
+        # will raise ValueError if bad id
+        taxonomies.append(Taxonomy(tx_id))
+    if taxonomies:
+        sighting.set_taxonomies(taxonomies)
+
+    edm_custom_fields = edm_data.get('customFields', {})
+    try:
+        sighting.set_custom_field_values(edm_custom_fields)
+    except ValueError as ve:
+        if str(ve).startswith('Value "" is not valid for'):
+            log.info(f'attempting to repair: {edm_custom_fields}')
+            for key in edm_custom_fields:
+                if edm_custom_fields[key] == '':
+                    edm_custom_fields[key] = None
+            log.info(f'repaired candidate: {edm_custom_fields}')
+            sighting.set_custom_field_values(edm_custom_fields)
+        else:
+            log.error(f'unrepairable fail on {edm_custom_fields} for {sighting}')
+            raise ve
 
-        loc = edm_data.get('locationId')
-        if loc:
-            found = reg.transfer_find(loc)
-            if found and found.get('id'):
-                sighting.location_guid = found['id']
-            else:  # TODO handle better?
-                raise ValueError(
-                    f'unknown locationId "{loc}" on sighting {sighting.guid}'
-                )
 
-        txs = edm_data.get('taxonomies', [])
-        taxonomies = []
-        for tx_id in txs:
-            # will raise ValueError if bad id
-            taxonomies.append(Taxonomy(tx_id))
-        if taxonomies:
-            sighting.set_taxonomies(taxonomies)
+def transfer_data_sighting(**kwargs):
+    from app.modules.sightings.models import Sighting
+    from app.modules.site_settings.models import Regions
 
-        edm_custom_fields = edm_data.get('customFields', {})
-        try:
-            sighting.set_custom_field_values(edm_custom_fields)
-        except ValueError as ve:
-            if str(ve).startswith('Value "" is not valid for'):
-                log.info(f'attempting to repair: {edm_custom_fields}')
-                for key in edm_custom_fields:
-                    if edm_custom_fields[key] == '':
-                        edm_custom_fields[key] = None
-                log.info(f'repaired candidate: {edm_custom_fields}')
-                sighting.set_custom_field_values(edm_custom_fields)
-            else:
-                log.error(f'unrepairable fail on {edm_custom_fields} for {sighting}')
-                raise ve
-    db.session.flush()
-    print('sighting edm data transfer complete')
+    reg = Regions()
+    return EDMTransfer(
+        'sighting',
+        Sighting,
+        'sighting.data_complete',
+        lambda sighting, edm_data: _apply_sighting_data(reg, sighting, edm_data),
+        **kwargs,
+    ).run()
 
 
-def transfer_data_individual():
+def _apply_individual_data(indiv, edm_data):
     import datetime
 
     import app.modules.utils as util
-    from app.modules.individuals.models import Individual
     from app.modules.site_settings.models import Taxonomy
 
-    indivs = Individual.query.all()
-    print('individual edm data transfer started')
-    for indiv in tqdm.tqdm(indivs):
-        response = app.edm.get_dict('individual.data_complete', indiv.guid)
-        if not isinstance(response, dict):
-            log.warning(
-                f'individual {indiv.guid} missing from EDM: response=({response})'
-            )
-            continue
-        assert response.get('success', False)
-        edm_data = response['result']
-        sex = edm_data.get('sex')
-        if sex and not util.is_valid_sex(sex):
-            raise ValueError(f'invalid sex "{sex}" on individual {indiv.guid}')
-        indiv.sex = sex
-        indiv.comments = edm_data.get(
-            'comments'
-        )  # TODO are comments staying here or customField via migration? FIXME
-
-        tx_id = edm_data.get('taxonomy')
-        if tx_id:
-            Taxonomy(tx_id)  # will raise ValueError if bad id
-            indiv.taxonomy_guid = tx_id
-
-        tob = edm_data.get('timeOfBirth')
-        if tob and tob != '0':
-            try:
-                # i am not sure if the value is in ms or sec?  FIXME
-                indiv.time_of_birth = datetime.datetime.fromtimestamp(float(tob) / 1000.0)
-            except Exception:
-                log.warning(f'could not get datetime from "{tob}"')
-        tod = edm_data.get('timeOfDeath')
-        if tod and tod != '0':
-            try:
-                indiv.time_of_death = datetime.datetime.fromtimestamp(float(tod) / 1000.0)
-            except Exception:
-                log.warning(f'could not get datetime from "{tod}"')
+    sex = edm_data.get('sex')
+    if sex and not util.is_valid_sex(sex):
+        raise ValueError(f'invalid sex "{sex}" on individual {indiv.guid}')
+    indiv.sex = sex
+    indiv.comments = edm_data.get(
+        'comments'
+    )  # TODO are comments staying here or customField via migration? FIXME
+
+    tx_id = edm_data.get('taxonomy')
+    if tx_id:
+        Taxonomy(tx_id)  # will raise ValueError if bad id
+        indiv.taxonomy_guid = tx_id
+
+    tob = edm_data.get('timeOfBirth')
+    if tob and tob != '0':
+        try:
+            # i am not sure if the value is in ms or sec?  FIXME
+            indiv.time_of_birth = datetime.datetime.fromtimestamp(float(tob) / 1000.0)
+        except Exception:
+            log.warning(f'could not get datetime from "{tob}"')
+    tod = edm_data.get('timeOfDeath')
+    if tod and tod != '0':
+        try:
+            indiv.time_of_death = datetime.datetime.fromtimestamp(float(tod) / 1000.0)
+        except Exception:
+            log.warning(f'could not get datetime from "{tod}"')
 
-        edm_custom_fields = edm_data.get('customFields', {})
-        indiv.set_custom_field_values(edm_custom_fields)
-    db.session.flush()
-    print('individual edm data transfer complete')
+    edm_custom_fields = edm_data.get('customFields', {})
+    indiv.set_custom_field_values(edm_custom_fields)
+
+
+def transfer_data_individual(**kwargs):
+    from app.modules.individuals.models import Individual
+
+    return EDMTransfer(
+        'individual',
+        Individual,
+        'individual.data_complete',
+        _apply_individual_data,
+        **kwargs,
+    ).run()
 
 
 @app_context_task(
     help={
         'section': 'setting, user, individual, encounter, sighting (note: setting MUST be run before any others will work)',
+        'workers': 'Number of concurrent requests to EDM',
+        'chunk_size': 'Number of objects committed together',
+        'checkpoint': 'Checkpoint file used to resume a transfer, defaults to one in PROJECT_DATABASE_PATH',
+        'restart': 'Ignore the checkpoint and transfer everything again',
+        'dry_run': 'Only fetch from EDM and report the throughput',
+        'recorded': 'JSON file of recorded EDM responses to use instead of EDM',
+        'record': 'JSON file to record the EDM responses to',
     }
 )
-def transfer_data(context, section=None, refresh=True):
+def transfer_data(
+    context,
+    section=None,
+    refresh=True,
+    workers=EDM_TRANSFER_WORKERS,
+    chunk_size=EDM_TRANSFER_CHUNK_SIZE,
+    checkpoint=None,
+    restart=False,
+    dry_run=False,
+    recorded=None,
+    record=None,
+):
     """
     Transfer data
+
+    Individuals, encounters and sightings are transferred in chunks and resume
+    from the checkpoint file after a failure, unless --restart is given.
     """
-    if not is_extension_enabled('edm'):
+    if recorded is None and not is_extension_enabled('edm'):
         raise RuntimeError('EDM must be enabled')
 
+    if checkpoint is None:
+        checkpoint = os.path.join(
+            app.config['PROJECT_DATABASE_PATH'], EDM_TRANSFER_CHECKPOINT_FILENAME
+        )
+
+    edm = None
+    if recorded is not None:
+        edm = RecordedEDM(recorded)
+    elif record is not None:
+        edm = RecordingEDM(app.edm)
+
+    transfer_kwargs = {
+        'edm': edm,
+        'workers': int(workers),
+        'chunk_size': int(chunk_size),
+        'checkpoint': checkpoint,
+        'dry_run': dry_run,
+    }
+
     valid_sections = ['user', 'setting', 'individual', 'encounter', 'sighting']
     if section:
         if section not in valid_sections:
@@ -550,18 +850,28 @@ def transfer_data(context, section=None, refresh=True):
         sections = valid_sections
         sections.pop(0)  # we dont want user as part of all
 
-    for sect in sections:
-        if sect == 'setting':
-            transfer_data_setting()
-        elif sect == 'individual':
-            transfer_data_individual()
-        elif sect == 'encounter':
-            transfer_data_encounter()
-        elif sect == 'sighting':
-            transfer_data_sighting()
-        elif sect == 'user':
-            UserDataSync.edm_sync_all(refresh=refresh)
-        # TODO Organisations at some point
+    if restart:
+        for sect in sections:
+            EDMTransfer(sect, None, None, None, checkpoint=checkpoint).reset()
+
+    try:
+        for sect in sections:
+            if sect == 'setting':
+                if not dry_run:
+                    transfer_data_setting(edm=edm)
+            elif sect == 'individual':
+                transfer_data_individual(**transfer_kwargs)
+            elif sect == 'encounter':
+                transfer_data_encounter(**transfer_kwargs)
+            elif sect == 'sighting':
+                transfer_data_sighting(**transfer_kwargs)
+            elif sect == 'user':
+                if not dry_run:
+                    UserDataSync.edm_sync_all(refresh=refresh, workers=int(workers))
+            # TODO Organisations at some point
+    finally:
+        if record is not None:
+            edm.save(record)
 
 
 @app_context_task()
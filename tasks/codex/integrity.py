@@ -5,7 +5,6 @@ Application AssetGroup management related tasks for Invoke.
 
 import pprint
 
-from app.extensions import db
 from tasks.utils import app_context_task
 
 
@@ -15,16 +14,19 @@ def print_result(result):
     )
 
 
-@app_context_task()
-def create_new(context):
+@app_context_task(
+    help={
+        'incremental': 'Only check what changed since the last completed run',
+    }
+)
+def create_new(context, incremental=False):
     """
     Create new integity check.
     """
     from app.modules.integrity.models import Integrity
 
-    integ = Integrity()
-    with db.session.begin():
-        db.session.add(integ)
+    integ = Integrity.create(incremental=incremental)
+    integ.start(foreground=True)
     print_result(integ)
 
 
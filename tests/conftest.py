@@ -255,6 +255,7 @@ def flask_app(gitlab_remote_login_pat, disable_elasticsearch):
         )
         config_override['UPLOADS_DATABASE_PATH'] = str(pathlib.Path(td) / 'uploads')
         config_override['FILEUPLOAD_BASE_PATH'] = str(pathlib.Path(td) / 'fileuploads')
+        config_override['EXPORT_DATABASE_PATH'] = str(pathlib.Path(td) / 'export')
 
         # Override values that might be defined in docker-compose.override.yml
         config_override['DEFAULT_EMAIL_SERVICE_USERNAME'] = None
@@ -59,6 +59,74 @@ def test_export_api(
     export_utils.clear_files()
 
 
+@pytest.mark.skipif(
+    extension_unavailable('export') or module_unavailable('sightings'),
+    reason='Export extension disabled, or Sighting module is disabled',
+)
+def test_export_job_api(
+    flask_app,
+    flask_app_client,
+    researcher_1,
+    researcher_2,
+    test_root,
+    request,
+    db,
+):
+    from app.extensions.export.models import ExportJob
+    from app.modules.sightings.models import Sighting
+
+    uuids = sighting_utils.create_sighting(
+        flask_app_client,
+        researcher_1,
+        request,
+        test_root,
+    )
+    sighting_guid = uuids['sighting']
+    sighting = Sighting.query.get(sighting_guid)
+    sighting.index()
+    wait_for_elasticsearch_status(flask_app_client, researcher_1)
+
+    query = {'term': {'guid': sighting_guid}}
+    resp = export_utils.create_export_job(
+        flask_app_client,
+        researcher_1,
+        {'export_class': 'Sighting', 'search': query},
+    )
+    export_job_guid = resp.json['guid']
+    request.addfinalizer(lambda: ExportJob.query.get(export_job_guid).delete())
+
+    # Jobs run in the foreground while testing
+    resp = export_utils.read_export_job(flask_app_client, researcher_1, export_job_guid)
+    assert resp.json['progress']['complete']
+    assert resp.json['downloadable']
+    # The encounters of the sighting are exported with it, as by the sighting export
+    assert sighting.get_encounters()
+    assert resp.json['row_count'] == 1 + len(sighting.get_encounters())
+
+    resp = export_utils.download_export_job(
+        flask_app_client, researcher_1, export_job_guid
+    )
+    assert resp.status_code == 200
+    assert resp.content_type == 'application/vnd.ms-excel'
+    assert resp.content_length > 1000
+    resp.close()
+
+    # Only the owner can see or download the job
+    export_utils.read_export_job(flask_app_client, researcher_2, export_job_guid, 403)
+    resp = export_utils.download_export_job(
+        flask_app_client, researcher_2, export_job_guid
+    )
+    assert resp.status_code == 403
+
+    # Unknown classes are rejected
+    export_utils.create_export_job(
+        flask_app_client,
+        researcher_1,
+        {'export_class': 'User', 'search': query},
+        expected_status_code=422,
+    )
+
+
 @pytest.mark.skipif(
     extension_unavailable('export') or module_unavailable('sightings'),
     reason='Export extension disabled, or Sighting module is disabled',
@@ -28,9 +28,47 @@ def export_search(
     return resp
 
 
+def create_export_job(
+    flask_app_client,
+    user,
+    data,
+    expected_status_code=200,
+    expected_error='',
+):
+    return test_utils.post_via_flask(
+        flask_app_client,
+        user,
+        'sightings:read',
+        '/api/v1/export/jobs',
+        data,
+        expected_status_code,
+        {'guid', 'progress', 'downloadable'},
+        expected_error=expected_error,
+    )
+
+
+def read_export_job(flask_app_client, user, export_job_guid, expected_status_code=200):
+    return test_utils.get_dict_via_flask(
+        flask_app_client,
+        user,
+        'sightings:read',
+        f'/api/v1/export/jobs/{export_job_guid}',
+        expected_status_code,
+        {'guid', 'progress', 'downloadable'},
+    )
+
+
+def download_export_job(flask_app_client, user, export_job_guid):
+    with flask_app_client.login(user, auth_scopes=('sightings:read',)):
+        return flask_app_client.get(f'/api/v1/export/jobs/{export_job_guid}/download')
+
+
 def clear_files():
     import glob
     import os
 
-    for f in glob.glob('/tmp/export/*/codex-export-Unknown-*.xls'):
+    from flask import current_app
+
+    export_path = current_app.config['EXPORT_DATABASE_PATH']
+    for f in glob.glob(os.path.join(export_path, '*', 'codex-export-Unknown-*.xls')):
         os.remove(f)
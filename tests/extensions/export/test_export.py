@@ -136,3 +136,54 @@ def test_export_misc(
     assert saved_name == fname
     assert os.path.exists(export.filepath)
     os.remove(export.filepath)
+
+
+@pytest.mark.skipif(extension_unavailable('export'), reason='Export extension disabled')
+def test_export_cleanup(flask_app, researcher_1, db, request):
+    import datetime
+    import os
+    import time
+
+    from app.extensions.export.models import ExportJob
+
+    job = ExportJob.create('Sighting', {}, researcher_1)
+    job_guid = job.guid
+
+    def cleanup():
+        remaining = ExportJob.query.get(job_guid)
+        if remaining is not None:
+            remaining.delete()
+        for path in filepaths.values():
+            if os.path.exists(path):
+                os.remove(path)
+
+    filepaths = {}
+    request.addfinalizer(cleanup)
+    retention = ExportJob.get_retention()
+    assert job.expires == job.created + retention
+
+    user_dir = os.path.join(
+        flask_app.config['EXPORT_DATABASE_PATH'], str(researcher_1.guid)
+    )
+    os.makedirs(user_dir, exist_ok=True)
+    old = time.time() - retention.total_seconds() - 60
+    for name in ('job', 'old', 'new'):
+        filepaths[name] = os.path.join(user_dir, f'test-export-cleanup-{name}.xls')
+        with open(filepaths[name], 'w') as export_file:
+            export_file.write(name)
+        if name != 'new':
+            os.utime(filepaths[name], (old, old))
+
+    expired = datetime.datetime.utcnow() - retention - datetime.timedelta(minutes=1)
+    with db.session.begin():
+        job.filename = os.path.basename(filepaths['job'])
+        job.created = expired
+
+    deleted = ExportJob.cleanup()
+    assert deleted['export_job'] >= 1
+    assert deleted['export_file'] >= 1
+    assert ExportJob.query.filter_by(guid=job_guid).count() == 0
+    assert not os.path.exists(filepaths['job'])
+    assert not os.path.exists(filepaths['old'])
+    # Files within the retention period are kept
+    assert os.path.exists(filepaths['new'])
@@ -1,9 +1,20 @@
 # -*- coding: utf-8 -*-
 import datetime
+import json
 import re
 from unittest import mock
 
-from app.extensions.prometheus import _update_celery, _update_info, _update_logins, init
+from app.extensions.prometheus import (
+    _attach_flask_callbacks,
+    _sample_celery,
+    _update_celery,
+    _update_info,
+    _update_logins,
+    _update_models,
+    init,
+    outbound_timer,
+    update_auth_cleanup,
+)
 
 
 def test_update_info(request):
@@ -19,32 +30,30 @@ def test_update_info(request):
     # assert re.match('[0-9a-f.]+$', info_dict['git_revision'])
 
 
-def test_update_logins(request):
+def test_update_models(flask_app, db, request):
+    from app.extensions.prometheus import REGISTERED_MODELS
+
+    models_patch = mock.patch('app.extensions.prometheus.models')
+    models = models_patch.start()
+    request.addfinalizer(models_patch.stop)
+
+    _update_models()
+
+    cls_strs = [call[1]['cls'] for call in models.labels.call_args_list]
+    assert sorted(cls_strs) == sorted(
+        '{}.{}'.format(cls.__module__, cls.__name__) for cls in REGISTERED_MODELS
+    )
+    for call in models.labels.return_value.set.call_args_list:
+        assert call[0][0] >= 0
+
+
+def test_update_logins(flask_app, db, request):
+    from app.modules.auth.models import OAuth2Token
+
     logins_patch = mock.patch('app.extensions.prometheus.logins')
     logins = logins_patch.start()
     request.addfinalizer(logins_patch.stop)
 
-    oauth2token_patch = mock.patch('app.modules.auth.models.OAuth2Token')
-    OAuth2Token = oauth2token_patch.start()
-    request.addfinalizer(oauth2token_patch.stop)
-
-    now = datetime.datetime.utcnow()
-    datetime_patch = mock.patch('app.extensions.prometheus.datetime.datetime')
-    datetime_patch.start().utcnow.return_value = now
-    request.addfinalizer(datetime_patch.stop)
-
-    user1 = mock.Mock(guid='153b4b7b-12b5-46d5-a1c1-1de28aad747c')
-    user2 = mock.Mock(guid='ba89f346-056c-426d-8cb9-18c9919ab852')
-    user3 = mock.Mock(guid='168cca2d-9d7f-4ce7-a343-c6ad6e5f4b4c')
-    OAuth2Token.query.all.return_value = [
-        mock.Mock(user=user1, created=now),
-        mock.Mock(user=user1, created=now - datetime.timedelta(days=3)),
-        mock.Mock(user=user1, created=now - datetime.timedelta(days=4)),
-        mock.Mock(user=user2, created=now - datetime.timedelta(days=4)),
-        mock.Mock(user=user1, created=now - datetime.timedelta(days=20)),
-        mock.Mock(user=user3, created=now - datetime.timedelta(days=400)),
-    ]
-
     logins_count = {}
 
     def logins_labels(**kwargs):
@@ -53,24 +62,32 @@ def test_update_logins(request):
 
     logins.labels.side_effect = logins_labels
 
+    # The aggregate query must agree with counting each user's latest token
+    now = datetime.datetime.utcnow()
+    latest = {}
+    for token in OAuth2Token.query.all():
+        if token.user_guid not in latest or latest[token.user_guid] < token.created:
+            latest[token.user_guid] = token.created
+
     _update_logins()
 
-    for i, (days, count) in enumerate(
-        (
-            (1, 1),  # user1's latest login
-            (7, 2),  # user1 and user2's latest login
-            (30, 2),
-            (90, 2),
-            (180, 2),
-            (365, 2),
-            (None, 3),
-        )
-    ):
-        assert logins.labels.call_args_list[i] == mock.call(days=days)
-        assert logins.labels(days=days).set.call_args_list == [mock.call(count)]
+    for days in (1, 7, 30, 90, 180, 365, None):
+        if days is None:
+            expected = len(latest)
+        else:
+            limit = now - datetime.timedelta(days=days)
+            expected = len([created for created in latest.values() if created > limit])
+        assert logins.labels(days=days).set.call_args_list == [mock.call(expected)]
 
 
 def test_update_celery(request):
+    snapshot_patch = mock.patch.dict(
+        'app.extensions.prometheus.CELERY_STATS_SNAPSHOT',
+        {'stats': None, 'timestamp': None},
+    )
+    snapshot_patch.start()
+    request.addfinalizer(snapshot_patch.stop)
+
     tasks_patch = mock.patch('app.extensions.prometheus.tasks_')
     tasks_ = tasks_patch.start()
     request.addfinalizer(tasks_patch.stop)
@@ -89,6 +106,7 @@ def test_update_celery(request):
 
     tasks_.labels.side_effect = tasks_labels
 
+    _sample_celery()
     _update_celery()
 
     assert not tasks_.labels.called
@@ -207,6 +225,11 @@ def test_update_celery(request):
         },
     }
 
+    # Updating only uses the last snapshot and does not inspect the workers
+    _update_celery()
+    assert not tasks_.labels.called
+
+    _sample_celery()
     _update_celery()
 
     for i, (function, count) in enumerate(
@@ -234,15 +257,70 @@ def test_update_celery(request):
         assert tasks_.labels(function=function).set.call_args == mock.call(count)
 
 
+def test_update_celery_without_sampler(request):
+    snapshot_patch = mock.patch.dict(
+        'app.extensions.prometheus.CELERY_STATS_SNAPSHOT',
+        {'stats': None, 'timestamp': None},
+    )
+    snapshot_patch.start()
+    request.addfinalizer(snapshot_patch.stop)
+
+    tasks_patch = mock.patch('app.extensions.prometheus.tasks_')
+    tasks_ = tasks_patch.start()
+    request.addfinalizer(tasks_patch.stop)
+
+    current_app_patch = mock.patch('flask.current_app')
+    current_app = current_app_patch.start()
+    request.addfinalizer(current_app_patch.stop)
+
+    inspect = current_app.celery.control.inspect
+    inspect.return_value.stats.return_value = {
+        'celery@2a56fc477be1': {'total': {'app.extensions.tus.tasks.tus_task_cleanup': 3}}
+    }
+
+    # Without a snapshot from a sampler thread, one sample is taken
+    _update_celery()
+    assert inspect.return_value.stats.call_count == 1
+    assert tasks_.labels(function=None).set.call_args == mock.call(3)
+
+    # Until it goes stale the snapshot is used
+    _update_celery()
+    assert inspect.return_value.stats.call_count == 1
+
+
+def test_update_auth_cleanup(request):
+    patches = {}
+    for name in ('_update_auth', 'send_update'):
+        patches[name] = mock.patch(f'app.extensions.prometheus.{name}')
+        patches[name].start()
+        request.addfinalizer(patches[name].stop)
+
+    from app.extensions import prometheus
+
+    update_auth_cleanup({'code': 2, 'oauth2_token': 5})
+
+    # The counts are sent to the process serving the metrics
+    assert prometheus.send_update.call_count == 1
+    (data,), _ = prometheus.send_update.call_args
+    samples = {
+        (name, labels.get('table')): value
+        for name, labels, value, *_ in json.loads(data)
+    }
+    assert samples[('auth_cleanup_deleted', 'code')] == 2
+    assert samples[('auth_cleanup_deleted', 'oauth2_token')] == 5
+
+
 def test_init(request):
     patches = []
     functions = {}
     for path in (
         'app.extensions.prometheus._attach_flask_callbacks',
         'app.extensions.prometheus._attach_sqlalchemy_listeners',
+        'app.extensions.prometheus._attach_sqlalchemy_timing',
         'app.extensions.prometheus._update_info',
         'app.extensions.prometheus._update_models',
         'app.extensions.prometheus._update_logins',
+        'app.extensions.prometheus._start_celery_sampler',
     ):
         patches.append(mock.patch(path))
         functions[path.rsplit('.', 1)[-1]] = patches[-1].start()
@@ -256,9 +334,73 @@ def test_init(request):
     assert functions['_attach_flask_callbacks'].call_args == mock.call(app)
     assert functions['_attach_sqlalchemy_listeners'].call_count == 1
     assert functions['_attach_sqlalchemy_listeners'].call_args == mock.call(app)
+    assert functions['_attach_sqlalchemy_timing'].call_count == 1
     assert functions['_update_info'].call_count == 1
     assert functions['_update_info'].call_args == mock.call('a', b='c')
     assert functions['_update_models'].call_count == 1
     assert functions['_update_models'].call_args == mock.call('a', b='c')
     assert functions['_update_logins'].call_count == 1
     assert functions['_update_logins'].call_args == mock.call('a', b='c')
+    assert functions['_start_celery_sampler'].call_args == mock.call(app)
+
+
+def test_request_metrics_use_url_rule():
+    import flask
+    from prometheus_client import REGISTRY
+
+    app = flask.Flask('test_request_metrics_use_url_rule')
+
+    @app.route('/prometheus-test/<int:item_id>')
+    def item(item_id):
+        return 'x' * item_id
+
+    _attach_flask_callbacks(app)
+
+    endpoint = '/prometheus-test/<int:item_id>'
+    labels = {'method': 'GET', 'endpoint': endpoint}
+
+    def value(name, labels=labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    before_count = value('request_duration_seconds_count')
+    before_size = value('response_size_bytes_sum')
+    before_unmatched = value(
+        'requests_total', {'method': 'GET', 'endpoint': '<unmatched>'}
+    )
+
+    with app.test_client() as client:
+        assert client.get('/prometheus-test/10').status_code == 200
+        assert client.get('/prometheus-test/20').status_code == 200
+        assert client.get('/prometheus-test-missing/30').status_code == 404
+
+    # Both item requests share one time series labelled by the URL rule
+    assert value('request_duration_seconds_count') == before_count + 2
+    assert value('response_size_bytes_sum') == before_size + 30
+    assert value('request_sql_queries_count') >= 2
+    assert value('requests_in_flight') == 0
+    raw_path = {'method': 'GET', 'endpoint': '/prometheus-test/10'}
+    assert REGISTRY.get_sample_value('requests_total', raw_path) is None
+    assert (
+        value('requests_total', {'method': 'GET', 'endpoint': '<unmatched>'})
+        == before_unmatched + 1
+    )
+
+
+def test_outbound_timer():
+    from prometheus_client import REGISTRY
+
+    labels = {'service': 'test', 'method': 'get', 'operation': 'engine.list'}
+    name = 'outbound_request_duration_seconds_count'
+    before = REGISTRY.get_sample_value(name, labels) or 0
+
+    with outbound_timer('test', 'GET', 'engine.list'):
+        pass
+
+    try:
+        with outbound_timer('test', 'GET', 'engine.list'):
+            raise ValueError()
+    except ValueError:
+        pass
+
+    after = REGISTRY.get_sample_value(name, labels)
+    assert after == before + 2
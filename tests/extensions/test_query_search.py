@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=missing-docstring
+import uuid
+
+import sqlalchemy
+
+
+def test_parse_search_terms():
+    from app.extensions.query_search import parse_search_terms
+
+    assert parse_search_terms(None) == []
+    assert parse_search_terms('') == []
+    assert parse_search_terms(' zebra,  stripe ') == ['zebra', 'stripe']
+
+
+def test_search_term_clauses(flask_app):
+    from app.extensions.query_search import search_term_clauses
+    from app.modules.users.models import User
+
+    guid = uuid.uuid4()
+
+    # A full GUID is an equality match on GUID columns
+    clauses = search_term_clauses(str(guid), guid_columns=(User.guid,))
+    assert len(clauses) == 1
+    assert 'CAST' not in str(clauses[0])
+    assert '=' in str(clauses[0])
+
+    # A GUID fragment is a LIKE on the text form of the GUID
+    clauses = search_term_clauses(str(guid)[-12:].upper(), guid_columns=(User.guid,))
+    assert len(clauses) == 1
+    assert 'CAST' in str(clauses[0])
+    assert 'LIKE' in str(clauses[0])
+
+    # Terms that cannot appear in a GUID skip the GUID columns
+    clauses = search_term_clauses(
+        'zebra', guid_columns=(User.guid,), text_columns=(User.full_name,)
+    )
+    assert len(clauses) == 1
+    assert 'full_name' in str(clauses[0])
+
+    clauses = search_term_clauses('zebra', guid_columns=(User.guid,))
+    assert len(clauses) == 1
+    assert isinstance(clauses[0], sqlalchemy.sql.elements.False_)
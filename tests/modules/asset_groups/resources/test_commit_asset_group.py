@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 # pylint: disable=missing-docstring
+import os
+
 import pytest
 
 import tests.modules.asset_groups.resources.utils as asset_group_utils
@@ -270,3 +272,63 @@ def test_commit_anonymous_asset_group(
         flask_app_client, None, commit_resp['encounters'][0]['guid']
     )
     annot_utils.read_annotation(flask_app_client, None, annot_guid)
+
+
+@pytest.mark.skipif(
+    module_unavailable('asset_groups'), reason='AssetGroups module disabled'
+)
+def test_commit_asset_group_archive(
+    flask_app_client, researcher_1, test_root, db, request
+):
+    # pylint: disable=invalid-name
+    import zipfile
+
+    from flask import current_app
+
+    import tests.extensions.tus.utils as tus_utils
+    from app.extensions.tus import tus_upload_dir, tus_write_file_metadata
+    from app.modules.asset_groups.models import AssetGroupSighting
+    from app.modules.sightings.models import Sighting
+    from app.utils import get_stored_filename
+
+    transaction_id = tus_utils.get_transaction_id()
+    tus_utils.cleanup_tus_dir(transaction_id)
+    request.addfinalizer(lambda: tus_utils.cleanup_tus_dir(transaction_id))
+    upload_dir = tus_upload_dir(current_app, transaction_id=transaction_id)
+    os.mkdir(upload_dir)
+
+    archive_path = os.path.join(upload_dir, get_stored_filename('photos.zip'))
+    with zipfile.ZipFile(archive_path, 'w') as archive:
+        archive.write(test_root / 'zebra.jpg', arcname='zebra.jpg')
+        archive.write(test_root / 'fluke.jpg', arcname='nested/fluke.jpg')
+    tus_write_file_metadata(archive_path, 'photos.zip', None)
+
+    # The sighting references the archive rather than the files in it
+    data = asset_group_utils.AssetGroupCreationData(transaction_id, 'photos.zip')
+    resp = asset_group_utils.create_asset_group(
+        flask_app_client, researcher_1, data.get()
+    )
+    asset_group_uuid = resp.json['guid']
+    request.addfinalizer(
+        lambda: asset_group_utils.delete_asset_group(
+            flask_app_client, researcher_1, asset_group_uuid
+        )
+    )
+    asset_group_sighting_guid = resp.json['asset_group_sightings'][0]['guid']
+
+    # The reference is expanded into the assets extracted from the archive
+    asset_group_sighting = AssetGroupSighting.query.get(asset_group_sighting_guid)
+    assert asset_group_sighting.sighting_config['assetReferences'] == [
+        'photos.zip/nested/fluke.jpg',
+        'photos.zip/zebra.jpg',
+    ]
+    assert len(asset_group_sighting.get_assets()) == 2
+
+    response = asset_group_utils.commit_asset_group_sighting(
+        flask_app_client, researcher_1, asset_group_sighting_guid
+    )
+    sighting = Sighting.query.get(response.json['guid'])
+    assert sorted(asset.path for asset in sighting.get_assets()) == [
+        'photos.zip/nested/fluke.jpg',
+        'photos.zip/zebra.jpg',
+    ]
@@ -132,39 +132,86 @@ def test_asset_group_sightings_jobs(flask_app, db, admin_user, test_root, reques
     assert ps['curation'] == curation_progress
 
     # some additional testing for coverage
-    ags1.progress_preparation.status = ProgressStatus.skipped
+    def set_status(progress, status):
+        # the stored pipeline status is invalidated when the change is flushed
+        with db.session.begin():
+            progress.status = status
+            db.session.merge(progress)
+
+    version = ps['version']
+    assert not ags1.pipeline_status_changed(version)
+    set_status(ags1.progress_preparation, ProgressStatus.skipped)
+    assert ags1.pipeline_status_changed(version)
     ps = ags1.get_pipeline_status()
+    assert ps['version'] > version
     assert ps['preparation']['skipped']
-    ags1.progress_preparation.status = ProgressStatus.failed
+    # read back from the stored snapshot
+    assert ags1.get_pipeline_status()['preparation'] == ps['preparation']
+    set_status(ags1.progress_preparation, ProgressStatus.failed)
     ps = ags1.get_pipeline_status()
     assert ps['preparation']['failed']
-    ags1.progress_preparation.status = ProgressStatus.created
+    set_status(ags1.progress_preparation, ProgressStatus.created)
     ps = ags1.get_pipeline_status()
     assert ps['preparation']['inProgress']
 
-    ags1.progress_detection.status = ProgressStatus.skipped
+    set_status(ags1.progress_detection, ProgressStatus.skipped)
     ps = ags1.get_pipeline_status()
     assert ps['detection']['skipped']
-    ags1.progress_detection.status = ProgressStatus.failed
+    set_status(ags1.progress_detection, ProgressStatus.failed)
     ps = ags1.get_pipeline_status()
     assert ps['detection']['failed']
-    ags1.progress_detection.status = ProgressStatus.created
+    set_status(ags1.progress_detection, ProgressStatus.created)
     ps = ags1.get_pipeline_status()
     assert ps['detection']['inProgress']
 
-    ags1.progress_identification = Progress(description='Test')
     with db.session.begin():
+        ags1.progress_identification = Progress(description='Test')
         db.session.add(ags1.progress_identification)
-    ags1.progress_identification.status = ProgressStatus.skipped
+        db.session.merge(ags1)
+    set_status(ags1.progress_identification, ProgressStatus.skipped)
     ps = ags1.get_pipeline_status()
     assert ps['identification']['skipped']
-    ags1.progress_identification.status = ProgressStatus.failed
+    set_status(ags1.progress_identification, ProgressStatus.failed)
     ps = ags1.get_pipeline_status()
     assert ps['identification']['failed']
-    ags1.progress_identification.status = ProgressStatus.created
+    set_status(ags1.progress_identification, ProgressStatus.created)
     ps = ags1.get_pipeline_status()
     assert ps['identification']['inProgress']
 
+    # so is adding a step to a progress
+    version = ps['version']
+    with db.session.begin():
+        step = Progress(description='Test step')
+        ags1.progress_identification.steps.append(step)
+        db.session.add(step)
+    assert ags1.pipeline_status_changed(version)
+    ps = ags1.get_pipeline_status()
+    assert ps['identification']['steps'] == 1
+
+    # and adding or removing an annotation
+    from app.modules.annotations.models import Annotation
+
+    version = ps['version']
+    num_annotations = ps['detection']['numAnnotations']
+    with db.session.begin():
+        annotation = Annotation(
+            guid=uuid.uuid4(),
+            content_guid=uuid.uuid4(),
+            asset=asset_group.assets[0],
+            ia_class='none',
+            viewpoint='test',
+            bounds={'rect': [0, 1, 2, 3]},
+        )
+        db.session.add(annotation)
+    assert ags1.pipeline_status_changed(version)
+    ps = ags1.get_pipeline_status()
+    assert ps['detection']['numAnnotations'] == num_annotations + 1
+
+    version = ps['version']
+    with db.session.begin():
+        db.session.delete(annotation)
+    assert ags1.pipeline_status_changed(version)
+
 
 @pytest.mark.skipif(
     module_unavailable('asset_groups'), reason='AssetGroups module disabled'
@@ -201,6 +248,56 @@ def test_asset_group_sightings_bulk(
             )
 
 
+@pytest.mark.skipif(
+    module_unavailable('asset_groups'), reason='AssetGroups module disabled'
+)
+def test_asset_group_push_requests(db, researcher_1, request):
+    from unittest import mock
+
+    from app.extensions.git_store import GitStore
+    from app.modules.asset_groups.models import AssetGroup
+
+    asset_group = AssetGroup(owner=researcher_1)
+    with db.session.begin():
+        db.session.add(asset_group)
+    request.addfinalizer(asset_group.delete)
+
+    asset_group.request_push()
+    asset_group.request_push()
+    db.session.refresh(asset_group)
+    requested = asset_group.push_requested
+    assert requested is not None
+
+    with mock.patch.object(
+        GitStore, 'git_push', side_effect=ValueError('offline')
+    ) as git_push:
+        assert GitStore.push_pending() == 0
+        # Both requests are pushed together
+        assert git_push.call_count == 1
+        # The failed push is not retried before its retry delay
+        assert GitStore.push_pending() == 0
+        assert git_push.call_count == 1
+
+    db.session.refresh(asset_group)
+    assert asset_group.push_requested == requested
+    assert asset_group.push_attempts == 1
+    assert asset_group.push_error == 'offline'
+    assert asset_group.push_retry_after > requested
+
+    with db.session.begin():
+        asset_group.push_retry_after = None
+        db.session.merge(asset_group)
+
+    with mock.patch.object(GitStore, 'git_push', return_value=True):
+        assert GitStore.push_pending() == 1
+
+    db.session.refresh(asset_group)
+    assert asset_group.push_requested is None
+    assert asset_group.push_attempts == 0
+    assert asset_group.push_error is None
+    assert asset_group.pushed is not None
+
+
 @pytest.mark.skipif(
     module_unavailable('asset_groups'), reason='AssetGroups module disabled'
 )
@@ -52,3 +52,70 @@ def test_create_asset_group_from_tus(flask_app, db, researcher_1, test_root):
     if os.path.exists(sub.get_absolute_path()):
         shutil.rmtree(sub.get_absolute_path())
     sub.delete()
+
+
+@pytest.mark.skipif(
+    module_unavailable('asset_groups'), reason='AssetGroups module disabled'
+)
+@pytest.mark.parametrize('archive_format', ['zip', 'gztar'])
+def test_create_asset_group_from_tus_archive(
+    flask_app, db, researcher_1, test_root, archive_format
+):
+    import tarfile
+    import zipfile
+
+    from app.extensions.tus import tus_write_file_metadata
+    from app.modules.asset_groups.models import AssetGroup
+    from app.utils import get_stored_filename
+
+    tid = tus_utils.get_transaction_id()
+    tus_utils.cleanup_tus_dir(tid)
+    transaction_dir = pathlib.Path(
+        tus_utils.tus_upload_dir(flask_app, transaction_id=tid)
+    )
+    transaction_dir.mkdir(parents=True)
+
+    archive_filename = 'photos.zip' if archive_format == 'zip' else 'photos.tar.gz'
+    archive_path = transaction_dir / get_stored_filename(archive_filename)
+    members = {
+        'zebra.jpg': 'zebra.jpg',
+        'nested/fluke.jpg': 'fluke.jpg',
+        # Neither of these is extracted
+        '../escaped.jpg': 'zebra.jpg',
+        '__MACOSX/._zebra.jpg': 'zebra.jpg',
+    }
+    if archive_format == 'zip':
+        with zipfile.ZipFile(archive_path, 'w') as archive:
+            for name, filename in members.items():
+                archive.write(test_root / filename, arcname=name)
+    else:
+        with tarfile.open(archive_path, 'w:gz') as archive:
+            for name, filename in members.items():
+                archive.add(test_root / filename, arcname=name)
+    tus_write_file_metadata(str(archive_path), archive_filename, None)
+
+    sub, _ = AssetGroup.create_from_tus('PYTEST', researcher_1, tid)
+    try:
+        local_store_path = pathlib.Path(sub.get_absolute_path())
+        assert sorted(asset.path for asset in sub.assets) == [
+            f'{archive_filename}/nested/fluke.jpg',
+            f'{archive_filename}/zebra.jpg',
+        ]
+        assert sorted(asset.filename for asset in sub.assets) == [
+            'fluke.jpg',
+            'zebra.jpg',
+        ]
+        for asset in sub.assets:
+            assert asset.mime_type == 'image/jpeg'
+            assert asset.size_bytes == asset.get_symlink().stat().st_size
+            assert asset.filesystem_xxhash64
+        # The archive itself is not kept in the store
+        uploads = local_store_path / '_uploads'
+        assert not (uploads / archive_path.name).exists()
+        assert not (local_store_path / 'escaped.jpg').exists()
+        assert not (uploads / 'escaped.jpg').exists()
+    finally:
+        tus_utils.cleanup_tus_dir(tid)
+        if os.path.exists(sub.get_absolute_path()):
+            shutil.rmtree(sub.get_absolute_path())
+        sub.delete()
@@ -46,7 +46,8 @@ def test_find_asset(
 
     asset_response = asset_utils.read_asset(flask_app_client, researcher_1, asset_guid)
     assert asset_response.json['filename'] == 'zebra.jpg'
-    assert asset_response.json['src'] == f'/api/v1/assets/src/{asset_guid}'
+    src = asset_response.json['src']
+    assert src.split('?')[0] == f'/api/v1/assets/src/{asset_guid}'
 
     src_response = None
     try:
@@ -55,11 +56,123 @@ def test_find_asset(
         )
         # Derived files are always jpegs
         assert src_response.content_type == 'image/jpeg'
+        etag, _ = src_response.get_etag()
     finally:
         # Force the server to release the file handler
         if src_response is not None:
             src_response.close()
 
+    # Once the file exists its URL is pinned to the current version
+    asset_response = asset_utils.read_asset(flask_app_client, researcher_1, asset_guid)
+    src = asset_response.json['src']
+    assert src == f'/api/v1/assets/src/{asset_guid}?v={etag}'
+    with flask_app_client.login(researcher_1, auth_scopes=('assets:read',)):
+        response = flask_app_client.get(src)
+        assert response.status_code == 200
+        assert 'immutable' in response.headers['Cache-Control']
+        response.close()
+
+
+@pytest.mark.skipif(
+    module_unavailable('asset_groups'), reason='AssetGroups module disabled'
+)
+def test_asset_src_accelerated_delivery(
+    flask_app,
+    flask_app_client,
+    researcher_1,
+    request,
+    test_root,
+    monkeypatch,
+):
+    uuids = asset_group_utils.create_simple_asset_group_uuids(
+        flask_app_client, researcher_1, request, test_root
+    )
+    asset_guid = uuids['assets'][0]
+    monkeypatch.setitem(flask_app.config, 'ASSET_DELIVERY_MODE', 'x-accel-redirect')
+
+    src_response = asset_utils.read_src_asset(flask_app_client, researcher_1, asset_guid)
+    # The file is left for nginx to send
+    assert src_response.data == b''
+    assert src_response.content_type == 'image/jpeg'
+    accel_redirect = src_response.headers['X-Accel-Redirect']
+    assert accel_redirect.startswith('/_protected_data/')
+    assert accel_redirect.endswith(f'{asset_guid}.master.jpg')
+    etag, _ = src_response.get_etag()
+    assert etag
+    assert src_response.headers['Cache-Control'] == 'private, no-cache'
+
+    with flask_app_client.login(researcher_1, auth_scopes=('assets:read',)):
+        # Unchanged files are not sent again
+        response = flask_app_client.get(
+            f'{asset_utils.SRC_PATH}{asset_guid}', headers={'If-None-Match': f'"{etag}"'}
+        )
+        assert response.status_code == 304
+        assert 'X-Accel-Redirect' not in response.headers
+
+        # Requests for the current version can be cached for good
+        response = flask_app_client.get(f'{asset_utils.SRC_PATH}{asset_guid}?v={etag}')
+        assert response.status_code == 200
+        assert 'immutable' in response.headers['Cache-Control']
+
+    monkeypatch.setitem(flask_app.config, 'ASSET_DELIVERY_MODE', 'x-sendfile')
+    src_response = asset_utils.read_src_asset(flask_app_client, researcher_1, asset_guid)
+    assert src_response.headers['X-Sendfile'].endswith(f'{asset_guid}.master.jpg')
+    assert src_response.get_etag() == (etag, False)
+
+
+@pytest.mark.skipif(
+    module_unavailable('asset_groups'), reason='AssetGroups module disabled'
+)
+def test_asset_src_range_requests(flask_app_client, researcher_1, request, test_root):
+    uuids = asset_group_utils.create_simple_asset_group_uuids(
+        flask_app_client, researcher_1, request, test_root
+    )
+    asset_guid = uuids['assets'][0]
+    src_path = f'{asset_utils.SRC_PATH}{asset_guid}'
+
+    with flask_app_client.login(researcher_1, auth_scopes=('assets:read',)):
+        response = flask_app_client.get(src_path)
+        assert response.status_code == 200
+        assert response.headers['Accept-Ranges'] == 'bytes'
+        data = response.data
+        size = len(data)
+        assert int(response.headers['Content-Length']) == size
+        etag, _ = response.get_etag()
+
+        response = flask_app_client.get(src_path, headers={'Range': 'bytes=10-19'})
+        assert response.status_code == 206
+        assert response.headers['Content-Range'] == f'bytes 10-19/{size}'
+        assert response.data == data[10:20]
+
+        response = flask_app_client.get(src_path, headers={'Range': 'bytes=-5'})
+        assert response.status_code == 206
+        assert response.data == data[-5:]
+
+        response = flask_app_client.get(src_path, headers={'Range': 'bytes=0-1,5-9'})
+        assert response.status_code == 206
+        assert response.content_type.startswith('multipart/byteranges; boundary=')
+        assert int(response.headers['Content-Length']) == len(response.data)
+        assert data[0:2] in response.data
+        assert data[5:10] in response.data
+        assert f'Content-Range: bytes 5-9/{size}'.encode() in response.data
+
+        response = flask_app_client.get(src_path, headers={'Range': f'bytes={size}-'})
+        assert response.status_code == 416
+        assert response.headers['Content-Range'] == f'bytes */{size}'
+
+        # A range of a file that has changed since is answered with the whole file
+        response = flask_app_client.get(
+            src_path, headers={'Range': 'bytes=10-19', 'If-Range': '"outdated"'}
+        )
+        assert response.status_code == 200
+        assert response.data == data
+
+        response = flask_app_client.get(
+            src_path, headers={'Range': 'bytes=10-19', 'If-Range': f'"{etag}"'}
+        )
+        assert response.status_code == 206
+        assert response.data == data[10:20]
+
 
 @pytest.mark.skipif(
     module_unavailable('asset_groups'), reason='AssetGroups module disabled'
@@ -244,6 +357,69 @@ def test_read_all_assets(
     # both of these lists should be lexical order
     asset_guids = [entry['guid'] for entry in admin_response.json]
     assert asset_guids == uuids['assets']
+    assert admin_response.headers['X-Total-Count'] == str(len(uuids['assets']))
+    assert admin_response.headers['X-Total-Count-Type'] == 'exact'
+
+
+@pytest.mark.skipif(
+    module_unavailable('asset_groups'), reason='AssetGroups module disabled'
+)
+def test_read_all_assets_keyset_pagination(
+    flask_app_client,
+    admin_user,
+    researcher_1,
+    request,
+    test_root,
+):
+    from app.modules.assets.models import Asset
+
+    Asset.query.delete()
+    uuids = asset_group_utils.create_large_asset_group_uuids(
+        flask_app_client, researcher_1, request, test_root
+    )
+    assert len(uuids['assets']) > 2
+
+    # Walk the listing two at a time following the X-Next-After cursor
+    asset_guids = []
+    response = asset_utils.read_all_assets_pagination(
+        flask_app_client, admin_user, limit=2, count='none'
+    )
+    assert response.headers['X-Total-Count-Type'] == 'none'
+    while True:
+        asset_guids += [entry['guid'] for entry in response.json]
+        after = response.headers.get('X-Next-After')
+        if after is None:
+            break
+        response = asset_utils.read_all_assets_pagination(
+            flask_app_client, admin_user, limit=2, after=after, count='none'
+        )
+    assert asset_guids == uuids['assets']
+
+    # Keyset pagination on a non-primary sort column, newest first
+    response = asset_utils.read_all_assets_pagination(
+        flask_app_client, admin_user, limit=1, sort='created', reverse=True
+    )
+    first = response.json[0]['guid']
+    response = asset_utils.read_all_assets_pagination(
+        flask_app_client,
+        admin_user,
+        limit=1,
+        sort='created',
+        reverse=True,
+        after=response.headers['X-Next-After'],
+    )
+    assert response.json[0]['guid'] != first
+
+    # A sort key without a GUID is rejected for non-primary sorts
+    asset_utils.read_all_assets_pagination(
+        flask_app_client, admin_user, 400, sort='created', after='2020-01-01T00:00:00'
+    )
+
+    # Estimated counts fall back to a cached count when no estimate is available
+    response = asset_utils.read_all_assets_pagination(
+        flask_app_client, admin_user, count='estimated'
+    )
+    assert response.headers['X-Total-Count-Type'] in ('estimated', 'cached')
 
 
 @pytest.mark.skipif(
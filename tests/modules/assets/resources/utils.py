@@ -111,7 +111,15 @@ def read_all_assets(flask_app_client, user, expected_status_code=200):
 def read_all_assets_pagination(
     flask_app_client, user, expected_status_code=200, **kwargs
 ):
-    assert set(kwargs.keys()) <= {'limit', 'offset', 'sort', 'reverse', 'reverse_after'}
+    assert set(kwargs.keys()) <= {
+        'limit',
+        'offset',
+        'sort',
+        'reverse',
+        'reverse_after',
+        'after',
+        'count',
+    }
 
     with flask_app_client.login(user, auth_scopes=('assets:read',)):
         response = flask_app_client.get(
@@ -205,3 +205,158 @@ def test_derived_images_and_rotation(test_asset_group_uuid, request):
     # The original should be still the same
     with Image.open(zebra.get_original_path()) as im:
         assert im.size == (1000, 664)
+
+
+def test_scan_git_store_assets(tmp_path):
+    from app.modules.assets.reconcile import scan_git_store_assets
+
+    present, missing, broken = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    assets_path = tmp_path / '_assets'
+    assets_path.mkdir()
+    (tmp_path / 'image.jpg').write_bytes(b'')
+    (assets_path / f'{present}.jpg').symlink_to(pathlib.Path('..') / 'image.jpg')
+    (assets_path / f'{broken}.jpg').symlink_to(pathlib.Path('..') / 'deleted.jpg')
+    (assets_path / 'orphan.jpg').write_bytes(b'')
+
+    expected = {
+        f'{present}.jpg': present,
+        f'{missing}.jpg': missing,
+        f'{broken}.jpg': broken,
+    }
+    missing_guids, orphaned = scan_git_store_assets(str(tmp_path), expected)
+    assert sorted(missing_guids) == sorted([missing, broken])
+    assert orphaned == ['orphan.jpg']
+
+    # Git stores without an asset directory have every asset missing
+    missing_guids, orphaned = scan_git_store_assets(str(tmp_path / 'none'), expected)
+    assert sorted(missing_guids) == sorted(expected.values())
+    assert orphaned == []
+
+
+@pytest.mark.skipif(
+    module_unavailable('asset_groups'), reason='AssetGroups module disabled'
+)
+def test_asset_reconciliation_resume(db, researcher_1, request, monkeypatch):
+    from app.extensions.git_store import GitStore
+    from app.modules.asset_groups.models import AssetGroup
+    from app.modules.assets import reconcile
+    from app.modules.assets.models import AssetReconciliation
+
+    # At least two chunks of one git store
+    for _ in range(2):
+        asset_group = AssetGroup(owner=researcher_1)
+        with db.session.begin():
+            db.session.add(asset_group)
+        request.addfinalizer(asset_group.delete)
+
+    scanned = []
+
+    def scan_git_store_assets(git_store_path, expected):
+        scanned.append(git_store_path)
+        return [], ['orphan.jpg']
+
+    monkeypatch.setattr(reconcile, 'scan_git_store_assets', scan_git_store_assets)
+
+    iter_reconciled_chunks = reconcile.iter_reconciled_chunks
+
+    def interrupted_chunks(*args, **kwargs):
+        chunks = iter_reconciled_chunks(*args, **kwargs)
+        yield next(chunks)
+        raise RuntimeError('interrupted')
+
+    monkeypatch.setattr(reconcile, 'iter_reconciled_chunks', interrupted_chunks)
+
+    reconciliation = AssetReconciliation.get_or_create()
+
+    def cleanup():
+        with db.session.begin():
+            db.session.delete(reconciliation)
+
+    request.addfinalizer(cleanup)
+    assert reconciliation.cursor is None
+
+    with pytest.raises(RuntimeError):
+        reconciliation.run(chunk_size=1)
+    assert len(scanned) == 1
+    assert reconciliation.cursor is not None
+    assert reconciliation.num_git_stores == 1
+    assert reconciliation.completed is None
+    cursor = reconciliation.cursor
+
+    # The next run picks up after the last git store checked
+    monkeypatch.setattr(reconcile, 'iter_reconciled_chunks', iter_reconciled_chunks)
+    resumed = AssetReconciliation.get_or_create()
+    assert resumed.guid == reconciliation.guid
+    assert resumed.cursor == cursor
+    resumed.run(chunk_size=1)
+    assert resumed.completed is not None
+
+    # Every git store was checked once
+    num_git_stores = GitStore.query.count()
+    assert len(scanned) == len(set(scanned)) == num_git_stores
+    assert resumed.num_git_stores == num_git_stores
+    assert resumed.num_orphaned == num_git_stores
+    assert len(resumed.get_orphaned()) == num_git_stores
+    assert resumed.get_missing() == []
+
+
+def test_asset_reconciliation_claim_and_prune(db, request):
+    import datetime
+
+    from app.modules.assets.models import (
+        AssetReconciliation,
+        AssetReconciliationFinding,
+    )
+
+    created = []
+
+    def cleanup():
+        with db.session.begin():
+            AssetReconciliation.query.filter(
+                AssetReconciliation.guid.in_(created)
+            ).delete(synchronize_session=False)
+
+    request.addfinalizer(cleanup)
+
+    reconciliation = AssetReconciliation.get_or_create()
+    created.append(reconciliation.guid)
+    assert reconciliation.lease_expires is not None
+
+    # Another worker can not run it while the lease is held
+    assert AssetReconciliation.get_or_create() is None
+
+    # The run of a worker that died is taken over once the lease expired
+    with db.session.begin():
+        reconciliation.lease_expires = datetime.datetime.utcnow()
+    assert AssetReconciliation.get_or_create().guid == reconciliation.guid
+
+    # Only the last completed runs are kept, with their findings
+    keep = AssetReconciliation.KEEP_COMPLETED_RUNS
+    now = datetime.datetime.utcnow()
+    with db.session.begin():
+        reconciliation.completed = now
+        reconciliation.lease_expires = None
+        for days in range(1, keep + 2):
+            run = AssetReconciliation(
+                guid=uuid.uuid4(),
+                num_git_stores=0,
+                num_missing=0,
+                num_orphaned=1,
+                completed=now - datetime.timedelta(days=days),
+            )
+            db.session.add(run)
+            created.append(run.guid)
+    oldest = created[-1]
+    with db.session.begin():
+        AssetReconciliationFinding.insert(oldest, [{'path': 'orphan.jpg'}])
+
+    AssetReconciliation.prune()
+    kept = (
+        AssetReconciliation.query.filter(AssetReconciliation.completed.isnot(None))
+        .order_by(AssetReconciliation.completed.desc())
+        .all()
+    )
+    assert len(kept) == keep
+    assert kept[0].guid == reconciliation.guid
+    assert AssetReconciliation.query.filter_by(guid=oldest).count() == 0
+    assert AssetReconciliationFinding.query.filter_by(run_guid=oldest).count() == 0
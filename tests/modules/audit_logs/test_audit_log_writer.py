@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=missing-docstring
+import uuid
+from unittest import mock
+
+
+def _record(message):
+    import datetime
+
+    now = datetime.datetime.utcnow()
+    return {
+        'guid': uuid.uuid4(),
+        'module_name': None,
+        'item_guid': None,
+        'user_email': 'anonymous user',
+        'message': message,
+        'audit_type': 'Access',
+        'duration': None,
+        'created': now,
+        'updated': now,
+        'indexed': now,
+        'viewed': now,
+    }
+
+
+def test_buffered_writer(flask_app, db, request):
+    from app.modules.audit_logs.models import AuditLog
+    from app.modules.audit_logs.writer import AuditLogWriter
+
+    writer = AuditLogWriter(flask_app)
+    writer.max_size = 3
+    writer.batch_size = 2
+    # Nothing is written by the background thread during the test
+    writer.flush_interval = 3600
+
+    message = f'buffered writer test {uuid.uuid4()}'
+
+    def cleanup():
+        AuditLog.query.filter(AuditLog.message.startswith(message)).delete(
+            synchronize_session=False
+        )
+        db.session.commit()
+
+    request.addfinalizer(cleanup)
+
+    assert writer.enqueue(_record(f'{message} 1'))
+    assert writer.enqueue(_record(f'{message} 2'))
+    assert writer.enqueue(_record(f'{message} 3'))
+    # The buffer is bounded, the caller has to write this one itself
+    assert not writer.enqueue(_record(f'{message} 4'))
+
+    assert writer.flush() == 3
+    assert writer.flush() == 0
+
+    logs = AuditLog.query.filter(AuditLog.message.startswith(message)).all()
+    assert sorted(log_entry.message for log_entry in logs) == [
+        f'{message} 1',
+        f'{message} 2',
+        f'{message} 3',
+    ]
+
+
+def test_create_synchronous(flask_app, db, request):
+    from app.modules.audit_logs.models import AuditLog
+
+    writer_patch = mock.patch('app.modules.audit_logs.writer.audit_log_writer')
+    writer = writer_patch.start()
+    request.addfinalizer(writer_patch.stop)
+    writer.enqueue.return_value = True
+
+    message = f'create test {uuid.uuid4()}'
+
+    def cleanup():
+        AuditLog.query.filter(AuditLog.message.startswith(message)).delete(
+            synchronize_session=False
+        )
+        db.session.commit()
+
+    request.addfinalizer(cleanup)
+
+    # Buffered entries are handed to the writer
+    AuditLog.create(f'{message} buffered', 'Access')
+    assert writer.enqueue.call_count == 1
+    assert writer.enqueue.call_args[0][0]['message'] == f'{message} buffered'
+    assert AuditLog.query.filter_by(message=f'{message} buffered').count() == 0
+
+    # Synchronous entries are added to the session straight away
+    AuditLog.create(f'{message} synchronous', 'Access', synchronous=True)
+    assert writer.enqueue.call_count == 1
+    assert AuditLog.query.filter_by(message=f'{message} synchronous').count() == 1
+
+    # As are buffered entries that the writer could not take
+    writer.enqueue.return_value = False
+    AuditLog.create(f'{message} full', 'Access')
+    assert writer.enqueue.call_count == 2
+    assert AuditLog.query.filter_by(message=f'{message} full').count() == 1
+
+    # Entries created in a transaction are only handed over on commit
+    with db.session.begin():
+        AuditLog.create(f'{message} committed', 'Access')
+        assert writer.enqueue.call_count == 2
+    assert writer.enqueue_all.call_count == 1
+    assert writer.enqueue_all.call_args[0][0][0]['message'] == f'{message} committed'
+
+    # And dropped on rollback
+    try:
+        with db.session.begin():
+            AuditLog.create(f'{message} rolled back', 'Access')
+            raise ValueError('rollback')
+    except ValueError:
+        pass
+    assert writer.enqueue.call_count == 2
+    assert writer.enqueue_all.call_count == 1
+
+
+def test_write_failure(flask_app, db, request):
+    from app.modules.audit_logs.models import AuditLog
+    from app.modules.audit_logs.writer import AuditLogWriter
+
+    writer = AuditLogWriter(flask_app)
+
+    message = f'write failure test {uuid.uuid4()}'
+
+    def cleanup():
+        AuditLog.query.filter(AuditLog.message.startswith(message)).delete(
+            synchronize_session=False
+        )
+        db.session.commit()
+
+    request.addfinalizer(cleanup)
+
+    bad_record = _record(f'{message} bad')
+    bad_record['audit_type'] = None
+
+    # The bad record fails the batch, the others are still written
+    records = [_record(f'{message} 1'), bad_record, _record(f'{message} 2')]
+    assert writer._write(records) == 1
+    assert writer.lost == 1
+
+    logs = AuditLog.query.filter(AuditLog.message.startswith(message)).all()
+    assert sorted(log_entry.message for log_entry in logs) == [
+        f'{message} 1',
+        f'{message} 2',
+    ]
@@ -180,3 +180,45 @@ def test_regular_user_can_revoke_token(
     )
 
     assert revoke_token_response.status_code == 200
+
+
+def test_regular_user_can_revoke_access_token(
+    flask_app,
+    flask_app_client,
+    regular_user_oauth2_token,
+    monkeypatch,
+):
+    from app.modules.auth.models import OAuth2Token
+
+    # Tokens are only cached with a cache shared by the workers
+    monkeypatch.setitem(flask_app.config, 'CACHE_TYPE', 'RedisCache')
+
+    # Revoke the token the request is authenticated with
+    data = {
+        'token': regular_user_oauth2_token.access_token,
+        'token_type_hint': 'access_token',
+        'client_id': regular_user_oauth2_token.client.guid,
+        'client_secret': regular_user_oauth2_token.client.secret,
+    }
+    headers = {
+        'Authorization': 'Bearer {}'.format(regular_user_oauth2_token.access_token)
+    }
+    revoke_token_response = flask_app_client.post(
+        '/api/v1/auth/revoke',
+        content_type='application/x-www-form-urlencoded',
+        headers=headers,
+        data=data,
+    )
+
+    assert revoke_token_response.status_code == 200
+    assert OAuth2Token.find(access_token=data['token']) is None
+
+    # The token was cached when the request was authenticated, but can no
+    # longer be used
+    revoke_token_response = flask_app_client.post(
+        '/api/v1/auth/revoke',
+        content_type='application/x-www-form-urlencoded',
+        headers=headers,
+        data=data,
+    )
+    assert revoke_token_response.status_code == 401
@@ -22,7 +22,7 @@ def test_loading_user_from_request_with_oauth_user_cached(flask_app):
 
 
 def test_loading_user_from_request_with_bearer_token(
-    flask_app, db, regular_user_oauth2_client
+    flask_app, db, regular_user_oauth2_client, monkeypatch
 ):
     oauth2_bearer_token = auth.models.OAuth2Token(
         client=regular_user_oauth2_client,
@@ -44,5 +44,35 @@ def test_loading_user_from_request_with_bearer_token(
             auth.views.load_user_from_request(request) == regular_user_oauth2_client.user
         )
 
+    # Tokens are not cached in a cache local to the worker
+    token = auth.models.OAuth2Token.find_cached(
+        access_token=oauth2_bearer_token.access_token
+    )
+    assert isinstance(token, auth.models.OAuth2Token)
+
+    monkeypatch.setitem(flask_app.config, 'CACHE_TYPE', 'RedisCache')
+    with flask_app.test_request_context(
+        path='/',
+        headers=(('Authorization', 'Bearer %s' % oauth2_bearer_token.access_token),),
+    ):
+        assert (
+            auth.views.load_user_from_request(request) == regular_user_oauth2_client.user
+        )
+
+    # The token is now cached
+    cached = auth.models.OAuth2Token.find_cached(
+        access_token=oauth2_bearer_token.access_token
+    )
+    assert isinstance(cached, auth.models.CachedOAuth2Token)
+    assert cached.user == regular_user_oauth2_client.user
+
     with db.session.begin():
         db.session.delete(oauth2_bearer_token)
+
+    # Deleting the token invalidates the cache
+    assert (
+        auth.models.OAuth2Token.find_cached(
+            access_token=oauth2_bearer_token.access_token
+        )
+        is None
+    )
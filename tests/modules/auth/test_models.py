@@ -72,10 +72,84 @@ def test_Code(db, researcher_1):
     assert Code.valid_codes(researcher_1, CodeTypes.recover) == []
 
     # Clean up expired but not resolved codes
-    Code.cleanup()
+    assert Code.cleanup() >= 1
     assert Code.query.get(recover_1.guid) == recover_1
     assert Code.query.get(recover_4.guid) is None
 
     # Delete other codes
     recover_1.delete()
     recover_5.delete()
+
+
+def test_cleanup(db, researcher_1, researcher_2, regular_user_oauth2_client, request):
+    from app.modules.auth.models import OAUTH2_TOKEN_RETENTION_DAYS, OAuth2Token
+
+    now = datetime.datetime.utcnow()
+
+    def create_token(user, created_days_ago, expired_days_ago):
+        token = OAuth2Token(
+            client=regular_user_oauth2_client,
+            user=user,
+            token_type=OAuth2Token.TokenTypes.Bearer,
+            scopes=[],
+            created=now - datetime.timedelta(days=created_days_ago),
+            expires=now - datetime.timedelta(days=expired_days_ago),
+        )
+        with db.session.begin():
+            db.session.add(token)
+        return token
+
+    retention = OAUTH2_TOKEN_RETENTION_DAYS
+    tokens = {
+        # Expired long ago, with newer tokens for the user
+        'old_1': create_token(researcher_1, retention + 20, retention + 19),
+        'old_2': create_token(researcher_1, retention + 10, retention + 9),
+        # Expired within the retention period
+        'recent': create_token(researcher_1, retention - 5, retention - 6),
+        # The latest token of the user is kept, however old
+        'old_3': create_token(researcher_2, retention + 30, retention + 29),
+        'latest': create_token(researcher_2, retention + 20, retention + 19),
+    }
+    token_guids = {name: token.guid for name, token in tokens.items()}
+
+    def cleanup_tokens():
+        with db.session.begin():
+            OAuth2Token.query.filter(
+                OAuth2Token.guid.in_(list(token_guids.values()))
+            ).delete(synchronize_session=False)
+
+    request.addfinalizer(cleanup_tokens)
+
+    codes = {}
+    for name in ('expired_1', 'expired_2', 'resolved', 'valid'):
+        codes[name] = Code.get(researcher_1, CodeTypes.recover, create_force=True)
+    code_guids = {name: code.guid for name, code in codes.items()}
+
+    def cleanup_codes():
+        with db.session.begin():
+            Code.query.filter(Code.guid.in_(list(code_guids.values()))).delete(
+                synchronize_session=False
+            )
+
+    request.addfinalizer(cleanup_codes)
+
+    codes['resolved'].record(CodeDecisions.reject)
+    for name in ('expired_1', 'expired_2', 'resolved'):
+        codes[name].expires = now - datetime.timedelta(seconds=1)
+        with db.session.begin():
+            db.session.merge(codes[name])
+
+    # One row per batch, so the clean-up has to go through several batches
+    assert OAuth2Token.cleanup(batch_size=1) >= 3
+    remaining = {
+        name
+        for name, guid in token_guids.items()
+        if OAuth2Token.query.get(guid) is not None
+    }
+    assert remaining == {'recent', 'latest'}
+
+    assert Code.cleanup(batch_size=1) >= 2
+    remaining = {
+        name for name, guid in code_guids.items() if Code.query.get(guid) is not None
+    }
+    assert remaining == {'resolved', 'valid'}
@@ -182,6 +182,12 @@ def test_create_individual(
     assert n == '003'
     n = agn.get_next()
     assert n == '004'
+    # a range of values is reserved at once
+    assert agn.reserve_values(10) == 5
+    assert agn.next_value == 15
+    assert agn.get_next() == '015'
+    # everyone with this taxonomy already has a name
+    assert agn.populate_all_individuals(admin_user) == 0
 
     # set up a second taxonomy. first we fail tho do to enabled=False
     agn2_prefix = 'BARR'
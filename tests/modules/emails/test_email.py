@@ -94,3 +94,64 @@ def test_sender():
 
     msg = Email(recipients=[test_recipient], sender='User One <user1@example.org>')
     assert msg.sender == 'User One <user1@example.org>'
+
+
+def test_queue(flask_app, db, request):
+    from app.modules.emails.models import OutgoingEmail, OutgoingEmailStatus
+
+    test_subject = f'test queue {uuid.uuid4()}'
+    msg = RecordedEmail(subject=test_subject, recipients=[test_recipient])
+    msg.email_type = EmailTypes.receipt
+    msg.body = 'body'
+
+    def cleanup():
+        OutgoingEmail.query.filter_by(subject=test_subject).delete()
+        EmailRecord.query.filter_by(email_type=EmailTypes.receipt).delete()
+
+    request.addfinalizer(cleanup)
+
+    # Stored in the outbox without being sent
+    resp = msg.queue(foreground=False)
+    assert resp == {'status': 'queued', 'success': True}
+    outgoing = OutgoingEmail.query.filter_by(subject=test_subject).one()
+    assert outgoing.status == OutgoingEmailStatus.pending
+    assert outgoing.recipients == msg.recipients
+    assert outgoing.extra_headers['X-Houston-Transaction-ID'] == msg._transaction_id
+
+    with msg.mail.record_messages() as outbox:
+        assert OutgoingEmail.deliver_pending() >= 1
+        sent = [message for message in outbox if message.subject == test_subject]
+        assert len(sent) == 1
+        assert sent[0].recipients == msg.recipients
+        assert sent[0].body == 'body'
+
+    db.session.refresh(outgoing)
+    assert outgoing.status == OutgoingEmailStatus.sent
+    assert outgoing.attempts == 1
+    assert EmailRecord.query.filter_by(email_type=EmailTypes.receipt).count() == 1
+
+    # Nothing left to send
+    with msg.mail.record_messages() as outbox:
+        OutgoingEmail.deliver_pending(guids=[outgoing.guid])
+        assert len(outbox) == 0
+
+
+def test_template_cache():
+    from app.extensions import email as email_extension
+
+    email_extension.HTML_TEMPLATE_CACHE.clear()
+
+    names = ['Alice', 'Bob & "Carol"']
+    for name in names:
+        msg = Email(recipients=[test_recipient])
+        msg.template(
+            'notifications/collaboration_request',
+            sender_name=name,
+            base_url='http://example.org/a b',
+        )
+        assert msg._template_found
+        assert name in msg.html
+        assert 'houston-var://' not in msg.html
+
+    # The premailed HTML is rendered once for both messages
+    assert len(email_extension.HTML_TEMPLATE_CACHE) == 1
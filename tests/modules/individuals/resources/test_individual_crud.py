@@ -183,6 +183,9 @@ def test_add_remove_encounters(db, flask_app_client, researcher_1, request, test
 
     assert individual_1.get_last_seen_time_isoformat() == test_time
     assert individual_1.get_last_seen_time_specificity() == Specificities.time
+    assert individual_1.encounter_count == 1
+    assert individual_1.sighting_count == 1
+    assert individual_1.last_seen_time == sighting.time
 
     # # let's start with one
     # individual_1.add_encounter(enc_1)
@@ -243,6 +246,14 @@ def test_add_remove_encounters(db, flask_app_client, researcher_1, request, test
     assert str(enc_3.guid), str(enc_4.guid) in [
         str(encounter.guid) for encounter in individual_1.get_encounters()
     ]
+    assert individual_1.num_encounters() == 3
+    assert individual_1.get_number_sightings() == 1
+    assert not individual_1.has_annotations()
+
+    # the summary is maintained in place, so refreshing it changes nothing
+    individual_1.refresh_summary()
+    assert individual_1.encounter_count == 3
+    assert individual_1.last_seen_time == sighting.time
 
     # Check individual encounters times (which are null and should
     # return the sighting time)
@@ -2,7 +2,6 @@
 # pylint: disable=missing-docstring
 import email
 import logging
-from unittest import mock
 
 import pytest
 
@@ -209,6 +208,7 @@ def test_get_data_and_voting(
     request,
     test_root,
 ):
+    from app.extensions.email import mail
     from app.modules.individuals.models import Individual, IndividualMergeRequestVote
     from app.modules.notifications.models import NotificationType
 
@@ -366,14 +366,15 @@ def test_get_data_and_voting(
     )
 
     # valid vote (will incidentally also do merge!)
-    with mock.patch('app.extensions.email.mail.send') as send:
+    # notification emails are delivered through the outbox
+    with mail.record_messages() as outbox:
         response = individual_utils.vote_merge_request(
             flask_app_client,
             researcher_1,
             request_id,
             'allow',
         )
-    email_obj = send.call_args[0][0]
+    email_obj = outbox[-1]
     message = email.message_from_string(str(email_obj))
     assert message.get('To') == researcher_2.email
     assert message.get('Subject') == 'Archibald and 1 individual have been merged'
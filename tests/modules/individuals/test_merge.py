@@ -81,9 +81,12 @@ def test_merge(db, flask_app_client, researcher_1, request, test_root):
     except ValueError as ve:
         assert 'with self' in str(ve)
 
-    indiv1.merge_from(indiv2)
+    result = indiv1.merge_from(indiv2)
+    assert result['merged'] == {indiv2_guid: [enc2_guid]}
 
     assert len(indiv1.encounters) == 2
+    assert indiv1.num_encounters() == 2
+    assert Individual.get_merge_request_stakeholders([indiv1]) == {researcher_1}
     indiv2 = Individual.query.get(indiv2_guid)  # should be gone
     assert not indiv2
 
@@ -234,7 +237,7 @@ def test_merge_request_init(db, flask_app_client, researcher_1, researcher_2, re
     from dateutil import parser as dt_parser
 
     from app.modules.encounters.models import Encounter
-    from app.modules.individuals.models import Individual
+    from app.modules.individuals.models import Individual, IndividualMergeRequest
     from app.modules.notifications.models import Notification, NotificationType
 
     conf_tx = site_setting_utils.get_some_taxonomy_dict(flask_app_client, researcher_1)
@@ -266,6 +269,26 @@ def test_merge_request_init(db, flask_app_client, researcher_1, researcher_2, re
     assert res['async'].id
     request.addfinalizer(Notification.query.delete)
 
+    # the request is recorded with its stakeholders, under the celery task id
+    merge_request = IndividualMergeRequest.query.get(res['async'].id)
+    assert merge_request
+    request.addfinalizer(merge_request.delete)
+    assert merge_request.target_individual_guid == individual.guid
+    assert merge_request.from_individual_guids == [str(individual2.guid)]
+    assert set(merge_request.get_stakeholder_guids()) == {
+        researcher_1.guid,
+        researcher_2.guid,
+    }
+    # the merge is not due for another few seconds
+    assert merge_request.state == 'pending'
+    for user in (researcher_1, researcher_2):
+        active_ids = [
+            req['request']['id'] for req in Individual.get_active_merge_requests(user)
+        ]
+        assert res['async'].id in active_ids
+    data = Individual.get_merge_request_data(res['async'].id)
+    assert data['request']['args'][0] == str(individual.guid)
+
     notif = Notification.query.filter_by(
         recipient=researcher_1,
         message_type=NotificationType.individual_merge_request,
@@ -70,3 +70,28 @@ def test_errors(
 
     # encounters not cleared up unless this is restored
     sight.encounters = old_encounters
+
+
+@pytest.mark.skipif(module_unavailable('integrity'), reason='Integrity module disabled')
+def test_incremental(db, flask_app_client, researcher_1, admin_user, request, test_root):
+    from app.modules.integrity.models import Integrity
+    from app.modules.progress.models import ProgressStatus
+
+    full = integ_utils.create(flask_app_client, admin_user, request=request).json
+    assert full['since'] is None
+    assert set(full['result'].keys()) == set(Integrity.CHECKS)
+
+    integrity = Integrity.query.get(full['guid'])
+    assert integrity.progress.status == ProgressStatus.completed
+    assert len(integrity.progress.steps) == len(Integrity.CHECKS)
+
+    # Only the new individual is checked by an incremental run
+    uuids = ind_utils.create_individual_and_sighting(
+        flask_app_client, researcher_1, request, test_root
+    )
+    incremental = integ_utils.create(
+        flask_app_client, admin_user, request=request, data={'incremental': True}
+    ).json
+    assert incremental['since'] is not None
+    assert set(incremental['result'].keys()) == set(Integrity.CHECKS)
+    assert incremental['result']['assets']['no_content_guid'] == [uuids['assets'][0]]
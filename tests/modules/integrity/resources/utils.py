@@ -15,13 +15,14 @@ def create(
     expected_status_code=200,
     expected_error='',
     request=None,
+    data=None,
 ):
     resp = test_utils.post_via_flask(
         flask_app_client,
         user,
         'integrity:write',
         PATH,
-        None,
+        data,
         expected_status_code,
         EXPECTED_KEYS,
         expected_error,
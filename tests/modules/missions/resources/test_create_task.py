@@ -105,6 +105,14 @@ def test_create_and_delete_mission_task(flask_app_client, admin_user, test_root,
         nonce, new_mission_collection3 = new_mission_collections[2]
         assert mission_task_assets[0].git_store == new_mission_collection3
 
+        # Counts are computed in SQL and agree with the loaded objects
+        assert read_mission_task.asset_count == 1
+        assert read_mission_task.get_asset_guids() == [mission_task_assets[0].guid]
+        assert temp_mission.asset_count == sum(
+            len(collection.assets) for _, collection in new_mission_collections
+        )
+        assert temp_mission.asset_count == len(temp_mission.get_assets(load=False))
+
         # Try reading it back
         mission_utils.read_mission_task(flask_app_client, admin_user, mission_task_guid)
 
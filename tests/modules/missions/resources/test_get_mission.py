@@ -49,6 +49,19 @@ def test_get_mission_by_search(flask_app_client, admin_user):
     response = current_list.json[0]
     assert response['title'] == new_mission.title
 
+    # Search missions by full GUID (exact match fast path)
+    current_list = mission_utils.read_all_missions(
+        flask_app_client, admin_user, search=guid_str
+    )
+    assert len(current_list.json) == 1
+    assert current_list.json[0]['guid'] == guid_str
+
+    # Words that cannot be part of a GUID are only matched against the title
+    current_list = mission_utils.read_all_missions(
+        flask_app_client, admin_user, search='not-a-guid-{}'.format(nonce)
+    )
+    assert len(current_list.json) == 0
+
     # Search missions by owner GUID segment
     nonce, new_mission = new_missions[2]
     guid_str = str(new_mission.owner_guid)
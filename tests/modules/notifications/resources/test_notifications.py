@@ -275,3 +275,58 @@ def test_notification_preferences(
     )
 
     assert len(collab_requests_from_res1) != 0
+
+
+# The unread counts are only cached when the cache is shared by the workers
+@pytest.mark.parametrize('cache_type', ['SimpleCache', 'RedisCache'])
+def test_unread_notifications_inbox(
+    db,
+    flask_app,
+    flask_app_client,
+    researcher_1,
+    researcher_2,
+    request,
+    monkeypatch,
+    cache_type,
+):
+    monkeypatch.setitem(flask_app.config, 'CACHE_TYPE', cache_type)
+    notif_utils.mark_all_notifications_as_read(flask_app_client, researcher_1)
+    unread_before = notif_utils.read_unread_notifications_count(
+        flask_app_client, researcher_1
+    ).json['unread']
+
+    builder = NotificationBuilder(researcher_2)
+    builder.data['request_id'] = 'inbox-test'
+    notif = Notification.create(
+        NotificationType.individual_merge_complete, researcher_1, builder
+    )
+
+    def cleanup():
+        with db.session.begin(subtransactions=True):
+            db.session.delete(notif)
+
+    request.addfinalizer(cleanup)
+
+    # The badge count is kept up to date as notifications are created
+    resp = notif_utils.read_unread_notifications_count(flask_app_client, researcher_1)
+    assert resp.json['unread'] == unread_before + 1
+
+    # Unread notifications come first in the inbox, newest first
+    for sub_path in ('', 'unread'):
+        resp = notif_utils.read_all_notifications(
+            flask_app_client, researcher_1, sub_path=sub_path
+        )
+        assert resp.json[0]['guid'] == str(notif.guid)
+        assert resp.json[0]['sender_name'] == researcher_2.full_name
+
+    # Paging is done by the database
+    resp = notif_utils.read_all_notifications(
+        flask_app_client, researcher_1, sub_path='?limit=1'
+    )
+    assert len(resp.json) == 1
+
+    notif_utils.mark_notification_as_read(flask_app_client, researcher_1, notif.guid)
+    resp = notif_utils.read_unread_notifications_count(flask_app_client, researcher_1)
+    assert resp.json['unread'] == unread_before
+    resp = notif_utils.read_all_unread_notifications(flask_app_client, researcher_1)
+    assert str(notif.guid) not in [item['guid'] for item in resp.json]
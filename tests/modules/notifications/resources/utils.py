@@ -123,6 +123,17 @@ def read_all_unread_notifications(flask_app_client, user, expected_status_code=2
     )
 
 
+def read_unread_notifications_count(flask_app_client, user, expected_status_code=200):
+    return test_utils.get_dict_via_flask(
+        flask_app_client,
+        user,
+        scopes='notifications:read',
+        path=f'{PATH}unread/count',
+        expected_status_code=expected_status_code,
+        response_200={'unread'},
+    )
+
+
 def get_unread_notifications(json_data, from_user_guid, notification_type):
     return list(
         filter(
@@ -411,10 +411,10 @@ def test_create_anon_and_delete_sighting(
     asset_guids = [a['guid'] for a in assets]
     assert assets[0]['filename'] == 'fluke.jpg'
     assert assets[0]['guid'] == asset_guids[0]
-    assert assets[0]['src'] == f'/api/v1/assets/src/{asset_guids[0]}'
+    assert assets[0]['src'].split('?')[0] == f'/api/v1/assets/src/{asset_guids[0]}'
     assert assets[1]['filename'] == 'zebra.jpg'
     assert assets[1]['guid'] == asset_guids[1]
-    assert assets[1]['src'] == f'/api/v1/assets/src/{asset_guids[1]}'
+    assert assets[1]['src'].split('?')[0] == f'/api/v1/assets/src/{asset_guids[1]}'
 
     asset_group_sighting_guid = group_create_response.json['asset_group_sightings'][0][
         'guid'
@@ -3,6 +3,7 @@
 
 import logging
 import uuid
+from unittest import mock
 
 import pytest
 
@@ -559,3 +560,116 @@ def test_individual_delete(
         flask_app_client, researcher_1, group_guid
     )
     soc_group_utils.validate_response(new_data, later_group.json)
+
+
+@pytest.mark.skipif(
+    module_unavailable('social_groups'), reason='SocialGroup module disabled'
+)
+def test_role_revalidation(
+    db, flask_app_client, researcher_1, admin_user, request, test_root
+):
+    from app.modules.social_groups.models import SocialGroup
+
+    roles = soc_group_utils.set_basic_roles(flask_app_client, admin_user, request)
+    matriarch_guid, git_guid = roles[0]['guid'], roles[1]['guid']
+    individuals = create_individuals(flask_app_client, researcher_1, request, test_root)
+
+    valid_group = {
+        'name': 'Revalidated bunch of hooligans',
+        'members': {
+            individuals[0]['guid']: {'role_guids': [matriarch_guid]},
+            individuals[1]['guid']: {'role_guids': [git_guid]},
+            individuals[2]['guid']: {'role_guids': [git_guid]},
+        },
+    }
+    group_guid = soc_group_utils.create_social_group(
+        flask_app_client, researcher_1, valid_group, request=request
+    ).json['guid']
+
+    # Adding a role has nothing to revalidate and leaves the members alone
+    added_roles = roles + [
+        {'guid': str(uuid.uuid4()), 'label': 'Sentinel', 'multipleInGroup': False}
+    ]
+    assert SocialGroup.site_settings_updated(added_roles, roles) is None
+    soc_group_utils.set_roles(flask_app_client, admin_user, added_roles)
+    group = soc_group_utils.read_social_group(
+        flask_app_client, researcher_1, group_guid
+    ).json
+    soc_group_utils.validate_members(valid_group['members'], group['members'])
+
+    # Making IrritatingGit singular keeps both holders but audits the conflict
+    singular_roles = [dict(role, multipleInGroup=False) for role in added_roles]
+    progress = SocialGroup.site_settings_updated(
+        singular_roles, added_roles, foreground=True
+    )
+    request.addfinalizer(progress.delete)
+    assert progress.complete
+    assert progress.percentage == 100
+
+    group = soc_group_utils.read_social_group(
+        flask_app_client, researcher_1, group_guid
+    ).json
+    soc_group_utils.validate_members(valid_group['members'], group['members'])
+    audit = audit_utils.read_audit_log(flask_app_client, admin_user, group_guid)
+    warnings = [
+        audit_log['message']
+        for audit_log in audit.json
+        if 'WARNING' in (audit_log['message'] or '')
+    ]
+    assert len(warnings) == 1
+    assert git_guid in warnings[0]
+    assert matriarch_guid not in warnings[0]
+
+
+@pytest.mark.skipif(
+    module_unavailable('social_groups'), reason='SocialGroup module disabled'
+)
+def test_role_revalidation_background(
+    db, flask_app_client, researcher_1, admin_user, request, test_root
+):
+    from app.modules.social_groups.models import SocialGroup
+    from app.modules.social_groups.tasks import revalidate_social_group_roles
+
+    roles = soc_group_utils.set_basic_roles(flask_app_client, admin_user, request)
+    matriarch_guid, git_guid = roles[0]['guid'], roles[1]['guid']
+    individuals = create_individuals(
+        flask_app_client, researcher_1, request, test_root, num_individuals=2
+    )
+
+    valid_group = {
+        'name': 'Slowly revalidated hooligans',
+        'members': {
+            individuals[0]['guid']: {'role_guids': [matriarch_guid, git_guid]},
+            individuals[1]['guid']: {'role_guids': [git_guid]},
+        },
+    }
+    group_guid = soc_group_utils.create_social_group(
+        flask_app_client, researcher_1, valid_group, request=request
+    ).json['guid']
+
+    # Removing Matriarch queues the revalidation instead of running it
+    celery_guid = uuid.uuid4()
+    with mock.patch(
+        'app.modules.social_groups.tasks.revalidate_social_group_roles.delay',
+        return_value=mock.Mock(id=str(celery_guid)),
+    ) as delay:
+        progress = SocialGroup.site_settings_updated([roles[1]], roles, foreground=False)
+    request.addfinalizer(progress.delete)
+    delay.assert_called_once_with([matriarch_guid], [], str(progress.guid))
+    assert progress.celery_guid == celery_guid
+    assert not progress.complete
+
+    group = soc_group_utils.read_social_group(
+        flask_app_client, researcher_1, group_guid
+    ).json
+    soc_group_utils.validate_members(valid_group['members'], group['members'])
+
+    # and the task strips the removed role and completes the progress
+    revalidate_social_group_roles(*delay.call_args.args)
+    group = soc_group_utils.read_social_group(
+        flask_app_client, researcher_1, group_guid
+    ).json
+    assert group['members'][individuals[0]['guid']]['role_guids'] == [git_guid]
+    assert group['members'][individuals[1]['guid']]['role_guids'] == [git_guid]
+    assert progress.complete
+    assert progress.percentage == 100
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=missing-docstring
+import json
+
+import pytest
+
+from tests.modules.individuals.resources import utils as individual_utils
+from tests.utils import module_unavailable
+
+
+@pytest.mark.skipif(
+    module_unavailable('individuals', 'encounters', 'sightings'),
+    reason='Individuals module disabled',
+)
+def test_transfer_individuals_from_recording(
+    flask_app, flask_app_client, researcher_1, request, test_root, tmp_path
+):
+    from app.modules.individuals.models import Individual
+    from tasks.codex.edm import EDMTransfer, RecordedEDM, transfer_data_individual
+
+    guids = [
+        individual_utils.create_individual_and_sighting(
+            flask_app_client, researcher_1, request, test_root
+        )['individual']
+        for _ in range(3)
+    ]
+    guids.sort()
+
+    recording = tmp_path / 'edm.json'
+    recording.write_text(
+        json.dumps(
+            {
+                'individual.data_complete': {
+                    guids[0]: {'success': True, 'result': {'sex': 'female'}},
+                    guids[1]: {'success': True, 'result': {'sex': 'not a sex'}},
+                    guids[2]: {'success': True, 'result': {'sex': 'male'}},
+                }
+            }
+        )
+    )
+    checkpoint = tmp_path / 'checkpoint.json'
+    transfer_kwargs = {
+        'edm': RecordedEDM(str(recording)),
+        'workers': 2,
+        'chunk_size': 1,
+        'checkpoint': str(checkpoint),
+    }
+
+    # A dry run only fetches
+    stats = transfer_data_individual(dry_run=True, **transfer_kwargs)
+    assert stats['fetched'] >= 3
+    assert stats['transferred'] == 0
+    assert not checkpoint.exists()
+
+    # The invalid sex stops the transfer, the chunks before it are committed
+    with pytest.raises(ValueError):
+        transfer_data_individual(**transfer_kwargs)
+    assert Individual.query.get(guids[0]).sex == 'female'
+    state = json.loads(checkpoint.read_text())['individual']
+    assert state['last_guid'] < guids[1]
+
+    # Resuming after the data is fixed starts from the checkpoint
+    transfer_kwargs['edm'].responses['individual.data_complete'][guids[1]] = {
+        'success': True,
+        'result': {'sex': 'male'},
+    }
+    transfer = EDMTransfer(
+        'individual',
+        Individual,
+        'individual.data_complete',
+        lambda indiv, edm_data: setattr(indiv, 'sex', edm_data['sex']),
+        **transfer_kwargs,
+    )
+    stats = transfer.run()
+    assert stats['fetched'] < Individual.query.count()
+    assert Individual.query.get(guids[1]).sex == 'male'
+    assert Individual.query.get(guids[2]).sex == 'male'
+
+    # A completed transfer removes its checkpoint
+    assert 'individual' not in json.loads(checkpoint.read_text())